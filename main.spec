@@ -3,6 +3,7 @@
 data_files = [
     ('py_apps/ui/*.tcss', 'py_apps/ui'),
     ('py_apps/apps/browser/lnk/*', 'py_apps/apps/browser/lnk'),
+    ('py_apps/apps/catalog.json', 'py_apps/apps'),
 ]
 
 a = Analysis(
@@ -14,9 +15,11 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Never used, keep them out of the archive
+    excludes=['tkinter', 'unittest', 'pydoc_data', 'test'],
     noarchive=False,
-    optimize=0,
+    # Strip asserts from the frozen bytecode
+    optimize=1,
 )
 pyz = PYZ(a.pure)
 
@@ -29,7 +32,8 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # UPX packed binaries are unpacked on every launch, which slows startup down
+    upx=False,
     console=True,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -42,7 +46,7 @@ coll = COLLECT(
     a.binaries,
     a.datas,
     strip=False,
-    upx=True,
+    upx=False,
     upx_exclude=[],
     name='main',
 )
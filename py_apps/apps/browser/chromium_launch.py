@@ -0,0 +1,270 @@
+"""
+Launch wrappers of the Chromium based browsers (QtWebEngine included), with flags
+fitted to the environment, & desktop entries starting them
+
+The flags, from the RAM, the cores, /dev/dri & proot:
+    sandbox         off under proot (no namespaces & seccomp), as root,
+                    or for the browsers without one (falkon-no-sandbox)
+    /dev/shm        not used under proot, it's tiny or missing there
+    renderers       one process per GiB of RAM, at most one per core & 8
+    GPU             rasterization & zero-copy uploads with a GPU, off without
+    disk cache      in $XDG_RUNTIME_DIR (RAM) & SMALL_CACHE on small machines
+                    (up to 4 GiB or 2 cores), on disk & DISK_CACHE otherwise
+QtWebEngine reads its flags from $QTWEBENGINE_CHROMIUM_FLAGS, the cache being a
+setting of the browser. A headless start checks the flags, falling back on the
+sandbox ones when they don't start.
+
+Add a ChromiumBrowser to CHROMIUM_BROWSERS for another browser.
+"""
+
+from os import environ, path
+from re import sub
+from subprocess import DEVNULL, SubprocessError
+from time import monotonic
+from typing import NamedTuple
+
+from py_apps.utils.cmd import stream
+from py_apps.utils.fileops import write_file
+from py_apps.utils.sys import hardware, is_proot, is_small_machine, root_path
+
+
+# Seconds before a headless browser is given up on
+CHECK_TIMEOUT: float = 30
+
+# The disk cache of small machines & of the others, in MiB
+SMALL_CACHE: int = 64
+DISK_CACHE: int = 256
+
+
+class ChromiumBrowser(NamedTuple):
+    """A browser to be wrapped"""
+
+    # Tried in order, absolute when the wrapper has the same name
+    commands: list[str]
+    # The wrapper, such as /usr/local/bin/vivaldi-stable
+    wrapper: str
+    # The desktop entry written, "" for none
+    desktop: str
+    # Its source, the desktop entry itself when "", rewritten in place
+    template: str = ""
+    qt: bool = False
+    no_sandbox: bool = False
+
+
+CHROMIUM_BROWSERS: dict[str, ChromiumBrowser] = {
+    "vivaldi": ChromiumBrowser(
+        commands=["/usr/bin/vivaldi-stable"],
+        wrapper="/usr/local/bin/vivaldi-stable",
+        desktop="/usr/share/applications/vivaldi-stable.desktop",
+    ),
+    "falkon": ChromiumBrowser(
+        commands=["falkon", "falkon-browser", "org.kde.falkon"],
+        wrapper="/usr/local/bin/falkon-no-sandbox",
+        desktop="/usr/share/applications/org.kde.falkon-no-sandbox.desktop",
+        template=f"{path.dirname(__file__)}/lnk/org.kde.falkon-no-sandbox.desktop",
+        qt=True,
+        no_sandbox=True,
+    ),
+}
+
+
+class LaunchEnv(NamedTuple):
+    """What the flags are chosen from"""
+
+    ram: int
+    cores: int
+    gpu: bool
+    proot: bool
+
+    @classmethod
+    def detect(cls) -> "LaunchEnv":
+        """The environment of this machine"""
+        ram, cores = hardware()
+        return cls(ram, cores, path.exists("/dev/dri"), is_proot())
+
+    def summary(self) -> str:
+        """Such as "3800 MiB, 4 cores, no GPU, proot" """
+        return (
+            f"{self.ram} MiB, {self.cores} cores"
+            + ("" if self.gpu else ", no GPU")
+            + (", proot" if self.proot else "")
+        )
+
+
+def launch_flags(env: LaunchEnv, cache_dir: str, qt: bool = False) -> list[str]:
+    """
+    The flags for the environment, see the module docstring,
+    the sandbox ones aside
+
+    Params:
+        LaunchEnv env: the environment
+        str cache_dir: the disk cache dir of small machines
+        bool qt: QtWebEngine, the cache is a setting of the browser then
+
+    Returns: list[str]
+    """
+    small: bool = is_small_machine(env.ram, env.cores)
+    flags: list[str] = ["--disable-dev-shm-usage"] if env.proot else []
+
+    flags.append(
+        f"--renderer-process-limit={max(min(env.ram // 1024, env.cores, 8), 1)}"
+    )
+    flags.extend(
+        ["--enable-gpu-rasterization", "--enable-zero-copy"]
+        if env.gpu
+        else ["--disable-gpu", "--disable-gpu-compositing"]
+    )
+
+    if not qt:
+        flags.extend(
+            [
+                f"--disk-cache-dir={cache_dir}",
+                f"--disk-cache-size={SMALL_CACHE * 1024**2}",
+            ]
+            if small
+            else [f"--disk-cache-size={DISK_CACHE * 1024**2}"]
+        )
+    return flags
+
+
+def wrapper_script(
+    browser: ChromiumBrowser, flags: list[str], sandbox: bool, comment: str = ""
+) -> str:
+    """
+    The shell script of a wrapper
+
+    Params:
+        ChromiumBrowser browser: the browser
+        list[str] flags: the flags, expanded by the shell in double quotes
+        bool sandbox: whether the sandbox is kept, but as root
+        str comment: written at the top
+
+    Returns: str
+    """
+    lines: list[str] = ["#!/bin/sh", f"# py_apps: {comment}" if comment else ""]
+
+    no_sandbox: str = (
+        "export QTWEBENGINE_DISABLE_SANDBOX=1"
+        if browser.qt
+        else 'set -- --no-sandbox "$@"'
+    )
+    if not sandbox:
+        lines.append(no_sandbox)
+    else:
+        lines.append(f'[ "$(id -u)" = 0 ] && {no_sandbox}')
+
+    args: list[str] = [*[f'"{flag}"' for flag in flags], '"$@"']
+    if browser.qt:
+        lines.append(
+            'export QTWEBENGINE_CHROMIUM_FLAGS="$QTWEBENGINE_CHROMIUM_FLAGS '
+            + " ".join(flags)
+            + '"'
+        )
+        args = ['"$@"']
+
+    lines.extend(
+        [
+            f"for bin in {' '.join(browser.commands)}; do",
+            '    if command -v "$bin" >/dev/null 2>&1; then',
+            f'        exec "$bin" {" ".join(args)}',
+            "    fi",
+            "done",
+            f'echo "{path.basename(browser.wrapper)}: browser not found" >&2',
+            "exit 127",
+        ]
+    )
+    return "\n".join(line for line in lines if line) + "\n"
+
+
+def desktop_entry(content: str, wrapper: str) -> str:
+    """
+    A desktop entry starting the wrapper
+
+    Params:
+        str content: the desktop entry of the browser
+        str wrapper: the wrapper
+
+    Returns: str
+    """
+    # The binary replaced, "--no-sandbox" is up to the wrapper now
+    return sub(
+        r"(?m)^(Exec|TryExec)=\S+(?: --no-sandbox)*",
+        lambda match: f"{match[1]}={wrapper}",
+        content,
+    )
+
+
+def check_startup(wrapper: str) -> float | None:
+    """
+    Start the browser headless through the wrapper, until about:blank is rendered
+
+    Params:
+        str wrapper: the wrapper
+
+    Returns: float | None, the time it took in ms, None when it didn't start
+    """
+    start: float = monotonic()
+    try:
+        stream(
+            [wrapper, "--headless", "--dump-dom", "about:blank"],
+            stdout=DEVNULL,
+            stderr=DEVNULL,
+            timeout=CHECK_TIMEOUT,
+        )
+    except (SubprocessError, OSError):
+        return None
+    return (monotonic() - start) * 1000
+
+
+def install_launcher(name: str, env: LaunchEnv | None = None) -> str:
+    """
+    Write the wrapper & the desktop entry of a browser
+
+    Params:
+        str name: the key in CHROMIUM_BROWSERS
+        LaunchEnv | None env: the environment, detected by default
+
+    Returns: str, the report
+    """
+    browser: ChromiumBrowser = CHROMIUM_BROWSERS[name]
+    env = env or LaunchEnv.detect()
+    sandbox: bool = not (browser.no_sandbox or env.proot)
+    flags: list[str] = (
+        launch_flags(
+            env,
+            f"${{XDG_RUNTIME_DIR:-/tmp}}/{path.basename(browser.wrapper)}-cache",
+            browser.qt,
+        )
+        if environ.get("PY_APPS_BROWSER_TUNE", "on") != "off"
+        else []
+    )
+
+    wrapper: str = root_path(browser.wrapper)
+    write_file(wrapper, wrapper_script(browser, flags, sandbox, env.summary()), 0o755)
+
+    desktop: str = root_path(browser.desktop)
+    template: str = browser.template or desktop
+    if path.exists(template):
+        with open(template, "r", encoding="utf-8") as template_file:
+            write_file(desktop, desktop_entry(template_file.read(), browser.wrapper))
+
+    report: str = f"{browser.wrapper}: {' '.join(flags) or '-'}"
+    # QtWebEngine browsers have no headless mode
+    if browser.qt or environ.get("PY_APPS_BROWSER_CHECK", "on") == "off":
+        return report
+
+    startup: float | None = check_startup(wrapper)
+    if startup is not None:
+        return f"{report}\n无头启动用时 {startup:.0f} ms"
+    if not flags:
+        return f"{report}\n无头启动失败"
+
+    # The flags are to blame only if it starts without them
+    write_file(wrapper, wrapper_script(browser, [], sandbox, env.summary()), 0o755)
+    startup = check_startup(wrapper)
+    if startup is None:
+        write_file(
+            wrapper, wrapper_script(browser, flags, sandbox, env.summary()), 0o755
+        )
+        return f"{report}\n无头启动失败"
+    return f"{report}\n调优参数无法启动，已回退到默认参数（{startup:.0f} ms）"
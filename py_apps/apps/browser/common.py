@@ -16,3 +16,11 @@ class Browser:
     def install(self) -> Any:
         """Install method for overwrite"""
         return self
+
+    def artifacts(self) -> list[str]:
+        """Urls downloaded by install(), available after prepare()"""
+        return []
+
+    def packages(self) -> list[str]:
+        """System packages installed by install(), available after prepare()"""
+        return []
@@ -2,80 +2,33 @@
 Falkon Browser
 """
 
-from os import path
-
+from py_apps.apps.browser.chromium_launch import install_launcher
 from py_apps.apps.browser.common import Browser
-from py_apps.errors.distro_x_only import DistroXOnlyError
-from py_apps.ui.notice import Notice
-from py_apps.utils.app_manage import install_app
-from py_apps.utils.cmd import run
-from py_apps.utils.sys import check_architecture, get_distro_short_name
-
+from py_apps.apps.package_app import PackageApp
+from py_apps.utils.jobs import current_job
 
-class Falkon(Browser):
-    """Falkon Browser"""
 
-    _ARCH: str = check_architecture()
-    _DISTRO, _OTHER_DISTRO = get_distro_short_name()
+class Falkon(PackageApp, Browser):
+    """Falkon Browser, the packages are in the catalog"""
 
-    def __init__(self) -> None:
-        self.pkg: str = ""
-        self._pkg_dict: dict[str, str] = {
-            "debian": "falkon",
-            "redhat": "falkon",
-            "arch": "falkon",
-            "gentoo": "www-client/falkon",
-            "void": "falkon",
-        }
-
-    def prepare(self) -> Browser:
-        self.pkg = self._pkg_dict.get(self._DISTRO, "")
-        if self.pkg == "":
-            raise DistroXOnlyError(
-                self._DISTRO,
-                "Debian & RHEL & Archlinux & Void Linux & Gentoo",
-            )
-
-        return self
+    APP_ID: str = "falkon"
 
     def install(self) -> Browser:
-        install_app(self._DISTRO, [self.pkg])
-
-        bin_path = f"{path.dirname(__file__)}/lnk/falkon-no-sandbox"
-        lnk_path = f"{path.dirname(__file__)}/lnk/org.kde.falkon-no-sandbox.desktop"
-
-        # Write falkon no sandbox command
-        with open(
-            "/usr/local/bin/falkon-no-sandbox", mode="w", encoding="utf-8"
-        ) as falkon_no_sandbox:
-            cmd_bin_content = []
-            with open(bin_path, mode="r", encoding="utf-8") as bin_file:
-                cmd_bin_content = bin_file.readlines()
+        super().install()
 
-            falkon_no_sandbox.writelines(cmd_bin_content)
-        run(["chmod", "+rwx", "-vf", "/usr/local/bin/falkon-no-sandbox"])
+        # Write falkon no sandbox command & its desktop entry
+        print(install_launcher("falkon"))
 
-        # Write falkon no sandbox desktop entry
-        with open(
-            "/usr/share/applications/org.kde.falkon-no-sandbox.desktop",
-            mode="w",
-            encoding="utf-8",
-        ) as entry:
-            entry_content: list[str] = []
-            with open(lnk_path, mode="r", encoding="utf-8") as lnk:
-                entry_content = lnk.readlines()
+        msg: str = "若不能使用Falkon，请启动falkon-no-sandbox"
+        # No dialog from the background job queue, the TUI is busy
+        if current_job() is not None:
+            print(msg)
+            return self
 
-            entry.writelines(entry_content)
-        run(
-            [
-                "chmod",
-                "+rwx",
-                "-vf",
-                "/usr/share/applications/org.kde.falkon-no-sandbox.desktop",
-            ]
-        )
+        # pylint: disable=import-outside-toplevel
+        from py_apps.ui.notice import Notice
 
-        notice = Notice("若不能使用Falkon，请启动falkon-no-sandbox").run()
+        notice = Notice(msg).run()
         assert notice == "ok"
 
         return self
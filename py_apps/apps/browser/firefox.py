@@ -3,13 +3,18 @@ This module contains an Firefox managing class
 """
 
 from enum import Enum, unique
+from os import environ
 from time import sleep
+from typing import Any
 
 from py_apps.apps.browser.common import Browser
+from py_apps.apps.browser.firefox_tune import tune_firefox
+from py_apps.apps.catalog import app_entry
 from py_apps.errors.distro_x_only import DistroXOnlyError
 from py_apps.utils.app_manage import install_app
 from py_apps.utils.cmd import check_cmd_exists, run
-from py_apps.utils.sys import get_distro_short_name
+from py_apps.utils.fileops import sub_lines, write_file
+from py_apps.utils.sys import get_distro_short_name, root_path
 
 
 @unique
@@ -51,92 +56,40 @@ class Firefox(Browser):
                 msg="when installing software-properties-common for ppa",
             )
 
-    def _prepare_for_esr(self) -> None:
+    def _prepare_packages(self) -> None:
         """
-        Prepare the environment for the installation of firefox-esr
+        Resolve the packages of the variant from the catalog,
+        the extra packages of the sub distro (such as ubuntu) first
         """
-        dep_main_dict: dict[str, str] = {
-            "debian": "firefox-esr",
-            "arch": "firefox-esr",
-            "gentoo": "www-client/firefox",
-            "suse": "MozillaFirefox-esr",
-            "void": "firefox-esr",
-        }
-        dep_others_dict: dict[str, list[str]] = {
-            "debian": ["ffmpeg", "firefox-esr-locale-zh-hans"],
-            "arch": ["firefox-i18n-zh-cn", "ffmpeg"],
-            "suse": ["MozillaFirefox-esr-translations-common"],
-            "void": ["firefox-esr-i18n-zh-CN", "firefox-esr-i18n-zh-TW"],
-        }
-
-        # Use dict.get instead of if ... elif ... to avoid pylint warnings
-        self.dependency_main = dep_main_dict.get(self._DISTRO, "")
-        self.dependency_others = dep_others_dict.get(self._OTHER_DISTRO, [])
+        entry: dict[str, Any] = app_entry(f"firefox/{self.variant.value}")
+        extra_packages: dict[str, list[str]] = entry["extra_packages"]
+
+        self.dependency_main = entry["packages"].get(self._DISTRO, "")
+        self.dependency_others = extra_packages.get(
+            self._OTHER_DISTRO, extra_packages.get(self._DISTRO, [])
+        )
 
         if self._DISTRO == "gentoo":
             run(cmd_args=["dispatch-conf"], msg="when running dispatch-conf")
 
+        if self.dependency_main == "":
+            raise DistroXOnlyError(self._DISTRO, entry["distros"])
+
     def _set_ubuntu_firefox_priority(self) -> None:
         """
         This function tends to disable snap firefox by default in ubuntu
         """
 
         # Create a file to disable snap for firefox
-        with open(
-            file="/etc/apt/preferences.d/90-mozilla-firefox", mode="w", encoding="utf-8"
-        ) as apt_conf_file:
-            apt_conf_file.writelines(
-                """Package: *\n
+        # Readable by apt, which may drop its privileges
+        write_file(
+            root_path("/etc/apt/preferences.d/90-mozilla-firefox"),
+            """Package: *
 Pin: release o=LP-PPA-mozillateam,l=Firefox ESR and Thunderbird stable builds
 Pin-Priority: 900
-""".split(
-                    "\n", maxsplit=1
-                )
-            )
-            run(
-                ["chmod", "a+r", "-vf", "/etc/apt/preferences.d/90-mozilla-firefox"],
-                msg='when trying to give permission to "/etc/apt/preferences.d/90-mozilla-firefox"',
-            )
-
-        if self.dependency_main == "" or self.dependency_others == []:
-            raise DistroXOnlyError(
-                self._DISTRO, "Debian & Archlinux & RHEL & SUSE & Void Linux"
-            )
-
-    def _prepare_for_firefox(self) -> None:
-        """
-        Prepare the environment for the installation of firefox
-        """
-        dep_main_dict: dict[str, str] = {
-            "debian": "firefox",
-            "arch": "firefox",
-            "redhat": "firefox",
-            "gentoo": "www-client/firefox-bin",
-            "suse": "MozillaFirefox",
-            "void": "firefox",
-        }
-        dep_others_dict: dict[str, list[str]] = {
-            "debian": ["firefox-l10n-zh-cn"],
-            "arch": ["firefox-i18n-zh-cn", "firefox-i18n-zh-tw"],
-            "suse": ["MozillaFirefox-translations-common"],
-            "void": ["firefox-i18n-zh-CN", "firefox-i18n-zh-TW"],
-        }
-
-        # The same, avoid pylint warnings
-        self.dependency_main = dep_main_dict.get(self._DISTRO, "")
-        self.dependency_others = dep_others_dict.get(self._DISTRO, [])
-
-        # Locales for ubuntu are different from other debian distros
-        if self._OTHER_DISTRO == "ubuntu":
-            self.dependency_others = ["ffmpeg", "^firefox-locale-zh"]
-
-        if self._DISTRO == "gentoo":
-            run(cmd_args=["dispatch-conf"], msg="when running dispatch-conf")
-
-        if self.dependency_main == "" or self.dependency_others == []:
-            raise DistroXOnlyError(
-                self._DISTRO, "Debian & Archlinux & RHEL & SUSE & Void Linux"
-            )
+""",
+            mode=0o644,
+        )
 
     def prepare(self) -> Browser:
         """
@@ -152,24 +105,29 @@ Pin-Priority: 900
             )
             self._set_ubuntu_firefox_priority()
 
-        if self.variant == FirefoxVariants.FIREFOX:
-            self._prepare_for_firefox()
-        elif self.variant == FirefoxVariants.ESR:
-            self._prepare_for_esr()
+        self._prepare_packages()
 
         return self
 
-    def _install_for_esr(self) -> None:
+    def packages(self) -> list[str]:
+        return [self.dependency_main, *self.dependency_others]
+
+    def _install_for_esr(self, fallback: bool = True) -> None:
         """
         Installation for ESR
         """
         install_app(
             distro=self._DISTRO, apps=[self.dependency_main, *self.dependency_others]
         )
-        if (not check_cmd_exists("firefox")) and (not check_cmd_exists("firefox-esr")):
-            self._install_for_firefox()
+        # Fall back on the other variant once, not back & forth forever
+        if (
+            fallback
+            and (not check_cmd_exists("firefox"))
+            and (not check_cmd_exists("firefox-esr"))
+        ):
+            self._install_for_firefox(fallback=False)
 
-    def _install_for_firefox(self) -> None:
+    def _install_for_firefox(self, fallback: bool = True) -> None:
         """
         Installation for firefox
         """
@@ -177,8 +135,8 @@ Pin-Priority: 900
         install_app(
             distro=self._DISTRO, apps=[self.dependency_main, *self.dependency_others]
         )
-        if not check_cmd_exists("firefox"):
-            self._install_for_esr()
+        if fallback and not check_cmd_exists("firefox"):
+            self._install_for_esr(fallback=False)
 
     def install(self) -> Browser:
         """
@@ -195,7 +153,7 @@ Pin-Priority: 900
             self._install_for_firefox()
 
         if self._DISTRO == "debian":
-            postinst_file: str = (
+            postinst_file: str = root_path(
                 "/var/lib/dpkg/info/"
                 + (
                     "firefox"
@@ -205,13 +163,20 @@ Pin-Priority: 900
                 + ".postinst"
             )
 
-            run(
-                ["sed", "-i", "-E", "s@(configure)@pre\\1@", postinst_file],
-                f"when changing configure to preconfigure in {postinst_file}",
-            )
+            # The first "configure" of each line, like sed without the g flag
+            sub_lines(postinst_file, "(configure)", r"pre\1", count=1)
             run(
                 ["sudo", "dpkg", "--configure", "-a"],
                 "when trying to fix misconfigured deb packages",
             )
 
+        # Rewrites the system-wide policies, asked for
+        if environ.get("PY_APPS_FIREFOX_TUNE", "off") == "on":
+            print(
+                tune_firefox(
+                    "firefox" if check_cmd_exists("firefox") else "firefox-esr",
+                    bench=environ.get("PY_APPS_FIREFOX_BENCH", "off") == "on",
+                )
+            )
+
         return self
@@ -0,0 +1,203 @@
+"""
+Firefox preferences fitted to the machine, as system-wide policies, so that it
+doesn't exhaust the RAM of small (proot, ARM) devices
+
+Set as defaults in /etc/firefox/policies/policies.json, the other policies kept,
+the users can still change them in about:config:
+    content processes   one per GiB of RAM, at most one per core & 8 (the default)
+    small machines      (see is_small_machine) one process per site & none started
+                        ahead, the cache in memory, the session saved less often
+    acceleration        the GPU isn't probed without /dev/dri
+Only the prefs tuned for the machine are written, Firefox's own defaults are kept
+for the rest, such as the smart sizing of the disk cache of the other machines.
+Opt-in, with $PY_APPS_FIREFOX_TUNE=on, as it rewrites a file of the system.
+"""
+
+from json import JSONDecodeError, dumps, load
+from os import makedirs, path
+from subprocess import DEVNULL, SubprocessError
+from tempfile import TemporaryDirectory
+from time import monotonic
+from typing import Any
+
+from py_apps.utils.cmd import stream
+from py_apps.utils.fileops import write_file
+from py_apps.utils.jobs import report_progress
+from py_apps.utils.startup import STARTUP_RUNS, measure_startups, startup_report
+from py_apps.utils.sys import SMALL_RAM, hardware, is_small_machine, root_path
+
+
+# Seconds before a headless firefox is given up on
+STARTUP_TIMEOUT: float = 120
+
+POLICIES_PATH: str = "/etc/firefox/policies/policies.json"
+
+
+def firefox_prefs(ram: int, cores: int, gpu: bool) -> dict[str, Any]:
+    """
+    The preferences for the hardware, see the module docstring
+
+    Params:
+        int ram: the RAM in MiB
+        int cores: the number of cores
+        bool gpu: whether there's a GPU, /dev/dri
+
+    Returns: dict[str, Any], pref -> value
+    """
+    prefs: dict[str, Any] = {
+        "dom.ipc.processCount": max(min(ram // 1024, cores, 8), 1),
+        "browser.tabs.unloadOnLowMemory": True,
+    }
+    if is_small_machine(ram, cores):
+        prefs.update(
+            {
+                # Processes per site with Fission, & the one started ahead
+                "dom.ipc.processCount.webIsolated": 1,
+                "dom.ipc.processPrelaunch.enabled": False,
+                "browser.sessionstore.interval": 60000,
+                "browser.cache.disk.enable": False,
+                # In KiB
+                "browser.cache.memory.capacity": min(ram // 32, 256) * 1024,
+            }
+        )
+    if not gpu:
+        prefs.update(
+            {
+                "layers.acceleration.disabled": True,
+                "gfx.webrender.software": True,
+                "media.hardware-video-decoding.enabled": False,
+            }
+        )
+    return prefs
+
+
+def _load_policies() -> dict[str, Any]:
+    """The current policies, empty when there are none"""
+    try:
+        with open(root_path(POLICIES_PATH), "r", encoding="utf-8") as policies:
+            data: Any = load(policies)
+    except (OSError, JSONDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _write_policies(data: dict[str, Any]) -> None:
+    policies_path: str = root_path(POLICIES_PATH)
+    makedirs(path.dirname(policies_path), exist_ok=True)
+    # Read by firefox as the user
+    write_file(policies_path, dumps(data, indent=2) + "\n", mode=0o644)
+
+
+def tuned_policies(data: dict[str, Any], prefs: dict[str, Any]) -> dict[str, Any]:
+    """
+    Add the preferences to policies
+
+    Params:
+        dict[str, Any] data: the content of policies.json
+        dict[str, Any] prefs: pref -> value
+
+    Returns: dict[str, Any], the new content
+    """
+    policies: dict[str, Any] = dict(data.get("policies", {}))
+    policies["Preferences"] = {
+        **policies.get("Preferences", {}),
+        **{
+            pref: {"Value": value, "Status": "default"} for pref, value in prefs.items()
+        },
+    }
+    return {**data, "policies": policies}
+
+
+def untuned_policies(data: dict[str, Any]) -> dict[str, Any]:
+    """
+    Remove the tuned preferences from policies
+
+    Params:
+        dict[str, Any] data: the content of policies.json
+
+    Returns: dict[str, Any], the new content
+    """
+    # Every pref is tuned on a small machine without GPU
+    tuned: dict[str, Any] = firefox_prefs(SMALL_RAM, 1, False)
+    policies: dict[str, Any] = dict(data.get("policies", {}))
+    policies["Preferences"] = {
+        pref: value
+        for pref, value in policies.get("Preferences", {}).items()
+        if pref not in tuned
+    }
+    return {**data, "policies": policies}
+
+
+def measure_startup(cmd: str, runs: int = STARTUP_RUNS) -> list[float]:
+    """
+    Start a headless firefox runs times until it renders about:blank,
+    after one warm up start creating the profile
+
+    Params:
+        str cmd: the firefox command, such as firefox-esr
+        int runs: the number of measured starts
+
+    Returns: list[float], the startup times in ms, empty when firefox can't start
+    """
+    with TemporaryDirectory(prefix="py_apps-firefox-") as profile:
+
+        def _start() -> float | None:
+            start: float = monotonic()
+            try:
+                stream(
+                    [
+                        cmd,
+                        "--headless",
+                        "--no-remote",
+                        "--profile",
+                        profile,
+                        "--screenshot",
+                        path.join(profile, "shot.png"),
+                        "about:blank",
+                    ],
+                    stdout=DEVNULL,
+                    stderr=DEVNULL,
+                    timeout=STARTUP_TIMEOUT,
+                )
+            except (SubprocessError, OSError):
+                return None
+            return (monotonic() - start) * 1000
+
+        # The warm up start creates the profile
+        return measure_startups(_start, runs)
+
+
+def tune_firefox(cmd: str, bench: bool = False) -> str:
+    """
+    Write the preferences for this machine to the policies
+
+    Params:
+        str cmd: the firefox command, such as firefox-esr
+        bool bench: measure the startup without & with them
+
+    Returns: str, the report
+    """
+    ram, cores = hardware()
+    prefs: dict[str, Any] = firefox_prefs(ram, cores, path.exists("/dev/dri"))
+    data: dict[str, Any] = _load_policies()
+
+    before: list[float] = []
+    if bench:
+        report_progress(0, 0, "测量启动时间")
+        _write_policies(untuned_policies(data))
+        before = measure_startup(cmd)
+
+    _write_policies(tuned_policies(data, prefs))
+    report: str = (
+        f"Firefox：{prefs['dom.ipc.processCount']} 个内容进程，"
+        + (
+            f"内存缓存 {prefs['browser.cache.memory.capacity'] // 1024} MiB"
+            if "browser.cache.memory.capacity" in prefs
+            else "默认磁盘缓存"
+        )
+        + ("，无硬件加速" if "layers.acceleration.disabled" in prefs else "")
+    )
+    if not bench:
+        return report
+
+    return report + "\n" + startup_report(before, measure_startup(cmd), "Firefox")
@@ -4,15 +4,14 @@ This module contains the class for managing Vivaldi browser
 
 from re import search
 
-from bs4 import BeautifulSoup
-
+from py_apps.apps.browser.chromium_launch import install_launcher
 from py_apps.apps.browser.common import Browser
 from py_apps.errors.distro_x_only import DistroXOnlyError
 from py_apps.errors.unsupported_arch import UnsupportedArchitectureError
 from py_apps.utils.app_manage import install_app
 from py_apps.utils.cmd import run
 from py_apps.utils.network import download, get
-from py_apps.utils.sys import check_architecture, get_distro_short_name
+from py_apps.utils.sys import check_architecture, get_distro_short_name, root_path
 
 
 class Vivaldi(Browser):
@@ -43,6 +42,9 @@ class Vivaldi(Browser):
         ):
             raise DistroXOnlyError(self._DISTRO, "Debian & RHEL & Gentoo & Void Linux")
 
+        # pylint: disable=import-outside-toplevel
+        from bs4 import BeautifulSoup
+
         # Use BeautifulSoup to parse the vivaldi download page for getting the download link
         repo_page = BeautifulSoup(get(self.REPO_URL).text, "html.parser")
 
@@ -99,13 +101,21 @@ class Vivaldi(Browser):
 
         return self
 
+    def artifacts(self) -> list[str]:
+        return [] if self.use_sys_pkg_manager else [self.pkg_url]
+
+    def packages(self) -> list[str]:
+        return [self.pkg_url] if self.use_sys_pkg_manager else []
+
     def install(self) -> Browser:
         """
         Install vivaldi browser
         """
 
         # Let the file path be /tmp/vivaldi.{Package name extension by distro}
-        file_path: str = f"/tmp/vivaldi.{self.pkg_url[-3:-1]+self.pkg_url[-1]}"
+        file_path: str = root_path(
+            f"/tmp/vivaldi.{self.pkg_url[-3:-1]+self.pkg_url[-1]}"
+        )
 
         # Download the package from website except
         # when use_sys_pkg_manager is True
@@ -122,7 +132,7 @@ class Vivaldi(Browser):
         # For rhel based distros
         elif self._DISTRO == "redhat":
             run(
-                cmd_args=["sudo", "rpm", "-ivh", file_path],
+                cmd_args=["sudo", "rpm", "-Uvh", file_path],
                 msg="when trying to install vivaldi browser in /tmp",
             )
 
@@ -130,15 +140,7 @@ class Vivaldi(Browser):
         elif self.use_sys_pkg_manager:
             install_app(self._DISTRO, [self.pkg_url])
 
-        # Add "--no-sandbox" to application launcher
-        run(
-            cmd_args=[
-                "sed",
-                "-i",
-                "s@Exec=/usr/bin/vivaldi-stable@& --no-sandbox@g",
-                "/usr/share/applications/vivaldi-stable.desktop",
-            ],
-            msg="when adding no-sandbox to vivaldi",
-        )
+        # The launcher gets the flags of this machine, "--no-sandbox" under proot
+        print(install_launcher("vivaldi"))
 
         return self
@@ -0,0 +1,165 @@
+"""
+The app catalog: apps, variants, per-distro packages, artifact sources & menus,
+declared in catalog.json
+
+The json is compiled once into a marshal cache (under $XDG_CACHE_HOME/py_apps),
+which is loaded instead while the json is unchanged:
+    apps    every app id, "name/variant" included, to its flat entry,
+            a variant entry overrides the fields of its app
+    menus   every page & variant dialog, to its title, ids & labels
+"""
+
+import marshal
+import sys
+from json import load
+from os import path, replace, stat
+from typing import Any
+
+from py_apps.utils.cache import cache_dir
+
+
+CATALOG_PATH: str = path.join(path.dirname(__file__), "catalog.json")
+
+# Bump when the compiled layout changes
+COMPILED_VERSION: int = 1
+
+# The compiled catalog of this process
+_loaded: dict[str, Any] = {}
+
+
+def compile_catalog(catalog: dict[str, Any]) -> dict[str, Any]:
+    """
+    Flatten the variants & expand the menus of a catalog
+
+    Params:
+        dict catalog: the content of catalog.json
+
+    Returns: dict[str, Any], see the module docstring
+    """
+    apps: dict[str, dict[str, Any]] = {}
+    menus: dict[str, dict[str, Any]] = {}
+
+    for name, entry in catalog["apps"].items():
+        variants: dict[str, dict[str, Any]] = entry.get("variants", {})
+        apps[name] = {key: value for key, value in entry.items() if key != "variants"}
+        for variant, variant_entry in variants.items():
+            apps[f"{name}/{variant}"] = {**apps[name], **variant_entry}
+
+        if "variants_title" in entry:
+            menus[name] = {
+                "title": entry["variants_title"],
+                "ids": list(variants),
+                "labels": [variant["label"] for variant in variants.values()],
+            }
+
+    for page, page_entry in catalog["pages"].items():
+        ids: list[str] = []
+        for item in page_entry["items"]:
+            # "name/*" lists every variant
+            if item.endswith("/*"):
+                name = item[:-2]
+                ids.extend(
+                    f"{name}/{variant}" for variant in catalog["apps"][name]["variants"]
+                )
+            else:
+                ids.append(item)
+        menus[page] = {
+            "title": page_entry["title"],
+            "ids": ids,
+            "labels": [
+                (
+                    catalog["actions"][item]
+                    if item in catalog["actions"]
+                    else apps[item]["label"]
+                )
+                for item in ids
+            ],
+        }
+
+    return {"apps": apps, "menus": menus}
+
+
+def _cache_key() -> list:
+    """What the compiled cache depends on"""
+    info = stat(CATALOG_PATH)
+    return [
+        COMPILED_VERSION,
+        list(sys.version_info[:2]),
+        info.st_mtime_ns,
+        info.st_size,
+    ]
+
+
+def load_catalog() -> dict[str, Any]:
+    """
+    The compiled catalog, from the marshal cache when it's current,
+    compiled & cached otherwise
+
+    Returns: dict[str, Any]
+    """
+    if _loaded:
+        return _loaded
+
+    key: list = _cache_key()
+
+    try:
+        cache_path: str = path.join(cache_dir("catalog"), "catalog.marshal")
+        with open(cache_path, "rb") as cache_file:
+            cached_key, compiled = marshal.load(cache_file)
+        if cached_key != key:
+            raise ValueError("stale")
+    except (OSError, ValueError, EOFError, TypeError):
+        with open(CATALOG_PATH, "r", encoding="utf-8") as catalog_file:
+            compiled = compile_catalog(load(catalog_file))
+        try:
+            cache_path = path.join(cache_dir("catalog"), "catalog.marshal")
+            with open(f"{cache_path}.tmp", "wb") as cache_file:
+                marshal.dump((key, compiled), cache_file)
+            replace(f"{cache_path}.tmp", cache_path)
+        except OSError:
+            # Such as a read-only cache dir, compiled again next time
+            pass
+
+    _loaded.update(compiled)
+    return _loaded
+
+
+def app_entry(app_id: str) -> dict[str, Any]:
+    """
+    The catalog entry of an app
+
+    Params:
+        str app_id: such as "falkon" or "firefox/esr"
+
+    Returns: dict[str, Any]
+
+    Throws: KeyError if the app id isn't in the catalog
+    """
+    return load_catalog()["apps"][app_id]
+
+
+def menu(name: str) -> tuple[str, list[str], list[str]]:
+    """
+    A page or a variant dialog
+
+    Params:
+        str name: such as "browser" or "nvim"
+
+    Returns: tuple[str, list[str], list[str]], the title, ids & labels
+    """
+    entry: dict[str, Any] = load_catalog()["menus"][name]
+    # Copies, the pages append their own items
+    return entry["title"], list(entry["ids"]), list(entry["labels"])
+
+
+def app_title(app_id: str) -> str:
+    """
+    The display name of an app, such as "Firefox esr" for "firefox/esr"
+
+    Params:
+        str app_id: the app id in the catalog
+
+    Returns: str
+    """
+    name, _, variant = app_id.partition("/")
+    return f"{app_entry(name)['name']} {variant}".rstrip()
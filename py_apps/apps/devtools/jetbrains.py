@@ -1,11 +1,26 @@
 """Class for Jetbrains IDE Family"""
 
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
 from enum import Enum, unique
+from multiprocessing import get_context
+from os import cpu_count, environ, path, remove
+from typing import Any
 
-from py_apps.utils.cmd import run
-from py_apps.utils.network import download
-from py_apps.utils.sys import check_architecture
-from py_apps.utils.utils import extract_tgz_file
+from py_apps.apps.catalog import app_entry
+from py_apps.apps.devtools.jetbrains_vm import cds_archive, warmup, write_vm_options
+from py_apps.errors.checksum_mismatch import ChecksumMismatchError
+from py_apps.errors.common import universal_msg
+from py_apps.errors.download_failed import DownloadFailedError
+from py_apps.utils.cache import load_cache, save_cache
+from py_apps.utils.fileops import link, sha256_of
+from py_apps.utils.network import download, get, is_offline, is_recording, mirrors_of
+from py_apps.utils.store import ContentStore, StoreReport, extract_to_store
+from py_apps.utils.sys import check_architecture, root_path
 
 
 @unique
@@ -25,6 +40,95 @@ class JetbrainsVariants(Enum):
     WEBSTORM = "webstorm"
 
 
+# Product codes in the JetBrains release feed
+_product_codes: dict[str, str] = {
+    variant.value: app_entry(f"jetbrains/{variant.value}")["product_code"]
+    for variant in JetbrainsVariants
+}
+
+RELEASES_URL: str = "https://data.services.jetbrains.com/products/releases"
+
+# Seconds before the release feed is queried again
+RELEASES_TTL: int = 6 * 60 * 60
+
+
+def parse_releases(feed: dict[str, Any], arch: str) -> dict[str, dict[str, str]]:
+    """
+    Parse the release feed for the architecture
+
+    Params:
+        dict feed: the feed, product code -> list of releases (latest first)
+        str arch: the architecture, such as amd64 or arm64
+
+    Returns: dict[str, dict[str, str]], JetbrainsVariants value ->
+        version, link & checksum_link of the latest release
+    """
+    platform: str = "linuxARM64" if arch == "arm64" else "linux"
+    releases: dict[str, dict[str, str]] = {}
+
+    for variant, code in _product_codes.items():
+        for release in feed.get(code, []):
+            download_info: dict[str, Any] | None = release.get("downloads", {}).get(
+                platform, None
+            )
+            if download_info is None:
+                continue
+
+            releases[variant] = {
+                "version": release.get("version", ""),
+                "link": download_info["link"],
+                "checksum_link": download_info.get("checksumLink", ""),
+            }
+            break
+
+    return releases
+
+
+def jetbrains_releases(
+    arch: str | None = None, refresh: bool = False
+) -> dict[str, dict[str, str]]:
+    """
+    The latest release of every JetBrains IDE, from one batched query of the feed,
+    cached on disk for RELEASES_TTL seconds
+
+    Params:
+        str | None arch: the architecture, the current one by default
+        bool refresh: ignore the cache
+
+    Returns: dict[str, dict[str, str]], see parse_releases(),
+        empty when the feed is unreachable
+    """
+    # Bundles must record / replay the feed itself
+    use_cache: bool = not (refresh or is_offline() or is_recording())
+    feed: dict[str, Any] | None = (
+        load_cache("jetbrains-releases", RELEASES_TTL) if use_cache else None
+    )
+
+    if feed is None:
+        res = get(
+            f"{RELEASES_URL}?code={','.join(_product_codes.values())}"
+            + "&latest=true&type=release",
+            fatal=False,
+        )
+        if res is None:
+            return {}
+
+        # Only keep what's used
+        feed = {
+            code: [
+                {
+                    "version": release.get("version"),
+                    "downloads": release.get("downloads"),
+                }
+                for release in releases
+            ]
+            for code, releases in res.json().items()
+        }
+        save_cache("jetbrains-releases", feed)
+
+    return parse_releases(feed, arch or check_architecture())
+
+
 class Jetbrains:
     """Jetbrains IDE Family Classes"""
 
@@ -45,36 +149,29 @@ class Jetbrains:
         # Download page: f"https://www.jetbrains.com/{self.product}/download"
 
         self.link = ""
+        self.checksum = ""
+        self.version = ""
 
     def prepare(self):
-        """Prepare download links"""
-
-        file_name: str = {
-            "idea_community": "ideaIC",
-            "idea_professional": "ideaU",
-            "python_community": "pycharm-community",
-            "python_professional": "pycharm-professional",
-            "go": "goland",
-            "webide": "PhpStorm",
-            "webstorm": "WebStorm",
-            "cpp": "CLion",
-            "rider": "JetBrains.Rider",
-            "rustrover": "RustRover",
-            "ruby": "RubyMine",
-        }[self.variant.value]
-
-        version: str = {
-            "idea": "2024.3.2.1",
-            "python": "2024.3.3",
-            "go": "2024.3.3",
-            "webide": "2024.3.3",
-            "webstorm": "2024.3.2.1",
-            "cpp": "2024.3.3",
-            "rider": "2024.3.5",
-            "rustrover": "2024.3.4",
-            "ruby": "2024.3.2.1",
-        }[self.product]
+        """Prepare download links, from the release feed if it's reachable"""
+
+        release: dict[str, str] | None = jetbrains_releases(self._ARCH).get(
+            self.variant.value, None
+        )
+
+        if release is not None:
+            self.version = release["version"]
+            self.link = release["link"]
+            if release["checksum_link"]:
+                self.checksum = self._get_checksum(release["checksum_link"])
+            return self
 
+        # Fallback on the last known versions
+        entry: dict[str, Any] = app_entry(f"jetbrains/{self.variant.value}")
+        file_name: str = entry["file_name"]
+        version: str = entry["fallback_version"]
+
+        self.version = version
         self.link = (
             f"https://download.jetbrains.com/{self.product}/"
             + f"{file_name}-{version}"
@@ -87,24 +184,242 @@ class Jetbrains:
 
         return self
 
+    def artifacts(self) -> list[str]:
+        """Urls downloaded by install(), available after prepare()"""
+        return [self.link]
+
+    def packages(self) -> list[str]:
+        """System packages installed by install(), available after prepare()"""
+        return []
+
+    def _get_checksum(self, checksum_link: str) -> str:
+        """Get the published sha256, empty if unreachable"""
+        res = get(checksum_link, fatal=False)
+
+        # The checksum file is like "<sha256> *ideaIC-2024.3.2.1.tar.gz"
+        return "" if res is None else res.text.strip().split(" ", maxsplit=1)[0].lower()
+
+    @property
+    def product_dirname(self) -> str:
+        """The dir name in /opt, shared by the editions of an IDE"""
+        return self.variant.name.lower().split("_")[0]
+
+    def download(self, max_speed: int = 0) -> str:
+        """
+        Download & verify the .tar.gz file
+
+        Params:
+            int max_speed: the download speed limit in bytes per second, 0 for no limit
+
+        Returns: str, the downloaded file path
+
+        Throws: DownloadFailedError, ChecksumMismatchError
+        """
+        file_name: str = root_path(
+            f"/tmp/{self.variant.name.lower()}-{self._ARCH}.tar.gz"
+        )
+        # Segments from the CDN as well, the checksum verifies them all
+        if not download(
+            mirrors_of(self.link), file_name, overwrite=True, max_speed=max_speed
+        ):
+            raise DownloadFailedError(self.link, file_name)
+
+        # Verify the download with the published checksum
+        if self.checksum:
+            actual: str = sha256_of(file_name)
+            if actual != self.checksum:
+                raise ChecksumMismatchError(file_name, self.checksum, actual)
+
+        return file_name
+
+    def link_launcher(self) -> None:
+        """Link the executable to /usr/bin"""
+        link(self.script, self.launcher)
+
+    @property
+    def script(self) -> str:
+        """The launch script in the install dir"""
+        return f"{self.install_dir}/bin/{self.product_dirname}.sh"
+
+    @property
+    def launcher(self) -> str:
+        """The launcher path in /usr/bin"""
+        edition: str = f"_{self.edition}" if self.edition is not None else ""
+        return root_path(f"/usr/bin/{self.product_dirname}{edition}")
+
+    @property
+    def install_dir(self) -> str:
+        """The dir the IDE is extracted to"""
+        return root_path(f"/opt/{self.product_dirname}")
+
     def install(self):
         """Extract and install"""
-        file_name: str = f"/tmp/{self.variant.name.lower()}-{self._ARCH}.tar.gz"
-        download(self.link, file_name, overwrite=True)
+        file_name: str = self.download()
 
-        product_dirname = self.variant.name.lower().split("_")[0]
+        # Extract the downloaded .tar.gz file to /opt,
+        # files shared with the other IDEs are hardlinked from the store
+        report: StoreReport = extract_to_store(file_name, self.install_dir)
+        print(f"{self.variant.name}: {report.summary()}")
 
-        # Extract the downloaded .tar.gz file to /opt
-        extract_tgz_file(file_name, f"/opt/{product_dirname}")
+        self.link_launcher()
+        self.tune()
 
-        # Link the executable to /usr/bin
-        run(
-            [
-                "ln",
-                "-vf",
-                f"/opt/{product_dirname}/bin/{product_dirname}.sh",
-                f"/usr/bin/{product_dirname}{'_'+self.edition if self.edition is not None else ''}",
-            ]
-        )
+        return self
+
+    def tune(self) -> None:
+        """
+        Fit the JVM options to the machine, and build the CDS archive
+        with $PY_APPS_JETBRAINS_WARMUP=on, see jetbrains_vm
+        """
+        if environ.get("PY_APPS_JETBRAINS_TUNE", "on") == "off":
+            return
+
+        options: list[str] = write_vm_options(self.install_dir, self._ARCH)
+        print(f"{self.variant.name}: {' '.join(options[:3])}")
+
+        # Without a CDS archive (JBR < 19) there's nothing to warm up for
+        if environ.get("PY_APPS_JETBRAINS_WARMUP", "off") == "on" and any(
+            option.startswith("-XX:SharedArchiveFile=") for option in options
+        ):
+            print(
+                f"{self.variant.name}: {warmup(self.script, self.install_dir, self._ARCH)}"
+            )
+
+    def uninstall(self):
+        """Remove the IDE, and the stored files no other IDE uses"""
+        if path.lexists(self.launcher):
+            remove(self.launcher)
+        for tuned in [
+            f"{self.install_dir}.vmoptions",
+            cds_archive(self.install_dir, self._ARCH),
+        ]:
+            if path.exists(tuned):
+                remove(tuned)
+
+        removed, freed = ContentStore().uninstall(self.install_dir)
+        print(f"Freed {removed} files ({freed / 1024 / 1024:.1f} MiB) from the store")
 
         return self
+
+
+def _prepare_all(variants: list[JetbrainsVariants]) -> dict[str, Jetbrains]:
+    """
+    Prepare the IDEs, one edition per IDE since the editions share a dir
+
+    Params:
+        list[JetbrainsVariants] variants: the IDEs to be installed
+
+    Returns: dict[str, Jetbrains], the dir name in /opt -> the IDE
+    """
+    ides: dict[str, Jetbrains] = {}
+    for variant in variants:
+        ide = Jetbrains(variant)
+        if ide.product_dirname in ides:
+            print(f"Skipping {variant.name}: another edition is selected already")
+            continue
+        ides[ide.product_dirname] = ide.prepare()
+    return ides
+
+
+def _download_all(
+    ides: list[Jetbrains],
+    max_speed: int,
+    extract_pool: ProcessPoolExecutor,
+    failed: dict[str, str],
+) -> dict[Future, Jetbrains]:
+    """
+    Download the IDEs in parallel, each extraction submitted as its download finishes
+
+    Params:
+        list[Jetbrains] ides: the prepared IDEs
+        int max_speed: the download speed limit of each in bytes per second
+        ProcessPoolExecutor extract_pool: the pool extracting the downloads
+        dict[str, str] failed: variant name -> the error, the failures are added to
+
+    Returns: dict[Future, Jetbrains], the extractions
+    """
+    extractions: dict[Future, Jetbrains] = {}
+    with ThreadPoolExecutor(len(ides)) as download_pool:
+        downloads: dict[Future, Jetbrains] = {
+            download_pool.submit(ide.download, max_speed): ide for ide in ides
+        }
+        for finished in as_completed(downloads):
+            ide = downloads[finished]
+            try:
+                file_name: str = finished.result()
+            except (DownloadFailedError, ChecksumMismatchError) as err:
+                failed[ide.variant.name] = str(err)
+                continue
+
+            # Extraction is CPU bound, so it goes to another process
+            extractions[
+                extract_pool.submit(extract_to_store, file_name, ide.install_dir)
+            ] = ide
+            print(f"Downloaded {ide.variant.name}, extracting")
+    return extractions
+
+
+def _extracted(
+    extractions: dict[Future, Jetbrains], failed: dict[str, str]
+) -> list[Jetbrains]:
+    """
+    Wait for the extractions
+
+    Params:
+        dict[Future, Jetbrains] extractions: the extractions
+        dict[str, str] failed: variant name -> the error, the failures are added to
+
+    Returns: list[Jetbrains], the IDEs extracted
+    """
+    installed: list[Jetbrains] = []
+    for extracted in as_completed(extractions):
+        ide = extractions[extracted]
+        try:
+            print(f"{ide.variant.name}: {extracted.result().summary()}")
+        except Exception as err:  # pylint: disable=broad-except
+            # Such as a broken archive or a crashed worker, the others go on
+            failed[ide.variant.name] = f"{universal_msg} {err!r}"
+            continue
+        installed.append(ide)
+    return installed
+
+
+def install_many(
+    variants: list[JetbrainsVariants], bandwidth: int = 0
+) -> dict[str, str]:
+    """
+    Install several IDEs at once: download in parallel, extract in a process pool
+    as soon as each download finishes, then link the launchers of the ones done.
+    An IDE failing doesn't stop the others
+
+    Params:
+        list[JetbrainsVariants] variants: the IDEs to be installed
+        int bandwidth: the total download speed limit in bytes per second,
+            split evenly between the downloads, 0 for no limit
+
+    Returns: dict[str, str], variant name -> the error, of the IDEs failed
+    """
+    ides: dict[str, Jetbrains] = _prepare_all(variants)
+    if not ides:
+        return {}
+
+    failed: dict[str, str] = {}
+    # Spawned, not forked from this threaded process,
+    # and with the environment as it is now (PY_APPS_ROOT …)
+    with ProcessPoolExecutor(
+        min(len(ides), cpu_count() or 1), mp_context=get_context("spawn")
+    ) as extract_pool:
+        installed: list[Jetbrains] = _extracted(
+            _download_all(
+                list(ides.values()), bandwidth // len(ides), extract_pool, failed
+            ),
+            failed,
+        )
+
+    for ide in installed:
+        ide.link_launcher()
+        ide.tune()
+
+    for name, error in failed.items():
+        print(f"{name}: {error}")
+    return failed
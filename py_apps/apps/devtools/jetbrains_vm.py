@@ -0,0 +1,176 @@
+"""
+JVM options of the JetBrains IDEs fitted to the machine, instead of the stock
+ones sized for an average laptop
+
+They're written to "<install dir>.vmoptions", such as /opt/goland.vmoptions, which
+the launchers read after bin/<product>64.vmoptions, so they win & upgrades (which
+replace /opt/goland) keep them. It's the slot of the Toolbox App though: the launcher
+reads one of $<PRODUCT>_VM_OPTIONS, this file, or the user's
+~/.config/JetBrains/<product><version>/<product>64.vmoptions ("Edit Custom VM
+Options"), so the latter is ignored while this file exists:
+    heap        a quarter of the RAM, 768 MiB to 8 GiB
+    GC          Serial on small machines (up to 4 GiB or 2 cores), G1 otherwise
+    JIT         CICompilerCount from the cores, a smaller code cache on small machines
+    CDS         the classes loaded at startup mapped from a shared archive,
+                "<install dir>-<arch>.jsa", built by the JVM on the first exit
+                or by warmup() at install time, with a bundled JBR 19+ only
+                (-XX:+AutoCreateSharedArchive is new in JDK 19)
+"""
+
+from os import environ, makedirs, path, remove
+from subprocess import DEVNULL, SubprocessError
+from tempfile import TemporaryDirectory
+from time import monotonic
+
+from py_apps.utils.cmd import stream
+from py_apps.utils.fileops import write_file
+from py_apps.utils.jobs import report_progress
+from py_apps.utils.sys import hardware, is_small_machine
+
+
+# Seconds before the warm up run is given up on
+WARMUP_TIMEOUT: float = 20 * 60
+
+# The first JDK with -XX:+AutoCreateSharedArchive
+CDS_AUTO_JAVA: int = 19
+
+
+def jbr_version(install_dir: str) -> int:
+    """
+    The feature version of the JBR bundled with an IDE, from jbr/release
+
+    Params:
+        str install_dir: the dir the IDE is extracted to
+
+    Returns: int, such as 21, 0 if unknown
+    """
+    try:
+        with open(path.join(install_dir, "jbr/release"), encoding="utf-8") as file:
+            for line in file:
+                # JAVA_VERSION="21.0.5"
+                key, _, value = line.strip().partition("=")
+                if key == "JAVA_VERSION":
+                    return int(value.strip('"').split(".")[0])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def cds_archive(install_dir: str, arch: str) -> str:
+    """
+    The CDS archive of an IDE, per arch since /opt may be shared between machines
+
+    Params:
+        str install_dir: the dir the IDE is extracted to
+        str arch: the architecture, such as amd64 or arm64
+
+    Returns: str
+    """
+    return f"{install_dir}-{arch}.jsa"
+
+
+def vm_options(ram: int, cores: int, archive: str | None) -> list[str]:
+    """
+    The JVM options for the hardware, see the module docstring
+
+    Params:
+        int ram: the RAM in MiB
+        int cores: the number of cores
+        str | None archive: the CDS archive, None if the JBR can't create it
+
+    Returns: list[str]
+    """
+    small: bool = is_small_machine(ram, cores)
+    heap: int = min(max(ram // 4 // 128 * 128, 768), 8192)
+
+    options: list[str] = [
+        f"-Xmx{heap}m",
+        "-XX:+UseSerialGC" if small else "-XX:+UseG1GC",
+        # Tiered compilation needs 2 compiler threads at least
+        f"-XX:CICompilerCount={min(max(cores // 2, 2), 8)}",
+        f"-XX:ReservedCodeCacheSize={240 if small else 512}m",
+    ]
+    if archive is not None:
+        options += [
+            f"-XX:SharedArchiveFile={archive}",
+            # Built on exit when missing, or stale after an upgrade
+            "-XX:+AutoCreateSharedArchive",
+        ]
+    return options
+
+
+def write_vm_options(install_dir: str, arch: str) -> list[str]:
+    """
+    Write the JVM options of an IDE for this machine
+
+    Params:
+        str install_dir: the dir the IDE is extracted to
+        str arch: the architecture, such as amd64 or arm64
+
+    Returns: list[str], the options
+    """
+    ram, cores = hardware()
+    # An older JBR refuses to start with the unknown option
+    options: list[str] = vm_options(
+        ram,
+        cores,
+        (
+            cds_archive(install_dir, arch)
+            if jbr_version(install_dir) >= CDS_AUTO_JAVA
+            else None
+        ),
+    )
+    write_file(
+        f"{install_dir}.vmoptions",
+        f"# py_apps: {ram} MiB, {cores} cores, {arch}\n" + "\n".join(options) + "\n",
+    )
+    return options
+
+
+def warmup(launcher: str, install_dir: str, arch: str) -> str:
+    """
+    Start the IDE headless on an empty project so it indexes the JDK & exits,
+    the JVM writes the CDS archive then
+
+    Params:
+        str launcher: the launch script in the install dir, bin/<product>.sh,
+            not the link in /usr/bin which it would resolve the IDE home from
+        str install_dir: the dir the IDE is extracted to
+        str arch: the architecture, such as amd64 or arm64
+
+    Returns: str, the report
+    """
+    archive: str = cds_archive(install_dir, arch)
+    # The classes of the previous version
+    if path.exists(archive):
+        remove(archive)
+
+    report_progress(0, 0, "预热索引")
+    start: float = monotonic()
+    # The settings & caches of the run don't end up in the user's home
+    with TemporaryDirectory(prefix="py_apps-warmup-") as home:
+        project: str = path.join(home, "project")
+        makedirs(project)
+        try:
+            stream(
+                [launcher, "warmup", f"--project-dir={project}"],
+                stdout=DEVNULL,
+                stderr=DEVNULL,
+                timeout=WARMUP_TIMEOUT,
+                env={
+                    **environ,
+                    "HOME": home,
+                    "XDG_CONFIG_HOME": path.join(home, ".config"),
+                    "XDG_CACHE_HOME": path.join(home, ".cache"),
+                    "XDG_DATA_HOME": path.join(home, ".local/share"),
+                },
+            )
+        except (SubprocessError, OSError):
+            pass
+
+    if not path.exists(archive):
+        return "CDS 存档生成失败，将在首次退出 IDE 时生成"
+    return (
+        f"CDS 存档 {path.getsize(archive) / 1024**2:.0f} MiB，"
+        + f"预热用时 {monotonic() - start:.0f} 秒"
+    )
@@ -6,11 +6,15 @@ from enum import Enum, unique
 from os import getenv
 from re import search
 from sys import exit as sys_exit
+from typing import Any
 
+from py_apps.apps.catalog import app_entry
+from py_apps.apps.devtools.nvim_plugins import sync_plugins
+from py_apps.apps.devtools.nvim_startup import tune_startup
 from py_apps.utils.app_manage import install_app
-from py_apps.utils.cmd import run
-from py_apps.utils.network import download, get, get_github_releases
-from py_apps.utils.sys import check_architecture, get_distro_short_name
+from py_apps.utils.cmd import check_cmd_exists, run
+from py_apps.utils.network import download, get, get_github_releases, mirrors_of
+from py_apps.utils.sys import check_architecture, get_distro_short_name, root_path
 
 
 @unique
@@ -44,24 +48,16 @@ class Neovim:
 
         self.pkg = "neovim"
 
+        self.entry: dict[str, Any] = app_entry(f"nvim/{variant.value}")
+
         # Setup nvim configs using git repos
-        self.var_url: str = {
-            NvimVariants.ASTRO: "https://github.com/AstroNvim/template",
-            NvimVariants.LAZY: "https://github.com/LazyVim/starter",
-            NvimVariants.NVCHAD: "https://github.com/NvChad/starter",
-        }.get(self.variant, "")
+        self.var_url: str = self.entry.get("config_repo", "")
 
         self.use_installer: str = ""
 
         # Setup nvim configs using installer scripts
         if self.var_url == "" and variant != NvimVariants.DEFAULT:
-            self.use_installer: str = get(
-                {
-                    NvimVariants.LUNAR: "https://raw.githubusercontent.com/LunarVim/LunarVim/"
-                    + "release-1.4/neovim-0.9/utils/installer/install.sh",
-                    NvimVariants.SPACE: "https://spacevim.org/cn/install.sh",
-                }.get(self.variant, "")
-            ).text
+            self.use_installer = get(self.entry.get("installer", "")).text
 
             if self.use_installer == "":
                 sys_exit("Unknown Variant")
@@ -73,12 +69,27 @@ class Neovim:
         if not self.use_sys_pkg:
             pkg_url: str = ""
 
-            for url in get_github_releases("Skywalker0803/nvim-releases"):
-                pkg_url = url if search(f".{self._ARCH}.deb", url) else ""
+            for url in get_github_releases(self.entry["github"]):
+                if search(f".{self._ARCH}.deb", url):
+                    pkg_url = url
+                    break
 
-            download(pkg_url, file_path="/tmp/neovim.deb", overwrite=True)
+            download(
+                mirrors_of(pkg_url),
+                file_path=root_path("/tmp/neovim.deb"),
+                overwrite=True,
+            )
         return self
 
+    def artifacts(self) -> list[str]:
+        """Urls downloaded by install(), available after prepare()"""
+        # The neovim package is downloaded in prepare() already
+        return []
+
+    def packages(self) -> list[str]:
+        """System packages installed by install(), available after prepare()"""
+        return [self.pkg] if self.use_sys_pkg else []
+
     def install(self):
         """Install nvim with configs"""
 
@@ -87,14 +98,27 @@ class Neovim:
 
         else:
             run(
-                ["sudo", "apt", "install", "/tmp/neovim.deb", "-y"],
+                ["sudo", "apt", "install", root_path("/tmp/neovim.deb"), "-y"],
                 msg="when installing neovim pkg",
             )
 
         # Run installer
         if self.use_installer:
-            run(["bash", "-c", self.use_installer], "when executing installer")
+            run(
+                ["bash", "-c", self.use_installer],
+                "when executing installer",
+                interactive=True,
+            )
 
-        # Clone the config repo
+        # Clone the config repo, only its latest commit is needed
         elif self.var_url != "":
-            run(["git", "clone", self.var_url, f"{getenv('HOME')}/.config/nvim"])
+            config_dir: str = f"{getenv('HOME')}/.config/nvim"
+            run(["git", "clone", "--depth=1", self.var_url, config_dir])
+
+            # The plugins of the config, rather than on the first launch
+            if getenv("PY_APPS_NVIM_SYNC", "") != "off" and check_cmd_exists("nvim"):
+                seconds: float = sync_plugins(getenv("HOME", ""))
+                print(f"Neovim 插件预同步完成，用时 {seconds:.1f} 秒")
+
+                if getenv("PY_APPS_NVIM_TUNE", "") != "off":
+                    print(tune_startup(config_dir))
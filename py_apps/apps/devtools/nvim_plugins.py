@@ -0,0 +1,187 @@
+"""
+Pre-sync of the plugins of a lazy.nvim based config, so the first launch of nvim
+doesn't stall while dozens of plugins are cloned & treesitter parsers compiled
+
+The plugins are cloned from a local git cache of mirrors when they're in it,
+$PY_APPS_NVIM_PLUGIN_CACHE, or ~/.cache/py_apps/nvim-plugins by default:
+    <host>/<owner>/<repo>.git   a mirror of https://<host>/<owner>/<repo>.git
+Point it to a shared dir (NFS, a synced dir) to share it across users & machines.
+Git reads "url.<mirror>.insteadOf" from the environment during the sync, so local
+clones (hard links) replace the network ones, lazy.nvim & the configs untouched.
+lazy.nvim's own concurrency is kept, unlimited on Linux: the clones are local.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from configparser import ConfigParser
+from configparser import Error as ConfigError
+from os import environ, listdir, path
+from time import monotonic
+
+from py_apps.utils.cache import cache_dir
+from py_apps.utils.cmd import run
+from py_apps.utils.jobs import bind_job, report_progress
+
+
+# Git processes at once, updating the cache
+PLUGIN_WORKERS: int = 8
+
+
+def plugin_cache() -> str:
+    """The dir of the plugin git cache, see the module docstring"""
+    return environ.get("PY_APPS_NVIM_PLUGIN_CACHE", "") or cache_dir("nvim-plugins")
+
+
+def mirror_path(cache: str, url: str) -> str | None:
+    """
+    The mirror of a plugin in the cache
+
+    Params:
+        str cache: the cache dir
+        str url: the plugin url, such as https://github.com/folke/lazy.nvim.git
+
+    Returns: str | None, None when the url can't be cached
+    """
+    scheme, _, rest = url.partition("://")
+    parts: list[str] = rest.removesuffix(".git").split("/")
+    if scheme not in ["http", "https"] or len(parts) != 3 or "" in parts:
+        return None
+    return path.join(cache, *parts[:2], f"{parts[2]}.git")
+
+
+def _mirrors(cache: str) -> list[str]:
+    """The mirrors in the cache"""
+    mirrors: list[str] = []
+    for host in listdir(cache):
+        if not path.isdir(path.join(cache, host)):
+            continue
+        for owner in listdir(path.join(cache, host)):
+            owner_dir: str = path.join(cache, host, owner)
+            if path.isdir(owner_dir):
+                mirrors.extend(
+                    path.join(owner_dir, repo)
+                    for repo in listdir(owner_dir)
+                    if repo.endswith(".git")
+                )
+    return mirrors
+
+
+def git_env(cache: str) -> dict[str, str]:
+    """
+    The git config clones are redirected to the mirrors with, as env vars
+
+    Params:
+        str cache: the cache dir
+
+    Returns: dict[str, str], GIT_CONFIG_COUNT, GIT_CONFIG_KEY_<n> & GIT_CONFIG_VALUE_<n>
+    """
+    config: list[tuple[str, str]] = [
+        (
+            f"url.{mirror}.insteadOf",
+            "https://" + path.relpath(mirror, cache).replace(path.sep, "/"),
+        )
+        for mirror in _mirrors(cache)
+    ]
+
+    env: dict[str, str] = {"GIT_CONFIG_COUNT": str(len(config))}
+    for index, (key, value) in enumerate(config):
+        env.update({f"GIT_CONFIG_KEY_{index}": key, f"GIT_CONFIG_VALUE_{index}": value})
+    return env
+
+
+def plugin_urls(lazy_dir: str) -> list[str]:
+    """
+    The origin urls of the plugins installed
+
+    Params:
+        str lazy_dir: the plugin dir of lazy.nvim, such as ~/.local/share/nvim/lazy
+
+    Returns: list[str]
+    """
+    urls: list[str] = []
+    if not path.isdir(lazy_dir):
+        return urls
+
+    for name in sorted(listdir(lazy_dir)):
+        git_config = ConfigParser(strict=False)
+        try:
+            git_config.read(path.join(lazy_dir, name, ".git", "config"))
+            urls.append(git_config['remote "origin"']["url"])
+        except (ConfigError, KeyError):
+            continue
+    return urls
+
+
+def _run_all(commands: list[list[str]]) -> None:
+    """Run git commands PLUGIN_WORKERS at once, failures are skipped"""
+    with ThreadPoolExecutor(PLUGIN_WORKERS) as pool:
+        list(pool.map(bind_job(run), commands))
+
+
+def refresh_cache(cache: str) -> None:
+    """
+    Fetch every mirror of the cache
+
+    Params:
+        str cache: the cache dir
+    """
+    _run_all(
+        [
+            ["git", "--git-dir", mirror, "fetch", "--prune", "--quiet"]
+            for mirror in _mirrors(cache)
+        ]
+    )
+
+
+def add_to_cache(cache: str, urls: list[str]) -> None:
+    """
+    Mirror the plugins not in the cache yet
+
+    Params:
+        str cache: the cache dir
+        list[str] urls: the plugin urls
+    """
+    commands: list[list[str]] = []
+    for url in urls:
+        mirror: str | None = mirror_path(cache, url)
+        if mirror is not None and not path.exists(mirror):
+            commands.append(["git", "clone", "--mirror", "--quiet", url, mirror])
+    _run_all(commands)
+
+
+def sync_plugins(home: str) -> float:
+    """
+    Install the plugins of the nvim config of home in a headless nvim,
+    cloned from the cache when possible, and add them to the cache afterwards
+
+    Params:
+        str home: the home dir of the user
+
+    Returns: float, the seconds the sync took
+    """
+    cache: str = plugin_cache()
+    lazy_dir: str = path.join(
+        environ.get("XDG_DATA_HOME", "") or path.join(home, ".local/share"),
+        "nvim",
+        "lazy",
+    )
+    report_progress(0, 0, "同步插件")
+    start: float = monotonic()
+
+    # The mirrors are fetched first, so their plugins are up to date
+    refresh_cache(cache)
+    run(
+        [
+            "nvim",
+            "--headless",
+            "+Lazy! sync",
+            # Compile the parsers now, not in the first session
+            "+silent! TSUpdateSync",
+            "+qa",
+        ],
+        "when syncing neovim plugins",
+        env={**environ, **git_env(cache)},
+    )
+    seconds: float = monotonic() - start
+
+    add_to_cache(cache, plugin_urls(lazy_dir))
+    return seconds
@@ -0,0 +1,140 @@
+"""
+Startup tuning of a Neovim config, measured with "nvim --startuptime"
+before & after, so the cost of the config picked shows up on slow devices
+
+The tuning:
+    vim.loader      enabled first thing in init.lua, so every module of the config
+                    is loaded from cached bytecode, not only the ones required after
+                    lazy.nvim enables it
+    precompiling    the modules of the config are put in the loader's cache at
+                    install time, not on the first launch
+    runtime plugins the unused ones shipped with nvim (gzip, tar, zip, tohtml,
+                    tutor) aren't sourced, the config's own plugins are lazy-loaded
+                    by its lazy.nvim specs already
+"""
+
+from itertools import count
+from os import path
+from subprocess import DEVNULL, SubprocessError
+from tempfile import TemporaryDirectory
+
+from py_apps.utils.cmd import stream
+from py_apps.utils.fileops import write_file
+from py_apps.utils.jobs import report_progress
+from py_apps.utils.startup import STARTUP_RUNS, measure_startups, startup_report
+
+
+# Seconds before a headless nvim is given up on
+STARTUP_TIMEOUT: float = 60
+
+_MARKER: str = "-- py_apps: startup tuning"
+
+_TUNING: str = f"""{_MARKER}
+if vim.loader then
+  vim.loader.enable()
+end
+for _, plugin in ipairs({{
+  "gzip", "tarPlugin", "zipPlugin", "2html_plugin", "tutor_mode_plugin",
+}}) do
+  vim.g["loaded_" .. plugin] = 1
+end
+
+"""
+
+# Loads (without running) every module of the config through vim.loader
+_PRECOMPILE: str = (
+    "lua if vim.loader then for _, file in ipairs(vim.fn.globpath("
+    + "vim.fn.stdpath('config'), 'lua/**/*.lua', false, true)) do "
+    + "pcall(vim.loader.loadfile, file) end end"
+)
+
+
+def parse_startuptime(log: str) -> float | None:
+    """
+    The startup time in a --startuptime log
+
+    Params:
+        str log: the log, its lines like "012.345  000.678: --- NVIM STARTED ---"
+
+    Returns: float | None, in ms, None when nvim didn't start
+    """
+    for line in reversed(log.splitlines()):
+        if line.endswith("--- NVIM STARTED ---"):
+            return float(line.split()[0])
+    return None
+
+
+def measure_startup(runs: int = STARTUP_RUNS) -> list[float]:
+    """
+    Start a headless nvim runs times, after one warm up start
+
+    Params:
+        int runs: the number of measured starts
+
+    Returns: list[float], the startup times in ms, empty when nvim can't start
+    """
+    with TemporaryDirectory() as temp_dir:
+        run_indexes = count()
+
+        def _start() -> float | None:
+            log_path: str = path.join(temp_dir, f"{next(run_indexes)}.log")
+            try:
+                stream(
+                    ["nvim", "--headless", "--startuptime", log_path, "+qa"],
+                    stdout=DEVNULL,
+                    stderr=DEVNULL,
+                    timeout=STARTUP_TIMEOUT,
+                )
+                with open(log_path, "r", encoding="utf-8") as log:
+                    return parse_startuptime(log.read())
+            except (SubprocessError, OSError):
+                return None
+
+        return measure_startups(_start, runs)
+
+
+def tune_config(config_dir: str) -> bool:
+    """
+    Add the tuning to the top of init.lua, see the module docstring
+
+    Params:
+        str config_dir: the config dir, such as ~/.config/nvim
+
+    Returns: bool, whether init.lua is changed
+    """
+    init_path: str = path.join(config_dir, "init.lua")
+    try:
+        with open(init_path, "r", encoding="utf-8") as init_file:
+            init: str = init_file.read()
+    except OSError:
+        return False
+
+    if _MARKER in init:
+        return False
+    return write_file(init_path, _TUNING + init)
+
+
+def tune_startup(config_dir: str) -> str:
+    """
+    Measure the startup, tune the config & precompile it, then measure again
+
+    Params:
+        str config_dir: the config dir, such as ~/.config/nvim
+
+    Returns: str, the report
+    """
+    report_progress(0, 0, "测量启动时间")
+    before: list[float] = measure_startup()
+
+    if tune_config(config_dir):
+        try:
+            stream(
+                ["nvim", "--headless", f"+{_PRECOMPILE}", "+qa"],
+                stdout=DEVNULL,
+                stderr=DEVNULL,
+                timeout=STARTUP_TIMEOUT,
+            )
+        except (SubprocessError, OSError):
+            pass
+
+    return startup_report(before, measure_startup(), "Neovim")
@@ -1,8 +1,20 @@
 """VSCode"""
 
+from os import environ
+
+from py_apps.apps.catalog import app_entry
+from py_apps.apps.devtools.vscode_extensions import (
+    install_extensions,
+    parse_extensions,
+    target_platform,
+    vsix_url,
+)
+from py_apps.errors.download_failed import DownloadFailedError
+from py_apps.errors.unsupported_arch import UnsupportedArchitectureError
 from py_apps.utils.cmd import run
 from py_apps.utils.network import download
-from py_apps.utils.sys import check_architecture, get_distro_short_name
+from py_apps.utils.store import extract_to_store
+from py_apps.utils.sys import check_architecture, get_distro_short_name, root_path
 from py_apps.utils.utils import fix_electron_libxssl
 
 
@@ -12,20 +24,16 @@ class VSCode:
     _ARCH: str = check_architecture()
     _DISTRO, _OTHER_DISTRO = get_distro_short_name()
 
-    def __init__(self) -> None:
+    def __init__(self, extensions: list[str] | None = None) -> None:
         self.pkg_url: str = ""
-        # Set pkg dict to some Microsoft direct links
-        self._pkg_dict: dict[str, str] = {
-            "debian_amd64": "https://go.microsoft.com/fwlink/?LinkID=760868",
-            "redhat_amd64": "https://go.microsoft.com/fwlink/?LinkID=760867",
-            "other_amd64": "https://go.microsoft.com/fwlink/?LinkID=620884",
-            "debian_arm64": "https://aka.ms/linux-arm64-deb",
-            "redhat_arm64": "https://aka.ms/linux-arm64-rpm",
-            "other_arm64": "https://aka.ms/linux-arm64",
-            "debian_armhf": "https://aka.ms/linux-armhf-deb",
-            "redhat_armhf": "https://aka.ms/linux-armhf-rpm",
-            "other_armhf": "https://aka.ms/linux-armhf",
-        }
+        # Installed after the editor, "publisher.name" or "publisher.name@version"
+        self.extensions: list[str] = (
+            extensions
+            if extensions is not None
+            else parse_extensions(environ.get("PY_APPS_VSCODE_EXTENSIONS", ""))
+        )
+        # Microsoft direct links, by distro & arch
+        self._pkg_dict: dict[str, str] = app_entry("vscode")["artifacts"]
 
         # Decide which suffix to use based on current distro
         suffix: str = {
@@ -33,7 +41,7 @@ class VSCode:
             "redhat": "rpm",
         }.get(self._DISTRO, "tar.gz")
 
-        self.pkg_file_path = f"/tmp/vscode.{suffix}"
+        self.pkg_file_path = root_path(f"/tmp/vscode.{suffix}")
 
     def prepare(self):
         """Prepare for vscode"""
@@ -44,28 +52,63 @@ class VSCode:
             "",
         )
 
-        # Download the pkg
-        download(self.pkg_url, self.pkg_file_path, overwrite=True)
+        if self.pkg_url == "":
+            raise UnsupportedArchitectureError(self._ARCH)
 
         return self
 
+    def artifacts(self) -> list[str]:
+        """Urls downloaded by install(), available after prepare()"""
+        platform: str = target_platform(self._ARCH)
+        return [self.pkg_url, *[vsix_url(ext, platform) for ext in self.extensions]]
+
+    def packages(self) -> list[str]:
+        """System packages installed by install(), available after prepare()"""
+        return []
+
     def install(self):
-        """Install vscode pkg"""
+        """
+        Install vscode pkg
+
+        Throws: DownloadFailedError
+        """
+        # Download the pkg, a stale one in /tmp mustn't be installed
+        if not download(self.pkg_url, self.pkg_file_path, overwrite=True):
+            raise DownloadFailedError(self.pkg_url, self.pkg_file_path)
+
         fix_electron_libxssl(self._DISTRO)
         # TODO: FIX VSCode for distros other than deb & rhel
 
-        # Install pkg for deb and rhel
-        run(
-            {
-                "debian": ["sudo", "apt", "install", self.pkg_file_path, "-y"],
-                "redhat": ["sudo", "dnf", "install", self.pkg_file_path],
-            }.get(
-                self._DISTRO, ["tar", "-zxvf", self.pkg_file_path, "-C", "/usr/share/"]
-            ),
-            "installing vscode pkg in /tmp",
-        )
-
         if self._DISTRO not in ["debian", "redhat"]:
-            run(["rm", "-rvf", "/usr/share/code"])
+            # An existing install is upgraded in place: only the changed files are
+            # written, and the new tree replaces the old one atomically
+            print(
+                extract_to_store(
+                    self.pkg_file_path, root_path("/usr/share/code")
+                ).summary()
+            )
+        else:
+            # Install pkg for deb and rhel
+            run(
+                {
+                    "debian": ["sudo", "apt", "install", self.pkg_file_path, "-y"],
+                    "redhat": ["sudo", "dnf", "install", self.pkg_file_path],
+                }[self._DISTRO],
+                "installing vscode pkg in /tmp",
+            )
+
+        if self.extensions:
+            times: dict[str, float] = install_extensions(
+                self.extensions,
+                (
+                    "code"
+                    if self._DISTRO in ["debian", "redhat"]
+                    else root_path("/usr/share/code/bin/code")
+                ),
+            )
+            print(
+                f"VSCode 扩展（{len(self.extensions)} 个）："
+                + f"下载 {times['download']:.1f} 秒，安装 {times['install']:.1f} 秒"
+            )
 
         return self
@@ -0,0 +1,225 @@
+"""
+VSCode extensions, installed in bulk from a local VSIX cache
+
+The VSIX files are downloaded EXTENSION_WORKERS at once into the cache,
+$PY_APPS_VSIX_CACHE or ~/.cache/py_apps/vsix by default, reused offline & shareable
+across machines, of any architecture:
+    <publisher>.<name>-<version>-<platform>.vsix  pinned with "publisher.name@version"
+    <publisher>.<name>-latest-<platform>.vsix     downloaded again after VSIX_TTL,
+                                                  when online
+The platform is the marketplace's, such as linux-x64: the extensions with native
+binaries (rust-analyzer, cpptools ...) have a VSIX per platform.
+Then one "code" process installs all of them (--install-extension per file),
+instead of an Electron start per extension
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from gzip import BadGzipFile
+from gzip import open as gzip_open
+from os import environ, makedirs, path, remove, replace
+from re import fullmatch
+from shutil import copyfileobj
+from time import monotonic, time
+
+from py_apps.utils.cache import cache_dir
+from py_apps.utils.cmd import run
+from py_apps.utils.jobs import report_progress
+from py_apps.utils.network import download, is_offline
+from py_apps.utils.sys import check_architecture
+
+
+# VSIX downloads at once
+EXTENSION_WORKERS: int = 8
+
+# Seconds before a "latest" VSIX is downloaded again
+VSIX_TTL: int = 24 * 60 * 60
+
+GALLERY_URL: str = (
+    "https://marketplace.visualstudio.com/_apis/public/gallery/publishers"
+)
+
+# The marketplace platforms of the architectures
+_target_platforms: dict[str, str] = {
+    "amd64": "linux-x64",
+    "arm64": "linux-arm64",
+    "armhf": "linux-armhf",
+}
+
+
+def parse_extensions(value: str) -> list[str]:
+    """
+    Parse an extension list, such as the one of $PY_APPS_VSCODE_EXTENSIONS
+
+    Params:
+        str value: comma or space separated "publisher.name" or "publisher.name@version"
+
+    Returns: list[str], the valid ones, the others are printed
+    """
+    extensions: list[str] = []
+    for extension in value.replace(",", " ").split():
+        if fullmatch(r"[\w-]+\.[\w-]+(@[\w.-]+)?", extension):
+            extensions.append(extension)
+        else:
+            print(f"\033[91m\033[1m[Error]\033[0m Not an extension id: {extension}")
+    return extensions
+
+
+def target_platform(arch: str | None = None) -> str:
+    """
+    The marketplace platform of an architecture
+
+    Params:
+        str | None arch: such as amd64, the current one by default
+
+    Returns: str, such as linux-x64, "" for the ones the marketplace has none for
+    """
+    return _target_platforms.get(arch or check_architecture(), "")
+
+
+def vsix_url(extension: str, platform: str = "") -> str:
+    """
+    The marketplace url of an extension's VSIX
+
+    Params:
+        str extension: "publisher.name" or "publisher.name@version"
+        str platform: the target platform, see target_platform(), "" for any
+
+    Returns: str
+    """
+    extension_id, _, version = extension.partition("@")
+    publisher, _, name = extension_id.partition(".")
+    return (
+        f"{GALLERY_URL}/{publisher}/vsextensions/{name}/{version or 'latest'}/vspackage"
+        + (f"?targetPlatform={platform}" if platform else "")
+    )
+
+
+def vsix_cache() -> str:
+    """The dir of the VSIX cache, see the module docstring"""
+    return environ.get("PY_APPS_VSIX_CACHE", "") or cache_dir("vsix")
+
+
+def vsix_path(cache: str, extension: str, platform: str = "") -> str:
+    """
+    The cached VSIX of an extension
+
+    Params:
+        str cache: the cache dir
+        str extension: "publisher.name" or "publisher.name@version"
+        str platform: the target platform, see target_platform(), "" for any
+
+    Returns: str
+    """
+    extension_id, _, version = extension.partition("@")
+    suffix: str = f"-{platform}" if platform else ""
+    return path.join(cache, f"{extension_id}-{version or 'latest'}{suffix}.vsix")
+
+
+def _is_fresh(file_path: str, extension: str) -> bool:
+    """Whether the cached VSIX can be used as is"""
+    if not path.exists(file_path):
+        return False
+    # Pinned versions never change, & offline the cache is all there is
+    if "@" in extension or is_offline():
+        return True
+    return time() - path.getmtime(file_path) < VSIX_TTL
+
+
+def _gunzip_in_place(file_path: str) -> None:
+    """The marketplace may serve the VSIX (a zip) gzipped, decompress it then"""
+    with open(file_path, "rb") as vsix:
+        if vsix.read(2) != b"\x1f\x8b":
+            return
+
+    try:
+        with gzip_open(file_path, "rb") as gzipped, open(
+            f"{file_path}.zip", "wb"
+        ) as unzipped:
+            copyfileobj(gzipped, unzipped, 1024 * 1024)
+    except (OSError, BadGzipFile):
+        remove(f"{file_path}.zip")
+        raise
+    replace(f"{file_path}.zip", file_path)
+
+
+def fetch_vsix(
+    extensions: list[str], cache: str | None = None, platform: str | None = None
+) -> list[str]:
+    """
+    Download the VSIX files missing or stale in the cache, EXTENSION_WORKERS at once
+
+    Params:
+        list[str] extensions: "publisher.name" or "publisher.name@version"
+        str | None cache: the cache dir, vsix_cache() by default
+        str | None platform: the target platform, the current one by default
+
+    Returns: list[str], the VSIX files available, in the order of extensions
+    """
+    cache = cache or vsix_cache()
+    platform = target_platform() if platform is None else platform
+    makedirs(cache, exist_ok=True)
+
+    def _fetch(extension: str) -> None:
+        file_path: str = vsix_path(cache, extension, platform)
+        if _is_fresh(file_path, extension):
+            return
+
+        # Downloaded beside first, a failure keeps the stale one
+        part_path: str = f"{file_path}.part"
+        if download(vsix_url(extension, platform), part_path, overwrite=True):
+            try:
+                _gunzip_in_place(part_path)
+                replace(part_path, file_path)
+            except OSError as err:
+                print(f"Broken VSIX of {extension}: {err}")
+
+    with ThreadPoolExecutor(EXTENSION_WORKERS) as pool:
+        # Reported from the job's thread, as extensions done
+        for done, _ in enumerate(pool.map(_fetch, extensions)):
+            report_progress((done + 1) * 100 / len(extensions), 100, "下载扩展", "%")
+
+    return [
+        vsix_path(cache, extension, platform)
+        for extension in extensions
+        if path.exists(vsix_path(cache, extension, platform))
+    ]
+
+
+def install_cmd(code: str, vsix_files: list[str], *options: str) -> list[str]:
+    """
+    The one "code" command installing every VSIX
+
+    Params:
+        str code: the code command
+        list[str] vsix_files: the VSIX files
+        str options: more options, such as "--extensions-dir", dir
+
+    Returns: list[str]
+    """
+    return [
+        code,
+        *options,
+        *[arg for vsix in vsix_files for arg in ["--install-extension", vsix]],
+        "--force",
+    ]
+
+
+def install_extensions(extensions: list[str], code: str = "code") -> dict[str, float]:
+    """
+    Fetch the extensions through the cache, then install them in one go
+
+    Params:
+        list[str] extensions: "publisher.name" or "publisher.name@version"
+        str code: the code command
+
+    Returns: dict[str, float], the seconds taken by "download" & "install"
+    """
+    start: float = monotonic()
+    vsix_files: list[str] = fetch_vsix(extensions)
+    downloaded: float = monotonic()
+
+    if vsix_files:
+        report_progress(0, 0, "安装扩展")
+        run(install_cmd(code, vsix_files), "when installing vscode extensions")
+
+    return {"download": downloaded - start, "install": monotonic() - downloaded}
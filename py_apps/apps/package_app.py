@@ -0,0 +1,65 @@
+"""
+Apps installed from the distro's repos, described by their catalog entry only
+"""
+
+from typing import Any
+
+from py_apps.apps.catalog import app_entry
+from py_apps.errors.distro_x_only import DistroXOnlyError
+from py_apps.errors.unsupported_arch import UnsupportedArchitectureError
+from py_apps.utils.app_manage import install_app
+from py_apps.utils.sys import check_architecture, get_distro_short_name
+
+
+class PackageApp:
+    """
+    An app of the catalog with per-distro "packages", and optionally "arches",
+    the architectures supported
+
+    Subclasses set APP_ID, see package_app()
+    """
+
+    _ARCH: str = check_architecture()
+    _DISTRO, _OTHER_DISTRO = get_distro_short_name()
+
+    APP_ID: str = ""
+
+    def __init__(self) -> None:
+        self.entry: dict[str, Any] = app_entry(self.APP_ID)
+        self.pkg: str = ""
+
+    def prepare(self) -> Any:
+        """Resolve the package of the current distro"""
+        arches: list[str] = self.entry.get("arches", [])
+        if arches and self._ARCH not in arches:
+            raise UnsupportedArchitectureError(self._ARCH)
+
+        self.pkg = self.entry["packages"].get(self._DISTRO, "")
+        if self.pkg == "":
+            raise DistroXOnlyError(self._DISTRO, self.entry.get("distros", ""))
+        return self
+
+    def artifacts(self) -> list[str]:
+        """Urls downloaded by install(), available after prepare()"""
+        return []
+
+    def packages(self) -> list[str]:
+        """System packages installed by install(), available after prepare()"""
+        return [self.pkg]
+
+    def install(self) -> Any:
+        """Install the package"""
+        install_app(self._DISTRO, [self.pkg])
+        return self
+
+
+def package_app(app_id: str) -> type:
+    """
+    The installer class of a catalog app without a class of its own
+
+    Params:
+        str app_id: the app id in the catalog
+
+    Returns: type, a PackageApp subclass named after the app
+    """
+    return type(app_entry(app_id)["name"], (PackageApp,), {"APP_ID": app_id})
@@ -0,0 +1,119 @@
+"""
+Registry of all the installable apps, mapping app ids to their installer objects
+
+App ids are in the form of "name" or "name/variant", such as:
+    vivaldi, firefox/esr, nvim/lazy, jetbrains/go
+
+Catalog apps with per-distro packages need no class, see package_app()
+"""
+
+from typing import Any
+
+from py_apps.apps.browser.epiphany import Epiphany
+from py_apps.apps.browser.falkon import Falkon
+from py_apps.apps.browser.firefox import Firefox, FirefoxVariants
+from py_apps.apps.browser.midori import Midori
+from py_apps.apps.browser.vivaldi import Vivaldi
+from py_apps.apps.catalog import load_catalog
+from py_apps.apps.devtools.jetbrains import Jetbrains, JetbrainsVariants
+from py_apps.apps.devtools.neovim import Neovim, NvimVariants
+from py_apps.apps.devtools.vscode import VSCode
+from py_apps.apps.package_app import package_app
+
+
+# Apps without variants
+_plain_apps: dict[str, type] = {
+    "vivaldi": Vivaldi,
+    "midori": Midori,
+    "epiphany": Epiphany,
+    "falkon": Falkon,
+    "vscode": VSCode,
+}
+
+# Apps with variants: (class, variant enum, default variant)
+_variant_apps: dict[str, tuple[type, Any, str]] = {
+    "firefox": (Firefox, FirefoxVariants, "firefox"),
+    "nvim": (Neovim, NvimVariants, "default"),
+    "jetbrains": (Jetbrains, JetbrainsVariants, "idea_community"),
+}
+
+
+def _package_apps() -> list[str]:
+    """Catalog apps without a class of their own"""
+    return [
+        app_id
+        for app_id, entry in load_catalog()["apps"].items()
+        if "/" not in app_id
+        and "packages" in entry
+        and app_id not in _plain_apps
+        and app_id not in _variant_apps
+    ]
+
+
+def list_app_ids() -> list[str]:
+    """
+    List all the known app ids
+
+    Returns: list[str]
+    """
+    app_ids: list[str] = list(_plain_apps)
+
+    for name, (_, variants, _) in _variant_apps.items():
+        app_ids.extend(f"{name}/{variant.value}" for variant in variants)
+
+    return app_ids + _package_apps()
+
+
+def _retarget(
+    cls: type, distro: str | None, other_distro: str, arch: str | None
+) -> type:
+    """
+    Derive an installer class that resolves for another distro / architecture,
+    the detected values are class attributes, so they're shadowed by a subclass
+    """
+    overrides: dict[str, str] = {}
+
+    if distro is not None:
+        overrides.update({"_DISTRO": distro, "_OTHER_DISTRO": other_distro})
+    if arch is not None:
+        # Vivaldi names it _ARCH_TYPE
+        overrides.update({"_ARCH": arch, "_ARCH_TYPE": arch})
+
+    return type(cls.__name__, (cls,), overrides) if overrides else cls
+
+
+def get_app(
+    app_id: str,
+    distro: str | None = None,
+    other_distro: str = "",
+    arch: str | None = None,
+) -> Any:
+    """
+    Create the installer object for the app id
+
+    Params:
+        str app_id: the app id, such as "vivaldi" or "jetbrains/go"
+        str | None distro: resolve for this distro instead of the current one
+        str other_distro: the sub distro (such as ubuntu) used with distro
+        str | None arch: resolve for this architecture instead of the current one
+
+    Throws: KeyError if the app id is unknown
+    """
+    name, _, variant = app_id.partition("/")
+
+    if name in _plain_apps and variant == "":
+        return _retarget(_plain_apps[name], distro, other_distro, arch)()
+
+    if variant == "" and name in _package_apps():
+        return _retarget(package_app(name), distro, other_distro, arch)()
+
+    if name not in _variant_apps:
+        raise KeyError(app_id)
+
+    cls, variants, default = _variant_apps[name]
+    try:
+        variant_value = variants(variant or default)
+    except ValueError as err:
+        raise KeyError(app_id) from err
+
+    return _retarget(cls, distro, other_distro, arch)(variant_value)
@@ -0,0 +1,364 @@
+"""
+Speculative work while the user browses the menus
+
+Once an item stays highlighted (or hovered) for RESOLVE_DELAY, the prepare() of
+its app starts in the background, for the apps marked "speculate" in the catalog:
+their prepare() only resolves (release lookups, page scrapes) without side effects.
+After DWELL_DELAY, the artifacts are downloaded too, if a HEAD tells their sizes
+fit in the byte budget. Choosing the app reuses both, the rest is discarded
+(the downloads in flight cancelled), and so are the downloads its install
+didn't use once it's done.
+
+$PY_APPS_SPECULATE:
+    on          resolve & download (default)
+    resolve     resolve only
+    off         nothing speculative
+$PY_APPS_SPECULATE_BUDGET:  MiB downloaded speculatively per menu, 256 by default
+$PY_APPS_SPECULATE_SPEED:   KiB/s of the speculative downloads, 0 (default) for no limit
+"""
+
+from concurrent.futures import Future
+from os import environ, path
+from tempfile import mkdtemp
+from threading import Event, Lock, Thread, Timer, get_ident
+from typing import Any, Callable
+from urllib.request import Request, urlopen
+
+from py_apps.apps.catalog import app_entry, app_title, load_catalog
+from py_apps.apps.registry import get_app
+from py_apps.utils.cache import cache_dir
+from py_apps.utils.fileops import move, remove
+from py_apps.utils.jobs import run_in_foreground, submit_job
+from py_apps.utils.network import (
+    ArtifactSource,
+    add_source,
+    download,
+    is_offline,
+    remove_source,
+    upstream_url,
+)
+
+
+# Seconds an item stays highlighted before its prepare() starts
+RESOLVE_DELAY: float = 0.3
+
+# Seconds an item stays highlighted before its artifacts are downloaded
+DWELL_DELAY: float = 3
+
+
+class SpeculativeSource(ArtifactSource):
+    """
+    Serve the artifacts downloaded speculatively, waiting for the ones in flight
+
+    Params:
+        str dir_path: where the speculative downloads are kept
+    """
+
+    def __init__(self, dir_path: str) -> None:
+        self.dir_path = dir_path
+        # url -> the downloaded file, or None while in flight
+        self.files: dict[str, str | None] = {}
+        self._done: dict[str, Event] = {}
+        # url -> set to stop its download
+        self._cancels: dict[str, Event] = {}
+        # url -> the thread downloading it, which mustn't wait for itself
+        self._threads: dict[str, int] = {}
+        self._lock = Lock()
+
+    def begin(self, url: str) -> tuple[str, Event]:
+        """
+        Claim the download of url
+
+        Returns: tuple[str, Event], the file path to download to,
+            & the event cancel() sets to stop the download
+        """
+        with self._lock:
+            self.files[url] = None
+            self._done[url] = Event()
+            self._cancels[url] = Event()
+            self._threads[url] = get_ident()
+            return path.join(self.dir_path, str(len(self._done))), self._cancels[url]
+
+    def end(self, url: str, file_path: str | None) -> None:
+        """Finish the download of url, None when it failed"""
+        with self._lock:
+            if file_path is None:
+                self.files.pop(url, None)
+            else:
+                self.files[url] = file_path
+            self._done[url].set()
+
+    def fetch(self, url: str, file_path: str) -> bool:
+        if url not in self.files or self._threads[url] == get_ident():
+            return False
+        self._done[url].wait()
+
+        with self._lock:
+            spec_path: str | None = self.files.pop(url, None)
+        if spec_path is None:
+            return False
+        try:
+            move(spec_path, file_path)
+        except OSError:
+            return False
+        return True
+
+    def cancel(self, keep: list[str]) -> None:
+        """
+        Stop the downloads in flight, but the ones of keep
+
+        Params:
+            list[str] keep: the urls kept for fetch()
+        """
+        with self._lock:
+            for url, cancel in self._cancels.items():
+                if url not in keep and self.files.get(url, "") is None:
+                    cancel.set()
+
+    def discard(self, keep: list[str]) -> None:
+        """
+        Remove the downloads, but the ones of keep, the ones in flight once
+        they're cancelled
+
+        Params:
+            list[str] keep: the urls kept for fetch()
+        """
+        self.cancel(keep)
+        for event in list(self._done.values()):
+            event.wait()
+
+        with self._lock:
+            for url, file_path in list(self.files.items()):
+                if url not in keep and file_path is not None:
+                    remove(file_path)
+                    del self.files[url]
+            kept: bool = bool(self.files)
+        if not kept:
+            self.release()
+
+    def release(self) -> None:
+        """
+        Stop serving & remove the downloads fetch() didn't claim, the ones
+        in flight once they're cancelled: when nothing is kept, or the install
+        of the app kept is done
+        """
+        self.cancel([])
+        for event in list(self._done.values()):
+            event.wait()
+
+        remove_source(self)
+        with self._lock:
+            for file_path in self.files.values():
+                if file_path is not None:
+                    remove(file_path)
+            self.files.clear()
+            remove(self.dir_path)
+
+
+def _in_thread(func: Callable[..., Any], *args: Any) -> Future:
+    """
+    Run func in a daemon thread, unlike an executor's threads it doesn't hold up
+    the exit of the program
+    """
+    future: Future = Future()
+
+    def _run() -> None:
+        try:
+            future.set_result(func(*args))
+        except (Exception, SystemExit) as err:  # pylint: disable=broad-except
+            future.set_exception(err)
+
+    Thread(target=_run, daemon=True).start()
+    return future
+
+
+def _content_length(url: str) -> int | None:
+    """The size of url from a HEAD request, None when unknown"""
+    try:
+        with urlopen(Request(upstream_url(url), method="HEAD"), timeout=10) as res:
+            return int(res.headers["Content-Length"])
+    except (OSError, TypeError, ValueError):
+        # No Content-Length is a TypeError
+        return None
+
+
+class Speculator:  # pylint: disable=too-many-instance-attributes
+    """
+    The speculative work of one menu, see the module docstring,
+    closed when leaving the with block
+
+    Params:
+        int | None budget: bytes downloaded speculatively at most,
+            $PY_APPS_SPECULATE_BUDGET by default
+    """
+
+    def __init__(self, budget: int | None = None) -> None:
+        self.mode: str = environ.get("PY_APPS_SPECULATE", "on")
+        self.budget: int = (
+            budget
+            if budget is not None
+            else int(environ.get("PY_APPS_SPECULATE_BUDGET", "256")) * 1024**2
+        )
+        self.max_speed: int = int(environ.get("PY_APPS_SPECULATE_SPEED", "0")) * 1024
+        self.prepared: dict[str, Future] = {}
+        self.source: SpeculativeSource | None = None
+        # url -> the app it's downloaded for
+        self.owners: dict[str, str] = {}
+        self._focused: str = ""
+        # The app chosen when closed
+        self._kept: str = ""
+        self._closed: bool = False
+        self._timers: list[Timer] = []
+        self._lock = Lock()
+
+    def __enter__(self) -> "Speculator":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def _wanted(self, app_id: str) -> bool:
+        return not self._closed or app_id == self._kept
+
+    def highlight(self, app_id: str) -> None:
+        """
+        The item highlighted changed, for Selection(on_highlight=...)
+
+        Params:
+            str app_id: the id of the item, menu actions are ignored
+        """
+        entry: dict[str, Any] | None = load_catalog()["apps"].get(app_id, None)
+
+        with self._lock:
+            for timer in self._timers:
+                timer.cancel()
+            self._timers = []
+            self._focused = app_id
+
+            if self._closed or self.mode == "off" or entry is None:
+                return
+            if not entry.get("speculate", False):
+                return
+
+            delays: list[tuple[float, Callable[[str], None]]] = [
+                (RESOLVE_DELAY, self._resolve)
+            ]
+            if self.mode == "on" and not is_offline():
+                delays.append((DWELL_DELAY, self._fetch))
+
+            for delay, func in delays:
+                timer = Timer(delay, func, [app_id])
+                timer.daemon = True
+                timer.start()
+                self._timers.append(timer)
+
+    def _resolve(self, app_id: str) -> None:
+        with self._lock:
+            if self._closed or self._focused != app_id or app_id in self.prepared:
+                return
+            self.prepared[app_id] = _in_thread(self._prepare, app_id)
+
+    def _prepare(self, app_id: str) -> Any:
+        # Queued before the menu is closed, and not chosen
+        if not self._wanted(app_id):
+            return None
+        return get_app(app_id).prepare()
+
+    def _fetch(self, app_id: str) -> None:
+        with self._lock:
+            if self._closed or self._focused != app_id or app_id not in self.prepared:
+                return
+            _in_thread(self._download, app_id, self.prepared[app_id])
+
+    def _download(self, app_id: str, prepared: Future) -> None:
+        """Download the artifacts of a prepared app, within the budget"""
+        try:
+            urls: list[str] = prepared.result().artifacts()
+        except (Exception, SystemExit):  # pylint: disable=broad-except
+            # Reported when the app is chosen
+            return
+
+        for url in urls:
+            if not self._wanted(app_id) or url in self.owners:
+                continue
+
+            size: int | None = _content_length(url)
+            with self._lock:
+                if size is None or size > self.budget or not self._wanted(app_id):
+                    continue
+                self.budget -= size
+                self.owners[url] = app_id
+
+                if self.source is None:
+                    self.source = SpeculativeSource(mkdtemp(dir=cache_dir("speculate")))
+                    add_source(self.source)
+                source: SpeculativeSource = self.source
+                file_path, cancel = source.begin(url)
+
+            ok: bool = download(
+                url, file_path, overwrite=True, max_speed=self.max_speed, cancel=cancel
+            )
+            source.end(url, file_path if ok else None)
+
+    def install(self, app_id: str) -> None:
+        """
+        Close the menu with an app chosen, and queue its install,
+        or run it in the foreground when its installer prompts
+
+        Params:
+            str app_id: the app chosen
+        """
+        prepare: Callable[[], Any] = self.take(app_id)
+        # The installer scripts prompt, in the terminal
+        if app_entry(app_id).get("installer", ""):
+            run_in_foreground(app_title(app_id), lambda: self._install(prepare))
+            return
+        # DistroXOnlyError is shown as the job's error
+        submit_job(app_title(app_id), lambda: self._install(prepare))
+
+    def _install(self, prepare: Callable[[], Any]) -> Any:
+        try:
+            return prepare().install()
+        finally:
+            # The downloads the install didn't use
+            if self.source is not None:
+                self.source.release()
+
+    def take(self, app_id: str) -> Callable[[], Any]:
+        """
+        Close the menu with an app chosen, keeping its speculative work
+
+        Params:
+            str app_id: the app chosen
+
+        Returns: Callable[[], Any], its prepare() for the job: the speculative one
+            if started (waited for), or a new one
+        """
+        prepared: Future | None = self.prepared.get(app_id, None)
+        self.close(keep=app_id)
+        if prepared is None:
+            return lambda: get_app(app_id).prepare()
+        return prepared.result
+
+    def close(self, keep: str = "") -> None:
+        """
+        Stop speculating, the downloads of the other apps are cancelled
+        & discarded, their prepare() runs on but it's ignored
+
+        Params:
+            str keep: the app chosen, its work goes on & is kept
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed, self._kept = True, keep
+            for timer in self._timers:
+                timer.cancel()
+
+        if self.source is not None:
+            # In the background, waiting for the cancelled downloads to stop
+            Thread(
+                target=self.source.discard,
+                args=([url for url, owner in self.owners.items() if owner == keep],),
+                daemon=True,
+            ).start()
@@ -0,0 +1,373 @@
+"""
+Check the installed apps for updates in one concurrent sweep
+
+The installed versions are read locally:
+    packages    one package db query (dpkg-query, rpm, pacman) for every app
+                installed from a package, Vivaldi & VSCode included
+    JetBrains   /opt/<ide>/product-info.json of the IDEs with a launcher
+    Neovim      nvim --version, its package when it's from the repos
+    VSCode      resources/app/package.json of the tarball on the other distros
+The latest ones come from upstream metadata, fetched at once & cached for
+UPSTREAM_TTL, so a check costs about one round trip:
+    repos       the metadata on disk, through the package index
+    upstream    GitHub releases (Neovim, Midori), the JetBrains feed,
+                the VSCode releases API & the Vivaldi download page
+Only the apps whose versions changed are listed.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from json import load
+from os import path
+from re import findall, search
+from subprocess import DEVNULL, PIPE, SubprocessError, run
+from typing import Any, Callable, NamedTuple
+
+from py_apps.apps.browser.vivaldi import Vivaldi
+from py_apps.apps.catalog import app_entry, app_title
+from py_apps.apps.devtools.jetbrains import (
+    Jetbrains,
+    JetbrainsVariants,
+    jetbrains_releases,
+)
+from py_apps.apps.devtools.neovim import Neovim, NvimVariants
+from py_apps.apps.registry import get_app, list_app_ids
+from py_apps.utils.app_manage import install_app
+from py_apps.utils.cache import load_cache, save_cache
+from py_apps.utils.cmd import check_cmd_exists
+from py_apps.utils.jobs import submit_job
+from py_apps.utils.network import get
+from py_apps.utils.pkg_index import PackageIndex
+from py_apps.utils.sys import get_distro_short_name, root_path
+
+
+# Probes & upstream queries at once
+UPDATE_WORKERS: int = 8
+
+# Seconds before the upstream versions are queried again
+UPSTREAM_TTL: int = 6 * 60 * 60
+
+VSCODE_RELEASES_URL: str = "https://update.code.visualstudio.com/api/releases/stable"
+
+# Queries of the installed versions, the package names are appended
+_installed_query: dict[str, list[str]] = {
+    "debian": ["dpkg-query", "-W", "-f=${Package}\t${Version}\n"],
+    "redhat": ["rpm", "-q", "--qf", "%{NAME}\t%{VERSION}-%{RELEASE}\n"],
+    "suse": ["rpm", "-q", "--qf", "%{NAME}\t%{VERSION}-%{RELEASE}\n"],
+    "arch": ["pacman", "-Q"],
+}
+
+# The packages of the apps installed from upstream files
+_upstream_packages: dict[str, str] = {
+    "vivaldi": "vivaldi-stable",
+    "vscode": "code",
+    "midori": "midori",
+}
+
+
+class Update(NamedTuple):
+    """An installed app with a newer version"""
+
+    app_id: str
+    installed: str
+    latest: str
+    # Upgraded by the package manager when set, reinstalled otherwise
+    package: str = ""
+
+
+def normalize(version: str) -> str:
+    """
+    The version without the "v", the epoch & the package revision, so that the
+    versions of packages & of upstream releases compare
+
+    Params:
+        str version: such as "v0.10.2", "1:7.0.3495.6-1" or "1.95.3-1731513102"
+
+    Returns: str, such as "0.10.2", "7.0.3495.6" or "1.95.3"
+    """
+    return version.strip().lstrip("v").split(":", 1)[-1].split("-")[0]
+
+
+def _version_key(version: str) -> list[int]:
+    return [int(number) for number in findall(r"\d+", version)]
+
+
+def find_updates(
+    installed: dict[str, str],
+    candidates: dict[str, list[str]],
+    packages: dict[str, str],
+) -> list[Update]:
+    """
+    Compare the installed versions with the latest ones
+
+    Params:
+        dict[str, str] installed: app id -> the installed version
+        dict[str, list[str]] candidates: app id -> the versions available,
+            of every repo having the package
+        dict[str, str] packages: app id -> its package in the repos,
+            the revisions are compared too for these
+
+    Returns: list[Update], by app id
+    """
+    updates: list[Update] = []
+    for app_id, version in sorted(installed.items()):
+        versions: list[str] = candidates.get(app_id, [])
+        package: str = packages.get(app_id, "")
+        if not versions:
+            continue
+
+        latest: str = max(versions, key=_version_key)
+        # The revisions of packages count, they're security fixes too
+        compared: Callable[[str], str] = str if package else normalize
+        if _version_key(compared(latest)) > _version_key(compared(version)):
+            updates.append(Update(app_id, version, latest, package))
+    return updates
+
+
+def installed_packages(distro: str, names: list[str]) -> dict[str, str]:
+    """
+    The installed versions of packages, in one query of the package db
+
+    Params:
+        str distro: the distro short name
+        list[str] names: the package names
+
+    Returns: dict[str, str], name -> version, of the installed ones
+    """
+    query: list[str] | None = _installed_query.get(distro, None)
+    if query is None or not names or not check_cmd_exists(query[0]):
+        return {}
+
+    try:
+        # Exits with 1 when some aren't installed
+        output: str = run(
+            [*query, *names], stdout=PIPE, stderr=DEVNULL, text=True, check=False
+        ).stdout
+    except OSError:
+        return {}
+
+    versions: dict[str, str] = {}
+    for line in output.splitlines():
+        name, _, version = line.replace("\t", " ").partition(" ")
+        # dpkg-query lists removed packages without a version
+        if name in names and version.strip():
+            versions[name] = version.strip()
+    return versions
+
+
+def _repo_versions(names: list[str]) -> dict[str, list[str]]:
+    """The versions in the repos, the index is used by this thread only"""
+    index = PackageIndex(root=root_path("/"))
+    try:
+        index.refresh()
+        return index.versions(names)
+    finally:
+        index.close()
+
+
+def _installed_jetbrains() -> dict[str, str]:
+    installed: dict[str, str] = {}
+    for variant in JetbrainsVariants:
+        ide = Jetbrains(variant)
+        # The editions share the dir, the launcher tells which one it is
+        if not path.lexists(ide.launcher):
+            continue
+        try:
+            with open(
+                path.join(ide.install_dir, "product-info.json"), "r", encoding="utf-8"
+            ) as product_info:
+                installed[f"jetbrains/{variant.value}"] = load(product_info)["version"]
+        except (OSError, ValueError, KeyError):
+            continue
+    return installed
+
+
+def _installed_nvim() -> dict[str, str]:
+    if not check_cmd_exists("nvim"):
+        return {}
+    try:
+        output: str = run(
+            ["nvim", "--version"],
+            stdout=PIPE,
+            stderr=DEVNULL,
+            text=True,
+            timeout=10,
+            check=False,
+        ).stdout
+    except (OSError, SubprocessError):
+        return {}
+    match = search(r"NVIM v(\S+)", output)
+    return {"nvim/default": match[1]} if match else {}
+
+
+def _installed_vscode_tarball() -> dict[str, str]:
+    try:
+        with open(
+            root_path("/usr/share/code/resources/app/package.json"),
+            "r",
+            encoding="utf-8",
+        ) as package_json:
+            return {"vscode": load(package_json)["version"]}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def _cached_latest(name: str, fetch: Callable[[], str | None]) -> str | None:
+    """The latest upstream version, cached for UPSTREAM_TTL"""
+    latest: str | None = load_cache(f"latest-{name}", UPSTREAM_TTL)
+    if latest is None:
+        try:
+            latest = fetch()
+        except (ValueError, KeyError, IndexError, TypeError):
+            # Unexpected upstream metadata
+            latest = None
+        if latest:
+            save_cache(f"latest-{name}", latest)
+    return latest
+
+
+def _github_latest(repo: str) -> str | None:
+    res = get(f"https://api.github.com/repos/{repo}/releases/latest", fatal=False)
+    return None if res is None else res.json()["tag_name"]
+
+
+def _vscode_latest() -> str | None:
+    res = get(VSCODE_RELEASES_URL, fatal=False)
+    return None if res is None else res.json()[0]
+
+
+def _vivaldi_latest() -> str | None:
+    res = get(Vivaldi.REPO_URL, fatal=False)
+    match = None if res is None else search(r"vivaldi-stable_([\d.]+)-", res.text)
+    return match[1] if match else None
+
+
+# App id -> its latest upstream version
+_upstream: dict[str, Callable[[], str | None]] = {
+    "vivaldi": partial(_cached_latest, "vivaldi", _vivaldi_latest),
+    "vscode": partial(_cached_latest, "vscode", _vscode_latest),
+    "midori": partial(
+        _cached_latest, "midori", lambda: _github_latest(app_entry("midori")["github"])
+    ),
+    "nvim/default": partial(
+        _cached_latest, "nvim", lambda: _github_latest(app_entry("nvim")["github"])
+    ),
+}
+
+
+def _package_apps(distro: str) -> dict[str, str]:
+    """App id -> its package in the repos of the distro"""
+    packages: dict[str, str] = {}
+    for app_id in list_app_ids():
+        package: str = app_entry(app_id).get("packages", {}).get(distro, "")
+        if package:
+            packages[app_id] = package
+    # Stale on debian, so it's from GitHub there
+    if Neovim(NvimVariants.DEFAULT).use_sys_pkg:
+        packages["nvim/default"] = "neovim"
+    return packages
+
+
+def check_updates(  # pylint: disable=too-many-locals
+    distro: str | None = None,
+) -> list[Update]:
+    """
+    Find the installed apps with a newer version, see the module docstring
+
+    Params:
+        str | None distro: the distro short name, the current one by default
+
+    Returns: list[Update], by app id
+    """
+    distro = distro or get_distro_short_name()[0]
+    packages: dict[str, str] = _package_apps(distro)
+    names: list[str] = sorted({*packages.values(), *_upstream_packages.values()})
+
+    with ThreadPoolExecutor(UPDATE_WORKERS) as pool:
+        # What's installed, locally
+        repo_future: Future = pool.submit(_repo_versions, list(packages.values()))
+        probes: list[Future] = [
+            pool.submit(probe)
+            for probe in [
+                _installed_jetbrains,
+                _installed_nvim,
+                _installed_vscode_tarball,
+            ]
+        ]
+        package_versions: dict[str, str] = installed_packages(distro, names)
+
+        installed: dict[str, str] = {}
+        for probe in probes:
+            installed.update(probe.result())
+        for app_id, package in {**_upstream_packages, **packages}.items():
+            if package in package_versions:
+                installed[app_id] = package_versions[package]
+
+        # The latest upstream versions of what's installed, all at once
+        upstream: dict[str, Future] = {
+            app_id: pool.submit(_upstream[app_id])
+            for app_id in installed
+            if app_id in _upstream and app_id not in packages
+        }
+        feed: Future | None = (
+            pool.submit(jetbrains_releases)
+            if any(app_id.startswith("jetbrains/") for app_id in installed)
+            else None
+        )
+
+        candidates: dict[str, list[str]] = {}
+        repo_versions: dict[str, list[str]] = repo_future.result()
+        for app_id, package in packages.items():
+            candidates[app_id] = repo_versions.get(package, [])
+        for app_id, future in upstream.items():
+            candidates[app_id] = [future.result()] if future.result() else []
+        releases: dict[str, Any] = feed.result() if feed is not None else {}
+        for app_id in installed:
+            release: dict[str, str] = releases.get(app_id.partition("/")[2], {})
+            if app_id.startswith("jetbrains/") and release.get("version"):
+                candidates[app_id] = [release["version"]]
+
+    return find_updates(installed, candidates, packages)
+
+
+def update_label(update: Update) -> str:
+    """
+    The label of an update, such as "Vivaldi：7.0.3495.6-1 → 7.1.3570.35"
+
+    Params:
+        Update update: the update
+
+    Returns: str
+    """
+    return f"{app_title(update.app_id)}：{update.installed} → {update.latest}"
+
+
+def _reinstall(app_id: str) -> None:
+    get_app(app_id).prepare().install()
+
+
+def upgrade(
+    updates: list[Update],
+    submit: Callable[[str, Callable[[], Any]], Any] = submit_job,
+    distro: str | None = None,
+) -> None:
+    """
+    Upgrade the apps: the packages in one package manager run, the others reinstalled
+
+    Params:
+        list[Update] updates: the updates
+        Callable submit: takes a title & the function to run,
+            submit_job() by default, to run them in the background
+        str | None distro: the distro short name, the current one by default
+    """
+    distro = distro or get_distro_short_name()[0]
+    package_names: list[str] = [update.package for update in updates if update.package]
+    if package_names:
+        submit(
+            f"更新 {len(package_names)} 个软件包",
+            partial(install_app, distro, package_names),
+        )
+
+    for update in updates:
+        if not update.package:
+            submit(app_title(update.app_id), partial(_reinstall, update.app_id))
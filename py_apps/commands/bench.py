@@ -0,0 +1,340 @@
+"""
+The "bench" subcommand, micro benchmarks of the UI
+
+Usage:
+    py-apps bench selection [--items 10000] [--query neovim]
+    py-apps bench network [--profiles lan,3g,cn] [--apps vivaldi,nvim] [--bundle B]
+    py-apps bench extensions [--extensions ms-python.python,...] [--code code]
+"""
+
+import sys
+from argparse import Namespace
+from os import environ, path
+from random import Random
+from time import perf_counter
+
+
+# One frame at 60 fps
+FRAME_MS: float = 1000 / 60
+
+_WORDS: list[str] = [
+    "python3",
+    "lib",
+    "dev",
+    "gtk",
+    "qt6",
+    "neovim",
+    "fonts",
+    "rust",
+    "node",
+    "doc",
+    "plugin",
+    "server",
+]
+
+
+def make_catalog(items: int) -> tuple[list[str], list[str]]:
+    """
+    A synthetic package catalog, the same for the same size
+
+    Returns: tuple[list[str], list[str]], the ids & the labels
+    """
+    rand = Random(items)
+    ids: list[str] = [f"pkg-{index}" for index in range(items)]
+    labels: list[str] = [
+        f"[b]{'-'.join(rand.sample(_WORDS, 3))}-{index}[/b]：软件包 {index}"
+        for index in range(items)
+    ]
+    return ids, labels
+
+
+def _bench_mount(ids: list[str], labels: list[str], query: str) -> float:
+    """
+    Mount a Selection headless & type the query
+
+    Returns: float, ms until mounted & rendered the first time
+    """
+    # pylint: disable=import-outside-toplevel
+    from asyncio import run as run_async
+
+    from py_apps.ui.selection import Selection
+    from py_apps.ui.virtual_list import VirtualList
+
+    start: float = perf_counter()
+    selection = Selection(ids, labels, "bench")
+
+    async def _mount() -> float:
+        async with selection.run_test(size=(100, 40)) as pilot:
+            mounted: float = perf_counter() - start
+            for char in query:
+                await pilot.press(char)
+            assert selection.query_one(VirtualList).highlighted_id is not None
+        return mounted
+
+    return run_async(_mount()) * 1000
+
+
+def _bench_selection(args: Namespace) -> None:
+    # pylint: disable=import-outside-toplevel
+    from py_apps.ui.virtual_list import FuzzyFilter
+
+    ids, labels = make_catalog(args.items)
+
+    start: float = perf_counter()
+    fuzzy = FuzzyFilter(labels)
+    print(f"index {args.items} labels: {(perf_counter() - start) * 1000:.1f} ms")
+
+    # Type the query one char at a time, then erase it
+    queries: list[str] = [args.query[:end] for end in range(1, len(args.query) + 1)]
+    latencies: list[float] = []
+    for query in queries + queries[::-1][1:] + [""]:
+        start = perf_counter()
+        matched: int = len(fuzzy.filter(query))
+        latencies.append((perf_counter() - start) * 1000)
+        print(f"  {query!r:>14}: {matched:>6} matches in {latencies[-1]:.2f} ms")
+
+    mount_ms: float = _bench_mount(ids, labels, args.query)
+
+    worst: float = max(latencies)
+    print(f"filter: worst {worst:.2f} ms, frame budget {FRAME_MS:.1f} ms")
+    print(f"mount & first render (headless): {mount_ms:.1f} ms")
+
+    # Fail above one frame, for scripting
+    if worst > FRAME_MS:
+        sys.exit(1)
+
+
+# The artifact downloaded by the network bench without a bundle
+_ARTIFACT_URL: str = (
+    "https://downloads.vivaldi.com/stable/vivaldi-stable_7.0.3495.6-1_amd64.deb"
+)
+
+
+def _network_fixtures(args: Namespace):
+    """
+    The fixtures of the network bench: the recorded bundle, or the fixture
+    responses of the simulated distros with synthetic artifacts
+
+    Returns: tuple[FixtureStore, str], the store & the url of the artifact downloaded
+    """
+    # pylint: disable=import-outside-toplevel
+    from py_apps.utils.fixture_server import FixtureStore
+    from py_apps.utils.sim import fixture_responses
+
+    if args.bundle:
+        store = FixtureStore.from_bundle(args.bundle)
+        # The largest recorded file
+        return store, max(store.fixtures, key=lambda url: store.fixtures[url].size)
+
+    store = FixtureStore()
+    for url, content in fixture_responses().items():
+        store.add(url, content)
+    body: bytes = Random(args.size).randbytes(args.size * 1024)
+    # The vivaldi package & the neovim one downloaded by prepare()
+    for prefix in [
+        "https://downloads.vivaldi.com/",
+        "https://github.com/Skywalker0803/",
+    ]:
+        store.add(prefix, body)
+    return store, _ARTIFACT_URL
+
+
+def _bench_network(args: Namespace) -> None:  # pylint: disable=too-many-locals
+    # pylint: disable=import-outside-toplevel
+    from tempfile import TemporaryDirectory
+    from threading import Thread
+
+    from py_apps.utils.fixture_server import PROFILES, Faults, FixtureServer
+    from py_apps.utils.sim import make_rootfs
+
+    store, artifact_url = _network_fixtures(args)
+    fixture = store.lookup(artifact_url)
+    expected_size: int = fixture.size if fixture is not None else -1
+    server = FixtureServer(
+        ("127.0.0.1", 0),
+        store,
+        faults=Faults(args.error_rate, args.reset_rate),
+        seed=args.seed,
+    )
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    with TemporaryDirectory(prefix="py_apps-bench-") as root:
+        # A debian rootfs, the installers detect the distro on import
+        make_rootfs(root, "debian")
+        environ.update(
+            PY_APPS_UPSTREAM=server.base_url, PY_APPS_ROOT=root, PY_APPS_CACHE="off"
+        )
+        if args.downloader:
+            environ["PY_APPS_DOWNLOADER"] = args.downloader
+
+        from py_apps.apps.registry import get_app
+        from py_apps.utils.network import download
+
+        for name in args.profiles.split(","):
+            profile = PROFILES[name]
+            server.profile = profile
+            server.stats.clear()
+            # A cold metadata cache for every profile
+            environ["XDG_CACHE_HOME"] = path.join(root, "cache", name)
+            print(
+                f"{name}: {profile.latency * 1000:.1f} ms per request, "
+                + f"{profile.bandwidth // 1024 or '-'} KiB/s per connection, "
+                + f"{profile.link // 1024 or '-'} KiB/s link"
+            )
+
+            for app_id in [app_id for app_id in args.apps.split(",") if app_id]:
+                start: float = perf_counter()
+                try:
+                    get_app(app_id, distro="debian", arch="amd64").prepare()
+                    outcome: str = "ok"
+                except (Exception, SystemExit) as err:  # pylint: disable=broad-except
+                    outcome = f"failed: {err}"
+                print(
+                    f"  prepare {app_id:<16} "
+                    + f"{(perf_counter() - start) * 1000:>8.0f} ms  {outcome}"
+                )
+
+            file_path: str = path.join(root, "tmp", "artifact")
+            start = perf_counter()
+            download(artifact_url, file_path, overwrite=True)
+            seconds: float = perf_counter() - start
+            size: int = path.getsize(file_path) if path.exists(file_path) else 0
+            print(
+                f"  download {size // 1024} KiB in {seconds:.2f} s, "
+                + f"{size / seconds / 1024:.0f} KiB/s  "
+                + ("ok" if size == expected_size else "failed")
+            )
+            print(
+                f"  {server.stats.get('requests', 0)} requests, "
+                + f"{server.stats.get('bytes', 0) // 1024} KiB served, "
+                + f"{server.stats.get('errors', 0)} errors & "
+                + f"{server.stats.get('resets', 0)} resets injected"
+            )
+
+    server.shutdown()
+    server.server_close()
+
+
+# Popular extensions the extensions bench installs by default
+_EXTENSIONS: str = ",".join(
+    [
+        "ms-python.python",
+        "ms-vscode.cpptools",
+        "rust-lang.rust-analyzer",
+        "golang.go",
+        "esbenp.prettier-vscode",
+        "dbaeumer.vscode-eslint",
+        "eamodio.gitlens",
+        "redhat.vscode-yaml",
+    ]
+)
+
+
+def _bench_extensions(args: Namespace) -> None:
+    # pylint: disable=import-outside-toplevel
+    from tempfile import TemporaryDirectory
+
+    from py_apps.apps.devtools.vscode_extensions import (
+        fetch_vsix,
+        install_cmd,
+        parse_extensions,
+    )
+    from py_apps.utils.cmd import check_cmd_exists, run
+
+    extensions: list[str] = parse_extensions(args.extensions)
+
+    start: float = perf_counter()
+    vsix_files: list[str] = fetch_vsix(extensions)
+    print(
+        f"fetch {len(vsix_files)}/{len(extensions)} VSIX: "
+        + f"{perf_counter() - start:.2f} s"
+    )
+
+    if not check_cmd_exists(args.code):
+        print(f"{args.code} not found, install skipped")
+        return
+
+    # Both into empty extension dirs, the user's extensions untouched
+    with TemporaryDirectory(prefix="py_apps-bench-") as root:
+        start = perf_counter()
+        for vsix in vsix_files:
+            run(
+                install_cmd(args.code, [vsix], "--extensions-dir", f"{root}/serial"),
+                "when installing a vscode extension",
+            )
+        serial: float = perf_counter() - start
+
+        start = perf_counter()
+        run(
+            install_cmd(args.code, vsix_files, "--extensions-dir", f"{root}/batched"),
+            "when installing vscode extensions",
+        )
+        batched: float = perf_counter() - start
+
+    print(f"serial:  {len(vsix_files)} processes, {serial:.2f} s")
+    print(f"batched: 1 process, {batched:.2f} s  x{serial / max(batched, 1e-3):.1f}")
+
+
+def register(subparsers) -> None:
+    """
+    Register the bench subcommand
+
+    Params:
+        subparsers: the subparsers of the main parser
+    """
+    parser = subparsers.add_parser("bench", help="run micro benchmarks")
+    targets = parser.add_subparsers(dest="target", required=True)
+
+    selection = targets.add_parser(
+        "selection", help="filter & render a large Selection list"
+    )
+    selection.add_argument(
+        "--items", type=int, default=10000, help="how many items in the list"
+    )
+    selection.add_argument(
+        "--query", default="neovim", help="the text typed, one char at a time"
+    )
+    selection.set_defaults(func=_bench_selection)
+
+    network = targets.add_parser(
+        "network",
+        help="prepare() & download() against the fixture server, per network profile",
+    )
+    network.add_argument(
+        "--profiles", default="lan,3g,cn", help="comma separated: lan, 3g, cn"
+    )
+    network.add_argument(
+        "--apps",
+        default="vivaldi,midori,nvim,jetbrains/go",
+        help="comma separated app ids to prepare()",
+    )
+    network.add_argument(
+        "--bundle", default="", help="replay a recorded bundle instead of the fixtures"
+    )
+    network.add_argument(
+        "--size", type=int, default=1024, help="KiB of the synthetic artifacts"
+    )
+    network.add_argument(
+        "--downloader", default="", help="rpc, process or native, see download()"
+    )
+    network.add_argument(
+        "--error-rate", type=float, default=0, help="chance of a 503 per request"
+    )
+    network.add_argument(
+        "--reset-rate",
+        type=float,
+        default=0,
+        help="chance of a connection dropped halfway per request",
+    )
+    network.add_argument("--seed", type=int, default=0, help="seed of the faults")
+    network.set_defaults(func=_bench_network)
+
+    extensions = targets.add_parser(
+        "extensions",
+        help="install vscode extensions one by one vs in one batched code process",
+    )
+    extensions.add_argument(
+        "--extensions", default=_EXTENSIONS, help="comma separated extension ids"
+    )
+    extensions.add_argument("--code", default="code", help="the code command")
+    extensions.set_defaults(func=_bench_extensions)
@@ -0,0 +1,64 @@
+"""
+The "bundle" subcommand, for offline bundles
+
+Usage:
+    py-apps bundle export manifest.json -o apps.bundle [-t debian/arm64 ...]
+    py-apps bundle import apps.bundle
+"""
+
+from argparse import Namespace
+
+
+# The handlers import what they need, keeping the CLI startup light
+# pylint: disable=import-outside-toplevel
+
+
+def _export(args: Namespace) -> None:
+    from py_apps.utils.bundle import export_bundle, load_manifest
+
+    manifest = load_manifest(args.manifest)
+    if args.target:
+        manifest["targets"] = args.target
+
+    export_bundle(manifest, args.output)
+    print(f"Bundle written to {args.output}")
+
+
+def _import(args: Namespace) -> None:
+    from py_apps.utils.bundle import import_bundle
+
+    import_bundle(args.bundle)
+
+
+def register(subparsers) -> None:
+    """
+    Register the bundle subcommand
+
+    Params:
+        subparsers: the subparsers of the main parser
+    """
+    parser = subparsers.add_parser(
+        "bundle", help="export / import offline bundles for air-gapped installs"
+    )
+    actions = parser.add_subparsers(dest="action", required=True)
+
+    export_parser = actions.add_parser(
+        "export", help="fetch every artifact of a manifest into one bundle"
+    )
+    export_parser.add_argument("manifest", help="the manifest json file")
+    export_parser.add_argument(
+        "-o", "--output", default="py_apps.bundle", help="the bundle file path"
+    )
+    export_parser.add_argument(
+        "-t",
+        "--target",
+        action="append",
+        help='target in the form of "distro[:other]/arch", overrides the manifest',
+    )
+    export_parser.set_defaults(func=_export)
+
+    import_parser = actions.add_parser(
+        "import", help="install from a bundle without network access"
+    )
+    import_parser.add_argument("bundle", help="the bundle file path")
+    import_parser.set_defaults(func=_import)
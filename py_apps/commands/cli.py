@@ -0,0 +1,61 @@
+"""
+Command line entry: run the TUI by default, or a subcommand such as "bundle"
+"""
+
+from argparse import ArgumentParser
+
+from py_apps.commands import (
+    bench,
+    bundle,
+    importtime,
+    serve_cache,
+    serve_fixtures,
+    sim,
+    updates,
+)
+
+
+# Every subcommand module provides register(subparsers),
+# which sets a "func" default taking the parsed args
+_command_modules: list = [
+    bundle,
+    serve_cache,
+    importtime,
+    bench,
+    sim,
+    serve_fixtures,
+    updates,
+]
+
+
+def build_parser() -> ArgumentParser:
+    """
+    Build the argument parser with all the subcommands
+
+    Returns: ArgumentParser
+    """
+    parser = ArgumentParser(prog="py-apps", description="PY Apps")
+    subparsers = parser.add_subparsers(title="commands", dest="command")
+
+    for module in _command_modules:
+        module.register(subparsers)
+
+    return parser
+
+
+def cli(argv: list[str] | None = None) -> None:
+    """
+    Parse the arguments and run the subcommand, or the TUI without one
+
+    Params:
+        list[str] | None argv: the arguments, sys.argv[1:] by default
+    """
+    args = build_parser().parse_args(argv)
+
+    if args.command is None:
+        # pylint: disable=import-outside-toplevel
+        from py_apps.pages.main import main
+
+        main()
+    else:
+        args.func(args)
@@ -0,0 +1,52 @@
+"""
+The "importtime" subcommand, reporting the cold import time of a module
+
+Usage:
+    py-apps importtime [py_apps.main] [-n 15] [--budget 50]
+"""
+
+import sys
+from argparse import Namespace
+
+
+def _importtime(args: Namespace) -> None:
+    # pylint: disable=import-outside-toplevel
+    from py_apps.utils.importtime import (
+        IMPORT_BUDGET_MS,
+        cumulative_ms,
+        format_report,
+        measure_imports,
+    )
+
+    if getattr(sys, "frozen", False):
+        sys.exit("importtime needs a python interpreter, not the frozen build")
+
+    budget: float = args.budget if args.budget is not None else IMPORT_BUDGET_MS
+    records = measure_imports(args.module)
+    print(format_report(records, args.module, args.top, budget))
+
+    # Fail above the budget, for scripting
+    if cumulative_ms(records, args.module) > budget:
+        sys.exit(1)
+
+
+def register(subparsers) -> None:
+    """
+    Register the importtime subcommand
+
+    Params:
+        subparsers: the subparsers of the main parser
+    """
+    parser = subparsers.add_parser(
+        "importtime", help="report the cold import time of a module"
+    )
+    parser.add_argument(
+        "module", nargs="?", default="py_apps.main", help="the module to import"
+    )
+    parser.add_argument(
+        "-n", "--top", type=int, default=15, help="how many slowest imports to list"
+    )
+    parser.add_argument(
+        "--budget", type=float, default=None, help="fail above this many ms"
+    )
+    parser.set_defaults(func=_importtime)
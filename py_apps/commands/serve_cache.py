@@ -0,0 +1,80 @@
+"""
+The "serve-cache" subcommand, running a LAN caching proxy for artifacts & metadata
+
+Usage:
+    py-apps serve-cache [--host 0.0.0.0] [--port 8480] [--dir DIR] [--allow-host HOST]
+                        [--max-size GIB]
+
+Clients use the server with PY_APPS_CACHE=http://host:port,
+or find it by a discovery broadcast with PY_APPS_CACHE=auto
+"""
+
+from argparse import Namespace
+
+
+def _serve_cache(args: Namespace) -> None:
+    # Imported here, keeping the CLI startup light
+    # pylint: disable=import-outside-toplevel
+    from py_apps.utils.cache import cache_dir
+    from py_apps.utils.cache_server import CacheServer, CacheStore, answer_discovery
+
+    store = CacheStore(
+        args.dir or cache_dir("lan"),
+        meta_ttl=args.meta_ttl,
+        allow_hosts=args.allow_host,
+        max_size=args.max_size * 1024**3,
+    )
+    server = CacheServer((args.host, args.port), store, verbose=args.verbose)
+
+    if not args.no_discovery:
+        answer_discovery(server.server_address[1])
+
+    print(
+        f"Serving the cache in {store.root} on {args.host}:{server.server_address[1]}"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("exit")
+    finally:
+        server.server_close()
+
+
+def register(subparsers) -> None:
+    """
+    Register the serve-cache subcommand
+
+    Params:
+        subparsers: the subparsers of the main parser
+    """
+    parser = subparsers.add_parser(
+        "serve-cache", help="run a LAN caching proxy for artifacts & metadata"
+    )
+    parser.add_argument("--host", default="0.0.0.0", help="the address to listen on")
+    parser.add_argument("--port", type=int, default=8480, help="the port to listen on")
+    parser.add_argument("--dir", default="", help="the cache dir")
+    parser.add_argument(
+        "--meta-ttl",
+        type=int,
+        default=600,
+        help="seconds before metadata (release lists, pages) is refetched",
+    )
+    parser.add_argument(
+        "--allow-host",
+        action="append",
+        default=[],
+        help="an upstream host allowed even on a loopback or link-local address",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        default=50,
+        help="GiB of artifacts kept, the least recently used ones are evicted beyond",
+    )
+    parser.add_argument(
+        "--no-discovery",
+        action="store_true",
+        help="don't answer discovery broadcasts from clients",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="log requests")
+    parser.set_defaults(func=_serve_cache)
@@ -0,0 +1,85 @@
+"""
+The "serve-fixtures" subcommand, running the fixture server of utils/fixture_server.py
+
+Usage:
+    py-apps serve-fixtures [--bundle apps.bundle] [--profile 3g] [--port 8490]
+                           [--error-rate 0.1] [--reset-rate 0.1]
+
+Clients are routed to it by PY_APPS_UPSTREAM=http://127.0.0.1:8490
+"""
+
+from argparse import Namespace
+
+
+def _serve_fixtures(args: Namespace) -> None:
+    # Imported here, keeping the CLI startup light
+    # pylint: disable=import-outside-toplevel
+    from py_apps.utils.fixture_server import (
+        PROFILES,
+        Faults,
+        FixtureServer,
+        FixtureStore,
+        NetProfile,
+    )
+    from py_apps.utils.sim import fixture_responses
+
+    if args.bundle:
+        store = FixtureStore.from_bundle(args.bundle)
+    else:
+        store = FixtureStore()
+        for url, content in fixture_responses().items():
+            store.add(url, content)
+
+    server = FixtureServer(
+        (args.host, args.port),
+        store,
+        profile=PROFILES.get(args.profile, NetProfile("none", 0, 0, 0)),
+        faults=Faults(args.error_rate, args.reset_rate),
+        seed=args.seed,
+        verbose=args.verbose,
+    )
+
+    print(
+        f"Serving {len(store.fixtures)} fixtures with the {server.profile.name} "
+        + f"profile, use PY_APPS_UPSTREAM={server.base_url}"
+    )
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("exit")
+
+
+def register(subparsers) -> None:
+    """
+    Register the serve-fixtures subcommand
+
+    Params:
+        subparsers: the subparsers of the main parser
+    """
+    parser = subparsers.add_parser(
+        "serve-fixtures",
+        help="replay recorded responses with network shaping & faults",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="the address to listen on")
+    parser.add_argument("--port", type=int, default=8490, help="the port to listen on")
+    parser.add_argument(
+        "--bundle",
+        default="",
+        help="replay a recorded bundle, the fixtures of the sim harness by default",
+    )
+    parser.add_argument(
+        "--profile", default="", help="lan, 3g or cn, no shaping by default"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0, help="chance of a 503 per request"
+    )
+    parser.add_argument(
+        "--reset-rate",
+        type=float,
+        default=0,
+        help="chance of a connection dropped halfway per request",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the faults")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log requests")
+    parser.set_defaults(func=_serve_fixtures)
@@ -0,0 +1,105 @@
+"""
+The "sim" subcommand, the simulated multi-distro matrix of utils/sim.py
+
+Usage:
+    py-apps sim [--distros debian,arch] [--arches amd64] [--apps vivaldi,jetbrains/go]
+                [--workers 8] [--json results.json] [--keep]
+"""
+
+from argparse import Namespace
+from json import dump
+from tempfile import mkdtemp
+from time import perf_counter
+
+
+def _split(value: str) -> list[str]:
+    return [item for item in value.split(",") if item]
+
+
+def _sim(args: Namespace) -> None:  # pylint: disable=too-many-locals
+    # pylint: disable=import-outside-toplevel
+    from shutil import rmtree
+
+    from py_apps.apps.registry import list_app_ids
+    from py_apps.utils.sim import ARCHES, OS_RELEASES, matrix, run_matrix
+
+    cells = matrix(
+        _split(args.distros) or list(OS_RELEASES),
+        _split(args.arches) or ARCHES,
+        _split(args.apps) or list_app_ids(),
+    )
+    workdir: str = mkdtemp(prefix="py_apps-sim-")
+
+    start: float = perf_counter()
+    try:
+        results = run_matrix(cells, workdir, args.workers)
+    finally:
+        if not args.keep:
+            rmtree(workdir, ignore_errors=True)
+    seconds: float = perf_counter() - start
+
+    print(
+        f"{'distro':<8} {'arch':<6} {'app':<28} {'prepare':>8} {'install':>8} "
+        + f"{'spawns':>6} {'avoided':>7}  outcome"
+    )
+    for result in results:
+        distro, arch, app_id = result.cell
+        print(
+            f"{distro:<8} {arch:<6} {app_id:<28} "
+            + f"{result.prepare_seconds * 1000:>6.0f}ms "
+            + f"{result.install_seconds * 1000:>6.0f}ms "
+            + f"{sum(result.spawns.values()):>6} {result.avoided:>7}  "
+            + result.outcome.splitlines()[0]
+        )
+
+    passed: int = sum(result.outcome == "ok" for result in results)
+    print(
+        f"{passed}/{len(results)} cells ok in {seconds:.1f}s, "
+        + f"{sum(sum(result.spawns.values()) for result in results)} processes spawned, "
+        + f"{sum(result.avoided for result in results)} avoided"
+    )
+    if args.keep:
+        print(f"Rootfs dirs kept in {workdir}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            dump(
+                [
+                    {**result._asdict(), "cell": result.cell._asdict()}
+                    for result in results
+                ],
+                json_file,
+                indent=2,
+            )
+
+
+def register(subparsers) -> None:
+    """
+    Register the sim subcommand
+
+    Params:
+        subparsers: the subparsers of the main parser
+    """
+    parser = subparsers.add_parser(
+        "sim", help="run the installers against simulated distros"
+    )
+    parser.add_argument(
+        "--distros", default="", help="comma separated, all of them by default"
+    )
+    parser.add_argument(
+        "--arches", default="", help="comma separated, amd64 & arm64 by default"
+    )
+    parser.add_argument(
+        "--apps", default="", help="comma separated app ids, all of them by default"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="worker processes, one per CPU by default",
+    )
+    parser.add_argument("--json", default="", help="also write the results to a file")
+    parser.add_argument(
+        "--keep", action="store_true", help="keep the rootfs dirs for inspection"
+    )
+    parser.set_defaults(func=_sim)
@@ -0,0 +1,50 @@
+"""
+The "updates" subcommand, checking the installed apps for updates
+
+Usage:
+    py-apps updates [--upgrade]
+"""
+
+import sys
+from argparse import Namespace
+from time import perf_counter
+from typing import Any, Callable
+
+
+def _run_now(title: str, func: Callable[[], Any]) -> None:
+    print(f"==> {title}")
+    func()
+
+
+def _updates(args: Namespace) -> None:
+    # pylint: disable=import-outside-toplevel
+    from py_apps.apps.updates import check_updates, update_label, upgrade
+
+    start: float = perf_counter()
+    updates = check_updates()
+    for update in updates:
+        print(update_label(update))
+    print(f"{len(updates)} updates, checked in {perf_counter() - start:.1f} s")
+
+    if args.upgrade and updates:
+        # In the foreground, there's no job queue without the TUI
+        upgrade(updates, submit=_run_now)
+    elif updates:
+        # Pending updates, for scripting
+        sys.exit(100)
+
+
+def register(subparsers) -> None:
+    """
+    Register the updates subcommand
+
+    Params:
+        subparsers: the subparsers of the main parser
+    """
+    parser = subparsers.add_parser(
+        "updates", help="check the installed apps for updates"
+    )
+    parser.add_argument(
+        "--upgrade", action="store_true", help="upgrade the apps with updates"
+    )
+    parser.set_defaults(func=_updates)
@@ -0,0 +1,21 @@
+"""
+Aria2Error, for errors reported by the aria2c RPC daemon
+"""
+
+from .common import universal_msg
+
+
+class Aria2Error(Exception):
+    """
+    This is the error for failed aria2c RPC calls & downloads
+
+    Params:
+        str reason: the message from aria2c
+    """
+
+    def __init__(self, reason: str) -> None:
+        super().__init__()
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return universal_msg + f" aria2c: {self.reason}"
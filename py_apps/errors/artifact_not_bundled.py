@@ -0,0 +1,26 @@
+"""
+ArtifactNotBundledError, for artifacts missing in an offline bundle
+"""
+
+from .common import universal_msg
+
+
+class ArtifactNotBundledError(Exception):
+    """
+    This is the error for urls requested while installing from an offline bundle
+    that the bundle doesn't contain
+
+    Params:
+        str url: the url that's not in the bundle
+    """
+
+    def __init__(self, url: str) -> None:
+        super().__init__()
+        self.url = url
+
+    def __str__(self) -> str:
+        msg: str = (
+            f"The offline bundle doesn't contain {self.url}, "
+            + "please export the bundle again with this app included"
+        )
+        return universal_msg + msg
@@ -0,0 +1,30 @@
+"""
+ChecksumMismatchError, for downloaded files not matching the published checksum
+"""
+
+from .common import universal_msg
+
+
+class ChecksumMismatchError(Exception):
+    """
+    This is the error for downloaded files with a wrong checksum
+
+    Params:
+        str file_path: the downloaded file
+        str expected: the published checksum
+        str actual: the checksum of the file
+    """
+
+    def __init__(self, file_path: str, expected: str, actual: str) -> None:
+        super().__init__()
+        self.file_path = file_path
+        self.expected = expected
+        self.actual = actual
+
+    def __str__(self) -> str:
+        msg: str = (
+            f"The checksum of {self.file_path} doesn't match, the download may be broken"
+            + "\\n"
+            + f"Expected: {self.expected}\\nActual: {self.actual}"
+        )
+        return universal_msg + msg
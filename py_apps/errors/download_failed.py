@@ -0,0 +1,24 @@
+"""
+DownloadFailedError, for files that couldn't be downloaded
+"""
+
+from .common import universal_msg
+
+
+class DownloadFailedError(Exception):
+    """
+    This is the error for downloads failed, the reason is printed by download()
+
+    Params:
+        str url: the url downloaded
+        str file_path: the output file
+    """
+
+    def __init__(self, url: str, file_path: str) -> None:
+        super().__init__()
+        self.url = url
+        self.file_path = file_path
+
+    def __str__(self) -> str:
+        msg: str = f"Failed to download {self.url} to {self.file_path}"
+        return universal_msg + msg
@@ -0,0 +1,22 @@
+"""
+FixtureMissingError, for urls the simulation harness has no fixture of
+"""
+
+from .common import universal_msg
+
+
+class FixtureMissingError(Exception):
+    """
+    This is the error for urls requested in a simulated install (see utils/sim.py)
+    that no fixture response serves, the network is never touched there
+
+    Params:
+        str url: the url without a fixture
+    """
+
+    def __init__(self, url: str) -> None:
+        super().__init__()
+        self.url = url
+
+    def __str__(self) -> str:
+        return universal_msg + f" No fixture response for {self.url}"
@@ -0,0 +1,23 @@
+"""
+InteractiveCmdError, for commands prompting the user in a background job
+"""
+
+from .common import universal_msg
+
+
+class InteractiveCmdError(Exception):
+    """
+    This is the error for interactive commands run in the job queue,
+    where stdin is /dev/null & the TUI owns the terminal
+
+    Params:
+        str cmd: the command name
+    """
+
+    def __init__(self, cmd: str) -> None:
+        super().__init__()
+        self.cmd = cmd
+
+    def __str__(self) -> str:
+        msg: str = f"{self.cmd} prompts for input, it can't run in a background job"
+        return universal_msg + msg
@@ -2,7 +2,8 @@
 项目的main模块
 """
 
-from py_apps.pages.main import main
+from py_apps.commands.cli import cli
 
 
-main()
+if __name__ == "__main__":
+    cli()
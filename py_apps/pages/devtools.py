@@ -1,66 +1,93 @@
 """Run DevTools selection page"""
 
-from py_apps.apps.devtools.jetbrains import Jetbrains, JetbrainsVariants
-from py_apps.apps.devtools.neovim import Neovim, NvimVariants
-from py_apps.apps.devtools.vscode import VSCode
+from os import environ
+
+from py_apps.apps.catalog import menu
+from py_apps.apps.devtools.jetbrains import (
+    JetbrainsVariants,
+    install_many,
+    jetbrains_releases,
+)
+from py_apps.apps.speculate import Speculator
+from py_apps.ui.multi_selection import MultiSelection
 from py_apps.ui.selection import Selection
+from py_apps.utils.jobs import submit_job
+
+
+def _with_versions(
+    ids: list[str], labels: list[str], releases: dict[str, dict[str, str]]
+) -> list[str]:
+    """Menu items, JetBrains IDEs with the current versions if known"""
+    items: list[str] = []
+    for app_id, label in zip(ids, labels):
+        _, _, variant = app_id.partition("/")
+        if app_id.startswith("jetbrains/") and variant in releases:
+            label += f"（{releases[variant]['version']}）"
+        items.append(label)
+    return items
+
+
+def _install_jetbrains_many(
+    ids: list[str], labels: list[str], releases: dict[str, dict[str, str]]
+) -> None:
+    """Install the JetBrains IDEs ticked, downloaded & extracted in parallel"""
+    jetbrains_ids: list[str] = [
+        app_id for app_id in ids if app_id.startswith("jetbrains/")
+    ]
+    chosen: list[str] | None = MultiSelection(
+        idlist=[app_id.partition("/")[2] for app_id in jetbrains_ids],
+        itemlist=_with_versions(
+            jetbrains_ids,
+            [labels[ids.index(app_id)] for app_id in jetbrains_ids],
+            releases,
+        ),
+        dialog_title="JetBrains：勾选要安装的 IDE",
+    ).run()
+    if chosen:
+        submit_job(
+            f"JetBrains × {len(chosen)}",
+            lambda: install_many(
+                [JetbrainsVariants(val) for val in chosen],
+                # KiB/s shared by the downloads, 0 for no limit
+                bandwidth=int(environ.get("PY_APPS_JETBRAINS_BANDWIDTH", "0")) * 1024,
+            ),
+        )
 
 
 def devtools() -> bool:
     """Run DevTools selection page"""
 
-    selection = Selection(
-        idlist=["vscode", "nvim", *[e.value for e in JetbrainsVariants], "back"],
-        itemlist=[
-            "Visual Studio Code：微软出品，宇宙第一编辑器",
-            "Neovim 加配置：极致的效率，极客们的最爱",
-            *[
-                {
-                    "idea_professional": "IntelliJ IDEA Ultimate Edition：适用于 Java Web 开发",
-                    "idea_community": "IntelliJ IDEA Community Edition：阉割版 Java & Kotlin IDE（免费）",
-                    "python_professional": "PyCharm Professional Edition：极其强大的数据科学和 Web 开发用 IDE",
-                    "python_community": "PyCharm Community Edition：纯 Python 开发必备（免费）",
-                    "go": "GoLand：为 Gophers 打造的完美 IDE",
-                    "webide": "PhpStorm：为 PHP 开发人员赋能",
-                    "webstorm": "WebStorm：JavaScript & TypeScript 的 IDE（非商业使用免费）",
-                    "cpp": "CLion：开发 C / C++ ，化繁为简，驾驭力量",
-                    "rider": "Rider：全世界最受欢迎的 .NET & C# 游戏开发 IDE（非商业使用免费）",
-                    "ruby": "RubyMine：Ruby on Rails 的 all-in-one 解决方案",
-                    "rustrover": "RustRover：智能 Rust IDE（非商业使用免费）",
-                }[e.value]
-                for e in JetbrainsVariants
-            ],
-            "返回上级菜单",
-        ],
-        dialog_title="工欲善其事，必先利其器：请选择称手的开发工具",
-    ).run()
+    # Current versions, one cached query for all the IDEs
+    releases: dict[str, dict[str, str]] = jetbrains_releases()
+    title, ids, labels = menu("devtools")
+
+    # Resolves the tool highlighted meanwhile
+    with Speculator() as speculator:
+        selection = Selection(
+            idlist=[*ids, "back"],
+            itemlist=[*_with_versions(ids, labels, releases), "返回上级菜单"],
+            dialog_title=title,
+            on_highlight=speculator.highlight,
+        ).run()
 
-    # Deciding block: decide which installer to use
-    match selection:
-        case "vscode":
-            VSCode().prepare().install()
+        # Deciding block: decide which installer to use
+        match selection:
+            case "nvim":
+                title, variant_ids, variant_labels = menu("nvim")
+                variant = Selection(
+                    idlist=variant_ids, itemlist=variant_labels, dialog_title=title
+                ).run()
+                if variant is not None:
+                    speculator.install(f"nvim/{variant}")
 
-        case "nvim":
-            variant = Selection(
-                idlist=["default", "astro", "space", "lazy", "lunar", "nvchad"],
-                itemlist=[
-                    "默认（无配置）",
-                    "AstroNvim：Configure less, code more",
-                    "SpaceVim：一个模块化的 Vim 和 Neovim 配置集合",
-                    "LazyVim：Lazy.nvim 包管理器作者出品，配置简单，懒人专属",
-                    "LunarVim：开箱即用的 Neovim IDE 层",
-                    "NvChad：拥有高度可定制的 UI，默认易用",
-                ],
-                dialog_title="Neovim：您想要什么配置文件呢？",
-            ).run()
-            Neovim(NvimVariants(variant)).prepare().install()
+            case "jetbrains_many":
+                _install_jetbrains_many(ids, labels, releases)
 
-        case val if val in [e.value for e in JetbrainsVariants]:
-            print(val)
-            Jetbrains(JetbrainsVariants(val)).prepare().install()
+            case val if val in ids:
+                speculator.install(val)
 
-        # In-page loop logic: True to go back and False to continue
-        case _:
-            return True
+            # In-page loop logic: True to go back and False to continue
+            case _:
+                return True
 
     return False
@@ -1,29 +1,51 @@
 """PY Apps front page"""
 
 import sys
+from importlib import import_module
+from os import getuid
+from time import sleep
 
-from py_apps.pages.browser import browser
 from py_apps.pages.common import loop
-from py_apps.pages.devtools import devtools
 from py_apps.ui.selection import Selection
+from py_apps.utils.cmd import check_cmd_exists
+from py_apps.utils.cmd import run as run_cmd
+from py_apps.utils.jobs import job_queue
 
 
 def run() -> bool:
     """Main page function"""
 
+    pending: int = len(job_queue.pending)
+
     selection = Selection(
-        idlist=["browser", "devtools", "quit"],
+        idlist=["browser", "devtools", "packages", "updates", "jobs", "quit"],
         itemlist=[
             ":globe_with_meridians: 浏览器：畅游互联网的海洋",
             ":wrench: IDE & 编辑器：Build your dreams",
-            "退出",
+            ":mag: 搜索软件包：安装软件源中的任意软件",
+            ":arrows_counterclockwise: 检查更新：一次检查所有已安装的软件",
+            f":hourglass: 后台任务：{pending} 个进行中"
+            + ("" if job_queue.jobs else "（选择软件后在后台安装）"),
+            "退出" + ("（等待后台任务完成）" if pending else ""),
         ],
         dialog_title="👏 欢迎来到PY Apps！",
     ).run()
 
     match selection:
-        case app_type if app_type in ["browser", "devtools"]:
-            loop({"browser": browser, "devtools": devtools}[app_type])
+        case app_type if app_type in [
+            "browser",
+            "devtools",
+            "packages",
+            "updates",
+        ]:
+            # Load the page (and its installers) only when it's chosen
+            loop(getattr(import_module(f"py_apps.pages.{app_type}"), app_type))
+
+        case "jobs":
+            # pylint: disable=import-outside-toplevel
+            from py_apps.ui.jobs import JobsScreen
+
+            JobsScreen(job_queue).run()
 
         case _:
             return True
@@ -31,11 +53,45 @@ def run() -> bool:
     return False
 
 
+def _wait_for_jobs() -> None:
+    """Show the progress in the terminal until the background jobs finish"""
+    # pylint: disable=import-outside-toplevel
+    from py_apps.ui.jobs import job_row
+    from py_apps.utils.fileops import summary
+
+    while job_queue.pending:
+        running = [job for job in job_queue.pending if job.state == "running"]
+        if running:
+            _, title, _, phase, percent, speed, eta = job_row(running[0])
+            print(
+                f"\r\033[K[{len(job_queue.pending)}] {title} {phase} {percent} "
+                + f"{speed} {eta}",
+                end="",
+                flush=True,
+            )
+        sleep(0.5)
+    print()
+
+    for job in job_queue.jobs:
+        if job.state == "failed":
+            print(f"\033[91m\033[1m[Error]\033[0m {job.title}: {job.error}")
+            print("\n".join(job.log))
+
+    # What the installers did without forking sed / chmod / ln / mv / rm
+    if summary():
+        print(f"In-process file operations: {summary()}")
+
+
 def main():
     """Main loop for the app"""
 
+    # Installs run in the background, ask for the password once beforehand
+    if getuid() != 0 and check_cmd_exists("sudo"):
+        run_cmd(["sudo", "-v"], "when asking for sudo")
+
     while True:
         if run():
+            _wait_for_jobs()
             print("exit")
             break
     sys.exit()
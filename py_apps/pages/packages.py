@@ -0,0 +1,54 @@
+"""Run package search page"""
+
+from rich.markup import escape
+
+from py_apps.ui.dialog import Dialog
+from py_apps.ui.package_search import PackageSearch
+from py_apps.utils.app_manage import install_app
+from py_apps.utils.jobs import submit_job
+from py_apps.utils.pkg_index import PackageIndex
+from py_apps.utils.sys import get_distro_short_name
+
+
+def packages() -> bool:
+    """Run package search page"""
+
+    distro: str = get_distro_short_name()[0]
+    index = PackageIndex()
+
+    try:
+        # Only the metadata changed since the last time is parsed
+        parsed, total = index.refresh()
+        print(f"Package index: {total} packages, {parsed} sources updated")
+        if total == 0:
+            print("No package metadata found, update the package lists first")
+            return True
+
+        chosen: str | None = PackageSearch(
+            lambda query: [
+                (
+                    record.name,
+                    f"[b]{escape(record.name)}[/b] {escape(record.version)}："
+                    + escape(record.summary),
+                )
+                for record in index.search(query)
+            ],
+            dialog_title="搜索软件包：来自本机的软件源索引",
+        ).run()
+    finally:
+        index.close()
+
+    if not chosen:
+        return True
+
+    if (
+        Dialog(
+            idlist=["install", "back"],
+            itemlist=["安装", "返回"],
+            dialog_title=f"安装 {chosen} ？",
+        ).run()
+        == "install"
+    ):
+        submit_job(chosen, lambda: install_app(distro, [chosen]))
+
+    return False
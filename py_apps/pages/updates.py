@@ -0,0 +1,28 @@
+"""Run check for updates page"""
+
+from rich.markup import escape
+
+from py_apps.apps.updates import Update, check_updates, update_label, upgrade
+from py_apps.ui.multi_selection import MultiSelection
+from py_apps.ui.notice import Notice
+
+
+def updates() -> bool:
+    """Run check for updates page"""
+
+    print("Checking the installed apps for updates...")
+    found: list[Update] = check_updates()
+    if not found:
+        Notice("已安装的软件都是最新版本").run()
+        return True
+
+    chosen: list[str] | None = MultiSelection(
+        idlist=[update.app_id for update in found],
+        itemlist=[escape(update_label(update)) for update in found],
+        dialog_title=f"检查更新：{len(found)} 个软件有新版本，勾选要更新的",
+    ).run()
+    if chosen:
+        # The packages in one job, the others one job each
+        upgrade([update for update in found if update.app_id in chosen])
+
+    return True
@@ -0,0 +1,140 @@
+"""
+This module contains the background jobs screen
+"""
+
+from textual.app import App, ComposeResult
+from textual.containers import Center, Container
+from textual.widgets import Button, DataTable, Label, Log
+
+from py_apps.utils.jobs import Job, JobQueue
+
+
+_state_labels: dict[str, str] = {
+    "queued": "等待中",
+    "running": "进行中",
+    "done": "已完成",
+    "failed": "失败",
+}
+
+
+def format_amount(amount: float, unit: str) -> str:
+    """Format bytes as KiB/MiB/GiB, or a percentage"""
+    if unit == "%":
+        return f"{amount:.0f}%"
+    for prefix in ["", "Ki", "Mi"]:
+        if amount < 1024:
+            return f"{amount:.1f} {prefix}B"
+        amount /= 1024
+    return f"{amount:.1f} GiB"
+
+
+def format_eta(seconds: float | None) -> str:
+    """Format the seconds left as m:ss, or "-" when unknown"""
+    if seconds is None:
+        return "-"
+    minutes, secs = divmod(int(seconds), 60)
+    return f"{minutes}:{secs:02d}"
+
+
+def job_row(job: Job) -> tuple[str, ...]:
+    """The cells of a job in the table"""
+    fraction: float | None = job.fraction
+    running: bool = job.state == "running"
+
+    return (
+        str(job.job_id),
+        job.title,
+        _state_labels.get(job.state, job.state)
+        + (f"：{job.error}" if job.error else ""),
+        job.phase if running else "",
+        f"{fraction:.0%}" if running and fraction is not None else "",
+        f"{format_amount(job.speed, job.unit)}/s" if running and job.speed else "",
+        format_eta(job.eta) if running else "",
+    )
+
+
+class JobsScreen(App[str]):
+    """
+    The background jobs, with the progress of the running one
+
+    Params:
+        JobQueue queue: the job queue shown
+    """
+
+    CSS_PATH = "jobs.tcss"
+
+    def __init__(self, queue: JobQueue):
+        super().__init__()
+        self.job_queue = queue
+        self.title = "后台任务"
+        # The job whose log is shown
+        self.shown_job: Job | None = None
+        self._log_size: int = 0
+
+    def compose(self) -> ComposeResult:
+        """
+        Compose method, composing the widgets together
+        """
+        yield Container(
+            Center(Label(self.title), id="title"),
+            DataTable(cursor_type="row"),
+            Log(),
+            Button("返回", variant="primary", id="back"),
+            id="container",
+        )
+        # Tips on using method
+        yield Label(":bulb:[b]小提示：[/b]选中任务查看其输出，任务在返回菜单后继续运行")
+
+    def on_mount(self) -> None:
+        """Fill the table & refresh it twice a second"""
+        table: DataTable = self.query_one(DataTable)
+        table.add_columns("#", "任务", "状态", "阶段", "进度", "速度", "剩余时间")
+        self.refresh_jobs()
+        self.set_interval(0.5, self.refresh_jobs)
+
+    def refresh_jobs(self) -> None:
+        """Update the rows & the log"""
+        table: DataTable = self.query_one(DataTable)
+
+        for job in self.job_queue.jobs:
+            row: tuple[str, ...] = job_row(job)
+            key: str = str(job.job_id)
+            if key not in table.rows:
+                table.add_row(*row, key=key)
+                continue
+            for column, cell in zip(table.columns, row):
+                table.update_cell(key, column, cell)
+
+        # Follow the running job unless one is chosen
+        if self.shown_job is None:
+            running: list[Job] = [
+                job for job in self.job_queue.jobs if job.state == "running"
+            ]
+            if running:
+                self._show(running[0])
+
+        self._append_log()
+
+    def _show(self, job: Job) -> None:
+        self.shown_job = job
+        self._log_size = 0
+        self.query_one(Log).clear()
+
+    def _append_log(self) -> None:
+        if self.shown_job is None:
+            return
+        lines, self._log_size = self.shown_job.lines_since(self._log_size)
+        self.query_one(Log).write_lines(lines)
+
+    def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
+        """
+        Show the log of the chosen job
+        """
+        self._show(self.job_queue.jobs[int(str(event.row_key.value)) - 1])
+        self._append_log()
+
+    def on_button_pressed(self, _: Button.Pressed):
+        """
+        Back to the menu, the jobs keep running
+        """
+        self.exit("back")
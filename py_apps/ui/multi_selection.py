@@ -0,0 +1,56 @@
+"""
+This module contains the multiple choice list dialog screen
+"""
+
+from textual.app import App, ComposeResult
+from textual.containers import Center, Container
+from textual.widgets import Button, Label, SelectionList
+
+
+class MultiSelection(App[list[str]]):
+    """
+    Vertical scrollable multiple choice list screen
+
+    Params:
+        list[str] idlist: the id of list item, for getting the selected item ids
+        list[str] itemlist: content list, supports Console Markup
+        str dialog_title: the title of dialog
+    """
+
+    CSS_PATH = "multi_selection.tcss"
+
+    def __init__(
+        self,
+        idlist: list[str],
+        itemlist: list[str],
+        dialog_title: str,
+    ):
+        super().__init__()
+
+        # Declare id list & item list & title of the dialog
+        self.idlist = idlist
+        self.itemlist = itemlist
+        self.title = dialog_title
+
+    def compose(self) -> ComposeResult:
+        """
+        Compose method, composing the widgets together
+        """
+        yield Container(
+            Center(Label(self.title), id="title"),
+            SelectionList[str](*zip(self.itemlist, self.idlist)),
+            Button("确认", variant="success", id="ok"),
+            Button("返回", variant="primary", id="back"),
+            id="container",
+        )
+        # Tips on using method
+        yield Label(":bulb:[b]小提示：[/b]空格键勾选，Tab键切换到确认按钮")
+
+    def on_button_pressed(self, event: Button.Pressed):
+        """
+        Return the selected item ids, or an empty list for going back
+        """
+        if event.button.id == "ok":
+            self.exit(list(self.query_one(SelectionList).selected))
+        else:
+            self.exit([])
@@ -0,0 +1,94 @@
+"""
+This module contains the package search screen
+"""
+
+from time import perf_counter
+from typing import Callable
+
+from textual.app import App, ComposeResult
+from textual.binding import Binding
+from textual.containers import Center, Container
+from textual.widgets import Input, Label
+
+from py_apps.ui.virtual_list import VirtualList
+
+
+class PackageSearch(App[str]):
+    """
+    Search as you type screen, the results come from a search function
+
+    Params:
+        Callable search: query -> list of (id, item), items support Console Markup
+        str dialog_title: the title of dialog
+    """
+
+    CSS_PATH = "selection.tcss"
+
+    BINDINGS = [
+        Binding("up", "move(-1)", show=False, priority=True),
+        Binding("down", "move(1)", show=False, priority=True),
+        Binding("escape", "leave", show=False),
+    ]
+
+    def __init__(
+        self,
+        search: Callable[[str], list[tuple[str, str]]],
+        dialog_title: str,
+    ):
+        super().__init__()
+
+        self.search = search
+        self.title = dialog_title
+
+    def compose(self) -> ComposeResult:
+        """
+        Compose method, composing the widgets together
+        """
+        yield Container(
+            Center(Label(self.title), id="title"),
+            Input(placeholder="输入软件包名或描述"),
+            Label("", id="status"),
+            VirtualList([], []),
+            id="container",
+        )
+        # Tips on using method
+        yield Label(":bulb:[b]小提示：[/b]用方向键选择，回车键安装，Esc键返回")
+
+    def on_mount(self) -> None:
+        """Focus the search box"""
+        self.query_one(Input).focus()
+
+    def action_move(self, step: int) -> None:
+        """Move the highlight of the results"""
+        self.query_one(VirtualList).action_move(step)
+
+    def action_leave(self) -> None:
+        """Go back without choosing"""
+        self.exit(None)
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        """
+        Search as the user types
+        """
+        start: float = perf_counter()
+        results: list[tuple[str, str]] = self.search(event.value)
+        spent: float = (perf_counter() - start) * 1000
+
+        self.query_one(VirtualList).set_items(
+            [item_id for item_id, _ in results], [item for _, item in results]
+        )
+        self.query_one("#status", Label).update(
+            f"{len(results)} 个结果，用时 {spent:.1f} ms" if event.value else ""
+        )
+
+    def on_input_submitted(self, _: Input.Submitted) -> None:
+        """
+        Choose the highlighted result on enter
+        """
+        self.query_one(VirtualList).action_select()
+
+    def on_virtual_list_selected(self, event: VirtualList.Selected) -> None:
+        """
+        Return the chosen id
+        """
+        self.exit(event.item_id)
@@ -2,28 +2,49 @@
 This module contains the scrollable list dialog screen
 """
 
+from typing import Callable
+
 from textual.app import App, ComposeResult
-from textual.containers import Center, Container, VerticalScroll
-from textual.widgets import Button, Label
+from textual.binding import Binding
+from textual.containers import Center, Container
+from textual.widgets import Input, Label
+
+from py_apps.ui.virtual_list import VirtualList
+
+
+# Lists longer than this get a search box
+SEARCH_THRESHOLD: int = 10
 
 
 class Selection(App[str]):
     """
-    Vertical scrollable list screen
+    Vertical scrollable list screen, only the visible rows are rendered,
+    long lists can be filtered by typing
 
     Params:
         list[str] idlist: the id of list item, for getting the selected item id
         list[str] itemlist: content list, supports Console Markup
         str dialogTitle: the title of dialog
+        Callable | None on_highlight: called with the id of the item highlighted
+            or hovered, such as to start some work speculatively
     """
 
     CSS_PATH = "selection.tcss"
 
+    # The search box keeps the focus, the arrows still move in the list
+    BINDINGS = [
+        Binding("up", "move(-1)", show=False, priority=True),
+        Binding("down", "move(1)", show=False, priority=True),
+        Binding("pageup", "page(-1)", show=False, priority=True),
+        Binding("pagedown", "page(1)", show=False, priority=True),
+    ]
+
     def __init__(
         self,
         idlist: list[str],
         itemlist: list[str],
         dialog_title: str,
+        on_highlight: Callable[[str], None] | None = None,
     ):
         super().__init__()
 
@@ -31,33 +52,62 @@ class Selection(App[str]):
         self.idlist = idlist
         self.itemlist = itemlist
         self.title = dialog_title
+        self.on_highlight = on_highlight
 
     def compose(self) -> ComposeResult:
         """
         Compose method, composing the widgets together
         """
-        # Setup the button list for rendering
-        buttonlist: list[Button] = []
-
-        # Iterate the item list
-        for item in self.itemlist:
-            button: Button = Button(
-                item,
-                id=self.idlist[self.itemlist.index(item)],
-            )
-            buttonlist.append(button)  # Append the button to the button list
+        searchable: bool = len(self.itemlist) > SEARCH_THRESHOLD
 
         # Add the margin for title and list only
         yield Container(
             Center(Label(self.title), id="title"),
-            VerticalScroll(*buttonlist),
+            *([Input(placeholder="输入以搜索")] if searchable else []),
+            VirtualList(self.idlist, self.itemlist),
             id="container",
         )
         # Tips on using method
-        yield Label(":bulb:[b]小提示：[/b]用Tab键选择，回车键按下，或使用触摸屏点击")
+        yield Label(
+            ":bulb:[b]小提示：[/b]"
+            + ("输入关键字筛选，" if searchable else "")
+            + "用方向键选择，回车键按下，或使用触摸屏点击"
+        )
+
+    def on_mount(self) -> None:
+        """Focus the search box, or the list"""
+        inputs = self.query(Input)
+        (inputs.first() if inputs else self.query_one(VirtualList)).focus()
+
+    def action_move(self, step: int) -> None:
+        """Move the highlight of the list"""
+        self.query_one(VirtualList).action_move(step)
+
+    def action_page(self, direction: int) -> None:
+        """Move the highlight of the list by a page"""
+        self.query_one(VirtualList).action_page(direction)
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        """
+        Filter the list as the user types
+        """
+        self.query_one(VirtualList).filter(event.value)
+
+    def on_input_submitted(self, _: Input.Submitted) -> None:
+        """
+        Choose the highlighted item on enter
+        """
+        self.query_one(VirtualList).action_select()
+
+    def on_virtual_list_highlighted(self, event: VirtualList.Highlighted) -> None:
+        """
+        Report the highlighted item
+        """
+        if self.on_highlight is not None:
+            self.on_highlight(event.item_id)
 
-    def on_button_pressed(self, event: Button.Pressed):
+    def on_virtual_list_selected(self, event: VirtualList.Selected) -> None:
         """
-        Process on press event for the buttons
+        Process the chosen item
         """
-        self.exit(event.button.id)  # Return the item id which is selected on exit
+        self.exit(event.item_id)  # Return the item id which is selected on exit
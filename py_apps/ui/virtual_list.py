@@ -0,0 +1,299 @@
+"""
+This module contains a virtualized list widget & its fuzzy filter,
+for catalogs too big to have one widget per item
+"""
+
+from re import Pattern
+from re import compile as compile_pattern
+from re import escape
+
+from rich.text import Text
+from textual import events
+from textual.binding import Binding
+from textual.geometry import Size
+from textual.message import Message
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+
+# Console markup tags like [b] [/] [link=...] & emoji codes like :fox_face:
+_TAG_PATTERN: Pattern[str] = compile_pattern(
+    r"(?<!\\)\[/?[a-zA-Z@#/][^\[\]]*\]|:[a-z0-9_+-]+:"
+)
+
+
+def plain_label(label: str) -> str:
+    """
+    The searchable text of a label: lowercase, without console markup & emoji codes
+
+    Params:
+        str label: the label, supports Console Markup
+    """
+    # Faster than parsing the markup, good enough for searching
+    return _TAG_PATTERN.sub("", label).strip().lower()
+
+
+class FuzzyFilter:  # pylint: disable=too-few-public-methods
+    """
+    Incremental fuzzy filter over a fixed list of labels
+
+    A query matches a label when its chars appear in order, prefix matches come
+    first, then substring matches, then the rest, each in the original order.
+    The matches of every prefix of the query are kept, so typing one more char
+    only searches the matches of the previous query, and erasing one is free.
+
+    Params:
+        list[str] labels: the labels, supports Console Markup
+    """
+
+    def __init__(self, labels: list[str]) -> None:
+        self.keys: list[str] = [plain_label(label) for label in labels]
+        # (query, its ranked matches, all its matches in the original order)
+        self._history: list[tuple[str, list[int], list[int]]] = [
+            ("", list(range(len(self.keys))), list(range(len(self.keys))))
+        ]
+
+    def filter(self, query: str) -> list[int]:
+        """
+        Filter the labels
+
+        Params:
+            str query: the text typed, case insensitive
+
+        Returns: list[int], the indexes of the matched labels, ranked
+        """
+        query = query.strip().lower()
+
+        # Drop the queries which aren't a prefix of this one anymore
+        while not query.startswith(self._history[-1][0]):
+            self._history.pop()
+        last_query, last_ranked, candidates = self._history[-1]
+        if query == last_query:
+            return last_ranked
+
+        pattern: Pattern[str] = compile_pattern(".*?".join(map(escape, query)))
+        keys: list[str] = self.keys
+        prefix: list[int] = []
+        substring: list[int] = []
+        scattered: list[int] = []
+
+        # Matches of "ab" are a subset of the matches of "a"
+        for index in candidates:
+            position: int = keys[index].find(query)
+            if position == 0:
+                prefix.append(index)
+            elif position > 0:
+                substring.append(index)
+            elif pattern.search(keys[index]) is not None:
+                scattered.append(index)
+
+        ranked: list[int] = prefix + substring + scattered
+        self._history.append((query, ranked, sorted(ranked)))
+        return ranked
+
+
+class VirtualList(  # pylint: disable=too-many-instance-attributes
+    ScrollView, can_focus=True
+):
+    """
+    A one line per item list, only the visible rows are rendered
+
+    Params:
+        list[str] idlist: the id of list item, must be unique
+        list[str] itemlist: content list, supports Console Markup
+
+    Throws: ValueError when the ids aren't unique
+    """
+
+    COMPONENT_CLASSES = {"virtual-list--highlight"}
+
+    DEFAULT_CSS = """
+    VirtualList {
+        height: 1fr;
+        overflow-x: hidden;
+    }
+    VirtualList > .virtual-list--highlight {
+        background: $accent;
+        text-style: bold;
+    }
+    """
+
+    BINDINGS = [
+        Binding("up", "move(-1)", show=False),
+        Binding("down", "move(1)", show=False),
+        Binding("pageup", "page(-1)", show=False),
+        Binding("pagedown", "page(1)", show=False),
+        Binding("home", "move(-1000000000)", show=False),
+        Binding("end", "move(1000000000)", show=False),
+        Binding("enter", "select", show=False),
+    ]
+
+    class Selected(Message):
+        """Posted when an item is chosen"""
+
+        def __init__(self, item_id: str) -> None:
+            super().__init__()
+            self.item_id = item_id
+
+    class Highlighted(Message):
+        """Posted when another item is highlighted, or hovered by the mouse"""
+
+        def __init__(self, item_id: str) -> None:
+            super().__init__()
+            self.item_id = item_id
+
+    def __init__(self, idlist: list[str], itemlist: list[str], **kwargs) -> None:
+        super().__init__(**kwargs)
+
+        self.idlist: list[str] = []
+        self.itemlist: list[str] = []
+        self.id_index: dict[str, int] = {}
+        self.fuzzy = FuzzyFilter([])
+        self.shown: list[int] = []
+        self.highlighted: int = 0
+        self._texts: dict[int, Text] = {}
+        # The item of the last Highlighted message
+        self._pointed: str | None = None
+
+        self._set_items(idlist, itemlist)
+
+    def _set_items(self, idlist: list[str], itemlist: list[str]) -> None:
+        # Id of an item in O(1), by its position
+        id_index: dict[str, int] = {
+            item_id: index for index, item_id in enumerate(idlist)
+        }
+        if len(id_index) != len(idlist):
+            raise ValueError("The ids of the list items must be unique")
+
+        self.idlist, self.itemlist, self.id_index = idlist, itemlist, id_index
+        self.fuzzy = FuzzyFilter(itemlist)
+        # Indexes of the items shown, in display order
+        self.shown = list(range(len(itemlist)))
+        self.highlighted = 0
+        # Parsed markup of the items rendered so far
+        self._texts = {}
+
+    def set_items(self, idlist: list[str], itemlist: list[str]) -> None:
+        """
+        Replace all the items, such as with new search results
+
+        Params:
+            list[str] idlist: the id of list item, must be unique
+            list[str] itemlist: content list, supports Console Markup
+        """
+        self._set_items(idlist, itemlist)
+        self.scroll_to(y=0, animate=False)
+        self._update_virtual_size()
+        self.refresh()
+        self._point(self.highlighted_id)
+
+    def on_mount(self) -> None:
+        """Set the virtual size once mounted"""
+        self._update_virtual_size()
+        self._point(self.highlighted_id)
+
+    def _point(self, item_id: str | None) -> None:
+        if item_id is not None and item_id != self._pointed:
+            self._pointed = item_id
+            self.post_message(self.Highlighted(item_id))
+
+    def _update_virtual_size(self) -> None:
+        self.virtual_size = Size(self.scrollable_content_region.width, len(self.shown))
+
+    @property
+    def highlighted_id(self) -> str | None:
+        """The id of the highlighted item, None when nothing is shown"""
+        if not self.shown:
+            return None
+        return self.idlist[self.shown[self.highlighted]]
+
+    def filter(self, query: str) -> None:
+        """
+        Show only the items matching the query
+
+        Params:
+            str query: the text typed
+        """
+        self.shown = self.fuzzy.filter(query)
+        self.highlighted = 0
+        self.scroll_to(y=0, animate=False)
+        self._update_virtual_size()
+        self.refresh()
+        self._point(self.highlighted_id)
+
+    def highlight(self, item_id: str) -> None:
+        """Highlight an item by its id, if it's shown"""
+        index: int = self.id_index[item_id]
+        if index in self.shown:
+            self.highlighted = self.shown.index(index)
+            self._scroll_to_highlighted()
+
+    def _text_of(self, index: int) -> Text:
+        text: Text | None = self._texts.get(index)
+        if text is None:
+            text = Text.from_markup(self.itemlist[index], emoji=True, end="")
+            text.no_wrap = True
+            self._texts[index] = text
+        return text
+
+    def render_line(self, y: int) -> Strip:
+        """Render one visible row"""
+        row: int = y + int(self.scroll_y)
+        width: int = self.scrollable_content_region.width
+        base_style = self.rich_style
+
+        if row >= len(self.shown):
+            return Strip.blank(width, base_style)
+
+        style = (
+            self.get_component_rich_style("virtual-list--highlight")
+            if row == self.highlighted
+            else base_style
+        )
+        text: Text = self._text_of(self.shown[row])
+        strip = Strip(list(text.render(self.app.console)))
+        return strip.crop_extend(0, width, style).apply_style(style)
+
+    def _scroll_to_highlighted(self) -> None:
+        height: int = self.scrollable_content_region.height
+        if self.highlighted < self.scroll_y:
+            self.scroll_to(y=self.highlighted, animate=False)
+        elif self.highlighted >= self.scroll_y + height:
+            self.scroll_to(y=self.highlighted - height + 1, animate=False)
+        self.refresh()
+        self._point(self.highlighted_id)
+
+    def action_move(self, step: int) -> None:
+        """Move the highlight"""
+        if self.shown:
+            self.highlighted = min(max(self.highlighted + step, 0), len(self.shown) - 1)
+            self._scroll_to_highlighted()
+
+    def action_page(self, direction: int) -> None:
+        """Move the highlight by a page"""
+        self.action_move(direction * max(self.scrollable_content_region.height, 1))
+
+    def action_select(self) -> None:
+        """Choose the highlighted item"""
+        item_id: str | None = self.highlighted_id
+        if item_id is not None:
+            self.post_message(self.Selected(item_id))
+
+    def on_click(self, event: events.Click) -> None:
+        """Choose the clicked item"""
+        offset = event.get_content_offset(self)
+        if offset is None:
+            return
+        row: int = offset.y + int(self.scroll_y)
+        if row < len(self.shown):
+            self.highlighted = row
+            self.action_select()
+
+    def on_mouse_move(self, event: events.MouseMove) -> None:
+        """Report the hovered item, the highlight stays"""
+        offset = event.get_content_offset(self)
+        if offset is None:
+            return
+        row: int = offset.y + int(self.scroll_y)
+        if row < len(self.shown):
+            self._point(self.idlist[self.shown[row]])
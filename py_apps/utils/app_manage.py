@@ -2,10 +2,24 @@
 This module provides some functions for managing sys apps
 """
 
-from subprocess import CalledProcessError, run
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from os import environ, listdir, makedirs, path
+from os import remove as remove_file
+from os import replace, symlink
+from shutil import copytree
+from subprocess import DEVNULL, PIPE, CalledProcessError, run
+from tempfile import TemporaryDirectory
+from urllib.parse import unquote, urlsplit
 
 from py_apps.errors.unknown_pkg_manager import UnknownPkgManagerError
+from py_apps.utils.cache import cache_dir
 from py_apps.utils.cmd import check_cmd_exists
+from py_apps.utils.cmd import run as run_cmd
+from py_apps.utils.cmd import stream
+from py_apps.utils.fileops import sha256_of
+from py_apps.utils.jobs import current_job, report_failure, report_progress
+from py_apps.utils.network import download, is_offline
+from py_apps.utils.sys import root_path
 
 
 _pkg_dict: dict[str, list[str]] = {
@@ -49,6 +63,180 @@ _install_opt_dict: dict[str, list[str]] = {
 }
 
 
+# Package downloads at once while prefetching
+PREFETCH_WORKERS: int = 8
+
+# Commands printing the urls of the packages to be installed & of their missing
+# dependencies, without installing anything, the package names are appended.
+# Only for the package managers verifying the prefetched files: apt against the
+# hashes it prints, pacman the signatures in its cache dir. dnf skips the GPG
+# check of local packages, so it downloads its own
+_print_uris_dict: dict[str, list[str]] = {
+    "debian": ["apt-get", "--print-uris", "-qq", "-y", "install"],
+    "arch": ["pacman", "-Sp", "--needed", "--noconfirm"],
+}
+
+# The package caches the prefetched packages are moved to, root-owned & read by
+# the package managers (& apt's _apt sandbox user) as usual
+_package_cache_dict: dict[str, str] = {
+    "debian": "/var/cache/apt/archives",
+    "arch": "/var/cache/pacman/pkg",
+}
+
+PACMAN_DB: str = "/var/lib/pacman"
+
+
+def _parse_uris(distro: str, output: str) -> list[tuple[str, str, str]]:
+    """
+    Parse the output of the _print_uris_dict command
+
+    Returns: list[tuple[str, str, str]], the url, the file name & the sha256
+        ("" when not printed) of every package
+    """
+    uris: list[tuple[str, str, str]] = []
+    for line in output.splitlines():
+        fields: list[str] = line.split()
+        if distro == "debian" and len(fields) >= 2:
+            # 'http://deb.debian.org/.../git_2.39_amd64.deb' git_2.39_amd64.deb 7260 SHA256:...
+            digest: str = next(
+                (field[7:] for field in fields[2:] if field.startswith("SHA256:")), ""
+            )
+            uris.append((fields[0].strip("'"), fields[1], digest))
+        # Cached packages are listed as file://
+        elif fields and fields[0].startswith(("http://", "https://", "ftp://")):
+            uris.append(
+                (fields[0], unquote(path.basename(urlsplit(fields[0]).path)), "")
+            )
+    return uris
+
+
+def prefetch_packages(
+    distro: str, apps: list[str], dest: str, options: list[str] | None = None
+) -> list[str]:
+    """
+    Download the packages to be installed & their missing dependencies to dest,
+    PREFETCH_WORKERS at once with the project's downloader, so the install
+    itself doesn't touch the network
+
+    Best effort: whatever isn't prefetched is downloaded by the package manager
+
+    Params:
+        str distro: the distro given, must be the current one
+        list[str] apps: the packages to be installed
+        str dest: the dir to store the package files
+        list[str] | None options: more options of the _print_uris_dict command
+
+    Returns: list[str], the package file paths in dest
+    """
+    cmd: list[str] | None = _print_uris_dict.get(distro, None)
+    if cmd is None or not check_cmd_exists(cmd[0]):
+        return []
+
+    try:
+        output: str = run(
+            [*cmd, *(options or []), *apps],
+            check=True,
+            stdout=PIPE,
+            stderr=DEVNULL,
+            text=True,
+        ).stdout
+    except (CalledProcessError, OSError):
+        return []
+
+    # Downloaded beside the dir first, the package managers trust complete names
+    part_dir: str = path.join(dest, ".prefetch")
+    makedirs(part_dir, exist_ok=True)
+
+    def _fetch(uri: tuple[str, str, str]) -> None:
+        url, file_name, digest = uri
+        part_path: str = path.join(part_dir, file_name)
+        if not download(url, part_path, overwrite=True):
+            return
+        # Whatever served it, only the repo's hash is trusted
+        if digest and sha256_of(part_path) != digest:
+            print(f"\033[91m\033[1m[Error]\033[0m Wrong sha256 of {file_name}")
+            remove_file(part_path)
+            return
+        replace(part_path, path.join(dest, file_name))
+
+    todo: list[tuple[str, str, str]] = [
+        uri
+        for uri in _parse_uris(distro, output)
+        if not path.exists(path.join(dest, uri[1]))
+    ]
+    with ThreadPoolExecutor(PREFETCH_WORKERS) as pool:
+        # Reported from the job's thread, as packages done
+        for done, _ in enumerate(
+            as_completed(pool.submit(_fetch, uri) for uri in todo)
+        ):
+            report_progress((done + 1) * 100 / len(todo), 100, "预取", "%")
+
+    return [
+        path.join(dest, file_name)
+        for _, file_name, _ in _parse_uris(distro, output)
+        if path.exists(path.join(dest, file_name))
+    ]
+
+
+def _fresh_pacman_db(dbpath: str) -> bool:
+    """
+    Sync a copy of the pacman db in dbpath, like checkupdates: the system's one
+    isn't synced, as "pacman -Sy" then "pacman -S" is a partial upgrade
+
+    Returns: bool, False without fakeroot or when it failed
+    """
+    if not check_cmd_exists("fakeroot"):
+        return False
+    try:
+        symlink(root_path(f"{PACMAN_DB}/local"), path.join(dbpath, "local"))
+        if path.isdir(root_path(f"{PACMAN_DB}/sync")):
+            copytree(root_path(f"{PACMAN_DB}/sync"), path.join(dbpath, "sync"))
+        run(
+            ["fakeroot", "--", "pacman", "-Sy", "--dbpath", dbpath]
+            + ["--logfile", "/dev/null"],
+            check=True,
+            stdin=DEVNULL,
+            stdout=DEVNULL,
+            stderr=DEVNULL,
+        )
+    except (CalledProcessError, OSError):
+        return False
+    return True
+
+
+def _prefetch(distro: str, apps: list[str]) -> None:
+    """
+    The prefetch stage of install_app(), disabled by PY_APPS_PREFETCH=off:
+    the packages are downloaded as the user, then moved to the package cache
+    """
+    if environ.get("PY_APPS_PREFETCH", "") == "off" or is_offline():
+        return
+    if distro not in _package_cache_dict:
+        return
+
+    staging: str = cache_dir("packages", distro)
+    with TemporaryDirectory(prefix="py_apps-pacman-") as dbpath:
+        # pacman prints the urls of its sync db, a fresh copy of it
+        if distro == "arch" and not _fresh_pacman_db(dbpath):
+            return
+        files: list[str] = prefetch_packages(
+            distro, apps, staging, ["--dbpath", dbpath] if distro == "arch" else []
+        )
+    if not files:
+        return
+
+    try:
+        stream(
+            ["sudo", "install", "-m", "644", "-t"]
+            + [root_path(_package_cache_dict[distro]), *files]
+        )
+    except CalledProcessError:
+        # Downloaded by the package manager then
+        return
+    for file_path in files:
+        remove_file(file_path)
+
+
 def install_app(distro: str, apps: list[str]) -> None:
     """
     Install the appointed app and its dependencies for the given distro
@@ -65,28 +253,152 @@ def install_app(distro: str, apps: list[str]) -> None:
     pkg: list[str] | None = _pkg_dict.get(distro, None)
     install: str | None = _install_dict.get(distro, None)
     update: str = _update_dict.get(distro, "")
-    extra_options: list[str] = _install_opt_dict.get(distro, [])
+    # A copy, it's changed below
+    extra_options: list[str] = list(_install_opt_dict.get(distro, []))
 
     if pkg is None or install is None:
         raise UnknownPkgManagerError(distro=distro)
 
     # For RedHat distros
-    if pkg[0] == "redhat" and check_cmd_exists("dnf"):
+    if distro == "redhat" and check_cmd_exists("dnf"):
         pkg = ["dnf"]
 
     elif distro == "suse":
         if check_cmd_exists("zypper"):
-            pkg = ["zypper"]
+            # Let zypper preload the packages in parallel before installing
+            pkg = ["env", "ZYPP_PCK_PRELOAD=1", "zypper"]
             install = "in"
             update = ""
             extra_options.pop()
 
+    # In the background job queue, apt reports its progress as status lines
+    if distro == "debian" and current_job() is not None:
+        extra_options = [*extra_options, "-o", "APT::Status-Fd=1"]
+
     try:
-        # If there is an updating command, update
-        if update != "":
-            run(args=[*pkg, update], check=True)
+        # If there is an updating command, update (impossible when offline)
+        if update != "" and not is_offline():
+            stream([*pkg, update])
+        # Fetch the packages concurrently, the install goes on without them on errors
+        _prefetch(distro, apps)
         # Execute sudo [pkg] [install] [app] [dependencies] [options]
-        run(["sudo", *pkg, install, *apps, *extra_options], check=True)
+        stream(["sudo", *pkg, install, *apps, *extra_options])
     except CalledProcessError as err:
         print(f"\033[91m\033[1m[Error]\033[0m Error when installing {' '.join(apps)}")
         print(f"\033[31mError message\033[0m\n\t{str(err)}")
+        report_failure(f"Error when installing {' '.join(apps)}")
+
+
+# Commands fetching the packages with the whole dependency closure into a dir,
+# "{dest}" is replaced with the target dir, the package names are appended
+_download_only_dict: dict[str, list[str]] = {
+    "redhat": ["dnf", "download", "--resolve", "--alldeps", "--destdir", "{dest}"],
+    "arch": ["sudo", "pacman", "-Sw", "--noconfirm", "--cachedir", "{dest}"],
+    "suse": ["sudo", "zypper", "--pkg-cache-dir", "{dest}", "in", "-y", "-d"],
+    "alpine": ["apk", "fetch", "-R", "-o", "{dest}"],
+}
+
+# Commands installing local package files without touching the network
+_install_local_dict: dict[str, list[str]] = {
+    "debian": ["sudo", "apt-get", "install", "-y", "--no-download"],
+    "redhat": ["sudo", "dnf", "install", "-y", "--disablerepo=*"],
+    "arch": ["sudo", "pacman", "-U", "--noconfirm", "--needed"],
+    "suse": ["sudo", "zypper", "--no-refresh", "in", "-y"],
+    "alpine": ["sudo", "apk", "add", "--no-network", "--allow-untrusted"],
+}
+
+_pkg_suffixes: tuple[str, ...] = (".deb", ".rpm", ".apk", ".pkg.tar.zst", ".pkg.tar.xz")
+
+
+def _apt_closure(apps: list[str]) -> list[str]:
+    """
+    Resolve the full dependency closure of apps with apt-cache,
+    regardless of what's installed on this machine
+    """
+    output: str = run(
+        [
+            "apt-cache",
+            "depends",
+            "--recurse",
+            *"--no-recommends --no-suggests --no-conflicts".split(" "),
+            *"--no-breaks --no-replaces --no-enhances".split(" "),
+            *apps,
+        ],
+        check=True,
+        stdout=PIPE,
+        text=True,
+    ).stdout
+
+    # Package names are unindented, virtual packages are shown as <name>
+    return sorted(
+        {
+            line.strip()
+            for line in output.splitlines()
+            if line and not line[0].isspace() and not line.startswith("<")
+        }
+    )
+
+
+def download_packages(distro: str, apps: list[str], dest: str) -> list[str]:
+    """
+    Download the packages and their dependency closure to dest
+    using the package manager's download-only mode
+
+    Params:
+        str distro: the distro given, must be the current one
+        list[str] apps: the packages to be downloaded
+        str dest: the dir to store the package files
+
+    Returns: list[str], the downloaded package file paths
+
+    Throws: UnknownPkgManagerError
+    """
+    if distro == "debian":
+        try:
+            closure: list[str] = _apt_closure(apps)
+        except CalledProcessError as err:
+            print(f"\033[31mError message\033[0m\n\t{str(err)}")
+            closure = apps
+        run_cmd(
+            ["apt-get", "download", *closure],
+            f"when downloading {' '.join(apps)}",
+            cwd=dest,
+        )
+
+    elif distro in _download_only_dict:
+        run_cmd(
+            [
+                *[arg.replace("{dest}", dest) for arg in _download_only_dict[distro]],
+                *apps,
+            ],
+            f"when downloading {' '.join(apps)}",
+        )
+
+    else:
+        raise UnknownPkgManagerError(distro=distro)
+
+    return sorted(
+        path.join(dest, file_name)
+        for file_name in listdir(dest)
+        if file_name.endswith(_pkg_suffixes)
+    )
+
+
+def install_local_packages(distro: str, files: list[str]) -> None:
+    """
+    Install local package files, dependencies are resolved among them
+
+    Params:
+        str distro: the distro given
+        list[str] files: the package file paths
+
+    Throws: UnknownPkgManagerError
+    """
+    if not files:
+        return
+
+    cmd: list[str] | None = _install_local_dict.get(distro, None)
+    if cmd is None:
+        raise UnknownPkgManagerError(distro=distro)
+
+    run_cmd([*cmd, *files], "when installing local packages")
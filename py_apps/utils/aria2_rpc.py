@@ -0,0 +1,390 @@
+"""
+A persistent aria2c daemon driven over JSON-RPC, the default backend of download()
+
+One daemon per session, listening on the loopback with a random port & secret,
+started again if it has exited. Downloads are submitted with aria2.addUri
+(several at once, each with its own options), and their progress is polled with
+one system.multicall per tick over a kept-alive connection. aria2c reuses its
+connections to the servers too.
+
+Environment:
+    PY_APPS_DOWNLOADER      "rpc" (default), "process" for one aria2c per file,
+                            or "native" for utils/segmented.py
+    PY_APPS_ARIA2_RPC       the url of an aria2c daemon already running
+    PY_APPS_ARIA2_SECRET    its secret
+"""
+
+from atexit import register as at_exit
+from http.client import HTTPConnection, HTTPException
+from json import dumps, loads
+from os import environ, getpid, path
+from secrets import token_hex
+from socket import socket
+from subprocess import DEVNULL, Popen
+from threading import Event, Lock
+from time import monotonic, sleep
+from typing import Any
+from urllib.parse import urlparse
+
+from py_apps.errors.aria2_error import Aria2Error
+from py_apps.errors.cmd_not_found import CmdNotFoundError
+from py_apps.utils.cmd import check_cmd_exists
+from py_apps.utils.jobs import report_progress
+
+
+POLL_INTERVAL: float = 0.5
+
+STARTUP_TIMEOUT: float = 5
+
+# The options download() used to pass on the command line
+DEFAULT_OPTIONS: dict[str, str] = {
+    "split": "5",
+    "max-connection-per-server": "5",
+    "min-split-size": "30M",
+    "check-certificate": "false",
+    "allow-overwrite": "false",
+    "auto-file-renaming": "false",
+}
+
+# Seconds a kept-alive connection may idle before a call that isn't retried,
+# the daemon may have dropped it meanwhile
+MAX_IDLE: float = 5
+
+# Calls not sent again when the connection fails, they may have been done
+_not_retried: set[str] = {"aria2.addUri", "aria2.addTorrent", "aria2.addMetalink"}
+
+_status_keys: list[str] = [
+    "gid",
+    "status",
+    "totalLength",
+    "completedLength",
+    "downloadSpeed",
+    "errorMessage",
+]
+
+
+class Aria2Client:  # pylint: disable=too-many-instance-attributes
+    """
+    A JSON-RPC client of aria2c, over one kept-alive HTTP connection
+
+    Params:
+        str rpc_url: such as http://127.0.0.1:6800/jsonrpc
+        str secret: the --rpc-secret of the daemon
+    """
+
+    def __init__(self, rpc_url: str, secret: str = "") -> None:
+        parsed = urlparse(rpc_url)
+        self.host: str = parsed.hostname or "127.0.0.1"
+        self.port: int = parsed.port or 6800
+        self.rpc_path: str = parsed.path or "/jsonrpc"
+        self.secret = secret
+        self._conn: HTTPConnection | None = None
+        self._used: float = 0
+        self._lock = Lock()
+        self._next_id: int = 0
+
+    def _post(self, body: bytes, retry: bool) -> Any:
+        # A call that isn't retried gets a fresh connection if it idled
+        if not retry and self._conn is not None and monotonic() - self._used > MAX_IDLE:
+            self.close()
+
+        # Reconnect once if the kept-alive connection was dropped
+        for attempt in range(2 if retry else 1):
+            if self._conn is None:
+                self._conn = HTTPConnection(self.host, self.port, timeout=10)
+            try:
+                self._conn.request(
+                    "POST",
+                    self.rpc_path,
+                    body,
+                    {"Content-Type": "application/json"},
+                )
+                response: Any = loads(self._conn.getresponse().read())
+                self._used = monotonic()
+                return response
+            except (OSError, HTTPException):
+                self.close()
+                if attempt or not retry:
+                    raise
+        return None
+
+    def call(self, method: str, *params: Any, retry: bool = True) -> Any:
+        """
+        Call an RPC method, the secret is added
+
+        Params:
+            str method: such as "aria2.addUri"
+            Any params: the method params
+            bool retry: whether it's sent again when the connection fails,
+                never for the calls adding downloads
+
+        Returns: Any, the result
+
+        Throws: Aria2Error, OSError, HTTPException
+        """
+        with self._lock:
+            self._next_id += 1
+            token: list[str] = [f"token:{self.secret}"] if self.secret else []
+            body: bytes = dumps(
+                {
+                    "jsonrpc": "2.0",
+                    "id": str(self._next_id),
+                    "method": method,
+                    "params": (
+                        [*token, *params]
+                        if not method.startswith("system.")
+                        else list(params)
+                    ),
+                }
+            ).encode()
+            response: dict[str, Any] = self._post(
+                body, retry and method not in _not_retried
+            )
+
+        if "error" in response:
+            raise Aria2Error(response["error"].get("message", "unknown error"))
+        return response["result"]
+
+    def multicall(self, calls: list[tuple[str, list[Any]]]) -> list[Any]:
+        """
+        Several calls in one request
+
+        Returns: list[Any], the result of each call, a dict with "code" on errors
+        """
+        token: list[str] = [f"token:{self.secret}"] if self.secret else []
+        results: list[Any] = self.call(
+            "system.multicall",
+            [
+                {"methodName": method, "params": [*token, *params]}
+                for method, params in calls
+            ],
+            retry=not any(method in _not_retried for method, _ in calls),
+        )
+        # Successful results are wrapped in a list
+        return [result[0] if isinstance(result, list) else result for result in results]
+
+    def close(self) -> None:
+        """Close the connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _free_port() -> int:
+    with socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Aria2Session:
+    """
+    The downloads of a session through one aria2c daemon
+
+    Params:
+        Aria2Client client: the client of the daemon
+        Popen | None process: the daemon, when started by this session
+    """
+
+    def __init__(self, client: Aria2Client, process: Popen | None = None) -> None:
+        self.client = client
+        self.process = process
+
+    @property
+    def exited(self) -> bool:
+        """Whether the daemon this session started has exited, crashed or killed"""
+        return self.process is not None and self.process.poll() is not None
+
+    @classmethod
+    def start(cls) -> "Aria2Session":
+        """
+        Start an aria2c daemon listening on the loopback
+
+        Throws: CmdNotFoundError, Aria2Error when it doesn't answer
+        """
+        if not check_cmd_exists("aria2c"):
+            raise CmdNotFoundError("aria2c")
+
+        port: int = _free_port()
+        secret: str = token_hex(16)
+        process = Popen(  # pylint: disable=consider-using-with
+            [
+                "aria2c",
+                "--no-conf",
+                "--quiet",
+                "--enable-rpc",
+                "--rpc-listen-all=false",
+                f"--rpc-listen-port={port}",
+                f"--rpc-secret={secret}",
+                "--max-concurrent-downloads=5",
+                # Never outlive this process
+                f"--stop-with-process={getpid()}",
+            ],
+            stdin=DEVNULL,
+            stdout=DEVNULL,
+            stderr=DEVNULL,
+        )
+        session = cls(Aria2Client(f"http://127.0.0.1:{port}/jsonrpc", secret), process)
+
+        deadline: float = monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                session.client.call("aria2.getVersion")
+                return session
+            except (OSError, HTTPException) as err:
+                if monotonic() > deadline or process.poll() is not None:
+                    process.kill()
+                    raise Aria2Error("the RPC daemon didn't start") from err
+                sleep(0.05)
+
+    def add(
+        self,
+        urls: str | list[str],
+        file_path: str,
+        options: dict[str, str] | None = None,
+    ):
+        """
+        Submit a download, returns its gid at once
+
+        Params:
+            str | list[str] urls: the remote file url, or several urls of the same file
+            str file_path: the output file path
+            dict[str, str] | None options: aria2c options of this download
+        """
+        return self.client.call(
+            "aria2.addUri",
+            [urls] if isinstance(urls, str) else urls,
+            {
+                **DEFAULT_OPTIONS,
+                "dir": path.dirname(path.abspath(file_path)),
+                "out": path.basename(file_path),
+                **(options or {}),
+            },
+        )
+
+    def statuses(self, gids: list[str]) -> list[dict[str, Any]]:
+        """The status of the downloads, polled in one request"""
+        return self.client.multicall(
+            [("aria2.tellStatus", [gid, _status_keys]) for gid in gids]
+        )
+
+    def remove(self, gids: list[str]) -> None:
+        """Stop the downloads, the ones complete already are left as is"""
+        for gid in gids:
+            try:
+                self.client.call("aria2.remove", gid)
+            except Aria2Error:
+                pass
+
+    def wait(self, gids: list[str], cancel: Event | None = None) -> None:
+        """
+        Wait for the downloads, reporting their progress to the current job
+
+        Params:
+            list[str] gids: the downloads
+            Event | None cancel: set to remove the downloads from the daemon
+
+        Throws: Aria2Error when a download fails, or is removed
+        """
+        cancel = cancel if cancel is not None else Event()
+        removing: bool = False
+        while True:
+            # Polled on until the daemon has stopped writing the files
+            if cancel.is_set() and not removing:
+                removing = True
+                self.remove(gids)
+
+            statuses: list[dict[str, Any]] = self.statuses(gids)
+
+            for status in statuses:
+                if "code" in status:
+                    raise Aria2Error(status.get("message", "unknown download"))
+                if status["status"] in ["error", "removed"]:
+                    raise Aria2Error(status.get("errorMessage", "") or status["status"])
+
+            report_progress(
+                sum(int(status["completedLength"]) for status in statuses),
+                sum(int(status["totalLength"]) for status in statuses),
+                "下载",
+            )
+            if all(status["status"] == "complete" for status in statuses):
+                return
+            cancel.wait(POLL_INTERVAL)
+
+    def download(
+        self,
+        items: list[tuple[str | list[str], str, dict[str, str] | None]],
+        cancel: Event | None = None,
+    ) -> None:
+        """
+        Download several files at once
+
+        Params:
+            list items: (url or urls, file path, options) of each file
+            Event | None cancel: set to stop the downloads
+
+        Throws: Aria2Error
+        """
+        gids: list[str] = [self.add(*item) for item in items]
+        try:
+            self.wait(gids, cancel)
+        finally:
+            # Keep the daemon's memory small
+            for gid in gids:
+                try:
+                    self.client.call("aria2.removeDownloadResult", gid)
+                except Aria2Error:
+                    pass
+
+    def close(self) -> None:
+        """Stop the daemon if this session started it"""
+        if self.process is not None:
+            try:
+                self.client.call("aria2.shutdown")
+            except (OSError, HTTPException, Aria2Error):
+                self.process.kill()
+            self.process.wait()
+            self.process = None
+        self.client.close()
+
+
+_session_state: dict[str, Aria2Session | None] = {"session": None}
+
+_session_lock = Lock()
+
+
+def use_rpc_session(session: Aria2Session | None) -> None:
+    """
+    Use this session for the downloads, None to start a daemon when needed
+
+    Params:
+        Aria2Session | None session: such as one of an existing daemon
+    """
+    _session_state["session"] = session
+
+
+def rpc_session() -> Aria2Session:
+    """
+    The session of the downloads, started on first use,
+    & again when its daemon has exited
+
+    Throws: CmdNotFoundError, Aria2Error
+    """
+    # Downloads from several threads share one daemon
+    with _session_lock:
+        session: Aria2Session | None = _session_state["session"]
+        if session is not None and not session.exited:
+            return session
+        if session is not None:
+            session.client.close()
+
+        rpc_url: str = environ.get("PY_APPS_ARIA2_RPC", "")
+        if rpc_url:
+            session = Aria2Session(
+                Aria2Client(rpc_url, environ.get("PY_APPS_ARIA2_SECRET", ""))
+            )
+        else:
+            session = Aria2Session.start()
+            at_exit(session.close)
+
+        _session_state["session"] = session
+        return session
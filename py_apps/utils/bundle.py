@@ -0,0 +1,338 @@
+"""
+Offline bundles: export every artifact needed by a manifest into one indexed archive,
+then install from the archive without any network access
+
+The archive is an uncompressed tar (the artifacts are compressed already):
+    artifacts/<sha256>      files fetched with download()
+    responses/<sha256>      contents fetched with get(), such as GitHub API responses
+    packages/<target>/...   system packages with their dependency closure
+    index.json              maps urls to members, written last
+
+A manifest is a json file like:
+    {
+        "apps": ["vivaldi", "jetbrains/go", "nvim/lazy"],
+        "packages": ["git"],
+        "targets": ["debian:ubuntu/amd64", "debian/arm64"]
+    }
+"""
+
+from hashlib import sha256
+from io import BytesIO
+from json import dumps, load, loads
+from os import makedirs, path
+from shutil import copyfileobj
+from tarfile import TarFile, TarInfo
+from tarfile import open as open_tarfile
+from tempfile import TemporaryDirectory
+from typing import IO, Any
+
+from py_apps.apps.registry import get_app
+from py_apps.errors.artifact_not_bundled import ArtifactNotBundledError
+from py_apps.errors.distro_x_only import DistroXOnlyError
+from py_apps.errors.unsupported_arch import UnsupportedArchitectureError
+from py_apps.utils.app_manage import download_packages, install_local_packages
+from py_apps.utils.fileops import sha256_of
+from py_apps.utils.network import ArtifactSource, add_source, download, remove_source
+from py_apps.utils.sys import check_architecture, get_distro_short_name
+
+
+INDEX_NAME: str = "index.json"
+
+BUNDLE_VERSION: int = 1
+
+
+def current_target() -> str:
+    """
+    The target string of the current machine, in the form of "distro:other/arch"
+
+    Returns: str
+    """
+    distro, other_distro = get_distro_short_name()
+    return f"{distro}:{other_distro}/{check_architecture()}"
+
+
+def parse_target(target: str) -> tuple[str, str, str]:
+    """
+    Parse a target string such as "debian:ubuntu/arm64" or "redhat/amd64"
+
+    Returns: tuple[str, str, str], the distro, the other distro & the architecture
+    """
+    distros, _, arch = target.partition("/")
+    distro, _, other_distro = distros.partition(":")
+    return distro, other_distro, arch
+
+
+def load_manifest(manifest_path: str) -> dict[str, Any]:
+    """
+    Load a bundle manifest json file
+
+    Params:
+        str manifest_path: the manifest file path
+    """
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        manifest: dict[str, Any] = load(manifest_file)
+
+    manifest.setdefault("apps", [])
+    manifest.setdefault("packages", [])
+    manifest.setdefault("targets", [])
+    return manifest
+
+
+class BundleWriter(ArtifactSource):
+    """
+    Records everything downloaded while it's registered as a source into the bundle
+
+    Params:
+        str bundle_path: the output archive path
+        dict manifest: the manifest the bundle is exported for
+    """
+
+    recording: bool = True
+
+    def __init__(self, bundle_path: str, manifest: dict[str, Any]) -> None:
+        # Closed in close()
+        self.tar: TarFile = open_tarfile(  # pylint: disable=consider-using-with
+            bundle_path, "w"
+        )
+        self.index: dict[str, Any] = {
+            "version": BUNDLE_VERSION,
+            "manifest": manifest,
+            "artifacts": {},
+            "responses": {},
+            "packages": {},
+        }
+        self._members: set[str] = set()
+
+    def _add_file(self, member: str, file_path: str) -> None:
+        """Add a file to the archive unless the member exists"""
+        if member not in self._members:
+            self.tar.add(file_path, arcname=member)
+            self._members.add(member)
+
+    def _add_bytes(self, member: str, content: bytes) -> None:
+        """Add a bytes object to the archive unless the member exists"""
+        if member not in self._members:
+            info = TarInfo(member)
+            info.size = len(content)
+            self.tar.addfile(info, BytesIO(content))
+            self._members.add(member)
+
+    def has_artifact(self, url: str) -> bool:
+        """Check if the url is recorded already"""
+        return url in self.index["artifacts"]
+
+    def store(self, url: str, file_path: str) -> None:
+        digest: str = sha256_of(file_path)
+
+        # Content addressed, the same file for several targets is stored once
+        self._add_file(f"artifacts/{digest}", file_path)
+        self.index["artifacts"][url] = {
+            "sha256": digest,
+            "size": path.getsize(file_path),
+            "name": path.basename(file_path),
+        }
+
+    def store_content(self, url: str, content: bytes) -> None:
+        digest: str = sha256(content).hexdigest()
+        self._add_bytes(f"responses/{digest}", content)
+        self.index["responses"][url] = digest
+
+    def add_packages(self, target: str, files: list[str]) -> None:
+        """
+        Add the package files for the target
+
+        Params:
+            str target: the target string
+            list[str] files: the package file paths
+        """
+        members: list[str] = []
+        for file_path in files:
+            member: str = (
+                f"packages/{target.replace('/', '_')}/{path.basename(file_path)}"
+            )
+            self._add_file(member, file_path)
+            members.append(member)
+        self.index["packages"][target] = members
+
+    def close(self) -> None:
+        """Write the index & close the archive"""
+        self._add_bytes(INDEX_NAME, dumps(self.index, indent=2).encode("utf-8"))
+        self.tar.close()
+
+
+class BundleReader(ArtifactSource):
+    """
+    Serves every download() & get() from the bundle, nothing goes to the network
+
+    Params:
+        str bundle_path: the archive path
+
+    Throws: ArtifactNotBundledError when something not in the bundle is requested
+    """
+
+    offline: bool = True
+
+    def __init__(self, bundle_path: str) -> None:
+        # Closed in close()
+        self.tar: TarFile = open_tarfile(  # pylint: disable=consider-using-with
+            bundle_path, "r"
+        )
+
+        index_file: IO[bytes] | None = self.tar.extractfile(INDEX_NAME)
+        if index_file is None:
+            raise ValueError(f"{bundle_path} is not a bundle")
+        self.index: dict[str, Any] = loads(index_file.read())
+
+    @property
+    def manifest(self) -> dict[str, Any]:
+        """The manifest the bundle was exported for"""
+        return self.index["manifest"]
+
+    def _open_member(self, member: str) -> IO[bytes]:
+        member_file: IO[bytes] | None = self.tar.extractfile(member)
+        if member_file is None:
+            raise ValueError(f"{member} is broken in the bundle")
+        return member_file
+
+    def fetch(self, url: str, file_path: str) -> bool:
+        entry: dict[str, Any] | None = self.index["artifacts"].get(url, None)
+        if entry is None:
+            raise ArtifactNotBundledError(url)
+
+        with open(file_path, "wb") as output:
+            copyfileobj(self._open_member(f"artifacts/{entry['sha256']}"), output)
+
+        if sha256_of(file_path) != entry["sha256"]:
+            raise ValueError(f"Checksum mismatch for {url} in the bundle")
+
+        return True
+
+    def fetch_content(self, url: str) -> bytes | None:
+        digest: str | None = self.index["responses"].get(url, None)
+        if digest is None:
+            raise ArtifactNotBundledError(url)
+
+        return self._open_member(f"responses/{digest}").read()
+
+    def package_members(self, target: str) -> list[str]:
+        """
+        The package members for the target, falls back on the same distro & arch
+
+        Params:
+            str target: the target string
+        """
+        packages: dict[str, list[str]] = self.index["packages"]
+        if target in packages:
+            return packages[target]
+
+        distro, _, arch = parse_target(target)
+        for bundled_target, members in packages.items():
+            bundled_distro, _, bundled_arch = parse_target(bundled_target)
+            if (bundled_distro, bundled_arch) == (distro, arch):
+                return members
+
+        return []
+
+    def extract_packages(self, target: str, dest: str) -> list[str]:
+        """
+        Extract the package files for the target to dest
+
+        Returns: list[str], the extracted file paths
+        """
+        files: list[str] = []
+        for member in self.package_members(target):
+            file_path: str = path.join(dest, path.basename(member))
+            with open(file_path, "wb") as output:
+                copyfileobj(self._open_member(member), output)
+            files.append(file_path)
+        return files
+
+    def close(self) -> None:
+        """Close the archive"""
+        self.tar.close()
+
+
+def _export_target(
+    writer: BundleWriter, manifest: dict[str, Any], target: str, tmp_dir: str
+) -> None:
+    """
+    Resolve & fetch the artifacts of the manifest for one target
+    """
+    distro, other_distro, arch = parse_target(target)
+    packages: list[str] = list(manifest["packages"])
+
+    for app_id in manifest["apps"]:
+        print(f"Resolving {app_id} for {target}")
+        try:
+            app = get_app(app_id, distro, other_distro, arch).prepare()
+        except (DistroXOnlyError, UnsupportedArchitectureError) as err:
+            print(str(err))
+            continue
+
+        # Downloads in prepare() are recorded already, fetch the rest
+        for url in app.artifacts():
+            if url and not writer.has_artifact(url):
+                download(url, f"{tmp_dir}/{sha256(url.encode()).hexdigest()}")
+        packages.extend(pkg for pkg in app.packages() if pkg)
+
+    if not packages:
+        return
+
+    # Package managers can only resolve for the distro they're running on
+    if (distro, arch) != parse_target(current_target())[::2]:
+        print(f"Skipping system packages for {target}: not the current distro")
+        return
+
+    pkg_dir: str = f"{tmp_dir}/{target.replace('/', '_')}"
+    makedirs(pkg_dir, exist_ok=True)
+    writer.add_packages(target, download_packages(distro, packages, pkg_dir))
+
+
+def export_bundle(manifest: dict[str, Any], bundle_path: str) -> None:
+    """
+    Resolve & fetch every artifact of the manifest into one bundle
+
+    Params:
+        dict manifest: the loaded manifest
+        str bundle_path: the output archive path
+    """
+    targets: list[str] = manifest["targets"] or [current_target()]
+
+    writer = BundleWriter(bundle_path, {**manifest, "targets": targets})
+    add_source(writer)
+
+    try:
+        with TemporaryDirectory(prefix="py_apps-bundle-") as tmp_dir:
+            for target in targets:
+                _export_target(writer, manifest, target, tmp_dir)
+    finally:
+        remove_source(writer)
+        writer.close()
+
+
+def import_bundle(bundle_path: str) -> None:
+    """
+    Install every app of the bundle's manifest without network access
+
+    Params:
+        str bundle_path: the archive path
+    """
+    reader = BundleReader(bundle_path)
+    target: str = current_target()
+    distro: str = parse_target(target)[0]
+
+    try:
+        # Install the dependency closure first, so installers find them satisfied
+        with TemporaryDirectory(prefix="py_apps-bundle-") as tmp_dir:
+            install_local_packages(distro, reader.extract_packages(target, tmp_dir))
+
+        add_source(reader)
+        for app_id in reader.manifest["apps"]:
+            print(f"Installing {app_id} from {bundle_path}")
+            try:
+                get_app(app_id).prepare().install()
+            except (DistroXOnlyError, UnsupportedArchitectureError) as err:
+                print(str(err))
+    finally:
+        remove_source(reader)
+        reader.close()
@@ -0,0 +1,60 @@
+"""
+This module manages the on-disk caches of this proj
+"""
+
+from json import dump, load
+from os import environ, makedirs, path, replace
+from time import time
+from typing import Any
+
+
+def cache_dir(*names: str) -> str:
+    """
+    Get (and create) a cache dir under $XDG_CACHE_HOME/py_apps
+
+    Params:
+        str names: the sub dir names, such as "lan", "artifacts"
+
+    Returns: str
+    """
+    base: str = environ.get("XDG_CACHE_HOME", "") or path.expanduser("~/.cache")
+    dir_path: str = path.join(base, "py_apps", *names)
+
+    makedirs(dir_path, exist_ok=True)
+    return dir_path
+
+
+def load_cache(name: str, ttl: float) -> Any | None:
+    """
+    Load a json cache file if it's younger than ttl
+
+    Params:
+        str name: the cache name, such as "jetbrains-releases"
+        float ttl: the max age in seconds
+
+    Returns: Any | None, None when missing, expired or broken
+    """
+    file_path: str = path.join(cache_dir("metadata"), f"{name}.json")
+
+    try:
+        if time() - path.getmtime(file_path) > ttl:
+            return None
+        with open(file_path, "r", encoding="utf-8") as cache_file:
+            return load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cache(name: str, data: Any) -> None:
+    """
+    Save data as a json cache file, atomically
+
+    Params:
+        str name: the cache name
+        Any data: json serializable data
+    """
+    file_path: str = path.join(cache_dir("metadata"), f"{name}.json")
+
+    with open(f"{file_path}.tmp", "w", encoding="utf-8") as cache_file:
+        dump(data, cache_file)
+    replace(f"{file_path}.tmp", file_path)
@@ -0,0 +1,457 @@
+"""
+A LAN caching proxy for artifacts & metadata
+
+Endpoints:
+    GET/HEAD /artifact?url=...  cached forever, supports Range
+    GET/HEAD /meta?url=...      cached for meta_ttl seconds (GitHub API, vendor pages)
+
+Clients asking for an url being fetched share the same upstream fetch,
+the bytes are streamed to every one of them as they arrive, & give up on it
+after STALL_TIMEOUT seconds without a byte.
+The artifacts are kept up to max_size bytes, the least recently used ones are
+evicted beyond.
+Only http(s) urls are fetched, & never from the loopback or link-local addresses
+(the server itself, cloud metadata), unless the host is allowed explicitly.
+"""
+
+from hashlib import sha256
+from http.client import HTTPException
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ipaddress import IPv6Address, ip_address
+from os import listdir, makedirs, path, remove, replace, utime
+from re import fullmatch
+from socket import AF_INET, IPPROTO_TCP, SOCK_DGRAM, getaddrinfo, socket
+from threading import Condition, Lock, Thread
+from time import time
+from typing import IO, Collection
+from urllib.error import URLError
+from urllib.parse import parse_qs, urlparse
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+
+from py_apps.utils.lan_cache import DISCOVERY_PORT, DISCOVERY_REPLY, DISCOVERY_REQUEST
+
+
+CHUNK_SIZE: int = 256 * 1024
+
+# Seconds clients wait for the next bytes of an upstream fetch
+STALL_TIMEOUT: float = 60
+
+# Bytes of artifacts kept by default
+MAX_SIZE: int = 50 * 1024**3
+
+
+def upstream_error(url: str, allow_hosts: Collection[str] = ()) -> str:
+    """
+    Check an upstream url, the server mustn't proxy local files or itself
+
+    Params:
+        str url: the url asked for
+        Collection[str] allow_hosts: hosts allowed whatever their addresses
+
+    Returns: str, why the url is refused, "" when it's fine
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ["http", "https"]:
+        return f"Scheme not allowed: {parsed.scheme or '-'}"
+
+    host: str | None = parsed.hostname
+    if not host:
+        return "No host in the url"
+    if host in allow_hosts:
+        return ""
+
+    try:
+        addresses = getaddrinfo(host, parsed.port, proto=IPPROTO_TCP)
+    except (OSError, ValueError):
+        return f"Unknown host: {host}"
+
+    for *_, sockaddr in addresses:
+        address = ip_address(str(sockaddr[0]).split("%", 1)[0])
+        if isinstance(address, IPv6Address) and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        if (
+            address.is_loopback
+            or address.is_link_local
+            or address.is_unspecified
+            or address.is_multicast
+        ):
+            return f"Host not allowed: {host}"
+    return ""
+
+
+class _CheckedRedirects(HTTPRedirectHandler):
+    """Redirects are checked like the urls asked for"""
+
+    def __init__(self, allow_hosts: Collection[str]) -> None:
+        super().__init__()
+        self.allow_hosts = allow_hosts
+
+    def redirect_request(
+        self, req, fp, code, msg, headers, newurl
+    ):  # pylint: disable=too-many-arguments, too-many-positional-arguments
+        error: str = upstream_error(newurl, self.allow_hosts)
+        if error:
+            raise URLError(error)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+class UpstreamFetch:
+    """
+    An upstream fetch in progress, shared by every client asking for the same url
+
+    Params:
+        str file_path: the cached file path, bytes are written to file_path.part first
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.cond = Condition()
+        # Bytes written to part_path so far
+        self.size: int = 0
+        # Content length of the upstream, None when unknown
+        self.total: int | None = None
+        self.started: bool = False
+        self.done: bool = False
+        self.error: str = ""
+
+    @property
+    def part_path(self) -> str:
+        """The file the bytes are written to before finished"""
+        return f"{self.file_path}.part"
+
+    def open(self) -> IO[bytes]:
+        """Open the file being written, or the finished one"""
+        try:
+            return open(self.part_path, "rb")
+        except FileNotFoundError:
+            # Finished & renamed in the meantime
+            return open(self.file_path, "rb")
+
+    def wait_started(self) -> str:
+        """
+        Wait until the upstream headers arrive, STALL_TIMEOUT at most
+
+        Returns: str, the error, "" when started
+        """
+        with self.cond:
+            if not self.cond.wait_for(
+                lambda: self.started or self.error != "", STALL_TIMEOUT
+            ):
+                return "Upstream timed out"
+            return self.error
+
+    def wait_for(self, offset: int) -> int:
+        """
+        Wait until there are bytes beyond offset or the fetch ends,
+        STALL_TIMEOUT at most
+
+        Returns: int, the bytes available now, offset at most when it ended
+        """
+        with self.cond:
+            self.cond.wait_for(
+                lambda: self.size > offset or self.done or self.error, STALL_TIMEOUT
+            )
+            return self.size
+
+
+class CacheStore:
+    """
+    The cache dir & the fetches in progress
+
+    Params:
+        str root: the cache dir
+        int meta_ttl: seconds before metadata is refetched
+        Collection[str] allow_hosts: upstream hosts allowed whatever their
+            addresses, such as a mirror on localhost, see upstream_error()
+        int max_size: bytes of artifacts kept, see evict()
+    """
+
+    def __init__(
+        self,
+        root: str,
+        meta_ttl: int = 600,
+        allow_hosts: Collection[str] = (),
+        max_size: int = MAX_SIZE,
+    ) -> None:
+        self.root = root
+        self.meta_ttl = meta_ttl
+        self.allow_hosts = allow_hosts
+        self.max_size = max_size
+        self.upstream_fetches: int = 0
+        self._inflight: dict[str, UpstreamFetch] = {}
+        self._lock = Lock()
+
+        for kind in ["artifact", "meta"]:
+            makedirs(path.join(root, kind), exist_ok=True)
+
+    def path_of(self, kind: str, url: str) -> str:
+        """The cached file path of the url"""
+        return path.join(self.root, kind, sha256(url.encode("utf-8")).hexdigest())
+
+    def is_fresh(self, kind: str, url: str) -> bool:
+        """Check if the url is cached and not expired"""
+        file_path: str = self.path_of(kind, url)
+        if not path.exists(file_path):
+            return False
+        return kind == "artifact" or time() - path.getmtime(file_path) < self.meta_ttl
+
+    def lookup(self, kind: str, url: str) -> str | UpstreamFetch:
+        """
+        Get the cached file path, or the (maybe just started) upstream fetch of the url
+        """
+        with self._lock:
+            if self.is_fresh(kind, url):
+                # The mtime of artifacts tells the least recently used
+                if kind == "artifact":
+                    utime(self.path_of(kind, url))
+                return self.path_of(kind, url)
+
+            key: str = f"{kind}:{url}"
+            if key not in self._inflight:
+                fetch = UpstreamFetch(self.path_of(kind, url))
+                self._inflight[key] = fetch
+                self.upstream_fetches += 1
+                Thread(
+                    target=self._fetch_upstream, args=(kind, url, fetch), daemon=True
+                ).start()
+
+            return self._inflight[key]
+
+    def evict(self) -> None:
+        """Remove the least recently used artifacts beyond max_size"""
+        artifact_dir: str = path.join(self.root, "artifact")
+        with self._lock:
+            files: list[tuple[float, int, str]] = []
+            for name in listdir(artifact_dir):
+                file_path: str = path.join(artifact_dir, name)
+                # Fetches in progress aren't evicted
+                if name.endswith(".part"):
+                    continue
+                try:
+                    files.append(
+                        (path.getmtime(file_path), path.getsize(file_path), file_path)
+                    )
+                except OSError:
+                    continue
+
+            total: int = sum(size for _, size, _ in files)
+            for _, size, file_path in sorted(files):
+                if total <= self.max_size:
+                    break
+                # Clients reading it keep their open handles
+                remove(file_path)
+                total -= size
+
+    def _fetch_upstream(self, kind: str, url: str, fetch: UpstreamFetch) -> None:
+        error: str = "upstream error"
+        try:
+            request = Request(url, headers={"User-Agent": "py_apps-cache"})
+            opener = build_opener(_CheckedRedirects(self.allow_hosts))
+            with opener.open(request, timeout=30) as res, open(
+                fetch.part_path, "wb"
+            ) as part:
+                length: str | None = res.headers.get("Content-Length")
+                with fetch.cond:
+                    fetch.total = int(length) if length else None
+                    fetch.started = True
+                    fetch.cond.notify_all()
+
+                for chunk in iter(lambda: res.read(CHUNK_SIZE), b""):
+                    part.write(chunk)
+                    part.flush()
+                    with fetch.cond:
+                        fetch.size += len(chunk)
+                        fetch.cond.notify_all()
+
+            # The upstream may close the connection early without an error
+            if fetch.total is not None and fetch.size != fetch.total:
+                raise OSError(
+                    f"Truncated upstream body: {fetch.size} of {fetch.total} bytes"
+                )
+
+            # Open handles on the part file keep working after the rename
+            replace(fetch.part_path, fetch.file_path)
+            with fetch.cond:
+                fetch.total = fetch.size
+                fetch.done = True
+                fetch.cond.notify_all()
+
+        # A truncated chunked body is an IncompleteRead, a bad length a ValueError
+        except (OSError, HTTPException, ValueError) as err:
+            error = str(err) or type(err).__name__
+
+        finally:
+            # Whatever went wrong, the part is removed & the clients released
+            if not fetch.done:
+                if path.exists(fetch.part_path):
+                    remove(fetch.part_path)
+                with fetch.cond:
+                    fetch.error = error
+                    fetch.cond.notify_all()
+            with self._lock:
+                self._inflight.pop(f"{kind}:{url}", None)
+
+        if fetch.done and kind == "artifact":
+            self.evict()
+
+
+def parse_range(header: str | None, total: int | None) -> tuple[int, int | None] | None:
+    """
+    Parse a single "bytes=start-end" Range header
+
+    Returns: tuple[int, int | None] | None, the start & the inclusive end
+    """
+    if header is None:
+        return None
+
+    matched = fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if matched is None:
+        return None
+
+    start, end = matched.groups()
+    if start == "":
+        # Suffix range: the last n bytes
+        if total is None or end == "":
+            return None
+        return max(total - int(end), 0), total - 1
+
+    return int(start), (int(end) if end else None)
+
+
+class CacheHandler(BaseHTTPRequestHandler):
+    """Serves the cache of the server's CacheStore"""
+
+    server: "CacheServer"
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_HEAD(self) -> None:  # pylint: disable=invalid-name
+        """Process HEAD requests"""
+        self._serve(send_body=False)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Process GET requests"""
+        self._serve(send_body=True)
+
+    def _serve(self, send_body: bool) -> None:
+        parsed = urlparse(self.path)
+        kind: str = parsed.path.strip("/")
+        urls: list[str] = parse_qs(parsed.query).get("url", [])
+
+        if kind not in ["artifact", "meta"] or len(urls) != 1:
+            self.send_error(404, "Use /artifact?url=... or /meta?url=...")
+            return
+
+        error: str = upstream_error(urls[0], self.server.store.allow_hosts)
+        if error:
+            self.send_error(403, error)
+            return
+
+        found = self.server.store.lookup(kind, urls[0])
+
+        if isinstance(found, str):
+            with open(found, "rb") as cached:
+                total: int = path.getsize(found)
+                self._send(cached, total, lambda offset: total, send_body)
+            return
+
+        error = found.wait_started()
+        if error:
+            self.send_error(502, error)
+            return
+
+        with found.open() as part:
+            self._send(part, found.total, found.wait_for, send_body)
+
+    def _send(self, file_obj: IO[bytes], total: int | None, wait_for, send_body: bool):
+        """
+        Send the (ranged) file, wait_for(offset) returns the bytes available
+        """
+        byte_range = parse_range(self.headers.get("Range"), total)
+
+        if byte_range is None:
+            start, end = 0, (total - 1 if total is not None else None)
+            self.send_response(200)
+        else:
+            start, end = byte_range
+            if total is not None:
+                end = total - 1 if end is None else min(end, total - 1)
+                if start > end:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{total}")
+                    self.end_headers()
+                    return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{total or '*'}")
+
+        self.send_header("Accept-Ranges", "bytes")
+        if end is not None:
+            self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        if send_body:
+            self._copy(file_obj, start, end, wait_for)
+
+    def _copy(self, file_obj: IO[bytes], start: int, end: int | None, wait_for):
+        """Copy [start, end] of a maybe growing file to the client"""
+        offset: int = start
+        file_obj.seek(start)
+
+        while end is None or offset <= end:
+            available: int = wait_for(offset)
+            if available <= offset:
+                # The fetch ended
+                break
+
+            limit: int = available if end is None else min(available, end + 1)
+            while offset < limit:
+                chunk: bytes = file_obj.read(min(CHUNK_SIZE, limit - offset))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                offset += len(chunk)
+
+
+class CacheServer(ThreadingHTTPServer):
+    """
+    The LAN caching proxy server
+
+    Params:
+        tuple[str, int] address: the (host, port) to listen on
+        CacheStore store: the cache
+        bool verbose: whether to log every request
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, address: tuple[str, int], store: CacheStore, verbose: bool = False
+    ) -> None:
+        super().__init__(address, CacheHandler)
+        self.store = store
+        self.verbose = verbose
+
+
+def answer_discovery(http_port: int, port: int = DISCOVERY_PORT) -> Thread:
+    """
+    Answer discovery datagrams from LAN clients in a background thread
+
+    Params:
+        int http_port: the port of the cache server
+        int port: the discovery port
+    """
+    sock = socket(AF_INET, SOCK_DGRAM)
+    sock.bind(("", port))
+
+    def _answer() -> None:
+        with sock:
+            while True:
+                request, client = sock.recvfrom(512)
+                if request == DISCOVERY_REQUEST:
+                    sock.sendto(DISCOVERY_REPLY + f" {http_port}".encode(), client)
+
+    thread = Thread(target=_answer, daemon=True)
+    thread.start()
+    return thread
@@ -3,9 +3,107 @@ Module to manipulate system commands
 """
 
 from os import environ, path
-from subprocess import CalledProcessError
+from re import split
+from subprocess import (
+    DEVNULL,
+    PIPE,
+    STDOUT,
+    CalledProcessError,
+    CompletedProcess,
+    Popen,
+)
 from subprocess import run as process_run
 
+from py_apps.errors.interactive_cmd import InteractiveCmdError
+from py_apps.utils.jobs import Job, current_job, report_failure
+
+
+def _cmd_name(cmd_args: list[str]) -> str:
+    """The command actually run, skipping wrappers such as sudo, eatmydata & env"""
+    for arg in cmd_args:
+        name: str = path.basename(arg)
+        # env takes VAR=value args before the command
+        if arg and name not in ["sudo", "eatmydata", "env"] and "=" not in arg:
+            return name
+    return ""
+
+
+def _run_in_job(job: Job, cmd_args: list[str], **kwargs) -> CompletedProcess:
+    """
+    Run a command with its output fed to the job instead of the terminal,
+    the TUI owns the terminal meanwhile
+    """
+    cmd: str = _cmd_name(cmd_args)
+    # Read as text by the job, a stderr of the caller (such as DEVNULL) is kept
+    kwargs.setdefault("stderr", STDOUT)
+    for key in ["text", "universal_newlines", "encoding", "errors"]:
+        kwargs.pop(key, None)
+
+    with Popen(cmd_args, stdout=PIPE, text=True, errors="replace", **kwargs) as process:
+        assert process.stdout is not None
+        for chunk in process.stdout:
+            # Progress readouts are redrawn with \r
+            for line in split(r"\r", chunk):
+                job.feed(cmd, line)
+
+    if process.returncode != 0:
+        raise CalledProcessError(process.returncode, cmd_args)
+    return CompletedProcess(cmd_args, process.returncode)
+
+
+def _run_captured(job: Job, cmd_args: list[str], **kwargs) -> CompletedProcess:
+    """
+    Run a command whose stdout the caller captures, in a job,
+    its stderr goes to the job unless the caller handles it too
+    """
+    feed_stderr: bool = "stderr" not in kwargs and not kwargs.get("capture_output")
+    if feed_stderr:
+        kwargs["stderr"] = PIPE
+
+    result: CompletedProcess = process_run(args=cmd_args, check=False, **kwargs)
+    if feed_stderr:
+        errors: str | bytes = result.stderr
+        if isinstance(errors, bytes):
+            errors = errors.decode(errors="replace")
+        for line in errors.splitlines():
+            job.feed(_cmd_name(cmd_args), line)
+
+    result.check_returncode()
+    return result
+
+
+def stream(
+    cmd_args: list[str], interactive: bool = False, **kwargs
+) -> CompletedProcess:
+    """
+    Run a command & raise on failure, its output goes to the terminal,
+    or to the job when running in the background job queue
+
+    Params:
+        list[str] cmd_args: the command list arguments
+        bool interactive: the command prompts for input, refused in a job,
+            see jobs.run_in_foreground()
+        **kwargs: passed to subprocess, stdin is /dev/null in a job by default,
+            & sudo never prompts there (-n)
+
+    Throws: CalledProcessError, InteractiveCmdError
+    """
+    job: Job | None = current_job()
+    if job is None:
+        return process_run(args=cmd_args, check=True, **kwargs)
+    if interactive:
+        raise InteractiveCmdError(_cmd_name(cmd_args))
+
+    # Never read the terminal from a job, sudo reads /dev/tty regardless of stdin
+    if "input" not in kwargs:
+        kwargs.setdefault("stdin", DEVNULL)
+    if cmd_args[:1] == ["sudo"] and "-n" not in cmd_args[1:2]:
+        cmd_args = ["sudo", "-n", *cmd_args[1:]]
+    # Callers capturing the output themselves keep it
+    if "stdout" in kwargs or kwargs.get("capture_output", False):
+        return _run_captured(job, cmd_args, **kwargs)
+    return _run_in_job(job, cmd_args, **kwargs)
+
 
 def run(cmd_args: list[str], msg: str = "", **kwargs):
     """
@@ -16,13 +114,14 @@ def run(cmd_args: list[str], msg: str = "", **kwargs):
         str msg: the message printed when an error occurred, usually started with a "when"
     """
     try:
-        return process_run(args=cmd_args, check=True, **kwargs)
+        return stream(cmd_args, **kwargs)
     except CalledProcessError as err:
         print(
             "\033[91m\033[1m[Error]",
             "An error occurred!" if msg == "" else f"An error occurred {msg}",
         )
         print(f"\033[31mError message\033[0m\n\t{str(err)}")
+        report_failure(f"{_cmd_name(cmd_args)} failed {msg}".rstrip())
 
         return 1
 
@@ -29,6 +29,8 @@ distro_list: list[str] = [
     # openSUSE
     "openSUSE",
     "suse",
+    # Void Linux
+    "void",
 ]
 
 distro_aliases: dict[str, str] = {
@@ -50,7 +52,7 @@ distro_aliases: dict[str, str] = {
     # For gentoo
     "funtoo": "gentoo",
     # For SUSE
-    "openSUSE": "suse",
+    "opensuse": "suse",
 }
 
 architecture_aliases: dict[str, str] = {
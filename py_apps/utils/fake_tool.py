@@ -0,0 +1,181 @@
+"""
+The stand-in of every external tool in the simulation harness (see utils/sim.py)
+
+Linked under each tool name (apt, pacman, aria2c, sudo ...) in the bin dir of a
+fixture rootfs. Every call is logged as one json line to $PY_APPS_SIM_LOG, then:
+    sudo / eatmydata / env  run the wrapped command, which is faked as well
+    aria2c                  write the fixture artifact of the url to the output file
+    package managers        "install" the packages: each becomes a command on PATH,
+                            fixture packages lay down their files in the rootfs,
+                            or print the urls of the packages to be prefetched
+    anything else           succeed quietly
+
+Only the standard library is imported here, it runs once per spawn
+"""
+
+import sys
+from hashlib import sha256
+from io import BytesIO
+from json import dumps, load, loads
+from os import environ, execvp, makedirs, path, symlink
+from tarfile import TarInfo
+from tarfile import open as open_tarfile
+
+
+# Tools that install packages, with the args that make them do so
+_installers: dict[str, list[str]] = {
+    "apt": ["install"],
+    "apt-get": ["install"],
+    "dnf": ["install"],
+    "yum": ["install"],
+    "zypper": ["in", "install"],
+    "pacman": ["-S", "-Sy", "-U"],
+    "xbps-install": ["-S"],
+    "emerge": ["-vk"],
+    "apk": ["add"],
+    "rpm": ["-ivh"],
+    "dpkg": ["-i"],
+}
+
+# The content of the fake packages apt-get prints the hash of
+FAKE_DEB: bytes = b"!<arch>\n"
+
+# Tools printing package urls, with the args that make them do so,
+# & the url line printed for a package name
+_uri_printers: dict[str, tuple[str, str]] = {
+    "apt-get": (
+        "--print-uris",
+        "'https://deb.example.org/pool/{name}_1.0_amd64.deb' {name}_1.0_amd64.deb "
+        + f"{len(FAKE_DEB)} SHA256:{sha256(FAKE_DEB).hexdigest()}",
+    ),
+    "pacman": ("-Sp", "https://arch.example.org/{name}-1.0-1-x86_64.pkg.tar.zst"),
+}
+
+# What some tools print
+_outputs: dict[str, str] = {
+    "whereis": "libnss3.so: /usr/lib/libnss3.so\n",
+}
+
+
+def _root(rel_path: str) -> str:
+    return path.join(environ.get("PY_APPS_ROOT", "/"), rel_path.lstrip("/"))
+
+
+def _log(argv: list[str]) -> None:
+    log_path: str = environ.get("PY_APPS_SIM_LOG", "")
+    if log_path:
+        # One short write in append mode, safe between processes
+        with open(log_path, "a", encoding="utf-8") as log:
+            log.write(dumps(argv) + "\n")
+
+
+def _artifacts() -> dict[str, dict]:
+    with open(environ["PY_APPS_SIM_ARTIFACTS"], encoding="utf-8") as artifacts_file:
+        return load(artifacts_file)
+
+
+def _artifact(url: str) -> dict:
+    """The fixture artifact spec of the url, the longest matching prefix wins"""
+    artifacts: dict[str, dict] = _artifacts()
+    matched: list[str] = [prefix for prefix in artifacts if url.startswith(prefix)]
+    return artifacts[max(matched, key=len)] if matched else {"package": url}
+
+
+def _tarball(top_dir: str, files: dict[str, str]) -> bytes:
+    buffer = BytesIO()
+    with open_tarfile(fileobj=buffer, mode="w:gz") as tar:
+        for name, content in files.items():
+            info = TarInfo(f"{top_dir}/{name}")
+            data: bytes = content.encode()
+            info.size, info.mode = len(data), 0o755
+            tar.addfile(info, BytesIO(data))
+    return buffer.getvalue()
+
+
+def _aria2c(args: list[str]) -> None:
+    """Write the fixture artifact to -d/-o, like "aria2c -o out -d dir url ..." """
+    output: str = args[args.index("-o") + 1]
+    directory: str = args[args.index("-d") + 1] if "-d" in args else "."
+    url: str = next(arg for arg in args if "://" in arg)
+    spec: dict = _artifact(url)
+
+    file_path: str = path.join(directory, output)
+    makedirs(path.dirname(file_path), exist_ok=True)
+    with open(file_path, "wb") as artifact:
+        if "tarball" in spec:
+            artifact.write(_tarball(spec["tarball"], spec.get("files", {})))
+        else:
+            artifact.write(dumps(spec).encode())
+
+
+def _provide(command: str) -> None:
+    """Make a command available on PATH, as a fake tool itself"""
+    link_path: str = path.join(path.dirname(sys.argv[0]), command)
+    if command and not path.lexists(link_path):
+        symlink(path.realpath(sys.argv[0]), link_path)
+
+
+def _lay_down(spec: dict) -> None:
+    """Install the files & the commands of a fixture package"""
+    for rel_path, content in spec.get("files", {}).items():
+        makedirs(path.dirname(_root(rel_path)), exist_ok=True)
+        with open(_root(rel_path), "w", encoding="utf-8") as installed:
+            installed.write(content)
+    for command in spec.get("commands", []):
+        _provide(command)
+
+
+def _install(tool: str, args: list[str]) -> None:
+    for arg in args:
+        if arg.startswith("-"):
+            continue
+
+        # A local package, from the fake aria2c
+        if path.isfile(arg):
+            with open(arg, encoding="utf-8") as package_file:
+                _lay_down(loads(package_file.read() or "{}"))
+            continue
+
+        # A package of the repo, such as www-client/firefox-bin
+        name: str = arg.rpartition("/")[2]
+        if name.replace("-", "").replace(".", "").isalnum():
+            _provide(name)
+            _lay_down(_artifacts().get(f"pkg:{name}", {}))
+            if tool in ["apt", "apt-get", "dpkg"]:
+                makedirs(_root("/var/lib/dpkg/info"), exist_ok=True)
+                with open(
+                    _root(f"/var/lib/dpkg/info/{name}.postinst"), "w", encoding="utf-8"
+                ) as postinst:
+                    postinst.write('if [ "$1" = configure ]; then :; fi\n')
+
+
+def main() -> None:
+    """Act as the tool named by argv[0]"""
+    tool: str = path.basename(sys.argv[0])
+    args: list[str] = sys.argv[1:]
+    _log([tool, *args])
+
+    if tool in ["sudo", "eatmydata", "env"]:
+        # Options of sudo, such as -n -v, & VAR=value of env
+        while args and (args[0].startswith("-") or "=" in args[0]):
+            name, _, value = args.pop(0).partition("=")
+            if value:
+                environ[name] = value
+        if args:
+            execvp(args[0], args)
+        return
+
+    if tool == "aria2c":
+        _aria2c(args)
+    elif tool in _uri_printers and _uri_printers[tool][0] in args:
+        for arg in args:
+            if arg.isidentifier() and arg not in ["install", "download"]:
+                print(_uri_printers[tool][1].format(name=arg))
+    elif tool in _installers and any(arg in _installers[tool] for arg in args):
+        _install(tool, args)
+
+    sys.stdout.write(_outputs.get(tool, ""))
+
+
+if __name__ == "__main__":
+    main()
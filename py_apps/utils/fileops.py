@@ -0,0 +1,228 @@
+"""
+In-process file operations, instead of spawning sed / chmod / ln / mv / rm
+
+Every spawn costs tens of ms under proot, these are a few syscalls each:
+    write_file   atomic write (temp file + rename), skipped when unchanged
+    edit_lines   streaming line edits like "sed -i", atomic as well
+    add_mode     chmod +bits
+    link         ln -f, atomic
+    move         mv
+    remove       rm -rf
+    sha256_of    sha256sum
+
+The spawns avoided are counted, see summary()
+"""
+
+from collections import Counter
+from hashlib import sha256
+from os import chmod, chown, close, fdopen
+from os import link as hard_link
+from os import path
+from os import remove as remove_file
+from os import replace, stat, unlink
+from re import Pattern
+from re import compile as compile_pattern
+from shutil import move as shutil_move
+from shutil import rmtree
+from tempfile import mkstemp
+from typing import Callable
+
+
+# Tool name -> times it wasn't spawned
+_avoided: Counter[str] = Counter()
+
+
+def _avoid(tool: str) -> None:
+    _avoided[tool] += 1
+
+
+def avoided_spawns() -> dict[str, int]:
+    """The external tools not spawned so far, with how many times"""
+    return dict(_avoided)
+
+
+def summary() -> str:
+    """Such as "3 spawns avoided (sed 1, chmod 2)", empty when nothing was done"""
+    if not _avoided:
+        return ""
+    details: str = ", ".join(f"{tool} {count}" for tool, count in _avoided.items())
+    return f"{sum(_avoided.values())} spawns avoided ({details})"
+
+
+def _temp_beside(file_path: str) -> tuple[int, str]:
+    """A temp file in the same dir, so that replace() is atomic"""
+    directory, name = path.split(path.abspath(file_path))
+    return mkstemp(prefix=f".{name}.", dir=directory)
+
+
+def _keep_owner(temp_path: str, file_path: str) -> int | None:
+    """Give the temp file the mode & owner of the file it replaces, returns the mode"""
+    if not path.exists(file_path):
+        return None
+    file_stat = stat(file_path)
+    try:
+        chown(temp_path, file_stat.st_uid, file_stat.st_gid)
+    except PermissionError:
+        pass
+    chmod(temp_path, file_stat.st_mode & 0o7777)
+    return file_stat.st_mode & 0o7777
+
+
+def sha256_of(file_path: str) -> str:
+    """
+    Get the sha256 hex digest of a file
+
+    Params:
+        str file_path
+    """
+    digest = sha256()
+
+    # In chunks, hashlib.file_digest() needs python 3.11
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _same_content(file_path: str, content: bytes) -> bool:
+    if not path.isfile(file_path) or path.getsize(file_path) != len(content):
+        return False
+    return sha256_of(file_path) == sha256(content).hexdigest()
+
+
+def write_file(file_path: str, content: str | bytes, mode: int | None = None) -> bool:
+    """
+    Write a file atomically, readers see the old or the new content, never a part
+
+    Params:
+        str file_path: the file path
+        str | bytes content: the whole content, str is written as UTF-8
+        int | None mode: such as 0o755, None to keep the current one (or 0o644)
+
+    Returns: bool, False when the file already had the content & the mode
+    """
+    # The mode is set in-process too
+    if mode is not None:
+        _avoid("chmod")
+    data: bytes = content.encode() if isinstance(content, str) else content
+    if _same_content(file_path, data) and (
+        mode is None or stat(file_path).st_mode & 0o7777 == mode
+    ):
+        return False
+
+    fd, temp_path = _temp_beside(file_path)
+    try:
+        with fdopen(fd, "wb") as temp:
+            temp.write(data)
+        kept: int | None = _keep_owner(temp_path, file_path)
+        chmod(temp_path, mode if mode is not None else kept or 0o644)
+        replace(temp_path, file_path)
+    except BaseException:
+        unlink(temp_path)
+        raise
+    return True
+
+
+def edit_lines(file_path: str, edit: Callable[[str], str]) -> bool:
+    """
+    Edit a file line by line like "sed -i", without loading it whole
+
+    Params:
+        str file_path: the file path
+        Callable edit: gets each line (with its "\\n"), returns the new one
+
+    Returns: bool, whether anything changed, the file is left alone if not
+    """
+    _avoid("sed")
+    fd, temp_path = _temp_beside(file_path)
+    changed: bool = False
+    try:
+        with open(file_path, encoding="utf-8", newline="") as old, fdopen(
+            fd, "w", encoding="utf-8", newline=""
+        ) as temp:
+            for line in old:
+                new_line: str = edit(line)
+                changed = changed or new_line != line
+                temp.write(new_line)
+        if changed:
+            _keep_owner(temp_path, file_path)
+            replace(temp_path, file_path)
+    finally:
+        if not changed:
+            unlink(temp_path)
+    return changed
+
+
+def sub_lines(file_path: str, pattern: str, repl: str, count: int = 0) -> bool:
+    """
+    re.sub on every line of a file, like "sed -i -E s@pattern@repl@"
+
+    Params:
+        str file_path: the file path
+        str pattern: the regex
+        str repl: the replacement, \\1 & \\g<0> (sed's &) refer to the match
+        int count: the replacements per line, 0 for all (sed's g flag), 1 for sed's default
+
+    Returns: bool, whether anything changed
+    """
+    compiled: Pattern[str] = compile_pattern(pattern)
+    return edit_lines(file_path, lambda line: compiled.sub(repl, line, count=count))
+
+
+def add_mode(file_path: str, bits: int) -> None:
+    """
+    Add permission bits, like "chmod a+r"
+
+    Params:
+        str file_path: the file path
+        int bits: such as 0o444 for a+r
+    """
+    _avoid("chmod")
+    chmod(file_path, stat(file_path).st_mode & 0o7777 | bits)
+
+
+def link(source: str, link_path: str) -> None:
+    """
+    Hard link a file, replacing link_path atomically if it exists, like "ln -f"
+
+    Params:
+        str source: the existing file
+        str link_path: the new name
+    """
+    _avoid("ln")
+    fd, temp_path = _temp_beside(link_path)
+    close(fd)
+    unlink(temp_path)
+    hard_link(source, temp_path)
+    try:
+        replace(temp_path, link_path)
+    except OSError:
+        unlink(temp_path)
+        raise
+
+
+def move(source: str, destination: str) -> None:
+    """
+    Move a file or a dir like "mv", a rename within the same filesystem
+
+    Params:
+        str source: the path moved
+        str destination: the new path, or an existing dir to move it into
+    """
+    _avoid("mv")
+    shutil_move(source, destination)
+
+
+def remove(target: str) -> None:
+    """
+    Remove a file or a whole dir like "rm -rf", missing ones are fine
+
+    Params:
+        str target: the path removed
+    """
+    _avoid("rm")
+    if path.isdir(target) and not path.islink(target):
+        rmtree(target, ignore_errors=True)
+    elif path.lexists(target):
+        remove_file(target)
@@ -0,0 +1,362 @@
+"""
+A local HTTP server replaying recorded responses, with network shaping & faults,
+so the network paths can be measured reproducibly
+
+Requests are routed to it by $PY_APPS_UPSTREAM (see network.upstream_url()),
+the original url is kept in the path:
+    https://api.github.com/repos/x  ->  <server>/https/api.github.com/repos/x
+
+Fixtures come from an offline bundle (see utils/bundle.py), which records the
+GitHub API responses, vendor pages & artifacts fetched for a manifest, or are
+added directly. Every response supports HEAD, a single Range, ETag & If-None-Match,
+and is shaped by a NetProfile:
+    latency     slept once per request, before the headers
+    bandwidth   bytes per second of each connection
+    link        bytes per second shared by every connection, such as a 3G link
+Faults are injected at random, reproducibly for the same seed & request order.
+"""
+
+from hashlib import sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from random import Random
+from tarfile import open as open_tarfile
+from threading import Lock
+from time import monotonic, sleep
+from typing import NamedTuple
+
+from py_apps.utils.cache_server import parse_range
+
+
+# Bytes written between two bandwidth checks
+CHUNK_SIZE: int = 16 * 1024
+
+
+class NetProfile(NamedTuple):
+    """How the network between the client & the hosts behaves"""
+
+    name: str
+    # Seconds per request, one round trip
+    latency: float
+    # Bytes per second of each connection, 0 for no limit
+    bandwidth: int
+    # Bytes per second shared by every connection, 0 for no limit
+    link: int
+
+
+PROFILES: dict[str, NetProfile] = {
+    # A gigabit LAN
+    "lan": NetProfile("lan", 0.0005, 0, 110 * 1024 * 1024),
+    # A mobile link of ~750 kbit/s with a long round trip
+    "3g": NetProfile("3g", 0.15, 0, 96 * 1024),
+    # Cross-border from China: a fast link, but every connection is throttled
+    "cn": NetProfile("cn", 0.25, 48 * 1024, 4 * 1024 * 1024),
+}
+
+
+class Faults(NamedTuple):
+    """The chance of every request to fail"""
+
+    # Answer 503 Service Unavailable
+    error_rate: float = 0
+    # Drop the connection halfway through the body
+    reset_rate: float = 0
+
+
+class Fixture:  # pylint: disable=too-few-public-methods
+    """
+    A recorded response body, in memory or a slice of a file
+
+    Params:
+        int size: the body size
+        str etag: the entity tag, without quotes
+        bytes content: the body when in memory
+        str file_path: the file the body is in otherwise
+        int offset: where the body starts in the file
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        size: int,
+        etag: str,
+        *,
+        content: bytes = b"",
+        file_path: str = "",
+        offset: int = 0,
+    ) -> None:
+        self.size = size
+        self.etag = etag
+        self.content = content
+        self.file_path = file_path
+        self.offset = offset
+
+    def read(self, start: int, length: int) -> bytes:
+        """Read length bytes of the body from start"""
+        if not self.file_path:
+            return self.content[start : start + length]
+        with open(self.file_path, "rb") as body_file:
+            body_file.seek(self.offset + start)
+            return body_file.read(length)
+
+
+class FixtureStore:
+    """
+    The fixtures by url, an url without an exact fixture is served by the
+    longest url prefix that has one
+    """
+
+    def __init__(self) -> None:
+        self.fixtures: dict[str, Fixture] = {}
+
+    def add(self, url: str, content: bytes | str) -> None:
+        """
+        Add a fixture held in memory
+
+        Params:
+            str url: the url, or an url prefix
+            bytes | str content: the body, str is encoded as utf-8
+        """
+        body: bytes = content.encode("utf-8") if isinstance(content, str) else content
+        self.fixtures[url] = Fixture(
+            len(body), sha256(body).hexdigest()[:16], content=body
+        )
+
+    @classmethod
+    def from_bundle(cls, bundle_path: str) -> "FixtureStore":
+        """
+        Serve the responses & artifacts recorded in an offline bundle,
+        read from the archive when requested
+
+        Params:
+            str bundle_path: the bundle archive path
+        """
+        # pylint: disable=import-outside-toplevel
+        from json import loads
+
+        from py_apps.utils.bundle import INDEX_NAME
+
+        store = cls()
+        with open_tarfile(bundle_path, "r") as tar:
+            members = {member.name: member for member in tar.getmembers()}
+            index_file = tar.extractfile(INDEX_NAME)
+            if index_file is None:
+                raise ValueError(f"{bundle_path} is not a bundle")
+            index: dict = loads(index_file.read())
+
+        def _add_member(url: str, digest: str, member_name: str) -> None:
+            member = members[member_name]
+            store.fixtures[url] = Fixture(
+                member.size,
+                digest[:16],
+                file_path=bundle_path,
+                offset=member.offset_data,
+            )
+
+        for url, digest in index["responses"].items():
+            _add_member(url, digest, f"responses/{digest}")
+        for url, artifact in index["artifacts"].items():
+            _add_member(url, artifact["sha256"], f"artifacts/{artifact['sha256']}")
+        return store
+
+    def lookup(self, url: str) -> Fixture | None:
+        """Get the fixture of the url, None when there's none"""
+        if url in self.fixtures:
+            return self.fixtures[url]
+        matched: list[str] = [
+            prefix for prefix in self.fixtures if url.startswith(prefix)
+        ]
+        return self.fixtures[max(matched, key=len)] if matched else None
+
+
+class _Pacer:  # pylint: disable=too-few-public-methods
+    """Spaces out writes to stay under a rate, shared by the threads using it"""
+
+    def __init__(self, rate: int) -> None:
+        self.rate = rate
+        self._next: float = monotonic()
+        self._lock = Lock()
+
+    def wait(self, size: int) -> None:
+        """Sleep until size more bytes fit in the rate"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now: float = monotonic()
+            self._next = max(self._next, now) + size / self.rate
+            delay: float = self._next - now
+        sleep(delay)
+
+
+def original_url(request_path: str) -> str:
+    """
+    The url a request path stands for, the inverse of network.upstream_url()
+
+    Params:
+        str request_path: such as "/https/api.github.com/repos/x"
+
+    Returns: str, such as "https://api.github.com/repos/x", "" when it's not one
+    """
+    scheme, _, rest = request_path.lstrip("/").partition("/")
+    return f"{scheme}://{rest}" if scheme in ["http", "https"] and rest else ""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves the fixtures of the server's FixtureStore"""
+
+    server: "FixtureServer"
+
+    # Keep-alive, as the real hosts do
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_HEAD(self) -> None:  # pylint: disable=invalid-name
+        """Process HEAD requests"""
+        self._serve(send_body=False)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Process GET requests"""
+        self._serve(send_body=True)
+
+    def _serve(self, send_body: bool) -> None:
+        server: FixtureServer = self.server
+        server.count("requests")
+        sleep(server.profile.latency)
+
+        url: str = original_url(self.path)
+        fixture: Fixture | None = server.store.lookup(url) if url else None
+        if fixture is None:
+            self.send_error(404, f"No fixture for {url or self.path}")
+            return
+
+        if server.roll(server.faults.error_rate):
+            server.count("errors")
+            self.send_error(503, "Injected fault")
+            return
+
+        etag: str = f'"{fixture.etag}"'
+        if self.headers.get("If-None-Match") in [etag, "*"]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        # A Range of another version of the file is ignored
+        if_range: str | None = self.headers.get("If-Range")
+        byte_range = (
+            parse_range(self.headers.get("Range"), fixture.size)
+            if if_range in [None, etag]
+            else None
+        )
+
+        start, end = 0, fixture.size - 1
+        if byte_range is None:
+            self.send_response(200)
+        else:
+            start = byte_range[0]
+            end = fixture.size - 1 if byte_range[1] is None else byte_range[1]
+            end = min(end, fixture.size - 1)
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{fixture.size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{fixture.size}")
+
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        if send_body:
+            self._copy(fixture, start, end + 1)
+
+    def _copy(self, fixture: Fixture, start: int, end: int) -> None:
+        """Send [start, end) of the body, shaped by the profile"""
+        server: FixtureServer = self.server
+        pacer = _Pacer(server.profile.bandwidth)
+
+        # Drop the connection halfway when a reset is injected
+        if server.roll(server.faults.reset_rate):
+            server.count("resets")
+            end = start + (end - start) // 2
+            # pylint: disable-next=attribute-defined-outside-init
+            self.close_connection = True
+
+        offset: int = start
+        while offset < end:
+            chunk: bytes = fixture.read(offset, min(CHUNK_SIZE, end - offset))
+            if not chunk:
+                break
+            pacer.wait(len(chunk))
+            server.link.wait(len(chunk))
+            self.wfile.write(chunk)
+            offset += len(chunk)
+            server.count("bytes", len(chunk))
+
+
+class FixtureServer(
+    ThreadingHTTPServer
+):  # pylint: disable=too-many-instance-attributes
+    """
+    The fixture server, the profile & faults can be changed while it's serving
+
+    Params:
+        tuple[str, int] address: the (host, port) to listen on, port 0 for any
+        FixtureStore store: the fixtures
+        NetProfile profile: the network shaping, no shaping by default
+        Faults faults: the faults injected, none by default
+        int seed: the seed of the injected faults
+        bool verbose: whether to log every request
+    """
+
+    daemon_threads = True
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        address: tuple[str, int],
+        store: FixtureStore,
+        *,
+        profile: NetProfile = NetProfile("none", 0, 0, 0),
+        faults: Faults = Faults(),
+        seed: int = 0,
+        verbose: bool = False,
+    ) -> None:
+        super().__init__(address, FixtureHandler)
+        self.store = store
+        self.faults = faults
+        self.verbose = verbose
+        self.stats: dict[str, int] = {}
+        self._random = Random(seed)
+        self._lock = Lock()
+        self.profile = profile
+
+    @property
+    def profile(self) -> NetProfile:
+        """The network shaping of the requests from now on"""
+        return self._profile
+
+    @profile.setter
+    def profile(self, profile: NetProfile) -> None:
+        self._profile = profile
+        self.link = _Pacer(profile.link)
+
+    @property
+    def base_url(self) -> str:
+        """The value of $PY_APPS_UPSTREAM for this server"""
+        host: str = str(self.server_address[0])
+        return f"http://{host}:{self.server_address[1]}"
+
+    def roll(self, rate: float) -> bool:
+        """Decide if a fault of the rate happens"""
+        with self._lock:
+            return rate > 0 and self._random.random() < rate
+
+    def count(self, stat: str, value: int = 1) -> None:
+        """Add to a stat, such as "requests" or "bytes" """
+        with self._lock:
+            self.stats[stat] = self.stats.get(stat, 0) + value
@@ -0,0 +1,111 @@
+"""
+Measure module import time with "python -X importtime"
+"""
+
+from os import environ
+from subprocess import run
+from sys import executable
+from typing import NamedTuple
+
+
+# The budget for a cold import of py_apps.main (the CLI entry),
+# overwritten by $PY_APPS_IMPORT_BUDGET_MS
+IMPORT_BUDGET_MS: float = float(environ.get("PY_APPS_IMPORT_BUDGET_MS", "50"))
+
+# Third party modules which must only be imported at their point of use
+HEAVY_MODULES: list[str] = ["textual", "requests", "bs4"]
+
+
+class ImportRecord(NamedTuple):
+    """One line of the -X importtime output"""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    # Nesting level, 0 for the modules imported directly
+    depth: int
+
+
+def measure_imports(module: str) -> list[ImportRecord]:
+    """
+    Cold import the module in a new interpreter and record the import times
+
+    Params:
+        str module: the module to be imported, such as "py_apps.main"
+
+    Returns: list[ImportRecord], in the order the imports finished
+    """
+    stderr: str = run(
+        [executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+
+    records: list[ImportRecord] = []
+    for line in stderr.splitlines():
+        # Lines like "import time:       386 |     105392 |   textual"
+        fields: list[str] = line.removeprefix("import time:").split("|")
+        if not line.startswith("import time:") or not fields[0].strip().isdigit():
+            continue
+
+        name: str = fields[2].rstrip()
+        stripped: str = name.lstrip()
+        records.append(
+            ImportRecord(
+                module=stripped,
+                self_us=int(fields[0]),
+                cumulative_us=int(fields[1]),
+                depth=(len(name) - len(stripped) - 1) // 2,
+            )
+        )
+
+    return records
+
+
+def cumulative_ms(records: list[ImportRecord], module: str) -> float:
+    """
+    The cumulative import time of the module in milliseconds, 0 if not imported
+    """
+    for record in records:
+        if record.module == module:
+            return record.cumulative_us / 1000
+    return 0
+
+
+def imported_heavy_modules(records: list[ImportRecord]) -> list[str]:
+    """The heavy modules which got imported"""
+    imported: set[str] = {record.module for record in records}
+    return [module for module in HEAVY_MODULES if module in imported]
+
+
+def format_report(
+    records: list[ImportRecord], module: str, top: int = 15, budget_ms: float = 0
+) -> str:
+    """
+    Format the import time report: the total, the heavy modules & the slowest imports
+
+    Params:
+        list[ImportRecord] records: the measured records
+        str module: the module imported
+        int top: how many of the slowest imports are listed
+        float budget_ms: the budget to compare with, 0 for none
+    """
+    total: float = cumulative_ms(records, module)
+    lines: list[str] = [
+        f"Cold import of {module}: {total:.1f} ms"
+        + (f" (budget {budget_ms:.0f} ms)" if budget_ms else "")
+    ]
+
+    heavy: list[str] = imported_heavy_modules(records)
+    if heavy:
+        lines.append(f"Heavy modules imported: {', '.join(heavy)}")
+
+    lines.append(f"{'self ms':>9} {'cumul ms':>9}  module")
+    for record in sorted(records, key=lambda r: r.self_us, reverse=True)[:top]:
+        lines.append(
+            f"{record.self_us / 1000:9.1f} {record.cumulative_us / 1000:9.1f}  "
+            + f"{'  ' * record.depth}{record.module}"
+        )
+
+    return "\n".join(lines)
@@ -0,0 +1,360 @@
+"""
+A background job queue for installs, so the menus stay usable meanwhile
+
+Jobs run one at a time in a worker thread (package managers hold a lock anyway).
+Code running inside a job reports progress with report_progress(), and the
+commands it runs through utils/cmd.py have their output captured and parsed:
+    aria2c      the download readout, "[#id 4.0MiB/25MiB(16%) CN:5 DL:3.2MiB ETA:6s]"
+    apt         "pmstatus:<pkg>:<percent>:<msg>" lines of APT::Status-Fd
+"""
+
+import sys
+from collections import deque
+from queue import Queue
+from re import compile as compile_pattern
+from re import fullmatch
+from shutil import which
+from subprocess import DEVNULL
+from subprocess import run as process_run
+from threading import Lock, Thread, local
+from time import monotonic
+from typing import Callable, Pattern, TextIO, TypeVar
+
+
+T = TypeVar("T")
+
+# Seconds of samples the speed is averaged over
+SPEED_WINDOW: float = 5
+
+LOG_LINES: int = 200
+
+_units: dict[str, int] = {
+    "B": 1,
+    "KiB": 1024,
+    "MiB": 1024**2,
+    "GiB": 1024**3,
+}
+
+_aria2c_readout: Pattern[str] = compile_pattern(
+    r"\[#\w+ ([\d.]+)(\w+)/([\d.]+)(\w+)\(\d+%\)"
+)
+
+
+def _to_bytes(number: str, unit: str) -> int:
+    return int(float(number) * _units.get(unit, 1))
+
+
+class Job:  # pylint: disable=too-many-instance-attributes
+    """
+    An install running (or waiting to run) in the background
+
+    Params:
+        int job_id: the position in the queue
+        str title: what's installed, shown in the jobs screen
+        Callable func: the work, runs in the worker thread
+    """
+
+    def __init__(self, job_id: int, title: str, func: Callable[[], object]) -> None:
+        self.job_id = job_id
+        self.title = title
+        self.func = func
+        # queued -> running -> done / failed
+        self.state: str = "queued"
+        self.error: str = ""
+        self.phase: str = ""
+        # Progress of the phase, in bytes, or in % when unit is "%"
+        self.done: float = 0
+        self.total: float = 0
+        self.unit: str = "B"
+        self.log: deque[str] = deque(maxlen=LOG_LINES)
+        # Lines logged in total, including the ones rotated out
+        self.log_count: int = 0
+        self._samples: deque[tuple[float, float]] = deque()
+        self._lock = Lock()
+
+    def update(self, done: float, total: float, phase: str = "", unit: str = "B"):
+        """
+        Report the progress of the current phase, a new phase restarts the speed
+
+        Params:
+            float done: the bytes (or %) done
+            float total: the bytes (or %) in total, 0 when unknown
+            str phase: such as "下载", "解压", "安装"
+            str unit: "B" or "%"
+        """
+        with self._lock:
+            now: float = monotonic()
+            if phase and phase != self.phase:
+                self.phase, self.unit = phase, unit
+                self._samples.clear()
+
+            self.done, self.total = done, total
+            self._samples.append((now, done))
+            while now - self._samples[0][0] > SPEED_WINDOW:
+                self._samples.popleft()
+
+    @property
+    def fraction(self) -> float | None:
+        """The part of the phase done, None when unknown"""
+        return min(self.done / self.total, 1) if self.total else None
+
+    @property
+    def speed(self) -> float:
+        """Units per second over the last few seconds"""
+        with self._lock:
+            if len(self._samples) < 2:
+                return 0
+            (start, first), (end, last) = self._samples[0], self._samples[-1]
+            return (last - first) / (end - start) if end > start else 0
+
+    @property
+    def eta(self) -> float | None:
+        """Seconds left in the phase, None when unknown"""
+        speed: float = self.speed
+        if not self.total or speed <= 0:
+            return None
+        return max(self.total - self.done, 0) / speed
+
+    def feed(self, cmd: str, line: str) -> None:
+        """
+        Log a line of command output and parse the progress out of it
+
+        Params:
+            str cmd: the command name, such as "aria2c"
+            str line: the output line
+        """
+        line = line.rstrip()
+        if not line:
+            return
+
+        parser: Callable[[Job, str], bool] | None = _line_parsers.get(cmd, None)
+        # Progress lines are not worth keeping in the log
+        if parser is None or not parser(self, line):
+            with self._lock:
+                self.log.append(line)
+                self.log_count += 1
+
+    def fail(self, error: str) -> None:
+        """
+        Record a failure the work went on after, such as a command whose error was
+        printed, the job ends as failed
+
+        Params:
+            str error: what failed, the first one is kept
+        """
+        with self._lock:
+            self.error = self.error or error
+
+    def lines_since(self, count: int) -> tuple[list[str], int]:
+        """
+        The log lines after the first count ones, as far as they're kept
+
+        Returns: tuple[list[str], int], the lines & the count of all the lines
+        """
+        with self._lock:
+            new: int = min(self.log_count - count, len(self.log))
+            return list(self.log)[len(self.log) - new :], self.log_count
+
+
+def parse_aria2c_line(job: Job, line: str) -> bool:
+    """Parse the aria2c readout, returns whether it's a progress line"""
+    matched = _aria2c_readout.search(line)
+    if matched is None:
+        return False
+
+    done, done_unit, total, total_unit = matched.groups()
+    job.update(_to_bytes(done, done_unit), _to_bytes(total, total_unit), "下载")
+    return True
+
+
+def parse_apt_status_line(job: Job, line: str) -> bool:
+    """Parse an APT::Status-Fd line, returns whether it's a progress line"""
+    matched = fullmatch(r"(pm|dl)status:[^:]*:([\d.]+):.*", line)
+    if matched is None:
+        return False
+
+    kind, percent = matched.groups()
+    job.update(float(percent), 100, "下载" if kind == "dl" else "安装", unit="%")
+    return True
+
+
+_line_parsers: dict[str, Callable[[Job, str], bool]] = {
+    "aria2c": parse_aria2c_line,
+    "apt": parse_apt_status_line,
+    "apt-get": parse_apt_status_line,
+}
+
+
+# The job the current thread is running
+_current: local = local()
+
+
+def current_job() -> Job | None:
+    """The job running in the current thread, None outside of the queue"""
+    return getattr(_current, "job", None)
+
+
+def bind_job(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    Bind a function to the job of the current thread, so the output of what it runs
+    in pool threads goes to the job too, instead of the terminal the TUI owns
+
+    Params:
+        Callable func: the function run in other threads
+
+    Returns: Callable, func running in the job, or func itself outside of the queue
+    """
+    job: Job | None = current_job()
+    if job is None:
+        return func
+
+    def _bound(*args, **kwargs) -> T:
+        previous: Job | None = current_job()
+        _current.job = job
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current.job = previous
+
+    return _bound
+
+
+def report_progress(done: float, total: float, phase: str = "", unit: str = "B"):
+    """
+    Report progress to the current job, does nothing outside of the queue
+
+    Params: see Job.update
+    """
+    job: Job | None = current_job()
+    if job is not None:
+        job.update(done, total, phase, unit)
+
+
+def report_failure(error: str) -> None:
+    """
+    Record a failure on the current job, does nothing outside of the queue
+
+    Params: see Job.fail
+    """
+    job: Job | None = current_job()
+    if job is not None:
+        job.fail(error)
+
+
+class _JobOutput:
+    """
+    Stand-in for sys.stdout, sending what jobs print to their log
+
+    A running Textual app redirects stdout itself, what's printed meanwhile is
+    dropped, the output of the commands is captured by utils/cmd.py regardless
+
+    Params:
+        TextIO output: the real stdout, for everything else
+    """
+
+    def __init__(self, output: TextIO) -> None:
+        self.output = output
+
+    def write(self, text: str) -> int:
+        """Write to the log of the current job, or the real stdout"""
+        job: Job | None = current_job()
+        if job is None:
+            return self.output.write(text)
+
+        for line in text.splitlines():
+            job.feed("", line)
+        return len(text)
+
+    def __getattr__(self, name: str):
+        return getattr(self.output, name)
+
+
+class JobQueue:
+    """
+    Runs the submitted jobs one by one in a daemon thread
+    """
+
+    def __init__(self) -> None:
+        self.jobs: list[Job] = []
+        self._queue: Queue[Job] = Queue()
+        self._worker: Thread | None = None
+
+    def submit(self, title: str, func: Callable[[], object]) -> Job:
+        """
+        Queue a job, returns immediately
+
+        Params:
+            str title: what's installed
+            Callable func: the work
+        """
+        job = Job(len(self.jobs) + 1, title, func)
+        self.jobs.append(job)
+        self._queue.put(job)
+
+        if self._worker is None:
+            # The TUI owns the terminal, what the jobs print goes to their log
+            sys.stdout = _JobOutput(sys.stdout)
+            self._worker = Thread(target=self._work, daemon=True)
+            self._worker.start()
+
+        return job
+
+    def _work(self) -> None:
+        while True:
+            job: Job = self._queue.get()
+            _current.job = job
+            job.state = "running"
+
+            # Keep the sudo credentials given before the menu, never prompt
+            if which("sudo") is not None:
+                process_run(["sudo", "-n", "-v"], stdin=DEVNULL, check=False)
+
+            try:
+                job.func()
+                # Failures reported by report_failure() don't raise
+                job.state = "failed" if job.error else "done"
+            except (Exception, SystemExit) as err:  # pylint: disable=broad-except
+                # Anything may go wrong in an installer, keep the queue going
+                job.state, job.error = "failed", str(err) or type(err).__name__
+            finally:
+                _current.job = None
+                self._queue.task_done()
+
+    @property
+    def pending(self) -> list[Job]:
+        """The jobs queued or running"""
+        return [job for job in self.jobs if job.state in ["queued", "running"]]
+
+    def wait(self) -> None:
+        """Block until every job is finished"""
+        self._queue.join()
+
+
+# The queue of this session
+job_queue: JobQueue = JobQueue()
+
+
+def submit_job(title: str, func: Callable[[], object]) -> Job:
+    """
+    Queue an install in the background
+
+    Params:
+        str title: what's installed
+        Callable func: the work, such as lambda: Vivaldi().prepare().install()
+    """
+    return job_queue.submit(title, func)
+
+
+def run_in_foreground(title: str, func: Callable[[], object]) -> None:
+    """
+    Run an install prompting the user in the terminal, once the queued jobs are done,
+    jobs can't prompt
+
+    Params:
+        str title: what's installed
+        Callable func: the work
+    """
+    if job_queue.pending:
+        print(f"等待 {len(job_queue.pending)} 个后台任务完成后安装 {title} ...")
+        job_queue.wait()
+    func()
@@ -0,0 +1,117 @@
+"""
+Client side of the LAN artifact cache (see utils/cache_server.py)
+
+The cache is located by $PY_APPS_CACHE:
+    unset / "off"   don't use any LAN cache
+    "auto"          broadcast a discovery datagram on the LAN, any host answering
+                    serves the installs then, so only on trusted networks
+    "http://..."    use the cache server at this url
+"""
+
+from http.client import HTTPException
+from os import environ, path, remove
+from shutil import copyfileobj
+from socket import AF_INET, SO_BROADCAST, SOCK_DGRAM, SOL_SOCKET, socket
+from socket import timeout as SocketTimeout
+from urllib.parse import quote
+from urllib.request import urlopen
+
+from py_apps.utils.network import ArtifactSource
+
+
+DISCOVERY_PORT: int = 38480
+
+DISCOVERY_REQUEST: bytes = b"PY_APPS_CACHE?"
+
+# The reply is followed by " <http port>"
+DISCOVERY_REPLY: bytes = b"PY_APPS_CACHE"
+
+
+def discover(
+    address: str = "<broadcast>", port: int = DISCOVERY_PORT, timeout: float = 0.3
+) -> str | None:
+    """
+    Look for a cache server on the LAN
+
+    Params:
+        str address: where to send the discovery datagram
+        int port: the discovery port
+        float timeout: seconds to wait for a reply
+
+    Returns: str | None, the base url of the first server replied
+    """
+    with socket(AF_INET, SOCK_DGRAM) as sock:
+        sock.setsockopt(SOL_SOCKET, SO_BROADCAST, 1)
+        sock.settimeout(timeout)
+        try:
+            sock.sendto(DISCOVERY_REQUEST, (address, port))
+            reply, (host, _) = sock.recvfrom(512)
+        except (SocketTimeout, OSError):
+            return None
+
+    magic, _, http_port = reply.partition(b" ")
+    if magic != DISCOVERY_REPLY or not http_port.isdigit():
+        return None
+
+    return f"http://{host}:{int(http_port)}"
+
+
+def find_lan_cache() -> str | None:
+    """
+    Locate the LAN cache as configured by $PY_APPS_CACHE
+
+    Returns: str | None, the base url of the cache server
+    """
+    setting: str = environ.get("PY_APPS_CACHE", "")
+
+    if setting.startswith("http"):
+        return setting.rstrip("/")
+    # Whoever answers first is trusted, never without asking for it
+    if setting == "auto":
+        return discover()
+
+    return None
+
+
+class LanCacheSource(ArtifactSource):
+    """
+    Fetch artifacts & metadata through the LAN cache server,
+    any failure falls back to the upstream
+
+    Params:
+        str base_url: the base url of the cache server
+        float timeout: seconds before giving up on the server
+    """
+
+    def __init__(self, base_url: str, timeout: float = 10) -> None:
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def _url_of(self, kind: str, url: str) -> str:
+        return f"{self.base_url}/{kind}?url={quote(url, safe='')}"
+
+    def fetch(self, url: str, file_path: str) -> bool:
+        try:
+            with urlopen(self._url_of("artifact", url), timeout=self.timeout) as res:
+                with open(file_path, "wb") as output:
+                    copyfileobj(res, output, 1024 * 1024)
+                length: str | None = res.headers.get("Content-Length")
+            # The server may close the connection early without an error
+            if length is not None and path.getsize(file_path) != int(length):
+                raise OSError(f"truncated, {path.getsize(file_path)} of {length} bytes")
+        except (OSError, HTTPException) as err:
+            print(f"LAN cache unavailable for {url}: {err}")
+            try:
+                remove(file_path)
+            except OSError:
+                pass
+            return False
+
+        return True
+
+    def fetch_content(self, url: str) -> bytes | None:
+        try:
+            with urlopen(self._url_of("meta", url), timeout=self.timeout) as res:
+                return res.read()
+        except (OSError, HTTPException):
+            return None
@@ -3,31 +3,290 @@ This module contains download functions for this proj
 """
 
 from json import loads
+from os import environ
+from subprocess import CalledProcessError
 from sys import exit as sys_exit
+from threading import Event
 
-from requests import get as req_get
-from requests.exceptions import RequestException
-
+from py_apps.errors.aria2_error import Aria2Error
 from py_apps.errors.cmd_not_found import CmdNotFoundError
-from py_apps.utils.cmd import check_cmd_exists, run
+from py_apps.utils.cmd import check_cmd_exists, stream
+from py_apps.utils.jobs import current_job
+
+
+class ArtifactSource:
+    """
+    A place artifacts can be served from / recorded to besides the network,
+    such as an offline bundle
+
+    Every method is a no-op by default, overwrite the ones needed
+    """
+
+    # pylint: disable=unused-argument
+
+    # Whether the network must not be touched while this source is active
+    offline: bool = False
+
+    # Whether this source records what's fetched, so on-disk caches must be bypassed
+    recording: bool = False
+
+    def fetch(self, url: str, file_path: str) -> bool:
+        """Try to place the file of url at file_path, returns whether it's served"""
+        return False
+
+    def fetch_content(self, url: str) -> bytes | None:
+        """Try to serve the content of url for get(), None if not served"""
+        return None
+
+    def store(self, url: str, file_path: str) -> None:
+        """Called after url is downloaded from the network to file_path"""
+
+    def store_content(self, url: str, content: bytes) -> None:
+        """Called after the content of url is fetched from the network"""
+
+
+class CachedResponse:
+    """
+    A minimal stand-in for requests.Response, for contents served by an ArtifactSource
+
+    Params:
+        str url: the requested url
+        bytes content: the response body
+    """
+
+    status_code: int = 200
+
+    def __init__(self, url: str, content: bytes) -> None:
+        self.url = url
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        """The response body decoded as utf-8"""
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        """The response body parsed as json"""
+        return loads(self.content)
+
+    def raise_for_status(self) -> None:
+        """Served contents are always successful"""
+
+
+# Sources tried in order before the network
+_sources: list[ArtifactSource] = []
+
+
+def add_source(source: ArtifactSource) -> None:
+    """
+    Register an artifact source, which is tried before the network
+
+    Params:
+        ArtifactSource source: the source to be registered
+    """
+    _sources.append(source)
+
+
+def remove_source(source: ArtifactSource) -> None:
+    """
+    Unregister an artifact source
+
+    Params:
+        ArtifactSource source: the source to be unregistered
+    """
+    if source in _sources:
+        _sources.remove(source)
+
+
+# Whether the LAN cache has been looked for, see utils/lan_cache.py
+_lan_cache_state: dict[str, bool] = {"checked": False}
+
+
+def _use_lan_cache() -> None:
+    """
+    Look for a LAN cache once per session, and try it before the network if found
+    """
+    if _lan_cache_state["checked"] or is_offline():
+        return
+    _lan_cache_state["checked"] = True
+
+    # pylint: disable=import-outside-toplevel, cyclic-import
+    from py_apps.utils.lan_cache import LanCacheSource, find_lan_cache
+
+    base_url: str | None = find_lan_cache()
+    if base_url is not None:
+        print(f"Using the LAN cache at {base_url}")
+        add_source(LanCacheSource(base_url))
+
+
+def is_offline() -> bool:
+    """Check if any registered source forbids network access"""
+    return any(source.offline for source in _sources)
 
 
-def download(
-    url: str,
+def is_recording() -> bool:
+    """Check if any registered source records what's fetched"""
+    return any(source.recording for source in _sources)
+
+
+# Equivalent hosts of the same files: url prefix -> mirror prefixes
+_mirror_prefixes: dict[str, list[str]] = {
+    "https://download.jetbrains.com/": ["https://download-cdn.jetbrains.com/"],
+}
+
+
+def mirrors_of(url: str) -> list[str]:
+    """
+    The url & its mirrors, for downloading segments from all of them at once
+
+    More mirrors are read from $PY_APPS_MIRRORS, such as
+    "https://github.com/=https://ghproxy.net/https://github.com/",
+    several rules are separated by ";"
+
+    Params:
+        str url: the original url
+
+    Returns: list[str], the original url first
+    """
+    rules: dict[str, list[str]] = {
+        prefix: list(mirrors) for prefix, mirrors in _mirror_prefixes.items()
+    }
+    for rule in environ.get("PY_APPS_MIRRORS", "").split(";"):
+        prefix, _, mirror = rule.partition("=")
+        if prefix and mirror:
+            rules.setdefault(prefix, []).append(mirror)
+
+    urls: list[str] = [url]
+    for prefix, mirrors in rules.items():
+        if url.startswith(prefix):
+            urls.extend(mirror + url[len(prefix) :] for mirror in mirrors)
+    return urls
+
+
+def upstream_url(url: str) -> str:
+    """
+    The url actually requested, $PY_APPS_UPSTREAM sends every request to a
+    fixture server instead (see utils/fixture_server.py), such as
+    "https://api.github.com/x" -> "http://127.0.0.1:8490/https/api.github.com/x"
+
+    Params:
+        str url: the original url
+
+    Returns: str
+    """
+    upstream: str = environ.get("PY_APPS_UPSTREAM", "").rstrip("/")
+    if not upstream:
+        return url
+    scheme, _, rest = url.partition("://")
+    return f"{upstream}/{scheme}/{rest}"
+
+
+def _downloader() -> str:
+    """
+    The download backend, $PY_APPS_DOWNLOADER:
+        rpc       the session's aria2c daemon (default, see utils/aria2_rpc.py)
+        process   one aria2c process per file
+        native    the segmented downloader of utils/segmented.py, no aria2c needed
+    """
+    return environ.get("PY_APPS_DOWNLOADER", "rpc")
+
+
+def download(  # pylint: disable=too-many-arguments
+    url: str | list[str],
     file_path: str = "",
     no_conf: bool = True,
     overwrite: bool = False,
     check_cert: bool = False,
-) -> None:
+    *,
+    max_speed: int = 0,
+    options: dict[str, str] | None = None,
+    cancel: Event | None = None,
+) -> bool:
     """
-    This function is for downloading files from remote url using aria2c
+    This function is for downloading files from remote url using aria2c,
+    through the session's aria2c RPC daemon by default
+
+    Several equivalent urls (such as the ones of mirrors_of()) are downloaded
+    from at once, the faster ones fetching more segments
 
     Params:
-        str url: the remote file url
+        str | list[str] url: the remote file url, or its equivalent urls, the first
+            one identifies the file for bundles & caches
         str file_path: the output file path, starts with a "/"
-        bool no_conf: whether to use the default aria2 config file
+        bool no_conf: whether to use the default aria2 config file, for "process" only
         bool overwrite: whether to overwrite the already existed file
         bool check_cert: check certificate
+        int max_speed: the download speed limit in bytes per second, 0 for no limit
+        dict[str, str] | None options: more aria2c options, such as {"split": "8"}
+        Event | None cancel: set to stop the download midway, it returns False
+            quietly then, not for the "process" backend
+
+    Returns: bool, whether it's downloaded, errors are printed
+    """
+    urls: list[str] = [url] if isinstance(url, str) else url
+
+    _use_lan_cache()
+
+    for source in _sources:
+        if source.fetch(urls[0], file_path):
+            return True
+
+    download_options: dict[str, str] = {
+        # Allow overwrite or else it'll be like a.txt.1, a.txt.2 ...
+        "allow-overwrite": str(overwrite).lower(),
+        "check-certificate": str(check_cert).lower(),
+        # Share the bandwidth with other downloads
+        "max-download-limit": str(max_speed),
+        # Prefer the sources measured faster, one connection per source at least
+        **(
+            {"uri-selector": "adaptive", "split": str(max(5, len(urls)))}
+            if len(urls) > 1
+            else {}
+        ),
+        **(options or {}),
+    }
+
+    request_urls: list[str] = [upstream_url(source_url) for source_url in urls]
+
+    # pylint: disable=import-outside-toplevel
+    try:
+        match _downloader():
+            case "native":
+                from py_apps.utils.segmented import SegmentedDownload
+
+                SegmentedDownload(
+                    request_urls, file_path, max_speed=max_speed, cancel=cancel
+                ).run()
+            case "process":
+                _download_process(request_urls, file_path, no_conf, download_options)
+            case _:
+                from py_apps.utils.aria2_rpc import rpc_session
+
+                rpc_session().download(
+                    [(request_urls, file_path, download_options)], cancel
+                )
+    except (Aria2Error, OSError, CalledProcessError) as err:
+        if cancel is not None and cancel.is_set():
+            return False
+        print(
+            "\033[91m\033[1m[Error]",
+            f"An error occurred when downloading {urls[0]} to {file_path}",
+        )
+        print(f"\033[31mError message\033[0m\n\t{str(err)}")
+        return False
+
+    for source in _sources:
+        source.store(urls[0], file_path)
+    return True
+
+
+def _download_process(
+    urls: list[str], file_path: str, no_conf: bool, download_options: dict[str, str]
+) -> None:
+    """
+    Download with one aria2c process for the file
+
+    Throws: CmdNotFoundError, CalledProcessError
     """
     if not check_cmd_exists("aria2c"):
         raise CmdNotFoundError("aria2c")
@@ -36,7 +295,7 @@ def download(
     ls_of_file_and_path: list[str] = file_path.split("/")
     ls_of_file_and_path.pop(0)
 
-    run(
+    stream(
         [
             "aria2c",
             # Set log level to "info"
@@ -48,18 +307,16 @@ def download(
             # Set process number to 5
             # an average between anti-scrap policy and download speed
             *"-s 5 -x 5".split(" "),
-            # Disable check cert
-            f"--check-certificate={str(check_cert).lower()}",
-            # Allow overwrite or else it'll be like a.txt.1, a.txt.2 ...
-            f"--allow-overwrite={str(overwrite).lower()}",
+            *[f"--{key}={value}" for key, value in download_options.items()],
+            # The readout is parsed for the jobs screen, every second
+            *(["--summary-interval=1"] if current_job() is not None else []),
             # Set output file path to file_path
             "-o",
             "/".join(ls_of_file_and_path),
             *"-d /".split(" "),
-            # Download URL
-            url,
-        ],
-        f"when downloading {url} to {file_path}",
+            # Download URLs, all of them for the same file
+            *urls,
+        ]
     )
 
 
@@ -99,19 +356,41 @@ def get_github_releases(repo: str, version: str = "latest") -> list[str]:
     return assets
 
 
-def get(url: str, headers: dict | None = None):
+def get(url: str, headers: dict | None = None, fatal: bool = True):
     """
     Encapsulation for requests.get with err processer
+
+    Params:
+        str url: the url
+        dict | None headers: the request headers
+        bool fatal: exit on errors, or return None when False
     """
 
+    _use_lan_cache()
+
+    for source in _sources:
+        content: bytes | None = source.fetch_content(url)
+        if content is not None:
+            return CachedResponse(url, content)
+
+    # requests takes ~100ms to import, only load it when going to the network
+    # pylint: disable=import-outside-toplevel
+    from requests import get as req_get
+    from requests.exceptions import RequestException
+
     if headers is None:
         # Fix "dangerous" default value {}
         headers = {}
     try:
-        res = req_get(url=url, headers=headers, timeout=10)
+        res = req_get(url=upstream_url(url), headers=headers, timeout=10)
         res.raise_for_status()
     except RequestException as err:
         print(str(err))
+        if not fatal:
+            return None
         sys_exit("request_error")
 
+    for source in _sources:
+        source.store_content(url, res.content)
+
     return res
@@ -0,0 +1,360 @@
+"""
+A local full-text index of the packages in the distro repositories
+
+Built from the metadata the package managers keep on disk, no network needed:
+    apt      /var/lib/apt/lists/*_Packages
+    pacman   /var/lib/pacman/sync/*.db
+    apk      /var/cache/apk/APKINDEX.*.tar.gz
+    dnf      /var/cache/dnf/*/repodata/*-primary.xml.* (also libdnf5 & zypper)
+
+The index is a SQLite FTS5 table. Every metadata file is a source, only the
+sources whose size or mtime changed are parsed again on refresh.
+"""
+
+import sqlite3
+from bz2 import decompress as bz2_decompress
+from glob import glob
+from gzip import decompress as gzip_decompress
+from io import BytesIO
+from lzma import decompress as lzma_decompress
+from os import path, stat
+from re import findall
+from subprocess import PIPE, CalledProcessError, run
+from tarfile import TarFile
+from tarfile import open as open_tarfile
+from typing import Callable, Iterator, NamedTuple
+from xml.etree.ElementTree import iterparse
+
+from py_apps.utils.cache import cache_dir
+from py_apps.utils.cmd import check_cmd_exists
+
+
+SCHEMA_VERSION: int = 1
+
+# (name, version, summary)
+Package = tuple[str, str, str]
+
+_schema: str = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pkgs (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pkgs_source ON pkgs(source_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS pkg_fts USING fts5(
+    name, summary, content='pkgs', content_rowid='id', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS pkgs_insert AFTER INSERT ON pkgs BEGIN
+    INSERT INTO pkg_fts(rowid, name, summary) VALUES (new.id, new.name, new.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS pkgs_delete AFTER DELETE ON pkgs BEGIN
+    INSERT INTO pkg_fts(pkg_fts, rowid, name, summary)
+    VALUES ('delete', old.id, old.name, old.summary);
+END;
+"""
+
+
+class PackageRecord(NamedTuple):
+    """A package found in the index"""
+
+    name: str
+    version: str
+    summary: str
+    # The package manager the metadata is from, such as "apt"
+    kind: str
+
+
+def _decompress(data: bytes) -> bytes:
+    """Decompress the metadata by its magic number, zstd & lz4 need their cmds"""
+    if data[:2] == b"\x1f\x8b":
+        return gzip_decompress(data)
+    if data[:6] == b"\xfd7zXZ\x00":
+        return lzma_decompress(data)
+    if data[:3] == b"BZh":
+        return bz2_decompress(data)
+
+    for magic, cmd in [
+        (b"\x28\xb5\x2f\xfd", ["zstd", "-dcq"]),
+        (b"\x04\x22\x4d\x18", ["lz4", "-dcq"]),
+    ]:
+        if data[:4] == magic:
+            if not check_cmd_exists(cmd[0]):
+                raise ValueError(f"{cmd[0]} is needed to read this metadata")
+            return run(cmd, input=data, stdout=PIPE, check=True).stdout
+
+    return data
+
+
+def _read(file_path: str) -> bytes:
+    with open(file_path, "rb") as metadata:
+        return _decompress(metadata.read())
+
+
+def parse_apt(file_path: str) -> Iterator[Package]:
+    """Parse an apt Packages list, stanzas of "Field: value" lines"""
+    for stanza in _read(file_path).decode("utf-8", "replace").split("\n\n"):
+        fields: dict[str, str] = {}
+        for line in stanza.splitlines():
+            # Continuation lines start with a space
+            if line and not line[0].isspace():
+                key, _, value = line.partition(":")
+                fields[key] = value.strip()
+        if "Package" in fields:
+            yield fields["Package"], fields.get("Version", ""), fields.get(
+                "Description", ""
+            )
+
+
+def _tar_of(file_path: str) -> TarFile:
+    return open_tarfile(fileobj=BytesIO(_read(file_path)), mode="r:")
+
+
+def parse_pacman(file_path: str) -> Iterator[Package]:
+    """Parse a pacman sync db, a tar of <name>-<version>/desc files"""
+    with _tar_of(file_path) as tar:
+        for member in tar:
+            if not member.name.endswith("/desc"):
+                continue
+            desc_file = tar.extractfile(member)
+            if desc_file is None:
+                continue
+
+            # %FIELD%\nvalue\n\n blocks
+            fields: dict[str, str] = {}
+            for block in desc_file.read().decode("utf-8", "replace").split("\n\n"):
+                key, _, value = block.strip().partition("\n")
+                fields[key] = value.split("\n")[0]
+            if "%NAME%" in fields:
+                yield fields["%NAME%"], fields.get("%VERSION%", ""), fields.get(
+                    "%DESC%", ""
+                )
+
+
+def parse_apk(file_path: str) -> Iterator[Package]:
+    """Parse an APKINDEX.tar.gz, records of "X:value" lines"""
+    with _tar_of(file_path) as tar:
+        index_file = tar.extractfile("APKINDEX")
+        if index_file is None:
+            return
+        for record in index_file.read().decode("utf-8", "replace").split("\n\n"):
+            fields: dict[str, str] = dict(
+                (line[0], line[2:]) for line in record.splitlines() if line[1:2] == ":"
+            )
+            if "P" in fields:
+                yield fields["P"], fields.get("V", ""), fields.get("T", "")
+
+
+def parse_rpm_md(file_path: str) -> Iterator[Package]:
+    """Parse a repodata primary.xml, used by dnf & zypper"""
+    name: str = ""
+    version: str = ""
+
+    for _, elem in iterparse(BytesIO(_read(file_path))):
+        # Strip the namespace
+        tag: str = elem.tag.rpartition("}")[2]
+        if tag == "name":
+            name = elem.text or ""
+        elif tag == "version":
+            version = f"{elem.get('ver', '')}-{elem.get('rel', '')}"
+        elif tag == "summary":
+            yield name, version, elem.text or ""
+        elif tag == "package":
+            elem.clear()
+
+
+# Metadata globs, relative to the root
+_source_globs: dict[str, list[str]] = {
+    "apt": ["var/lib/apt/lists/*_Packages", "var/lib/apt/lists/*_Packages.*"],
+    "pacman": ["var/lib/pacman/sync/*.db"],
+    "apk": ["var/cache/apk/APKINDEX.*.tar.gz", "etc/apk/cache/APKINDEX.*.tar.gz"],
+    "rpm-md": [
+        "var/cache/dnf/*/repodata/*primary.xml*",
+        "var/cache/libdnf5/*/repodata/*primary.xml*",
+        "var/cache/zypp/raw/*/repodata/*primary.xml*",
+    ],
+}
+
+_parsers: dict[str, Callable[[str], Iterator[Package]]] = {
+    "apt": parse_apt,
+    "pacman": parse_pacman,
+    "apk": parse_apk,
+    "rpm-md": parse_rpm_md,
+}
+
+
+def find_sources(root: str = "/") -> dict[str, str]:
+    """
+    Find the package metadata files on the system
+
+    Params:
+        str root: the root dir, for indexing another rootfs
+
+    Returns: dict[str, str], file path -> kind
+    """
+    sources: dict[str, str] = {}
+    for kind, patterns in _source_globs.items():
+        for pattern in patterns:
+            for file_path in glob(path.join(root, pattern)):
+                # Skip the diff indexes of apt
+                if not file_path.endswith(".diff_Index"):
+                    sources[file_path] = kind
+    return sources
+
+
+def _fts_query(query: str) -> str:
+    """Every word of the query as a prefix, all of them must match"""
+    return " ".join(f'"{word}"*' for word in findall(r"\w+", query.lower()))
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class PackageIndex:
+    """
+    The on-disk package index
+
+    Params:
+        str db_path: the SQLite file, under the cache dir by default
+        str root: the root dir to find the metadata in
+    """
+
+    def __init__(self, db_path: str = "", root: str = "/") -> None:
+        self.db_path: str = db_path or path.join(cache_dir("pkg-index"), "index.db")
+        self.root = root
+        self.db = sqlite3.connect(self.db_path)
+
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            for table in ["pkg_fts", "pkgs", "sources"]:
+                self.db.execute(f"DROP TABLE IF EXISTS {table}")
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.executescript(_schema)
+
+    def refresh(self) -> tuple[int, int]:
+        """
+        Index the metadata files changed since the last refresh
+
+        Returns: tuple[int, int], the sources parsed & the packages indexed now
+        """
+        found: dict[str, str] = find_sources(self.root)
+        known: dict[str, tuple[int, int, int]] = {
+            row[0]: row[1:]
+            for row in self.db.execute("SELECT path, id, mtime_ns, size FROM sources")
+        }
+        parsed: int = 0
+
+        with self.db:
+            # Drop the sources gone, such as the lists of a removed repo
+            for file_path in known.keys() - found.keys():
+                self._drop_source(known[file_path][0])
+
+            for file_path, kind in found.items():
+                file_stat = stat(file_path)
+                if file_path in known and known[file_path][1:] == (
+                    file_stat.st_mtime_ns,
+                    file_stat.st_size,
+                ):
+                    continue
+
+                if file_path in known:
+                    self._drop_source(known[file_path][0])
+                try:
+                    packages: list[Package] = list(_parsers[kind](file_path))
+                except (OSError, ValueError, CalledProcessError) as err:
+                    print(f"Skipping {file_path}: {err}")
+                    continue
+
+                source_id: int | None = self.db.execute(
+                    "INSERT INTO sources (path, kind, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                    (file_path, kind, file_stat.st_mtime_ns, file_stat.st_size),
+                ).lastrowid
+                self.db.executemany(
+                    "INSERT INTO pkgs (source_id, name, version, summary) "
+                    + "VALUES (?, ?, ?, ?)",
+                    [(source_id, *package) for package in packages],
+                )
+                parsed += 1
+
+        total: int = self.db.execute("SELECT count(*) FROM pkgs").fetchone()[0]
+        return parsed, total
+
+    def _drop_source(self, source_id: int) -> None:
+        self.db.execute("DELETE FROM pkgs WHERE source_id = ?", (source_id,))
+        self.db.execute("DELETE FROM sources WHERE id = ?", (source_id,))
+
+    def search(self, query: str, limit: int = 100) -> list[PackageRecord]:
+        """
+        Search the packages, exact & prefix name matches first, then the words
+        of the name & the summary, then the names containing the query's chars
+        in order (fuzzy)
+
+        Params:
+            str query: the words typed
+            int limit: the max number of packages returned
+
+        Returns: list[PackageRecord], one per package name
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        records: dict[str, PackageRecord] = {}
+        fts_query: str = _fts_query(query)
+
+        if fts_query:
+            # The same package may be in several repos, fetch some more
+            for row in self.db.execute(
+                "SELECT p.name, p.version, p.summary, s.kind FROM pkg_fts "
+                + "JOIN pkgs p ON p.id = pkg_fts.rowid "
+                + "JOIN sources s ON s.id = p.source_id "
+                + "WHERE pkg_fts MATCH ? "
+                + "ORDER BY p.name = ? DESC, p.name LIKE ? ESCAPE '\\' DESC, "
+                + "bm25(pkg_fts, 10.0, 1.0), length(p.name) LIMIT ?",
+                (fts_query, query, f"{_escape_like(query)}%", limit * 3),
+            ):
+                records.setdefault(row[0], PackageRecord(*row))
+
+        if len(records) < limit:
+            pattern: str = (
+                "%" + "%".join(map(_escape_like, query.replace(" ", ""))) + "%"
+            )
+            for row in self.db.execute(
+                "SELECT p.name, p.version, p.summary, s.kind FROM pkgs p "
+                + "JOIN sources s ON s.id = p.source_id "
+                + "WHERE p.name LIKE ? ESCAPE '\\' ORDER BY length(p.name) LIMIT ?",
+                (pattern, limit * 3),
+            ):
+                records.setdefault(row[0], PackageRecord(*row))
+
+        return list(records.values())[:limit]
+
+    def versions(self, names: list[str]) -> dict[str, list[str]]:
+        """
+        The versions of packages in the repos, by exact name
+
+        Params:
+            list[str] names: the package names
+
+        Returns: dict[str, list[str]], name -> the versions of every repo having it
+        """
+        versions: dict[str, list[str]] = {}
+        for name, version in self.db.execute(
+            "SELECT name, version FROM pkgs "
+            + f"WHERE name IN ({', '.join('?' * len(names))})",
+            names,
+        ):
+            versions.setdefault(name, []).append(version)
+        return versions
+
+    def close(self) -> None:
+        """Close the database"""
+        self.db.close()
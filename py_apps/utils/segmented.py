@@ -0,0 +1,315 @@
+"""
+A native segmented downloader, fetching one file from several equivalent sources
+
+The file is cut into pieces, every source has a few connections pulling the next
+piece from a shared queue, so a faster source naturally fetches more of them.
+When the queue is empty, an idle connection steals the second half of the
+biggest piece still in flight on a slower source. A source failing repeatedly
+is dropped, and its pieces go back to the queue for the others. Setting the
+cancel event stops every connection after its current chunk.
+"""
+
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from os import O_CREAT, O_TRUNC, O_WRONLY, close, ftruncate
+from os import open as open_fd
+from os import pwrite
+from re import fullmatch
+from threading import Event, Lock, Thread
+from time import monotonic, sleep
+from typing import NamedTuple
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+
+from py_apps.utils.jobs import Job, current_job
+
+
+PIECE_SIZE: int = 4 * 1024 * 1024
+
+CHUNK_SIZE: int = 64 * 1024
+
+# Pieces smaller than this aren't worth stealing
+MIN_STEAL: int = 512 * 1024
+
+MAX_FAILURES: int = 3
+
+
+class DownloadReport(NamedTuple):
+    """What a segmented download did"""
+
+    size: int
+    seconds: float
+    # Bytes fetched from each source url
+    per_source: dict[str, int]
+
+
+class _Source:
+    """A source url & its measured throughput"""
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        # The url after the redirects, requested directly
+        self.resolved: str = url
+        self.fetched: int = 0
+        self.busy_seconds: float = 0
+        self.failures: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second while downloading"""
+        return self.fetched / self.busy_seconds if self.busy_seconds else 0
+
+    @property
+    def dead(self) -> bool:
+        """Whether it failed too many times"""
+        return self.failures >= MAX_FAILURES
+
+
+class _Piece:  # pylint: disable=too-few-public-methods
+    """A byte range [pos, end) still to be fetched"""
+
+    def __init__(self, pos: int, end: int) -> None:
+        self.pos = pos
+        self.end = end
+        self.owner: _Source | None = None
+
+    @property
+    def remaining(self) -> int:
+        """Bytes still to be fetched"""
+        return self.end - self.pos
+
+
+def _connection(url: str) -> HTTPConnection:
+    parts = urlsplit(url)
+    connection_class = HTTPSConnection if parts.scheme == "https" else HTTPConnection
+    return connection_class(parts.netloc, timeout=30)
+
+
+def _request_path(url: str) -> str:
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+class SegmentedDownload:  # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """
+    Download one file from several equivalent urls at once
+
+    Params:
+        list[str] urls: the sources, all serving the same file
+        str file_path: the output file path
+        int connections: the connections per source
+        int piece_size: the bytes fetched per request
+        int max_speed: the speed limit of all the connections in bytes per second,
+            0 for no limit
+        Event | None cancel: set to stop the download
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        urls: list[str],
+        file_path: str,
+        connections: int = 2,
+        piece_size: int = PIECE_SIZE,
+        *,
+        max_speed: int = 0,
+        cancel: Event | None = None,
+    ) -> None:
+        self.sources: list[_Source] = [_Source(url) for url in urls]
+        self.file_path = file_path
+        self.connections = connections
+        self.piece_size = piece_size
+        self.max_speed = max_speed
+        self.cancel: Event = cancel if cancel is not None else Event()
+        self.size: int = 0
+        self._start: float = 0
+        self._queue: list[_Piece] = []
+        self._in_flight: list[_Piece] = []
+        self._lock = Lock()
+        self._fd: int = -1
+        self._job: Job | None = None
+
+    def _probe(self) -> None:
+        """
+        Follow the redirects of every source & get the size from the ones
+        supporting ranges, the others are dropped
+
+        Throws: OSError when no source supports ranges
+        """
+        for source in self.sources:
+            total: int | None = None
+            try:
+                request = Request(source.url, headers={"Range": "bytes=0-0"})
+                with urlopen(request, timeout=30) as res:
+                    matched = fullmatch(
+                        r"bytes 0-0/(\d+)", res.headers.get("Content-Range", "")
+                    )
+                    if res.status == 206 and matched is not None:
+                        total = int(matched.group(1))
+                    source.resolved = res.geturl()
+            except OSError:
+                pass
+
+            # Not equivalent to the first source, or no ranges
+            if total is None or total != (self.size or total):
+                source.failures = MAX_FAILURES
+                continue
+            self.size = total
+
+        if not any(not source.dead for source in self.sources):
+            raise OSError(f"No source of {self.file_path} supports ranged requests")
+
+    def _next_piece(self, source: _Source) -> _Piece | None:
+        """The next piece for the source, stolen from a slower one if needed"""
+        with self._lock:
+            if self._queue:
+                piece: _Piece = self._queue.pop(0)
+            else:
+                # Split the biggest piece in flight on a slower source
+                slower: list[_Piece] = [
+                    piece
+                    for piece in self._in_flight
+                    if piece.owner is not None
+                    and piece.owner.throughput < source.throughput
+                    and piece.remaining >= 2 * MIN_STEAL
+                ]
+                if not slower:
+                    return None
+                victim: _Piece = max(slower, key=lambda piece: piece.remaining)
+                middle: int = victim.pos + victim.remaining // 2
+                piece = _Piece(middle, victim.end)
+                victim.end = middle
+
+            piece.owner = source
+            self._in_flight.append(piece)
+            return piece
+
+    def _fetch(self, conn: HTTPConnection, source: _Source, piece: _Piece) -> bool:
+        """
+        Fetch a piece, it may shrink meanwhile when stolen
+
+        Returns: bool, whether the connection can be reused
+        """
+        start: float = monotonic()
+        conn.request(
+            "GET",
+            _request_path(source.resolved),
+            headers={"Range": f"bytes={piece.pos}-{piece.end - 1}"},
+        )
+        res = conn.getresponse()
+        if res.status != 206:
+            raise OSError(f"{source.url} answered {res.status} to a ranged request")
+
+        while True:
+            chunk: bytes = res.read(CHUNK_SIZE)
+            with self._lock:
+                # The range is this piece's now, even if it's stolen right after
+                offset, length = piece.pos, min(len(chunk), piece.remaining)
+                piece.pos += length
+                source.fetched += length
+                done: bool = piece.remaining <= 0 or not chunk
+                if done:
+                    source.busy_seconds += monotonic() - start
+                    if piece in self._in_flight:
+                        self._in_flight.remove(piece)
+            pwrite(self._fd, chunk[:length], offset)
+            self._report()
+            if done:
+                break
+            if self.cancel.is_set():
+                raise OSError(f"{self.file_path} cancelled")
+            self._throttle()
+
+        if piece.remaining > 0:
+            raise OSError(f"{source.url} closed the connection early")
+        # The rest of the response wasn't read when the piece was stolen
+        return res.isclosed() or not res.read(1)
+
+    def _work(self, source: _Source) -> None:
+        conn: HTTPConnection = _connection(source.resolved)
+
+        while not source.dead and not self.cancel.is_set():
+            piece: _Piece | None = self._next_piece(source)
+            if piece is None:
+                with self._lock:
+                    unfinished: bool = bool(self._queue or self._in_flight)
+                # Pieces may come back from a failing source
+                if not unfinished:
+                    break
+                sleep(0.05)
+                continue
+            try:
+                if not self._fetch(conn, source, piece):
+                    conn.close()
+                    conn = _connection(source.resolved)
+            except (OSError, HTTPException):
+                conn.close()
+                conn = _connection(source.resolved)
+                with self._lock:
+                    source.failures += 1
+                    # Give the rest back to the others
+                    if piece in self._in_flight:
+                        self._in_flight.remove(piece)
+                    if piece.remaining > 0:
+                        piece.owner = None
+                        self._queue.insert(0, piece)
+
+        conn.close()
+
+    def _throttle(self) -> None:
+        """Sleep while the bytes fetched are ahead of max_speed"""
+        if self.max_speed <= 0:
+            return
+        fetched: int = sum(source.fetched for source in self.sources)
+        ahead: float = fetched / self.max_speed - (monotonic() - self._start)
+        if ahead > 0:
+            self.cancel.wait(ahead)
+
+    def _report(self) -> None:
+        if self._job is not None:
+            self._job.update(
+                sum(source.fetched for source in self.sources), self.size, "下载"
+            )
+
+    def run(self) -> DownloadReport:
+        """
+        Download the file
+
+        Returns: DownloadReport
+
+        Throws: OSError when the sources fail, or it's cancelled
+        """
+        start: float = monotonic()
+        self._job = current_job()
+        self._probe()
+        self._start = monotonic()
+
+        self._queue = [
+            _Piece(pos, min(pos + self.piece_size, self.size))
+            for pos in range(0, self.size, self.piece_size)
+        ]
+        self._fd = open_fd(self.file_path, O_WRONLY | O_CREAT | O_TRUNC, 0o644)
+        try:
+            ftruncate(self._fd, self.size)
+
+            workers: list[Thread] = [
+                Thread(target=self._work, args=(source,), daemon=True)
+                for source in self.sources
+                if not source.dead
+                for _ in range(self.connections)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        finally:
+            close(self._fd)
+
+        if self.cancel.is_set():
+            raise OSError(f"{self.file_path} cancelled")
+        if self._queue or self._in_flight:
+            raise OSError(f"Every source of {self.file_path} failed")
+
+        return DownloadReport(
+            size=self.size,
+            seconds=monotonic() - start,
+            per_source={source.url: source.fetched for source in self.sources},
+        )
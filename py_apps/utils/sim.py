@@ -0,0 +1,399 @@
+"""
+A simulated multi-distro harness: the full prepare() / install() flow of every app,
+against fixture rootfs dirs instead of the real system
+
+Every cell of the distro x arch x app matrix runs in its own worker process with:
+    PY_APPS_ROOT        a fresh rootfs with the distro's /etc/os-release, so the
+                        installers detect the distro like on a real system
+    PATH                only fake tools (utils/fake_tool.py), every spawn is logged
+    get()               fixture responses, the network is never touched
+    download()          the "process" backend, the fake aria2c writes fixture artifacts
+
+The install is submitted to the background job queue, as the pages do. Each cell
+records its outcome, timings, the processes spawned & the spawns avoided in-process.
+"""
+
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from json import dumps, loads
+from multiprocessing import get_context
+from os import makedirs, path, symlink
+from re import sub
+from time import perf_counter
+from typing import NamedTuple
+
+from py_apps.errors.fixture_missing import FixtureMissingError
+from py_apps.utils.network import ArtifactSource
+
+
+# The os-release of every simulated distro
+OS_RELEASES: dict[str, str] = {
+    "debian": 'PRETTY_NAME="Debian GNU/Linux 12 (bookworm)"\nNAME="Debian GNU/Linux"\n'
+    + 'VERSION_ID="12"\nVERSION="12 (bookworm)"\nID=debian\n',
+    "ubuntu": 'PRETTY_NAME="Ubuntu 24.04.1 LTS"\nNAME="Ubuntu"\nVERSION_ID="24.04"\n'
+    + 'VERSION="24.04.1 LTS (Noble Numbat)"\nID=ubuntu\nID_LIKE=debian\n',
+    "fedora": 'NAME="Fedora Linux"\nVERSION="41 (Workstation Edition)"\nID=fedora\n'
+    + 'VERSION_ID=41\nPRETTY_NAME="Fedora Linux 41 (Workstation Edition)"\n',
+    "arch": 'NAME="Arch Linux"\nPRETTY_NAME="Arch Linux"\nID=arch\nBUILD_ID=rolling\n'
+    + 'VERSION="rolling"\n',
+    "suse": 'NAME="openSUSE Tumbleweed"\nID="opensuse-tumbleweed"\n'
+    + 'ID_LIKE="opensuse suse"\nVERSION="20241015"\n'
+    + 'PRETTY_NAME="openSUSE Tumbleweed"\n',
+    "void": 'NAME="Void"\nID="void"\nPRETTY_NAME="Void Linux"\nVERSION="rolling"\n',
+    "gentoo": 'NAME=Gentoo\nID=gentoo\nPRETTY_NAME="Gentoo Linux"\nVERSION="2.17"\n',
+}
+
+ARCHES: list[str] = ["amd64", "arm64"]
+
+# Every external tool the installers may run
+FAKE_TOOLS: list[str] = [
+    "sudo",
+    "eatmydata",
+    "env",
+    "apt",
+    "apt-get",
+    "apt-cache",
+    "add-apt-repository",
+    "dpkg",
+    "rpm",
+    "dnf",
+    "yum",
+    "zypper",
+    "pacman",
+    "xbps-install",
+    "emerge",
+    "dispatch-conf",
+    "apk",
+    "aria2c",
+    "git",
+    "bash",
+    "whereis",
+    "install",
+    "fakeroot",
+]
+
+# Dirs every rootfs has
+_rootfs_dirs: list[str] = [
+    "bin",
+    "etc/apt/preferences.d",
+    "opt",
+    "root",
+    "tmp",
+    "usr/bin",
+    "usr/lib",
+    "usr/local/bin",
+    "usr/share/applications",
+    "var/lib/dpkg/info",
+]
+
+_github_api: str = "https://api.github.com/repos"
+
+# Fixture responses of get(), by url prefix
+_responses: dict[str, str] = {
+    "https://vivaldi.com/": '<a href="https://downloads.vivaldi.com/stable/'
+    + 'vivaldi-stable_7.0.3495.6-1_amd64.deb">deb</a>'
+    + '<a href="https://downloads.vivaldi.com/stable/'
+    + 'vivaldi-stable-7.0.3495.6-1.x86_64.rpm">rpm</a>',
+    f"{_github_api}/goastian/midori-desktop/": dumps(
+        {
+            "assets": [
+                {"browser_download_url": f"https://github.com/goastian/{name}"}
+                for name in [
+                    "midori_11.5_amd64.deb",
+                    "midori_11.5_arm64.deb",
+                    "midori-11.5-1.x86_64.rpm",
+                    "midori-11.5-1-x86_64.pkg.tar.zst",
+                ]
+            ]
+        }
+    ),
+    f"{_github_api}/Skywalker0803/nvim-releases/": dumps(
+        {
+            "assets": [
+                {"browser_download_url": f"https://github.com/Skywalker0803/{name}"}
+                for name in ["nvim-linux.amd64.deb", "nvim-linux.arm64.deb"]
+            ]
+        }
+    ),
+    "https://raw.githubusercontent.com/LunarVim/": "echo lunarvim\n",
+    "https://spacevim.org/": "echo spacevim\n",
+}
+
+# Fixture artifacts written by the fake aria2c, by url prefix, or installed from
+# the repos by the fake package managers, by "pkg:<name>":
+#   {"files": {path in the rootfs: content}, "commands": [...]} for packages
+#   {"tarball": top dir, "files": {path in the archive: content}} for .tar.gz
+_vscode_tarball: dict = {
+    "tarball": "VSCode-linux",
+    "files": {"bin/code": "#!/bin/sh\n"},
+}
+_vivaldi_package: dict = {
+    "files": {
+        "usr/share/applications/vivaldi-stable.desktop": "[Desktop Entry]\n"
+        + "Exec=/usr/bin/vivaldi-stable %U\n"
+    },
+    "commands": ["vivaldi-stable"],
+}
+_artifacts: dict[str, dict] = {
+    "https://downloads.vivaldi.com/": _vivaldi_package,
+    "pkg:vivaldi": _vivaldi_package,
+    "pkg:vivaldi-snapshot": _vivaldi_package,
+    "https://github.com/goastian/": {"commands": ["midori"]},
+    "https://github.com/Skywalker0803/": {"commands": ["nvim"]},
+    "pkg:neovim": {"commands": ["nvim"]},
+    "https://go.microsoft.com/fwlink/?LinkID=760868": {"commands": ["code"]},
+    "https://go.microsoft.com/fwlink/?LinkID=760867": {"commands": ["code"]},
+    "https://go.microsoft.com/fwlink/?LinkID=620884": _vscode_tarball,
+    "https://aka.ms/linux-arm64-deb": {"commands": ["code"]},
+    "https://aka.ms/linux-arm64-rpm": {"commands": ["code"]},
+    "https://aka.ms/linux-arm64": _vscode_tarball,
+}
+
+
+def _jetbrains_fixtures() -> tuple[str, dict[str, dict]]:
+    """The release feed & the tarballs of every JetBrains IDE"""
+    # pylint: disable=import-outside-toplevel
+    from py_apps.apps.devtools.jetbrains import JetbrainsVariants, _product_codes
+
+    feed: dict[str, list] = {}
+    tarballs: dict[str, dict] = {}
+    for variant in JetbrainsVariants:
+        dirname: str = variant.name.lower().split("_")[0]
+        base_url: str = f"https://download.jetbrains.com/{dirname}/"
+        code: str = _product_codes[variant.value]
+        feed[code] = [
+            {
+                "version": "2099.1",
+                "downloads": {
+                    "linux": {"link": f"{base_url}{code}-2099.1.tar.gz"},
+                    "linuxARM64": {"link": f"{base_url}{code}-2099.1-aarch64.tar.gz"},
+                },
+            }
+        ]
+        tarballs[base_url] = {
+            "tarball": f"{dirname}-2099.1",
+            "files": {f"bin/{dirname}.sh": "#!/bin/sh\n", "lib/app.jar": "jar\n"},
+        }
+    return dumps(feed), tarballs
+
+
+def fixture_responses() -> dict[str, str]:
+    """
+    The fixture responses of get() by url prefix, the JetBrains feed included
+
+    Returns: dict[str, str]
+    """
+    # pylint: disable=import-outside-toplevel
+    from py_apps.apps.devtools.jetbrains import RELEASES_URL
+
+    return {**_responses, RELEASES_URL: _jetbrains_fixtures()[0]}
+
+
+class FixtureSource(ArtifactSource):
+    """
+    Serves every get() from the fixture responses, raises for the others
+    so that nothing goes to the network
+
+    Params:
+        dict[str, str] responses: url prefix -> response body
+    """
+
+    def __init__(self, responses: dict[str, str]) -> None:
+        self.responses = responses
+
+    def fetch_content(self, url: str) -> bytes | None:
+        matched: list[str] = [
+            prefix for prefix in self.responses if url.startswith(prefix)
+        ]
+        if not matched:
+            raise FixtureMissingError(url)
+        return self.responses[max(matched, key=len)].encode()
+
+
+class SimCell(NamedTuple):
+    """One cell of the matrix"""
+
+    distro: str
+    arch: str
+    app_id: str
+
+
+class CellResult(NamedTuple):
+    """What happened in a cell"""
+
+    cell: SimCell
+    # "ok", or "failed: <error>"
+    outcome: str
+    prepare_seconds: float
+    install_seconds: float
+    # Processes spawned, by tool
+    spawns: dict[str, int]
+    # Spawns avoided by utils/fileops.py
+    avoided: int
+    # The last lines of the job log
+    log: list[str]
+
+
+def _write(file_path: str, content: str) -> None:
+    makedirs(path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w", encoding="utf-8") as fixture:
+        fixture.write(content)
+
+
+def make_rootfs(root: str, distro: str) -> str:
+    """
+    Create a fixture rootfs with fake tools in its bin dir
+
+    Params:
+        str root: the rootfs dir, created
+        str distro: a key of OS_RELEASES
+
+    Returns: str, the bin dir of the fake tools
+    """
+    for rel_dir in _rootfs_dirs:
+        makedirs(path.join(root, rel_dir), exist_ok=True)
+
+    _write(path.join(root, "etc/os-release"), OS_RELEASES[distro])
+    if "debian" in OS_RELEASES[distro]:
+        _write(path.join(root, "etc/debian_version"), "12.8\n")
+
+    bin_dir: str = path.join(root, "bin")
+    tool_path: str = path.join(bin_dir, "fake-tool")
+    package_dir: str = path.dirname(path.dirname(path.dirname(path.abspath(__file__))))
+    _write(
+        tool_path,
+        f"#!{sys.executable} -I\nimport sys\nsys.path.insert(0, {package_dir!r})\n"
+        + "from py_apps.utils.fake_tool import main\nmain()\n",
+    )
+    os.chmod(tool_path, 0o755)
+    for tool in FAKE_TOOLS:
+        symlink(tool_path, path.join(bin_dir, tool))
+
+    return bin_dir
+
+
+# pylint: disable-next=too-many-locals
+def run_cell(cell: SimCell, workdir: str) -> CellResult:
+    """
+    Run prepare() & install() of one app in a fresh rootfs,
+    in a fresh process since the installers detect the distro on import
+
+    Params:
+        SimCell cell: the distro, arch & app
+        str workdir: the dir of the rootfs dirs
+    """
+    root: str = path.join(workdir, "-".join(cell).replace("/", "-"))
+    bin_dir: str = make_rootfs(root, cell.distro)
+    log_path: str = path.join(root, "spawns.jsonl")
+    artifacts_path: str = path.join(root, "artifacts.json")
+
+    os.environ.update(
+        PY_APPS_ROOT=root,
+        PATH=bin_dir,
+        HOME=path.join(root, "root"),
+        XDG_CACHE_HOME=path.join(root, "root/.cache"),
+        PY_APPS_SIM_LOG=log_path,
+        PY_APPS_SIM_ARTIFACTS=artifacts_path,
+        PY_APPS_DOWNLOADER="process",
+        PY_APPS_CACHE="off",
+        # The wrappers start the browsers by absolute paths, the host's ones
+        PY_APPS_BROWSER_CHECK="off",
+    )
+
+    # What isn't captured by the job goes to a file, not the harness' terminal
+    with open(path.join(root, "output.log"), "wb") as output:
+        os.dup2(output.fileno(), 1)
+        os.dup2(output.fileno(), 2)
+
+    # Imported after the rootfs is in place, the classes detect the distro
+    # pylint: disable=import-outside-toplevel
+    from py_apps.apps.registry import get_app
+    from py_apps.utils.fileops import avoided_spawns
+    from py_apps.utils.jobs import job_queue, submit_job
+    from py_apps.utils.network import add_source
+
+    _write(artifacts_path, dumps({**_artifacts, **_jetbrains_fixtures()[1]}))
+    add_source(FixtureSource(fixture_responses()))
+    seconds: dict[str, float] = {"prepare": 0, "install": 0}
+
+    def flow() -> None:
+        start: float = perf_counter()
+        app = get_app(cell.app_id, arch=cell.arch).prepare()
+        seconds["prepare"] = perf_counter() - start
+        start = perf_counter()
+        app.install()
+        seconds["install"] = perf_counter() - start
+
+    job = submit_job(cell.app_id, flow)
+    job_queue.wait()
+
+    spawns: Counter[str] = Counter()
+    if path.exists(log_path):
+        with open(log_path, encoding="utf-8") as log:
+            spawns.update(loads(line)[0] for line in log)
+
+    return CellResult(
+        cell=cell,
+        # Without the colors of the error messages
+        outcome=(
+            "ok"
+            if job.state == "done"
+            else sub(r"\033\[[\d;]*m", "", f"failed: {job.error}")
+        ),
+        prepare_seconds=seconds["prepare"],
+        install_seconds=seconds["install"],
+        spawns=dict(spawns),
+        avoided=sum(avoided_spawns().values()),
+        log=job.lines_since(max(job.log_count - 5, 0))[0],
+    )
+
+
+def matrix(distros: list[str], arches: list[str], app_ids: list[str]) -> list[SimCell]:
+    """Every combination of the distros, arches & apps"""
+    return [
+        SimCell(distro, arch, app_id)
+        for distro in distros
+        for arch in arches
+        for app_id in app_ids
+    ]
+
+
+def _run_cell_process(cell: SimCell, workdir: str) -> CellResult:
+    """run_cell() in a fresh process"""
+    # "spawn" gives the cell a clean interpreter, the distro is detected on import
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(run_cell, cell, workdir).result()
+
+
+def run_matrix(
+    cells: list[SimCell], workdir: str, workers: int = 0
+) -> list[CellResult]:
+    """
+    Run the cells in parallel worker processes, one fresh process per cell
+
+    Params:
+        list[SimCell] cells: see matrix()
+        str workdir: the dir of the rootfs dirs, such as a temp dir
+        int workers: the worker processes, the CPU count by default
+
+    Returns: list[CellResult], in the order of the cells
+    """
+    results: dict[SimCell, CellResult] = {}
+
+    # One single use process per cell, max_tasks_per_child needs python 3.11
+    with ThreadPoolExecutor(workers or os.cpu_count()) as pool:
+        futures = {
+            pool.submit(_run_cell_process, cell, workdir): cell for cell in cells
+        }
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as err:  # pylint: disable=broad-except
+                # Such as a crashed worker, the other cells go on
+                results[futures[future]] = CellResult(
+                    futures[future], f"failed: {err!r}", 0, 0, {}, 0, []
+                )
+
+    return [results[cell] for cell in cells]
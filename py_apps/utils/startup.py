@@ -0,0 +1,58 @@
+"""
+Startup times of apps, measured before & after tuning them: a few starts after
+a warm up one filling the caches, the median is reported
+"""
+
+from statistics import median
+from typing import Callable
+
+
+# Measured starts, the median is reported
+STARTUP_RUNS: int = 5
+
+
+def measure_startups(
+    start: Callable[[], float | None], runs: int = STARTUP_RUNS
+) -> list[float]:
+    """
+    Start an app runs times, after one warm up start
+
+    Params:
+        Callable start: starts the app once, returns the startup time in ms,
+            None when it didn't start
+        int runs: the number of measured starts
+
+    Returns: list[float], the startup times in ms, empty when the app can't start
+    """
+    times: list[float] = []
+    for run_index in range(runs + 1):
+        startup: float | None = start()
+        if startup is None:
+            return []
+        # The warm up start fills the caches
+        if run_index > 0:
+            times.append(startup)
+    return times
+
+
+def startup_report(before: list[float], after: list[float], name: str) -> str:
+    """
+    The before / after report
+
+    Params:
+        list[float] before: the startup times before the tuning, in ms
+        list[float] after: the startup times after the tuning, in ms
+        str name: the app measured
+
+    Returns: str
+    """
+    if not before or not after:
+        return f"{name} 启动时间：无法测量"
+
+    before_ms, after_ms = median(before), median(after)
+    return (
+        f"{name} 启动时间（{len(after)} 次的中位数）：\n"
+        + f"  优化前  {before_ms:7.1f} ms  （{min(before):.1f} ~ {max(before):.1f}）\n"
+        + f"  优化后  {after_ms:7.1f} ms  （{min(after):.1f} ~ {max(after):.1f}）"
+        + f"  {(after_ms - before_ms) * 100 / before_ms:+.0f}%"
+    )
@@ -0,0 +1,424 @@
+"""
+A content-addressed file store for the apps extracted into /opt
+
+Every regular file is stored once as objects/<sha256[:2]>/<sha256[2:]>-<mode>,
+and hardlinked into each install tree. Identical files (such as the JBR runtime
+and the platform jars shared by JetBrains IDEs) take the disk space only once.
+An object only linked by the store itself is garbage. Objects are read-only (the
+write bits dropped), as writing to one in place would change it in every tree;
+the file ops replace files with renames, which only unlink that tree's copy.
+
+The file manifest of every tree (relative path -> object name or symlink target)
+is kept in manifests/, so that an upgrade can tell what changed: the new tree is
+built next to the old one from links (only changed files are written),
+then swapped in with renames.
+
+Extractions (even in other processes) hold the store lock shared, & the garbage
+collection exclusive: an object just added isn't linked into its tree yet.
+"""
+
+from contextlib import contextmanager
+from fcntl import LOCK_EX, LOCK_SH, flock
+from hashlib import sha256
+from json import dump, load
+from os import (
+    chmod,
+    link,
+    lstat,
+    makedirs,
+    path,
+    remove,
+    rename,
+    replace,
+    symlink,
+    utime,
+    walk,
+)
+from shutil import copyfile, rmtree
+from tarfile import TarFile, TarInfo
+from tarfile import open as open_tarfile
+from tempfile import mkstemp
+from time import perf_counter
+from typing import IO, Iterator, NamedTuple
+
+from py_apps.utils.jobs import report_progress
+from py_apps.utils.sys import root_path
+
+
+STORE_ROOT: str = "/opt/.py_apps-store"
+
+CHUNK_SIZE: int = 1024 * 1024
+
+# Files up to this size are hashed in memory, so duplicates are never written
+MEMORY_LIMIT: int = 16 * 1024 * 1024
+
+# The write bits, dropped from the objects
+WRITE_BITS: int = 0o222
+
+
+class StoreReport(NamedTuple):
+    """What an extraction through the store did"""
+
+    files: int
+    # Bytes of all the regular files in the tree
+    total_bytes: int
+    # Bytes actually written to disk
+    written_bytes: int
+    # Bytes linked from the objects already in the store
+    deduped_bytes: int
+    seconds: float
+    # Estimated seconds the deduplicated bytes would have taken to write
+    saved_seconds: float
+    # For upgrades: files changed / added & removed compared with the old tree
+    changed_files: int = 0
+    removed_files: int = 0
+    upgrade: bool = False
+
+    def summary(self) -> str:
+        """A human readable summary"""
+        mib: int = 1024 * 1024
+        return (
+            f"{self.files} files, {self.total_bytes / mib:.1f} MiB in {self.seconds:.1f}s: "
+            + (
+                f"{self.changed_files} changed, {self.removed_files} removed, "
+                if self.upgrade
+                else ""
+            )
+            + f"{self.deduped_bytes / mib:.1f} MiB shared with other installs, "
+            + f"~{self.saved_seconds:.1f}s of writes saved"
+        )
+
+
+def _strip_top_dir(name: str) -> str:
+    """Strip the top dir of an archive member name, such as idea-IC-243.1/"""
+    return name.removeprefix("./").partition("/")[2]
+
+
+def _is_inside(file_path: str, real_target: str) -> bool:
+    """Check if file_path is in the target, symlinks resolved"""
+    real_path: str = path.realpath(file_path)
+    return real_path == real_target or real_path.startswith(real_target + "/")
+
+
+class ContentStore:
+    """
+    The content-addressed file store
+
+    Params:
+        str root: the store dir, must be on the same filesystem as the install trees,
+            STORE_ROOT under the root dir by default
+    """
+
+    def __init__(self, root: str = "") -> None:
+        self.root: str = root or root_path(STORE_ROOT)
+        self.objects_dir: str = path.join(self.root, "objects")
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        """Hold the store lock, across processes, until the block ends"""
+        makedirs(self.root, exist_ok=True)
+        with open(path.join(self.root, "lock"), "a", encoding="utf-8") as lock_file:
+            flock(lock_file, LOCK_EX if exclusive else LOCK_SH)
+            # Released when closed
+            yield
+
+    def _manifest_path(self, target: str) -> str:
+        return path.join(
+            self.root, "manifests", f"{path.abspath(target).replace('/', '_')}.json"
+        )
+
+    def load_manifest(self, target: str) -> dict[str, str] | None:
+        """
+        The file manifest recorded when target was extracted
+
+        Returns: dict[str, str] | None, relative path -> object name / "-> symlink"
+        """
+        try:
+            with open(self._manifest_path(target), "r", encoding="utf-8") as file:
+                return load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _save_manifest(self, target: str, manifest: dict[str, str]) -> None:
+        manifest_path: str = self._manifest_path(target)
+        makedirs(path.dirname(manifest_path), exist_ok=True)
+
+        with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as file:
+            dump(manifest, file)
+        replace(f"{manifest_path}.tmp", manifest_path)
+
+    def _object_path(self, digest: str, mode: int) -> str:
+        return path.join(self.objects_dir, digest[:2], f"{digest[2:]}-{mode:o}")
+
+    def _commit(self, tmp_path: str, digest: str, mode: int) -> str:
+        """Move a written temp file into the store, keeping the existing object"""
+        object_path: str = self._object_path(digest, mode)
+        makedirs(path.dirname(object_path), exist_ok=True)
+        # Shared by every tree, so no tree may write to it
+        chmod(tmp_path, mode & ~WRITE_BITS)
+
+        try:
+            # Another process may be adding the same object at the same time
+            link(tmp_path, object_path)
+        except FileExistsError:
+            pass
+        finally:
+            remove(tmp_path)
+
+        return object_path
+
+    def add(self, file_obj: IO[bytes], size: int, mode: int) -> tuple[str, int]:
+        """
+        Add a file to the store
+
+        Params:
+            IO[bytes] file_obj: the file content
+            int size: the file size
+            int mode: the permission bits, the object has them without the write bits
+
+        Returns: tuple[str, int], the object path & the bytes written
+        """
+        makedirs(self.objects_dir, exist_ok=True)
+
+        if size <= MEMORY_LIMIT:
+            content: bytes = file_obj.read()
+            digest: str = sha256(content).hexdigest()
+            if path.exists(self._object_path(digest, mode)):
+                return self._object_path(digest, mode), 0
+
+            fd, tmp_path = mkstemp(dir=self.objects_dir)
+            with open(fd, "wb") as tmp:
+                tmp.write(content)
+            return self._commit(tmp_path, digest, mode), size
+
+        # Too big for the memory: hash while writing
+        hasher = sha256()
+        fd, tmp_path = mkstemp(dir=self.objects_dir)
+        with open(fd, "wb") as tmp:
+            for chunk in iter(lambda: file_obj.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+                tmp.write(chunk)
+
+        digest = hasher.hexdigest()
+        existed: bool = path.exists(self._object_path(digest, mode))
+        return self._commit(tmp_path, digest, mode), size if not existed else 0
+
+    def _place(self, object_path: str, dest: str) -> None:
+        """Hardlink the object to dest, copy if linking isn't possible"""
+        if path.lexists(dest):
+            remove(dest)
+        try:
+            link(object_path, dest)
+        except OSError:
+            # Another filesystem, or too many links
+            copyfile(object_path, dest)
+            chmod(dest, lstat(object_path).st_mode)
+
+    def _extract_member(
+        self, tar: TarFile, member: TarInfo, dest: str, manifest: dict[str, str]
+    ) -> tuple[int, int]:
+        """
+        Extract one member to dest, recording it in the manifest
+
+        Returns: tuple[int, int], the file size & the bytes written
+        """
+        rel_path: str = _strip_top_dir(member.name)
+
+        if member.isdir():
+            makedirs(dest, exist_ok=True)
+            chmod(dest, member.mode | 0o700)
+            return 0, 0
+
+        makedirs(path.dirname(dest), exist_ok=True)
+
+        if member.issym():
+            if path.lexists(dest):
+                remove(dest)
+            symlink(member.linkname, dest)
+            manifest[rel_path] = f"-> {member.linkname}"
+            return 0, 0
+
+        if member.islnk():
+            linked: str = _strip_top_dir(member.linkname)
+            self._place(path.join(dest[: -len(rel_path)], linked), dest)
+            manifest[rel_path] = manifest.get(linked, "")
+            return 0, 0
+
+        if not member.isfile():
+            return 0, 0
+
+        file_obj: IO[bytes] | None = tar.extractfile(member)
+        if file_obj is None:
+            return 0, 0
+
+        object_path, written = self.add(file_obj, member.size, member.mode & 0o777)
+        self._place(object_path, dest)
+        manifest[rel_path] = path.basename(object_path)
+        utime(dest, (member.mtime, member.mtime))
+        return member.size, written
+
+    def extract_tgz(self, tgz_file: str, target: str) -> StoreReport:
+        """
+        Extract a .tar.gz file with one top dir to target through the store,
+        an existing target is upgraded
+
+        Params:
+            str tgz_file: the archive
+            str target: the install dir, such as /opt/goland
+
+        Returns: StoreReport
+        """
+        target = path.abspath(target)
+        if path.exists(target):
+            return self.upgrade_tgz(tgz_file, target)
+
+        report, manifest = self._extract_tree(tgz_file, target)
+        self._save_manifest(target, manifest)
+        return report
+
+    def _extract_tree(  # pylint: disable=too-many-locals
+        self, tgz_file: str, target: str
+    ) -> tuple[StoreReport, dict[str, str]]:
+        """Extract the archive to a new tree"""
+        start: float = perf_counter()
+        write_seconds: float = 0
+        files: int = 0
+        total: int = 0
+        written: int = 0
+        manifest: dict[str, str] = {}
+
+        makedirs(target, exist_ok=True)
+        real_target: str = path.realpath(target)
+        archive_size: int = path.getsize(tgz_file)
+
+        with self._locked(exclusive=False), open(tgz_file, "rb") as raw, open_tarfile(
+            fileobj=raw, mode="r:gz"
+        ) as tar:
+            # Members are streamed, the archive is read once
+            for member in tar:
+                # The compressed bytes read so far, for the jobs screen
+                report_progress(raw.tell(), archive_size, "解压")
+
+                dest: str = path.abspath(path.join(target, _strip_top_dir(member.name)))
+                # Skip the top dir itself & anything escaping the target
+                if dest == target or not dest.startswith(target + "/"):
+                    continue
+                # Nor through the symlinks of earlier members
+                if not _is_inside(
+                    dest if member.isdir() else path.dirname(dest), real_target
+                ):
+                    continue
+                if member.islnk() and not _is_inside(
+                    path.join(target, _strip_top_dir(member.linkname)), real_target
+                ):
+                    continue
+
+                member_start: float = perf_counter()
+                size, member_written = self._extract_member(tar, member, dest, manifest)
+                if member_written:
+                    write_seconds += perf_counter() - member_start
+
+                files += int(member.isfile())
+                total += size
+                written += member_written
+
+        # Estimate how long the shared bytes would have taken from the write speed
+        speed: float = written / write_seconds if write_seconds else 0
+        report = StoreReport(
+            files=files,
+            total_bytes=total,
+            written_bytes=written,
+            deduped_bytes=total - written,
+            seconds=perf_counter() - start,
+            saved_seconds=(total - written) / speed if speed else 0,
+        )
+        return report, manifest
+
+    def upgrade_tgz(self, tgz_file: str, target: str) -> StoreReport:
+        """
+        Upgrade an existing tree: build the new tree next to it (unchanged files
+        are only linked), swap it in, then drop the old tree & its stale objects
+
+        Params:
+            str tgz_file: the new archive
+            str target: the existing install dir
+
+        Returns: StoreReport
+        """
+        target = path.abspath(target)
+        new_tree: str = f"{target}.py_apps-new"
+        old_tree: str = f"{target}.py_apps-old"
+
+        for leftover in [new_tree, old_tree]:
+            if path.exists(leftover):
+                rmtree(leftover)
+
+        # Without a manifest (installed before the store), the old files are unknown
+        old_manifest: dict[str, str] = self.load_manifest(target) or {}
+
+        report, manifest = self._extract_tree(tgz_file, new_tree)
+
+        # Swap the trees, the target is missing only between the two renames
+        rename(target, old_tree)
+        rename(new_tree, target)
+        self._save_manifest(target, manifest)
+        rmtree(old_tree)
+        self.gc()
+
+        return report._replace(
+            upgrade=True,
+            changed_files=sum(
+                1 for rel, entry in manifest.items() if old_manifest.get(rel) != entry
+            ),
+            removed_files=sum(1 for rel in old_manifest if rel not in manifest),
+        )
+
+    def gc(self) -> tuple[int, int]:
+        """
+        Remove the objects no install tree links to anymore
+
+        Returns: tuple[int, int], the objects & bytes removed
+        """
+        removed: int = 0
+        freed: int = 0
+
+        # No extraction adds objects meanwhile
+        with self._locked(exclusive=True):
+            for dir_path, _, file_names in walk(self.objects_dir):
+                for file_name in file_names:
+                    object_path: str = path.join(dir_path, file_name)
+                    stat = lstat(object_path)
+                    # Only the store links to it
+                    if stat.st_nlink <= 1:
+                        remove(object_path)
+                        removed += 1
+                        freed += stat.st_size
+
+        return removed, freed
+
+    def uninstall(self, target: str) -> tuple[int, int]:
+        """
+        Remove an install tree and collect the garbage
+
+        Params:
+            str target: the install dir
+
+        Returns: tuple[int, int], the objects & bytes freed
+        """
+        if path.exists(target):
+            rmtree(target)
+        if path.exists(self._manifest_path(target)):
+            remove(self._manifest_path(target))
+        return self.gc()
+
+
+def extract_to_store(tgz_file: str, target: str) -> StoreReport:
+    """
+    Extract a .tar.gz file to target through the default store,
+    a module level function so that it can run in a process pool
+
+    Params:
+        str tgz_file: the archive
+        str target: the install dir
+    """
+    return ContentStore().extract_tgz(tgz_file, target)
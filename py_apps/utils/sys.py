@@ -3,12 +3,27 @@ This module contains some basic sys level funcs
 """
 
 from csv import reader
+from os import cpu_count, environ, path, sysconf
 from platform import machine
 from re import search
 
 from .common import architecture_aliases, distro_aliases, distro_list
 
 
+def root_path(file_path: str) -> str:
+    """
+    The path of a system file under the root dir, $PY_APPS_ROOT ("/" by default),
+    such as a fixture rootfs of the simulation harness (see utils/sim.py)
+
+    Params:
+        str file_path: the absolute path on the target system, such as /etc/os-release
+
+    Returns: str
+    """
+    root: str = environ.get("PY_APPS_ROOT", "")
+    return path.join(root, file_path.lstrip("/")) if root else file_path
+
+
 def get_distro_fullname() -> str:
     """
     Get the full name of current Linux distro (such as Ubuntu 22.04.5 LTS (Jammy Jellyfish))
@@ -17,14 +32,16 @@ def get_distro_fullname() -> str:
     """
     release_data = {}
 
-    with open("/etc/os-release", encoding="utf-8") as os_release:
+    with open(root_path("/etc/os-release"), encoding="utf-8") as os_release:
         release_reader = reader(os_release, delimiter="=")
         for row in release_reader:
             if row:
                 release_data[row[0]] = row[1]
 
         if release_data["ID"] in ["debian", "raspbian"]:
-            with open("/etc/debian_version", encoding="utf-8") as debian_release:
+            with open(
+                root_path("/etc/debian_version"), encoding="utf-8"
+            ) as debian_release:
                 debian_version = debian_release.readline().strip()
                 major_version = debian_version.split(".")[0]
             version_split = release_data["VERSION"].split(" ", maxsplit=1)
@@ -43,7 +60,7 @@ def get_distro_short_name() -> list[str]:
     """
 
     release_content: str = ""
-    with open("/etc/os-release", "r", encoding="utf-8") as release:
+    with open(root_path("/etc/os-release"), "r", encoding="utf-8") as release:
         release_content = " ".join(release.readlines())
 
     distro: str = ""
@@ -100,3 +117,50 @@ def check_architecture() -> str:
             break
 
     return architecture
+
+
+# Up to this RAM (MiB, MemTotal of a 4 GiB board is a bit less) a machine is small
+SMALL_RAM: int = 4608
+
+
+def hardware() -> tuple[int, int]:
+    """
+    The RAM & the cores of the machine
+
+    Returns: tuple[int, int], the RAM in MiB & the number of cores
+    """
+    ram: int = sysconf("SC_PAGE_SIZE") * sysconf("SC_PHYS_PAGES") // 1024**2
+    return ram, cpu_count() or 1
+
+
+def is_small_machine(ram: int | None = None, cores: int | None = None) -> bool:
+    """
+    Check if a machine is small: up to SMALL_RAM or 2 cores, such as a proot or ARM
+    device, the tunings go easy on its RAM there
+
+    Params:
+        int | None ram: the RAM in MiB, of this machine by default
+        int | None cores: the number of cores, of this machine by default
+
+    Returns: bool
+    """
+    if ram is None or cores is None:
+        ram, cores = hardware()
+    return ram <= SMALL_RAM or cores <= 2
+
+
+def is_proot() -> bool:
+    """Check if running under proot, which ptraces every process it runs"""
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as status:
+            tracer: str = next(
+                (line.split()[1] for line in status if line.startswith("TracerPid:")),
+                "0",
+            )
+        if tracer == "0":
+            return False
+        with open(f"/proc/{tracer}/comm", "r", encoding="utf-8") as comm:
+            return comm.read().startswith("proot")
+    except OSError:
+        # No /proc, or the tracer's is hidden
+        return False
@@ -5,10 +5,9 @@ Other utils in this proj
 from os import path
 from re import sub
 from subprocess import check_output
-from tarfile import open as open_tarfile
 
 from py_apps.utils.app_manage import install_app
-from py_apps.utils.cmd import run
+from py_apps.utils.sys import root_path
 
 
 def to_snakecase(string: str):
@@ -33,37 +32,9 @@ def fix_electron_libxssl(distro: str) -> None:
         case "redhat":
             install_app(distro, ["libXScrnSaver"])
         case "arch":
-            if not path.exists("/usr/lib/libnss3.so"):
+            if not path.exists(root_path("/usr/lib/libnss3.so")):
                 install_app(distro, ["nss"])
         case "suse":
             install_app(distro, ["mozilla-nss"])
         case _:
             install_app(distro, ["nss"])
-
-
-def extract_tgz_file(tgz_file: str, target_pathname: str):
-    """
-    Extract the .tar.gz file to the targeted pathname
-
-    Params:
-        str tgz_file
-        str target_pathname
-    """
-
-    pathname = target_pathname.split("/")
-    pathname.pop()
-    pathname = "/".join(pathname)
-
-    try:
-        with open_tarfile(tgz_file, "r:gz") as tar:
-            members = tar.getmembers()
-
-            dir_name: str = next(member.name for member in members if member.isdir())
-
-            tar.extractall(pathname)
-
-            run(["mv", f"{pathname}/{dir_name}", target_pathname])
-
-    except FileNotFoundError as err:
-        print(err)
-        print(f"File not found: {tgz_file}")
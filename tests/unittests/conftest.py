@@ -0,0 +1,33 @@
+from threading import Thread
+
+import pytest
+
+from py_apps.utils.fixture_server import FixtureServer, FixtureStore
+
+
+@pytest.fixture(name="fixture_server")
+def fixture_server_factory(tmp_path, monkeypatch):
+    """
+    Serve fixtures as the upstream of the native downloader, the LAN cache off:
+    fixture_server({url: content}) -> the started FixtureServer, shut down after the test
+    """
+    servers = []
+
+    def _serve(fixtures):
+        store = FixtureStore()
+        for url, content in fixtures.items():
+            store.add(url, content)
+        server = FixtureServer(("127.0.0.1", 0), store)
+        Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+        monkeypatch.setenv("PY_APPS_UPSTREAM", server.base_url)
+        monkeypatch.setenv("PY_APPS_DOWNLOADER", "native")
+        monkeypatch.setenv("PY_APPS_CACHE", "off")
+        return server
+
+    yield _serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,90 @@
+import json
+
+from py_apps.utils.app_manage import _parse_uris, _prefetch, prefetch_packages
+from py_apps.utils.fake_tool import FAKE_DEB
+from py_apps.utils.sim import make_rootfs
+
+
+def test_parse_uris():
+    apt = (
+        "'http://deb.debian.org/debian/pool/main/g/git/git_2.39.5-0%2bdeb12u1_amd64.deb' "
+        + "git_1%3a2.39.5-0+deb12u1_amd64.deb 7260372 SHA256:0123\n"
+    )
+    assert _parse_uris("debian", apt) == [
+        (
+            "http://deb.debian.org/debian/pool/main/g/git/git_2.39.5-0%2bdeb12u1_amd64.deb",
+            "git_1%3a2.39.5-0+deb12u1_amd64.deb",
+            "0123",
+        )
+    ]
+
+    pacman = (
+        "file:///var/cache/pacman/pkg/zlib-1.3-1-x86_64.pkg.tar.zst\n"
+        + "https://geo.mirror.pkgbuild.com/extra/os/x86_64/git-2.47.0-1-x86_64.pkg.tar.zst\n"
+    )
+    assert _parse_uris("arch", pacman) == [
+        (
+            "https://geo.mirror.pkgbuild.com/extra/os/x86_64/git-2.47.0-1-x86_64.pkg.tar.zst",
+            "git-2.47.0-1-x86_64.pkg.tar.zst",
+            "",
+        )
+    ]
+
+
+def test_prefetch_packages(fixture_server, tmp_path, monkeypatch):
+    # Fake apt-get printing the urls, served by the fixture server
+    bin_dir = make_rootfs(str(tmp_path / "root"), "debian")
+    server = fixture_server({"https://deb.example.org/pool/": FAKE_DEB})
+    monkeypatch.setenv("PATH", bin_dir)
+    monkeypatch.delenv("PY_APPS_SIM_LOG", raising=False)
+    dest = tmp_path / "archives"
+    dest.mkdir()
+    (dest / "curl_1.0_amd64.deb").write_bytes(b"cached")
+
+    files = prefetch_packages("debian", ["git", "curl"], str(dest))
+
+    assert files == [str(dest / "git_1.0_amd64.deb"), str(dest / "curl_1.0_amd64.deb")]
+    assert (dest / "git_1.0_amd64.deb").read_bytes() == FAKE_DEB
+    # Already there, not downloaded again
+    assert (dest / "curl_1.0_amd64.deb").read_bytes() == b"cached"
+    assert list((dest / ".prefetch").iterdir()) == []
+    assert server.stats["requests"] == 2
+
+
+def test_prefetch_wrong_hash(fixture_server, tmp_path, monkeypatch):
+    bin_dir = make_rootfs(str(tmp_path / "root"), "debian")
+    fixture_server({"https://deb.example.org/pool/": b"tampered"})
+    monkeypatch.setenv("PATH", bin_dir)
+    monkeypatch.delenv("PY_APPS_SIM_LOG", raising=False)
+    dest = tmp_path / "archives"
+    dest.mkdir()
+
+    # Left to apt, which downloads it again
+    assert prefetch_packages("debian", ["git"], str(dest)) == []
+    assert list(dest.glob("*.deb")) == []
+    assert list((dest / ".prefetch").iterdir()) == []
+
+
+def test_prefetch_to_package_cache(fixture_server, tmp_path, monkeypatch):
+    root = tmp_path / "root"
+    bin_dir = make_rootfs(str(root), "debian")
+    fixture_server({"https://deb.example.org/pool/": FAKE_DEB})
+    monkeypatch.setenv("PATH", bin_dir)
+    monkeypatch.setenv("PY_APPS_ROOT", str(root))
+    monkeypatch.setenv("PY_APPS_SIM_LOG", str(tmp_path / "log"))
+    monkeypatch.delenv("PY_APPS_PREFETCH", raising=False)
+
+    _prefetch("debian", ["git"])
+
+    # Moved by root to apt's own cache, nothing left in the user's
+    calls = [json.loads(line) for line in (tmp_path / "log").read_text().splitlines()]
+    staged = str(tmp_path / "cache/py_apps/packages/debian/git_1.0_amd64.deb")
+    assert [
+        "install",
+        "-m",
+        "644",
+        "-t",
+        str(root / "var/cache/apt/archives"),
+        staged,
+    ] in calls
+    assert not (tmp_path / "cache/py_apps/packages/debian/git_1.0_amd64.deb").exists()
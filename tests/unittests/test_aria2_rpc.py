@@ -0,0 +1,234 @@
+import json
+import sys
+from functools import partial
+from http.client import HTTPException
+from http.server import (
+    BaseHTTPRequestHandler,
+    SimpleHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from os import path
+from shutil import copyfileobj
+from subprocess import Popen
+from threading import Event, Thread
+from time import monotonic, sleep
+from urllib.request import urlopen
+
+import pytest
+
+from py_apps.errors.aria2_error import Aria2Error
+from py_apps.utils import aria2_rpc, network
+from py_apps.utils.aria2_rpc import Aria2Client, Aria2Session, use_rpc_session
+
+
+class FakeAria2:
+    """Just enough of the aria2c RPC: downloads run in threads with urllib"""
+
+    def __init__(self, secret):
+        self.secret = secret
+        self.downloads = {}
+        self.calls = []
+
+    def _fetch(self, gid, url, file_path):
+        status = self.downloads[gid]
+        try:
+            with urlopen(url) as res, open(file_path, "wb") as output:
+                status["totalLength"] = res.headers["Content-Length"]
+                copyfileobj(res, output)
+            if status["status"] == "active":
+                status["completedLength"] = status["totalLength"]
+                status["status"] = "complete"
+        except OSError as err:
+            status.update(status="error", errorMessage=str(err))
+
+    def handle(self, method, params):
+        self.calls.append(method)
+        if method == "system.multicall":
+            return [[self.handle(c["methodName"], c["params"])] for c in params[0]]
+        if params[:1] != [f"token:{self.secret}"]:
+            raise PermissionError("Unauthorized")
+        params = params[1:]
+
+        if method == "aria2.addUri":
+            gid = f"{len(self.downloads):016x}"
+            self.downloads[gid] = {
+                "gid": gid,
+                "status": "active",
+                "totalLength": "0",
+                "completedLength": "0",
+                "options": params[1],
+            }
+            file_path = path.join(params[1]["dir"], params[1]["out"])
+            Thread(target=self._fetch, args=(gid, params[0][0], file_path)).start()
+            return gid
+        if method == "aria2.remove":
+            if self.downloads[params[0]]["status"] == "active":
+                self.downloads[params[0]]["status"] = "removed"
+            return params[0]
+        if method == "aria2.tellStatus":
+            return {key: self.downloads[params[0]].get(key, "") for key in params[1]}
+        return "OK"
+
+
+def serve(handler_class):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fake_rpc_server(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            try:
+                body = {"result": fake.handle(request["method"], request["params"])}
+            except PermissionError as err:
+                body = {"error": {"code": 1, "message": str(err)}}
+            content = json.dumps({"id": request["id"], **body}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+    return serve(Handler)
+
+
+def test_rpc_download(tmp_path, monkeypatch):
+    (tmp_path / "www").mkdir()
+    (tmp_path / "www/a.bin").write_bytes(b"a" * 100000)
+    (tmp_path / "www/b.bin").write_bytes(b"b" * 10)
+    files = serve(partial(SimpleHTTPRequestHandler, directory=str(tmp_path / "www")))
+    base = f"http://127.0.0.1:{files.server_port}"
+
+    fake = FakeAria2("s3cret")
+    rpc = fake_rpc_server(fake)
+    session = Aria2Session(
+        Aria2Client(f"http://127.0.0.1:{rpc.server_port}/jsonrpc", "s3cret")
+    )
+
+    # Several at once, with their own options
+    session.download(
+        [
+            (f"{base}/a.bin", str(tmp_path / "a.bin"), {"split": "8"}),
+            (f"{base}/b.bin", str(tmp_path / "b.bin"), None),
+        ]
+    )
+    assert (tmp_path / "a.bin").read_bytes() == b"a" * 100000
+    assert (tmp_path / "b.bin").read_bytes() == b"b" * 10
+    options = [status["options"] for status in fake.downloads.values()]
+    assert (options[0]["split"], options[1]["split"]) == ("8", "5")
+    # Progress is polled in one request for all the downloads
+    assert fake.calls.count("aria2.addUri") == 2
+    assert fake.calls.count("system.multicall") >= 1
+
+    with pytest.raises(Aria2Error):
+        session.download([(f"{base}/missing", str(tmp_path / "missing"), None)])
+
+    # download() goes through the session
+    monkeypatch.setenv("PY_APPS_DOWNLOADER", "rpc")
+    monkeypatch.setattr(network, "_lan_cache_state", {"checked": True})
+    use_rpc_session(session)
+    try:
+        network.download(f"{base}/b.bin", str(tmp_path / "c.bin"), max_speed=1000)
+    finally:
+        use_rpc_session(None)
+    assert (tmp_path / "c.bin").read_bytes() == b"b" * 10
+    assert list(fake.downloads.values())[-1]["options"]["max-download-limit"] == "1000"
+
+    wrong = Aria2Session(Aria2Client(f"http://127.0.0.1:{rpc.server_port}/jsonrpc"))
+    with pytest.raises(Aria2Error):
+        wrong.download([(f"{base}/b.bin", str(tmp_path / "d.bin"), None)])
+
+    files.shutdown()
+    rpc.shutdown()
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "30")
+        self.end_headers()
+        for _ in range(30):
+            self.wfile.write(b"s")
+            sleep(0.1)
+
+
+def test_rpc_cancel(tmp_path):
+    slow = serve(SlowHandler)
+    fake = FakeAria2("s3cret")
+    rpc = fake_rpc_server(fake)
+    session = Aria2Session(
+        Aria2Client(f"http://127.0.0.1:{rpc.server_port}/jsonrpc", "s3cret")
+    )
+
+    cancel = Event()
+    Thread(target=lambda: (sleep(0.3), cancel.set())).start()
+    start = monotonic()
+    with pytest.raises(Aria2Error, match="removed"):
+        session.download(
+            [(f"http://127.0.0.1:{slow.server_port}/", str(tmp_path / "s"), None)],
+            cancel,
+        )
+    # Removed from the daemon, not waited for
+    assert "aria2.remove" in fake.calls
+    assert monotonic() - start < 2
+
+    slow.shutdown()
+    rpc.shutdown()
+
+
+def test_rpc_retry():
+    posts = []
+
+    class DroppingHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            # Done, but the connection drops before the response
+            posts.append(
+                json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            )
+            self.close_connection = True
+
+    rpc = serve(DroppingHandler)
+    client = Aria2Client(f"http://127.0.0.1:{rpc.server_port}/jsonrpc")
+    with pytest.raises((OSError, HTTPException)):
+        client.call("aria2.tellStatus", "0")
+    assert len(posts) == 2
+
+    # Adding again would download twice
+    with pytest.raises((OSError, HTTPException)):
+        client.call("aria2.addUri", ["http://example.org/a"])
+    with pytest.raises((OSError, HTTPException)):
+        client.multicall([("aria2.addUri", [["http://example.org/b"]])])
+    assert len(posts) == 4
+    rpc.shutdown()
+
+
+def test_rpc_session_respawn(monkeypatch):
+    dead = Aria2Session(
+        Aria2Client("http://127.0.0.1:1/jsonrpc"),
+        Popen([sys.executable, "-c", "pass"]),
+    )
+    dead.process.wait()
+    fresh = Aria2Session(Aria2Client("http://127.0.0.1:2/jsonrpc"))
+    monkeypatch.setattr(Aria2Session, "start", classmethod(lambda cls: fresh))
+    monkeypatch.setattr(aria2_rpc, "at_exit", lambda func: None)
+
+    use_rpc_session(dead)
+    try:
+        assert dead.exited
+        assert aria2_rpc.rpc_session() is fresh
+        # An external daemon (no process) is used as is
+        assert aria2_rpc.rpc_session() is fresh
+    finally:
+        use_rpc_session(None)
@@ -0,0 +1,39 @@
+from pytest import raises
+
+from py_apps.errors.artifact_not_bundled import ArtifactNotBundledError
+from py_apps.utils.bundle import BundleReader, BundleWriter, parse_target
+
+
+def test_parse_target():
+    assert parse_target("debian:ubuntu/arm64") == ("debian", "ubuntu", "arm64")
+    assert parse_target("redhat/amd64") == ("redhat", "", "amd64")
+
+
+def test_bundle_roundtrip(tmp_path):
+    artifact = tmp_path / "pkg.deb"
+    artifact.write_bytes(b"deb content")
+    bundle_path = str(tmp_path / "apps.bundle")
+
+    writer = BundleWriter(bundle_path, {"apps": ["vivaldi"]})
+    writer.store("https://example.com/pkg.deb", str(artifact))
+    # The same content for another url is stored once
+    writer.store("https://mirror.example.com/pkg.deb", str(artifact))
+    writer.store_content("https://example.com/page", b"<html></html>")
+    writer.add_packages("debian/amd64", [str(artifact)])
+    writer.close()
+
+    reader = BundleReader(bundle_path)
+    assert reader.manifest == {"apps": ["vivaldi"]}
+
+    output = tmp_path / "out.deb"
+    assert reader.fetch("https://mirror.example.com/pkg.deb", str(output))
+    assert output.read_bytes() == b"deb content"
+    assert reader.fetch_content("https://example.com/page") == b"<html></html>"
+    assert reader.package_members("debian:ubuntu/amd64") == [
+        "packages/debian_amd64/pkg.deb"
+    ]
+    assert len(reader.tar.getnames()) == 4
+
+    with raises(ArtifactNotBundledError):
+        reader.fetch_content("https://example.com/other")
+    reader.close()
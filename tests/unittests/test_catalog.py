@@ -0,0 +1,84 @@
+from time import perf_counter
+
+import pytest
+
+from py_apps.apps import catalog
+from py_apps.apps.package_app import package_app
+from py_apps.apps.registry import get_app, list_app_ids
+from py_apps.errors.distro_x_only import DistroXOnlyError
+
+
+CATALOG = {
+    "pages": {"tools": {"title": "Tools", "items": ["hello", "ide/*", "many"]}},
+    "actions": {"many": "Many IDEs"},
+    "apps": {
+        "hello": {"name": "Hello", "label": "Hello!", "packages": {"debian": "hello"}},
+        "ide": {
+            "name": "IDE",
+            "label": "IDE",
+            "variants_title": "Which IDE?",
+            "variants": {
+                "go": {"label": "GoLand", "code": "GO"},
+                "cpp": {"label": "CLion", "code": "CL"},
+            },
+            "code": "",
+            "vendor": "JetBrains",
+        },
+    },
+}
+
+
+@pytest.fixture(name="fresh")
+def fixture_fresh(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(catalog, "_loaded", {})
+
+
+def test_compile_catalog():
+    compiled = catalog.compile_catalog(CATALOG)
+
+    assert compiled["apps"]["ide/go"] == {
+        "name": "IDE",
+        "label": "GoLand",
+        "variants_title": "Which IDE?",
+        "code": "GO",
+        "vendor": "JetBrains",
+    }
+    assert "variants" not in compiled["apps"]["ide"]
+    assert compiled["menus"]["tools"] == {
+        "title": "Tools",
+        "ids": ["hello", "ide/go", "ide/cpp", "many"],
+        "labels": ["Hello!", "GoLand", "CLion", "Many IDEs"],
+    }
+    assert compiled["menus"]["ide"]["ids"] == ["go", "cpp"]
+
+
+def test_marshal_cache(fresh, tmp_path, monkeypatch):
+    # pylint: disable=unused-argument
+    compiled = catalog.load_catalog()
+    assert (tmp_path / "py_apps" / "catalog" / "catalog.marshal").exists()
+
+    # Loaded from the cache, without the json
+    monkeypatch.setattr(catalog, "_loaded", {})
+    monkeypatch.setattr(catalog, "compile_catalog", None)
+    start = perf_counter()
+    assert catalog.load_catalog() == compiled
+    assert perf_counter() - start < 0.05
+
+    title, ids, _ = catalog.menu("browser")
+    ids.append("back")
+    assert "back" not in catalog.menu("browser")[1] and title
+    assert catalog.app_title("firefox/esr") == "Firefox esr"
+
+
+def test_package_app(fresh, monkeypatch):
+    # pylint: disable=unused-argument
+    monkeypatch.setitem(
+        catalog.load_catalog()["apps"], "hello", CATALOG["apps"]["hello"]
+    )
+    assert "hello" in list_app_ids()
+
+    assert get_app("hello", "debian").prepare().packages() == ["hello"]
+    assert package_app("hello").__name__ == "Hello"
+    with pytest.raises(DistroXOnlyError):
+        get_app("hello", "arch").prepare()
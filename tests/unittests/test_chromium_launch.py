@@ -0,0 +1,80 @@
+import subprocess
+
+from py_apps.apps.browser.chromium_launch import (
+    ChromiumBrowser,
+    LaunchEnv,
+    desktop_entry,
+    launch_flags,
+    wrapper_script,
+)
+
+
+def test_launch_flags():
+    # A 4 GiB ARM board under proot, without GPU
+    board = launch_flags(LaunchEnv(3800, 4, False, True), "/run/cache")
+    assert board == [
+        "--disable-dev-shm-usage",
+        "--renderer-process-limit=3",
+        "--disable-gpu",
+        "--disable-gpu-compositing",
+        "--disk-cache-dir=/run/cache",
+        f"--disk-cache-size={64 * 1024**2}",
+    ]
+
+    workstation = launch_flags(LaunchEnv(64 * 1024, 32, True, False), "/run/cache")
+    assert workstation == [
+        "--renderer-process-limit=8",
+        "--enable-gpu-rasterization",
+        "--enable-zero-copy",
+        f"--disk-cache-size={256 * 1024**2}",
+    ]
+
+    # The cache is a setting of QtWebEngine browsers
+    assert not any(
+        flag.startswith("--disk-cache")
+        for flag in launch_flags(LaunchEnv(3800, 4, False, True), "/c", qt=True)
+    )
+
+
+def test_wrapper_script(tmp_path):
+    browser_path = tmp_path / "browser"
+    browser_path.write_text(
+        '#!/bin/sh\necho "$@"\necho "$QTWEBENGINE_CHROMIUM_FLAGS"\n'
+    )
+    browser_path.chmod(0o755)
+    wrapper_path = tmp_path / "wrapper"
+
+    def run_wrapper(browser, flags, sandbox):
+        wrapper_path.write_text(wrapper_script(browser, flags, sandbox, "test"))
+        return subprocess.run(
+            ["sh", str(wrapper_path), "https://example.org"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.splitlines()
+
+    browser = ChromiumBrowser(
+        ["missing-browser", str(browser_path)], str(wrapper_path), ""
+    )
+    assert run_wrapper(browser, ["--disable-gpu"], False)[0] == (
+        "--disable-gpu --no-sandbox https://example.org"
+    )
+
+    qt_browser = browser._replace(qt=True)
+    assert run_wrapper(qt_browser, ["--disable-gpu"], False) == [
+        "https://example.org",
+        " --disable-gpu",
+    ]
+
+
+def test_desktop_entry():
+    content = (
+        "[Desktop Entry]\nExec=/usr/bin/vivaldi-stable --no-sandbox %U\n"
+        + "[Desktop Action new-private-window]\nExec=/usr/bin/vivaldi-stable"
+        + " --incognito\n"
+    )
+    assert desktop_entry(content, "/usr/local/bin/vivaldi-stable") == (
+        "[Desktop Entry]\nExec=/usr/local/bin/vivaldi-stable %U\n"
+        + "[Desktop Action new-private-window]\nExec=/usr/local/bin/vivaldi-stable"
+        + " --incognito\n"
+    )
@@ -0,0 +1,89 @@
+from hashlib import sha256
+from os import stat
+
+from py_apps.utils import fileops
+
+
+def test_write_file(tmp_path):
+    target = tmp_path / "falkon-no-sandbox"
+
+    assert fileops.write_file(str(target), "#!/bin/sh\n", mode=0o755)
+    assert target.read_text() == "#!/bin/sh\n"
+    assert stat(target).st_mode & 0o777 == 0o755
+    inode = stat(target).st_ino
+
+    # Unchanged: the file isn't touched
+    assert not fileops.write_file(str(target), "#!/bin/sh\n", mode=0o755)
+    assert stat(target).st_ino == inode
+
+    # Changed: replaced by a new file, the mode is kept
+    assert fileops.write_file(str(target), "#!/bin/bash\n")
+    assert target.read_text() == "#!/bin/bash\n"
+    assert stat(target).st_mode & 0o777 == 0o755
+    assert [entry.name for entry in tmp_path.iterdir()] == ["falkon-no-sandbox"]
+
+
+def test_sub_lines(tmp_path):
+    desktop = tmp_path / "vivaldi-stable.desktop"
+    desktop.write_text("Name=Vivaldi\nExec=/usr/bin/vivaldi-stable %U\n")
+    desktop.chmod(0o600)
+    pattern, repl = (
+        "Exec=/usr/bin/vivaldi-stable(?! --no-sandbox)",
+        r"\g<0> --no-sandbox",
+    )
+
+    assert fileops.sub_lines(str(desktop), pattern, repl)
+    assert not fileops.sub_lines(str(desktop), pattern, repl)
+    assert desktop.read_text() == (
+        "Name=Vivaldi\nExec=/usr/bin/vivaldi-stable --no-sandbox %U\n"
+    )
+    assert stat(desktop).st_mode & 0o777 == 0o600
+
+    postinst = tmp_path / "firefox.postinst"
+    postinst.write_text('if [ "$1" = configure ]; then configure; fi\n')
+    fileops.sub_lines(str(postinst), "(configure)", r"pre\1", count=1)
+    assert postinst.read_text() == 'if [ "$1" = preconfigure ]; then configure; fi\n'
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_link_move_remove(tmp_path):
+    before = fileops.avoided_spawns()
+    script = tmp_path / "idea.sh"
+    script.write_text("echo idea\n")
+    launcher = tmp_path / "idea"
+    launcher.write_text("old\n")
+
+    fileops.link(str(script), str(launcher))
+    assert stat(launcher).st_ino == stat(script).st_ino
+
+    (tmp_path / "tree" / "bin").mkdir(parents=True)
+    fileops.move(str(tmp_path / "tree"), str(tmp_path / "opt"))
+    assert (tmp_path / "opt" / "bin").is_dir()
+
+    fileops.add_mode(str(script), 0o111)
+    assert stat(script).st_mode & 0o111 == 0o111
+
+    fileops.remove(str(tmp_path / "opt"))
+    fileops.remove(str(launcher))
+    fileops.remove(str(tmp_path / "missing"))
+    assert not (tmp_path / "opt").exists() and not launcher.exists()
+
+    after = fileops.avoided_spawns()
+    assert {
+        tool: after[tool] - before.get(tool, 0)
+        for tool in after
+        if after[tool] != before.get(tool, 0)
+    } == {
+        "ln": 1,
+        "mv": 1,
+        "chmod": 1,
+        "rm": 3,
+    }
+    assert "spawns avoided" in fileops.summary()
+
+
+def test_sha256_of(tmp_path):
+    # Over one 1 MiB chunk
+    content = b"py_apps" * 200000
+    (tmp_path / "a.bin").write_bytes(content)
+    assert fileops.sha256_of(str(tmp_path / "a.bin")) == sha256(content).hexdigest()
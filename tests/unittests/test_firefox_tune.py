@@ -0,0 +1,55 @@
+import json
+
+from py_apps.apps.browser import firefox_tune
+from py_apps.apps.browser.firefox_tune import (
+    firefox_prefs,
+    tune_firefox,
+    tuned_policies,
+    untuned_policies,
+)
+
+
+def test_firefox_prefs():
+    # A 4 GiB ARM board without GPU
+    board = firefox_prefs(3800, 4, False)
+    assert board["dom.ipc.processCount"] == 3
+    assert board["browser.cache.disk.enable"] is False
+    assert board["browser.cache.memory.capacity"] == 118 * 1024
+    assert board["layers.acceleration.disabled"] is True
+
+    # A workstation, Firefox's defaults kept
+    workstation = firefox_prefs(64 * 1024, 32, True)
+    assert workstation == {
+        "dom.ipc.processCount": 8,
+        "browser.tabs.unloadOnLowMemory": True,
+    }
+    assert "browser.cache.disk.capacity" not in board
+
+
+def test_policies_round_trip():
+    data = {
+        "policies": {
+            "DisableTelemetry": True,
+            "Preferences": {"browser.startup.homepage": {"Value": "about:home"}},
+        }
+    }
+    tuned = tuned_policies(data, firefox_prefs(3800, 4, False))
+    assert tuned["policies"]["DisableTelemetry"] is True
+    assert tuned["policies"]["Preferences"]["dom.ipc.processCount"] == {
+        "Value": 3,
+        "Status": "default",
+    }
+    assert untuned_policies(tuned) == data
+
+
+def test_tune_firefox(tmp_path, monkeypatch):
+    monkeypatch.setenv("PY_APPS_ROOT", str(tmp_path))
+    monkeypatch.setattr(firefox_tune, "hardware", lambda: (2048, 2))
+    policies_path = tmp_path / "etc/firefox/policies/policies.json"
+    policies_path.parent.mkdir(parents=True)
+    policies_path.write_text('{"policies": {"DisableAppUpdate": true}}')
+
+    assert tune_firefox("firefox").startswith("Firefox：2 个内容进程，内存缓存 64 MiB")
+    policies = json.loads(policies_path.read_text())["policies"]
+    assert policies["DisableAppUpdate"] is True
+    assert policies["Preferences"]["browser.cache.disk.enable"]["Value"] is False
@@ -0,0 +1,132 @@
+from http.client import IncompleteRead
+from threading import Thread
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from py_apps.utils import network
+from py_apps.utils.bundle import BundleWriter
+from py_apps.utils.fixture_server import (
+    Faults,
+    FixtureServer,
+    FixtureStore,
+    NetProfile,
+    original_url,
+)
+
+
+PAYLOAD = bytes(range(256)) * 1024
+RELEASES = '{"assets": [{"browser_download_url": "https://github.com/a/nvim.deb"}]}'
+
+
+def serve(store, **kwargs):
+    server = FixtureServer(("127.0.0.1", 0), store, **kwargs)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fixtures():
+    store = FixtureStore()
+    store.add("https://api.github.com/repos/a/b/releases/", RELEASES)
+    store.add("https://github.com/a/nvim.deb", PAYLOAD)
+    return store
+
+
+def test_upstream_url(monkeypatch):
+    url = "https://go.microsoft.com/fwlink/?LinkID=620884"
+    assert network.upstream_url(url) == url
+
+    monkeypatch.setenv("PY_APPS_UPSTREAM", "http://127.0.0.1:8490/")
+    routed = network.upstream_url(url)
+    assert (
+        routed == "http://127.0.0.1:8490/https/go.microsoft.com/fwlink/?LinkID=620884"
+    )
+    assert original_url(routed[len("http://127.0.0.1:8490") :]) == url
+    assert original_url("/favicon.ico") == ""
+
+
+def test_range_and_etag():
+    server = serve(fixtures())
+    url = f"{server.base_url}/https/github.com/a/nvim.deb"
+
+    with urlopen(Request(url, headers={"Range": "bytes=100-199"})) as res:
+        assert res.status == 206 and res.read() == PAYLOAD[100:200]
+        assert res.headers["Content-Range"] == f"bytes 100-199/{len(PAYLOAD)}"
+        etag = res.headers["ETag"]
+
+    with pytest.raises(HTTPError) as err:
+        urlopen(Request(url, headers={"If-None-Match": etag}))
+    assert err.value.code == 304
+
+    # A range of another version is answered with the whole file
+    with urlopen(
+        Request(url, headers={"Range": "bytes=0-9", "If-Range": '"x"'})
+    ) as res:
+        assert res.status == 200 and res.read() == PAYLOAD
+
+    with pytest.raises(HTTPError) as err:
+        urlopen(f"{server.base_url}/https/github.com/a/missing.deb")
+    assert err.value.code == 404
+    server.shutdown()
+
+
+def test_shaping():
+    server = serve(fixtures(), profile=NetProfile("test", 0.1, 256 * 1024, 0))
+    url = f"{server.base_url}/https/github.com/a/nvim.deb"
+
+    start = perf_counter()
+    with urlopen(url) as res:
+        assert res.read() == PAYLOAD
+    # 100 ms of latency, then 256 KiB at 256 KiB/s
+    assert 1.0 < perf_counter() - start < 3
+    server.shutdown()
+
+
+def test_faults():
+    server = serve(fixtures(), faults=Faults(error_rate=1))
+    with pytest.raises(HTTPError) as err:
+        urlopen(f"{server.base_url}/https/github.com/a/nvim.deb")
+    assert err.value.code == 503
+
+    server.faults = Faults(reset_rate=1)
+    with pytest.raises(IncompleteRead):
+        with urlopen(f"{server.base_url}/https/github.com/a/nvim.deb") as res:
+            res.read()
+    assert server.stats == {"requests": 2, "errors": 1, "resets": 1, "bytes": 131072}
+    server.shutdown()
+
+
+def test_network_paths(tmp_path, monkeypatch):
+    server = serve(fixtures(), profile=NetProfile("test", 0.01, 0, 0))
+    monkeypatch.setenv("PY_APPS_UPSTREAM", server.base_url)
+    monkeypatch.setenv("PY_APPS_CACHE", "off")
+    monkeypatch.setenv("PY_APPS_DOWNLOADER", "native")
+
+    assert network.get_github_releases("a/b") == ["https://github.com/a/nvim.deb"]
+
+    output = tmp_path / "nvim.deb"
+    network.download("https://github.com/a/nvim.deb", str(output), overwrite=True)
+    assert output.read_bytes() == PAYLOAD
+    server.shutdown()
+
+
+def test_from_bundle(tmp_path):
+    bundle_path = str(tmp_path / "apps.bundle")
+    artifact = tmp_path / "nvim.deb"
+    artifact.write_bytes(PAYLOAD)
+    writer = BundleWriter(bundle_path, {"apps": ["nvim"]})
+    writer.store_content("https://api.github.com/repos/a/b/releases/latest", b"{}")
+    writer.store("https://github.com/a/nvim.deb", str(artifact))
+    writer.close()
+
+    server = serve(FixtureStore.from_bundle(bundle_path))
+    url = f"{server.base_url}/https/github.com/a/nvim.deb"
+    with urlopen(Request(url, headers={"Range": "bytes=-16"})) as res:
+        assert res.read() == PAYLOAD[-16:]
+    with urlopen(
+        f"{server.base_url}/https/api.github.com/repos/a/b/releases/latest"
+    ) as res:
+        assert res.read() == b"{}"
+    server.shutdown()
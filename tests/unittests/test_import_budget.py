@@ -0,0 +1,13 @@
+from py_apps.utils.importtime import (
+    IMPORT_BUDGET_MS,
+    cumulative_ms,
+    imported_heavy_modules,
+    measure_imports,
+)
+
+
+def test_import_budget():
+    records = measure_imports("py_apps.main")
+
+    assert imported_heavy_modules(records) == []
+    assert 0 < cumulative_ms(records, "py_apps.main") <= IMPORT_BUDGET_MS
@@ -0,0 +1,81 @@
+import tarfile
+from io import BytesIO
+
+from py_apps.apps.devtools.jetbrains import (
+    Jetbrains,
+    JetbrainsVariants,
+    install_many,
+    parse_releases,
+)
+from py_apps.errors.download_failed import DownloadFailedError
+
+
+GO_URL = "https://download.jetbrains.com/go/goland-2024.3.4"
+FEED = {
+    "GO": [
+        {
+            "version": "2024.3.4",
+            "downloads": {
+                "linux": {
+                    "link": f"{GO_URL}.tar.gz",
+                    "checksumLink": f"{GO_URL}.tar.gz.sha256",
+                },
+                "linuxARM64": {
+                    "link": f"{GO_URL}-aarch64.tar.gz",
+                    "checksumLink": f"{GO_URL}-aarch64.tar.gz.sha256",
+                },
+            },
+        }
+    ],
+    "RD": [{"version": "2024.3.5", "downloads": {"linux": {"link": "rider.tar.gz"}}}],
+}
+
+
+def test_parse_releases():
+    amd64 = parse_releases(FEED, "amd64")
+    assert amd64["go"]["version"] == "2024.3.4"
+    assert amd64["go"]["link"].endswith("goland-2024.3.4.tar.gz")
+    assert amd64["rider"] == {
+        "version": "2024.3.5",
+        "link": "rider.tar.gz",
+        "checksum_link": "",
+    }
+
+    arm64 = parse_releases(FEED, "arm64")
+    assert arm64["go"]["checksum_link"].endswith("-aarch64.tar.gz.sha256")
+    # No aarch64 build
+    assert "rider" not in arm64
+
+
+def test_install_many_failures(tmp_path, monkeypatch):
+    monkeypatch.setenv("PY_APPS_ROOT", str(tmp_path))
+    (tmp_path / "tmp").mkdir()
+    good = tmp_path / "clion.tgz"
+    with tarfile.open(good, "w:gz") as tar:
+        info = tarfile.TarInfo("clion-2024.3/bin/clion.sh")
+        info.size = 2
+        tar.addfile(info, BytesIO(b"c\n"))
+    (tmp_path / "broken.tgz").write_bytes(b"not a tarball")
+
+    def download(ide, max_speed=0):
+        match ide.variant:
+            case JetbrainsVariants.GOLAND:
+                raise DownloadFailedError(ide.link, "goland.tgz")
+            case JetbrainsVariants.RIDER:
+                return str(tmp_path / "broken.tgz")
+        return str(good)
+
+    linked = []
+    monkeypatch.setattr(Jetbrains, "prepare", lambda ide: ide)
+    monkeypatch.setattr(Jetbrains, "download", download)
+    monkeypatch.setattr(Jetbrains, "link_launcher", lambda ide: linked.append(ide))
+    monkeypatch.setattr(Jetbrains, "tune", lambda ide: None)
+
+    failed = install_many(
+        [JetbrainsVariants.GOLAND, JetbrainsVariants.CLION, JetbrainsVariants.RIDER]
+    )
+
+    # One failing IDE doesn't stop the others
+    assert set(failed) == {"GOLAND", "RIDER"}
+    assert [ide.variant for ide in linked] == [JetbrainsVariants.CLION]
+    assert (tmp_path / "opt/clion/bin/clion.sh").read_bytes() == b"c\n"
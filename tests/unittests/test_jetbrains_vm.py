@@ -0,0 +1,68 @@
+from py_apps.apps.devtools import jetbrains_vm
+from py_apps.apps.devtools.jetbrains_vm import (
+    cds_archive,
+    jbr_version,
+    vm_options,
+    warmup,
+    write_vm_options,
+)
+
+
+def test_vm_options():
+    # A 4 GiB ARM board
+    board = vm_options(3800, 4, "/opt/goland-arm64.jsa")
+    assert board[:4] == [
+        "-Xmx896m",
+        "-XX:+UseSerialGC",
+        "-XX:CICompilerCount=2",
+        "-XX:ReservedCodeCacheSize=240m",
+    ]
+    assert "-XX:SharedArchiveFile=/opt/goland-arm64.jsa" in board
+
+    # A 64 GiB workstation
+    workstation = vm_options(64 * 1024, 32, "/opt/goland-amd64.jsa")
+    assert workstation[:4] == [
+        "-Xmx8192m",
+        "-XX:+UseG1GC",
+        "-XX:CICompilerCount=8",
+        "-XX:ReservedCodeCacheSize=512m",
+    ]
+
+    # The heap has a floor
+    assert vm_options(1024, 1, "a.jsa")[0] == "-Xmx768m"
+
+    # No CDS archive
+    assert len(vm_options(1024, 1, None)) == 4
+
+
+def test_write_vm_options(tmp_path, monkeypatch):
+    monkeypatch.setattr(jetbrains_vm, "hardware", lambda: (16 * 1024, 8))
+    install_dir = str(tmp_path / "goland")
+    (tmp_path / "goland/jbr").mkdir(parents=True)
+    release = tmp_path / "goland/jbr/release"
+    release.write_text('IMPLEMENTOR="JetBrains s.r.o."\nJAVA_VERSION="17.0.11"\n')
+    assert jbr_version(install_dir) == 17
+    # -XX:+AutoCreateSharedArchive would stop a JBR 17
+    assert not any(
+        "SharedArchive" in opt for opt in write_vm_options(install_dir, "amd64")
+    )
+
+    release.write_text('JAVA_VERSION="21.0.5"\n')
+    options = write_vm_options(install_dir, "amd64")
+    lines = (tmp_path / "goland.vmoptions").read_text().splitlines()
+    assert lines[0] == "# py_apps: 16384 MiB, 8 cores, amd64"
+    assert lines[1:] == options
+    assert f"-XX:SharedArchiveFile={cds_archive(install_dir, 'amd64')}" in options
+
+
+def test_warmup(tmp_path):
+    install_dir = str(tmp_path / "goland")
+    archive = cds_archive(install_dir, "amd64")
+    # Writes the archive when it's given an existing project dir
+    launcher = tmp_path / "goland.sh"
+    launcher.write_text(
+        f'#!/bin/sh\ntest -d "${{2#--project-dir=}}" && touch {archive}\n'
+    )
+    launcher.chmod(0o755)
+
+    assert warmup(str(launcher), install_dir, "amd64").startswith("CDS 存档 0 MiB")
@@ -0,0 +1,122 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import DEVNULL, PIPE
+
+from py_apps.errors.interactive_cmd import InteractiveCmdError
+from py_apps.ui.jobs import format_amount, format_eta, job_row
+from py_apps.utils.cmd import run, stream
+from py_apps.utils.jobs import Job, JobQueue, bind_job, current_job, report_progress
+
+
+def test_parse_progress():
+    job = Job(1, "test", lambda: None)
+
+    job.feed("aria2c", "[#2089b0 4.0MiB/25MiB(16%) CN:5 DL:3.2MiB ETA:6s]")
+    assert (job.phase, job.done, job.total) == ("下载", 4 * 1024**2, 25 * 1024**2)
+
+    job.feed("apt-get", "pmstatus:dpkg:42.5:Installing dpkg")
+    assert (job.phase, job.unit, job.done, job.total) == ("安装", "%", 42.5, 100)
+
+    job.feed("apt-get", "Setting up dpkg ...")
+    assert list(job.log) == ["Setting up dpkg ..."]
+
+
+def test_speed_and_eta():
+    job = Job(1, "test", lambda: None)
+    job.update(0, 1000, "解压")
+    job._samples[0] = (job._samples[0][0] - 2, 0)
+    job.update(500, 1000, "解压")
+
+    assert 240 < job.speed < 260
+    assert 1.9 < job.eta < 2.1
+    assert job_row(job)[3:] == ("", "", "", "")
+    assert format_amount(1536, "B") == "1.5 KiB"
+    assert format_eta(125) == "2:05"
+
+
+def test_queue_captures_output():
+    queue = JobQueue()
+
+    def _work():
+        report_progress(1, 2, "解压")
+        run([sys.executable, "-c", "print('hello'); print('\\rworld')"])
+        print("printed")
+
+    ok = queue.submit("ok", _work)
+    failed = queue.submit("failed", lambda: 1 / 0)
+    queue.wait()
+
+    assert ok.state == "done"
+    assert (ok.phase, ok.fraction) == ("解压", 0.5)
+    assert ok.lines_since(0) == (["hello", "world", "printed"], 3)
+    assert ok.lines_since(2) == (["printed"], 3)
+    assert (failed.state, failed.error) == ("failed", "division by zero")
+
+
+def test_bind_job():
+    queue = JobQueue()
+
+    def _work():
+        with ThreadPoolExecutor(2) as pool:
+            list(pool.map(bind_job(run), [[sys.executable, "-c", "print('pooled')"]]))
+            # The pool threads are left as they were
+            assert pool.submit(current_job).result() is None
+
+    job = queue.submit("pooled", _work)
+    queue.wait()
+
+    assert job.state == "done"
+    assert job.lines_since(0) == (["pooled"], 1)
+    assert bind_job(run) is run
+
+
+def test_stream_kwargs_in_job():
+    queue = JobQueue()
+    script = "import sys; print('out'); print('err', file=sys.stderr); print(sys.stdin.read())"
+    results = {}
+
+    def _work():
+        # Kept by the caller, no TypeError for the ones the job sets
+        results["captured"] = stream(
+            [sys.executable, "-c", script], capture_output=True
+        )
+        results["piped"] = stream(
+            [sys.executable, "-c", script], stdout=PIPE, text=True
+        )
+        stream([sys.executable, "-c", script], stderr=DEVNULL, text=True)
+        stream([sys.executable, "-c", script], interactive=True)
+
+    job = queue.submit("kwargs", _work)
+    queue.wait()
+
+    assert results["captured"].stdout == b"out\n\n"
+    assert results["captured"].stderr == b"err\n"
+    assert results["piped"].stdout == "out\n\n"
+    # stderr discarded, stdin /dev/null
+    assert job.lines_since(0)[0] == ["err", "out"]
+    assert job.state == "failed"
+    assert job.error == str(InteractiveCmdError(os.path.basename(sys.executable)))
+
+
+def test_job_failures(tmp_path, monkeypatch):
+    # Prints its args, like a sudo that would prompt without -n
+    fake_sudo = tmp_path / "sudo"
+    fake_sudo.write_text('#!/bin/sh\nprintf "%s\\n" "$*"\n')
+    fake_sudo.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+    queue = JobQueue()
+
+    def _work():
+        run(["sudo", "apt-get", "install", "-y", "git"])
+        # Printed & returned, the job goes on
+        run(["false"], "when failing")
+        print("after")
+
+    job = queue.submit("failing", _work)
+    queue.wait()
+
+    assert job.state == "failed"
+    assert job.error == "false failed when failing"
+    lines = job.lines_since(0)[0]
+    assert lines[0] == "-n apt-get install -y git" and lines[-1] == "after"
@@ -0,0 +1,188 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from time import monotonic, sleep
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+import pytest
+
+from py_apps.utils import lan_cache
+from py_apps.utils.cache_server import CacheServer, CacheStore, answer_discovery
+from py_apps.utils.lan_cache import LanCacheSource, discover, find_lan_cache
+
+
+PAYLOAD = bytes(range(256)) * 4096
+
+
+class SlowUpstream(BaseHTTPRequestHandler):
+    hits = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        SlowUpstream.hits += 1
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        # Stream slowly so that clients join while the fetch is in progress
+        for offset in range(0, len(PAYLOAD), len(PAYLOAD) // 8):
+            self.wfile.write(PAYLOAD[offset : offset + len(PAYLOAD) // 8])
+            sleep(0.02)
+
+
+class TruncatedUpstream(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD[:1000])
+        self.close_connection = True
+
+
+class ChunkedTruncatedUpstream(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        # One chunk, then closed without the last one
+        self.wfile.write(b"%x\r\n" % 1000 + PAYLOAD[:1000] + b"\r\n")
+        self.close_connection = True
+
+
+def serve(server):
+    Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_lan_cache(tmp_path):
+    upstream_url = serve(ThreadingHTTPServer(("127.0.0.1", 0), SlowUpstream))
+    store = CacheStore(str(tmp_path / "cache"), allow_hosts=["127.0.0.1"])
+    cache_url = serve(CacheServer(("127.0.0.1", 0), store))
+    source = LanCacheSource(cache_url)
+    artifact_url = f"{upstream_url}/ideaIC.tar.gz"
+
+    # Concurrent clients share one upstream fetch
+    def fetch(i):
+        output = tmp_path / f"out{i}"
+        assert source.fetch(artifact_url, str(output))
+        return output.read_bytes()
+
+    with ThreadPoolExecutor(6) as pool:
+        assert all(data == PAYLOAD for data in pool.map(fetch, range(6)))
+    assert SlowUpstream.hits == 1
+
+    # Range requests are served from the cache
+    request = Request(
+        f"{cache_url}/artifact?url={quote(artifact_url, safe='')}",
+        headers={"Range": "bytes=100-199"},
+    )
+    with urlopen(request) as res:
+        assert res.status == 206
+        assert res.headers["Content-Range"] == f"bytes 100-199/{len(PAYLOAD)}"
+        assert res.read() == PAYLOAD[100:200]
+    assert SlowUpstream.hits == 1
+
+    # Metadata
+    assert source.fetch_content(f"{upstream_url}/releases") == PAYLOAD
+    assert source.fetch_content(f"{upstream_url}/releases") == PAYLOAD
+    assert SlowUpstream.hits == 2
+    assert store.upstream_fetches == 2
+
+    # Upstream failures fall back
+    assert source.fetch_content("http://127.0.0.1:1/nothing") is None
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "file:///etc/hostname",
+        "http://127.0.0.1:1/x",
+        "http://[::1]:1/x",
+        "http://169.254.169.254/latest/meta-data/",
+    ],
+)
+def test_refused_upstreams(tmp_path, url):
+    store = CacheStore(str(tmp_path / "cache"))
+    cache_url = serve(CacheServer(("127.0.0.1", 0), store))
+
+    with pytest.raises(HTTPError) as err:
+        urlopen(f"{cache_url}/artifact?url={quote(url, safe='')}")
+    assert err.value.code == 403
+    assert store.upstream_fetches == 0
+
+
+def test_truncated_upstream(tmp_path):
+    upstream_url = serve(ThreadingHTTPServer(("127.0.0.1", 0), TruncatedUpstream))
+    store = CacheStore(str(tmp_path / "cache"), allow_hosts=["127.0.0.1"])
+    source = LanCacheSource(serve(CacheServer(("127.0.0.1", 0), store)))
+
+    assert source.fetch_content(f"{upstream_url}/releases") is None
+    assert not source.fetch(f"{upstream_url}/idea.tar.gz", str(tmp_path / "out"))
+    assert not (tmp_path / "out").exists()
+    # Not cached as complete
+    assert not store.is_fresh("meta", f"{upstream_url}/releases")
+    assert not store.is_fresh("artifact", f"{upstream_url}/idea.tar.gz")
+
+
+def test_chunked_truncated_upstream(tmp_path):
+    upstream_url = serve(
+        ThreadingHTTPServer(("127.0.0.1", 0), ChunkedTruncatedUpstream)
+    )
+    store = CacheStore(str(tmp_path / "cache"), allow_hosts=["127.0.0.1"])
+    fetch = store.lookup("artifact", f"{upstream_url}/idea.tar.gz")
+
+    # Released with an error, not left waiting
+    assert fetch.wait_started() == ""
+    start = monotonic()
+    assert fetch.wait_for(len(PAYLOAD)) <= 1000
+    assert monotonic() - start < 5
+    assert "IncompleteRead" in fetch.error
+    assert not any((tmp_path / "cache/artifact").iterdir())
+
+
+def test_evict(tmp_path):
+    store = CacheStore(str(tmp_path / "cache"), max_size=250)
+    for index, url in enumerate(["http://a/1", "http://a/2", "http://a/3"]):
+        with open(store.path_of("artifact", url), "wb") as artifact:
+            artifact.write(b"x" * 100)
+        os.utime(store.path_of("artifact", url), (index, index))
+    # Used lately
+    store.lookup("artifact", "http://a/1")
+
+    store.evict()
+    assert store.is_fresh("artifact", "http://a/1")
+    assert not store.is_fresh("artifact", "http://a/2")
+    assert store.is_fresh("artifact", "http://a/3")
+
+
+def test_find_lan_cache(monkeypatch):
+    monkeypatch.setattr(lan_cache, "discover", lambda: "http://10.0.0.2:8480")
+
+    # Discovery is opt-in
+    monkeypatch.delenv("PY_APPS_CACHE", raising=False)
+    assert find_lan_cache() is None
+    monkeypatch.setenv("PY_APPS_CACHE", "auto")
+    assert find_lan_cache() == "http://10.0.0.2:8480"
+    monkeypatch.setenv("PY_APPS_CACHE", "http://cache.lan:8480/")
+    assert find_lan_cache() == "http://cache.lan:8480"
+
+
+def test_discover():
+    probe = ThreadingHTTPServer(("127.0.0.1", 0), SlowUpstream)
+    port = probe.server_address[1]
+    probe.server_close()
+
+    answer_discovery(8480, port=port)
+    assert discover("127.0.0.1", port=port, timeout=2) == "http://127.0.0.1:8480"
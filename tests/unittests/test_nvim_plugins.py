@@ -0,0 +1,51 @@
+import os
+import subprocess
+
+from py_apps.apps.devtools.nvim_plugins import git_env, mirror_path, plugin_urls
+
+
+def git(*args, **kwargs):
+    subprocess.run(["git", *args], check=True, capture_output=True, **kwargs)
+
+
+def test_mirror_path():
+    url = "https://github.com/folke/lazy.nvim.git"
+    assert mirror_path("/c", url) == "/c/github.com/folke/lazy.nvim.git"
+    assert mirror_path("/c", url[:-4]) == "/c/github.com/folke/lazy.nvim.git"
+    assert mirror_path("/c", "git@github.com:folke/lazy.nvim.git") is None
+    assert mirror_path("/c", "https://github.com/folke") is None
+
+
+def test_clone_from_cache(tmp_path):
+    upstream = tmp_path / "upstream"
+    git("init", "-q", str(upstream))
+    (upstream / "init.lua").write_text("return {}\n")
+    git("-C", str(upstream), "add", ".")
+    git(
+        "-C",
+        str(upstream),
+        "-c",
+        "user.name=t",
+        "-c",
+        "user.email=t@t",
+        "commit",
+        "-qm",
+        "init",
+    )
+
+    cache = tmp_path / "cache"
+    url = "https://github.com/a/plugin.nvim.git"
+    git("clone", "--mirror", "-q", str(upstream), mirror_path(str(cache), url))
+
+    # Cloned from the mirror, not from github.com
+    lazy_dir = tmp_path / "lazy"
+    git(
+        "clone",
+        "-q",
+        url,
+        str(lazy_dir / "plugin.nvim"),
+        env={**os.environ, **git_env(str(cache))},
+    )
+    assert (lazy_dir / "plugin.nvim" / "init.lua").read_text() == "return {}\n"
+    assert plugin_urls(str(lazy_dir)) == [url]
+    assert plugin_urls(str(tmp_path / "missing")) == []
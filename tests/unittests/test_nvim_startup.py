@@ -0,0 +1,29 @@
+from py_apps.apps.devtools.nvim_startup import parse_startuptime, tune_config
+
+
+LOG = """times in msec
+ clock   self+sourced   self:  sourced script
+000.008  000.008: --- NVIM STARTING ---
+010.502  000.310  000.310: sourcing /home/u/.config/nvim/init.lua
+052.341  000.051: --- NVIM STARTED ---
+"""
+
+
+def test_parse_startuptime():
+    assert parse_startuptime(LOG) == 52.341
+    assert parse_startuptime("times in msec\n") is None
+
+
+def test_tune_config(tmp_path):
+    init = tmp_path / "init.lua"
+    init.write_text('require("config.lazy")\n')
+
+    assert tune_config(str(tmp_path))
+    tuned = init.read_text()
+    assert tuned.startswith("-- py_apps: startup tuning\nif vim.loader then")
+    assert tuned.endswith('\nrequire("config.lazy")\n')
+
+    # Once only, & nothing without an init.lua
+    assert not tune_config(str(tmp_path))
+    assert init.read_text() == tuned
+    assert not tune_config(str(tmp_path / "missing"))
@@ -0,0 +1,105 @@
+import gzip
+import tarfile
+from io import BytesIO
+from os import makedirs, remove
+
+from py_apps.utils.pkg_index import PackageIndex
+
+
+APT_LIST = """Package: neovim
+Version: 0.9.5-6
+Description: heavily refactored vim fork
+Description-md5: 0123
+
+Package: python3-neovim
+Version: 0.5.0-1
+Description: Python3 library for scripting Neovim processes
+ (continuation line)
+
+Package: nvi
+Version: 1.81.6
+Description: 4.4BSD re-implementation of vi
+"""
+
+RPM_MD = """<?xml version="1.0"?>
+<metadata xmlns="http://linux.duke.edu/metadata/common" packages="1">
+<package type="rpm"><name>ripgrep</name><arch>x86_64</arch>
+<version epoch="0" ver="14.1.0" rel="1.fc40"/>
+<summary>Line oriented search tool</summary></package>
+</metadata>
+"""
+
+
+def add_tar_file(tar, name, content):
+    info = tarfile.TarInfo(name)
+    info.size = len(content)
+    tar.addfile(info, BytesIO(content))
+
+
+def make_rootfs(root):
+    makedirs(root / "var/lib/apt/lists")
+    (root / "var/lib/apt/lists/deb_dists_main_binary-amd64_Packages").write_text(
+        APT_LIST
+    )
+
+    makedirs(root / "var/lib/pacman/sync")
+    with tarfile.open(root / "var/lib/pacman/sync/extra.db", "w:gz") as tar:
+        add_tar_file(
+            tar,
+            "fzf-0.50.0-1/desc",
+            b"%FILENAME%\nfzf.pkg\n\n%NAME%\nfzf\n\n%VERSION%\n0.50.0-1\n\n"
+            + b"%DESC%\nCommand-line fuzzy finder\n",
+        )
+
+    makedirs(root / "var/cache/apk")
+    with tarfile.open(root / "var/cache/apk/APKINDEX.abcd.tar.gz", "w:gz") as tar:
+        add_tar_file(
+            tar, "APKINDEX", b"C:Q1x=\nP:htop\nV:3.3.0-r0\nT:Interactive viewer\n\n"
+        )
+
+    makedirs(root / "var/cache/dnf/fedora-1/repodata")
+    with gzip.open(
+        root / "var/cache/dnf/fedora-1/repodata/abc-primary.xml.gz", "wt"
+    ) as xml:
+        xml.write(RPM_MD)
+
+
+def test_index_and_search(tmp_path):
+    make_rootfs(tmp_path / "root")
+    index = PackageIndex(str(tmp_path / "index.db"), str(tmp_path / "root"))
+
+    assert index.refresh() == (4, 6)
+    assert [r.name for r in index.search("neovim")] == ["neovim", "python3-neovim"]
+    # Prefix of a word
+    assert [r.name for r in index.search("neo")][0] == "neovim"
+    assert [r.name for r in index.search("fuzz")] == ["fzf"]
+    assert index.search("ripgrep")[0].version == "14.1.0-1.fc40"
+    assert index.search("htop")[0].kind == "apk"
+    # Fuzzy: the chars in order
+    assert "neovim" in [r.name for r in index.search("nvm")]
+    assert index.search("") == []
+    assert index.versions(["neovim", "fzf", "vim"]) == {
+        "neovim": ["0.9.5-6"],
+        "fzf": ["0.50.0-1"],
+    }
+    index.close()
+
+
+def test_index_incremental(tmp_path):
+    root = tmp_path / "root"
+    make_rootfs(root)
+    index = PackageIndex(str(tmp_path / "index.db"), str(root))
+    index.refresh()
+
+    # Nothing changed
+    assert index.refresh() == (0, 6)
+
+    apt_list = root / "var/lib/apt/lists/deb_dists_main_binary-amd64_Packages"
+    apt_list.write_text(APT_LIST + "\nPackage: vim\nVersion: 9.1\nDescription: Vi\n")
+    assert index.refresh() == (1, 7)
+    assert [r.name for r in index.search("vim")][0] == "vim"
+
+    remove(root / "var/cache/apk/APKINDEX.abcd.tar.gz")
+    assert index.refresh() == (0, 6)
+    assert index.search("htop") == []
+    index.close()
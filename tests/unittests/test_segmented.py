@@ -0,0 +1,128 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import urandom
+from re import fullmatch
+from threading import Thread
+from time import monotonic, sleep
+
+import pytest
+
+from py_apps.utils import network
+from py_apps.utils.network import mirrors_of
+from py_apps.utils.segmented import SegmentedDownload
+
+
+PAYLOAD = urandom(3 * 1024 * 1024 + 123)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Seconds slept per 64KiB sent
+    delay = 0.0
+
+    def do_GET(self):
+        matched = fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        start, end = int(matched.group(1)), int(matched.group(2)) + 1
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(PAYLOAD)}")
+        self.send_header("Content-Length", str(end - start))
+        self.end_headers()
+        try:
+            for pos in range(start, end, 64 * 1024):
+                self.wfile.write(PAYLOAD[pos : min(pos + 64 * 1024, end)])
+                sleep(self.delay)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class SlowHandler(RangeHandler):
+    delay = 0.05
+
+
+class MissingHandler(RangeHandler):
+    def do_GET(self):
+        self.send_error(404)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(handler):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/file.bin"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_segmented_download(serve, tmp_path):
+    fast, slow = serve(RangeHandler), serve(SlowHandler)
+    file_path = tmp_path / "file.bin"
+
+    report = SegmentedDownload(
+        [slow, fast], str(file_path), piece_size=256 * 1024
+    ).run()
+
+    assert file_path.read_bytes() == PAYLOAD
+    assert report.size == len(PAYLOAD)
+    assert sum(report.per_source.values()) == len(PAYLOAD)
+    assert report.per_source[fast] > report.per_source[slow]
+
+
+def test_segmented_max_speed(serve, tmp_path):
+    file_path = tmp_path / "file.bin"
+    start = monotonic()
+
+    SegmentedDownload(
+        [serve(RangeHandler)], str(file_path), max_speed=len(PAYLOAD) * 2
+    ).run()
+
+    assert file_path.read_bytes() == PAYLOAD
+    # Half a second at that speed, the last chunk isn't waited for
+    assert monotonic() - start > 0.4
+
+
+def test_segmented_dead_source(serve, tmp_path):
+    missing, good = serve(MissingHandler), serve(RangeHandler)
+    file_path = tmp_path / "file.bin"
+
+    report = SegmentedDownload([missing, good], str(file_path)).run()
+
+    assert file_path.read_bytes() == PAYLOAD
+    assert report.per_source == {missing: 0, good: len(PAYLOAD)}
+
+    with pytest.raises(OSError):
+        SegmentedDownload([missing], str(tmp_path / "none.bin")).run()
+
+
+def test_native_downloader(serve, tmp_path, monkeypatch):
+    monkeypatch.setenv("PY_APPS_DOWNLOADER", "native")
+    file_path = tmp_path / "file.bin"
+
+    network.download([serve(SlowHandler), serve(RangeHandler)], str(file_path))
+
+    assert file_path.read_bytes() == PAYLOAD
+
+
+def test_mirrors_of(monkeypatch):
+    url = "https://download.jetbrains.com/idea/ideaIC-2024.1.tar.gz"
+    assert mirrors_of(url) == [
+        url,
+        "https://download-cdn.jetbrains.com/idea/ideaIC-2024.1.tar.gz",
+    ]
+
+    monkeypatch.setenv(
+        "PY_APPS_MIRRORS", "https://github.com/=https://ghproxy.net/https://github.com/"
+    )
+    assert mirrors_of("https://github.com/a/b/releases/download/v1/b.deb") == [
+        "https://github.com/a/b/releases/download/v1/b.deb",
+        "https://ghproxy.net/https://github.com/a/b/releases/download/v1/b.deb",
+    ]
+    assert mirrors_of("https://example.com/a") == ["https://example.com/a"]
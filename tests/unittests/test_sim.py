@@ -0,0 +1,52 @@
+import pytest
+
+from py_apps.utils.sim import OS_RELEASES, SimCell, make_rootfs, matrix, run_matrix
+from py_apps.utils.sys import get_distro_short_name
+
+
+@pytest.mark.parametrize(
+    "distro, expected",
+    [
+        ("debian", ["debian", ""]),
+        ("ubuntu", ["debian", "ubuntu"]),
+        ("fedora", ["redhat", "fedora"]),
+        ("arch", ["arch", ""]),
+        ("suse", ["suse", ""]),
+        ("void", ["void", ""]),
+        ("gentoo", ["gentoo", ""]),
+    ],
+)
+def test_rooted_distro_detection(distro, expected, tmp_path, monkeypatch):
+    make_rootfs(str(tmp_path), distro)
+    monkeypatch.setenv("PY_APPS_ROOT", str(tmp_path))
+
+    assert get_distro_short_name() == expected
+
+
+def test_matrix(tmp_path):
+    cells = matrix(["debian", "arch"], ["amd64"], ["vivaldi", "jetbrains/go"])
+    assert len(cells) == 4 and set(OS_RELEASES) >= {"debian", "arch"}
+
+    results = {result.cell: result for result in run_matrix(cells, str(tmp_path), 2)}
+
+    vivaldi = results[SimCell("debian", "amd64", "vivaldi")]
+    assert vivaldi.outcome == "ok"
+    # sudo -v of the job queue, aria2c, sudo apt install
+    assert vivaldi.spawns == {"sudo": 2, "aria2c": 1, "apt": 1}
+    # The chmod of the launch wrapper, in-process
+    assert vivaldi.avoided == 1
+    desktop = tmp_path / "debian-amd64-vivaldi/usr/share/applications"
+    assert (
+        "Exec=/usr/local/bin/vivaldi-stable"
+        in (desktop / "vivaldi-stable.desktop").read_text()
+    )
+    wrapper = tmp_path / "debian-amd64-vivaldi/usr/local/bin/vivaldi-stable"
+    assert "--no-sandbox" in wrapper.read_text()
+
+    assert results[SimCell("arch", "amd64", "vivaldi")].outcome.startswith("failed")
+
+    goland = results[SimCell("arch", "amd64", "jetbrains/go")]
+    assert goland.outcome == "ok" and goland.install_seconds > 0
+    assert (tmp_path / "arch-amd64-jetbrains-go/usr/bin/goland").read_text() == (
+        "#!/bin/sh\n"
+    )
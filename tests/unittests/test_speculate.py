@@ -0,0 +1,122 @@
+from time import monotonic, sleep
+
+import pytest
+
+from py_apps.apps import speculate
+from py_apps.apps.speculate import Speculator
+from py_apps.utils import network
+from py_apps.utils.fixture_server import NetProfile
+from py_apps.utils.network import download
+
+
+PAYLOAD = b"deb" * 1024
+URL = "https://example.org/app.deb"
+
+
+def wait_for(condition):
+    deadline = monotonic() + 10
+    while not condition() and monotonic() < deadline:
+        sleep(0.02)
+    return condition()
+
+
+class FakeApp:
+    prepared = 0
+
+    def prepare(self):
+        FakeApp.prepared += 1
+        return self
+
+    def artifacts(self):
+        return [URL]
+
+    def install(self):
+        return self
+
+
+@pytest.fixture(name="server")
+def fixture_server_app(fixture_server, monkeypatch):
+    server = fixture_server({URL: PAYLOAD})
+    monkeypatch.delenv("PY_APPS_SPECULATE", raising=False)
+    monkeypatch.setattr(speculate, "RESOLVE_DELAY", 0)
+    monkeypatch.setattr(speculate, "DWELL_DELAY", 0.1)
+    monkeypatch.setattr(speculate, "get_app", lambda app_id: FakeApp())
+    FakeApp.prepared = 0
+    return server
+
+
+def test_speculate_and_take(server, tmp_path):
+    speculator = Speculator()
+    speculator.highlight("vscode")
+    assert wait_for(lambda: speculator.source and speculator.source.files.get(URL))
+    assert FakeApp.prepared == 1
+    requests = server.stats["requests"]
+
+    app = speculator.take("vscode")()
+    output = tmp_path / "app.deb"
+    assert download(app.artifacts()[0], str(output), overwrite=True)
+    assert output.read_bytes() == PAYLOAD
+    assert FakeApp.prepared == 1 and server.stats["requests"] == requests
+    speculator.source.release()
+
+
+def test_speculate_install_releases(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(speculate, "submit_job", lambda title, func: func())
+    speculator = Speculator()
+    speculator.highlight("vscode")
+    assert wait_for(lambda: speculator.source and speculator.source.files.get(URL))
+    source = speculator.source
+
+    # Kept for the install, which didn't claim it
+    speculator.install("vscode")
+    assert source not in network._sources
+    assert not any((tmp_path / "cache/py_apps/speculate").iterdir())
+
+
+def test_speculate_discard(server, tmp_path):
+    # Not speculated: actions & apps whose prepare() has side effects
+    speculator = Speculator()
+    speculator.highlight("jetbrains_many")
+    speculator.highlight("firefox/esr")
+    sleep(0.3)
+    assert FakeApp.prepared == 0
+
+    # Moved away before the download, then left
+    speculator.highlight("vscode")
+    sleep(0.05)
+    speculator.highlight("back")
+    sleep(0.2)
+    speculator.close()
+    assert FakeApp.prepared == 1 and server.stats.get("requests", 0) == 0
+
+    # Over the budget
+    speculator = Speculator(budget=len(PAYLOAD) - 1)
+    speculator.highlight("vscode")
+    assert wait_for(lambda: server.stats.get("requests", 0) == 1)
+    sleep(0.1)
+    speculator.close()
+    assert server.stats.get("requests", 0) == 1 and speculator.source is None
+
+    # Downloaded, then left
+    speculator = Speculator()
+    speculator.highlight("vscode")
+    assert wait_for(lambda: speculator.source and speculator.source.files.get(URL))
+    speculator.close()
+    assert wait_for(lambda: not any((tmp_path / "cache/py_apps/speculate").iterdir()))
+    assert wait_for(lambda: speculator.source not in network._sources)
+
+
+def test_speculate_cancel(server, tmp_path):
+    # 1 MiB at 64 KiB/s, left a moment after the download starts
+    server.store.add(URL, b"d" * 1024 * 1024)
+    server.profile = NetProfile("slow", 0, 64 * 1024, 0)
+    speculator = Speculator()
+    speculator.highlight("vscode")
+    assert wait_for(lambda: server.stats.get("bytes", 0) > 0)
+
+    start = monotonic()
+    speculator.close()
+    assert wait_for(lambda: speculator.source not in network._sources)
+    # Cancelled, not waited for
+    assert monotonic() - start < 5
+    assert not any((tmp_path / "cache/py_apps/speculate").iterdir())
@@ -0,0 +1,22 @@
+from py_apps.utils.startup import measure_startups, startup_report
+from py_apps.utils.sys import is_small_machine
+
+
+def test_measure_startups():
+    times = iter([900.0, 310.0, 300.0, 320.0])
+    # The warm up start isn't counted
+    assert measure_startups(lambda: next(times), runs=3) == [310.0, 300.0, 320.0]
+    assert measure_startups(lambda: None) == []
+
+
+def test_startup_report():
+    report = startup_report([310.0, 300.0, 320.0], [200.0, 210.0, 190.0], "Neovim")
+    assert "300.0 ~ 320.0" in report and "200.0 ms" in report
+    assert report.endswith("-35%")
+    assert startup_report([], [200.0], "Firefox") == "Firefox 启动时间：无法测量"
+
+
+def test_is_small_machine():
+    assert is_small_machine(3800, 8)
+    assert is_small_machine(16 * 1024, 2)
+    assert not is_small_machine(16 * 1024, 4)
@@ -0,0 +1,112 @@
+import tarfile
+from io import BytesIO
+from os import stat
+from threading import Thread
+from time import sleep
+
+from py_apps.utils.store import ContentStore
+
+
+def make_tgz(file_path, top_dir, files):
+    with tarfile.open(file_path, "w:gz") as tar:
+        for name, content in files.items():
+            info = tarfile.TarInfo(f"{top_dir}/{name}")
+            info.size = len(content)
+            info.mode = 0o755 if name.endswith(".sh") else 0o644
+            tar.addfile(info, BytesIO(content))
+
+
+def test_store_dedupe_and_gc(tmp_path):
+    jbr = b"jbr" * 10000
+    make_tgz(
+        tmp_path / "goland.tgz",
+        "GoLand-2024.3",
+        {"jbr/lib": jbr, "bin/goland.sh": b"go"},
+    )
+    make_tgz(
+        tmp_path / "clion.tgz", "clion-2024.3", {"jbr/lib": jbr, "bin/clion.sh": b"c"}
+    )
+    store = ContentStore(str(tmp_path / "store"))
+
+    first = store.extract_tgz(str(tmp_path / "goland.tgz"), str(tmp_path / "goland"))
+    assert first.deduped_bytes == 0
+    second = store.extract_tgz(str(tmp_path / "clion.tgz"), str(tmp_path / "clion"))
+    assert second.files == 2
+    assert second.deduped_bytes == len(jbr)
+    assert second.written_bytes == 1
+
+    goland_jbr = stat(tmp_path / "goland/jbr/lib")
+    assert goland_jbr.st_ino == stat(tmp_path / "clion/jbr/lib").st_ino
+    assert (tmp_path / "clion/bin/clion.sh").read_bytes() == b"c"
+    # Read-only, shared objects mustn't be written through one of the trees
+    assert stat(tmp_path / "clion/bin/clion.sh").st_mode & 0o777 == 0o555
+    assert goland_jbr.st_mode & 0o777 == 0o444
+
+    # The shared runtime stays while clion uses it
+    assert store.uninstall(str(tmp_path / "goland")) == (1, 2)
+    assert (tmp_path / "clion/jbr/lib").read_bytes() == jbr
+    assert store.uninstall(str(tmp_path / "clion")) == (2, len(jbr) + 1)
+
+
+def test_store_upgrade(tmp_path):
+    lib = b"lib" * 10000
+    make_tgz(
+        tmp_path / "v1.tgz",
+        "VSCode-linux-x64",
+        {"lib": lib, "bin/code.sh": b"v1", "old.txt": b"old"},
+    )
+    make_tgz(
+        tmp_path / "v2.tgz",
+        "VSCode-linux-x64",
+        {"lib": lib, "bin/code.sh": b"v2", "new.txt": b"new"},
+    )
+    store = ContentStore(str(tmp_path / "store"))
+    target = str(tmp_path / "code")
+
+    store.extract_tgz(str(tmp_path / "v1.tgz"), target)
+    report = store.extract_tgz(str(tmp_path / "v2.tgz"), target)
+
+    assert report.upgrade
+    # code.sh changed, new.txt added
+    assert (report.changed_files, report.removed_files) == (2, 1)
+    assert report.written_bytes == 5
+    assert (tmp_path / "code/bin/code.sh").read_bytes() == b"v2"
+    assert (tmp_path / "code/lib").read_bytes() == lib
+    assert not (tmp_path / "code/old.txt").exists()
+    assert not (tmp_path / "code.py_apps-new").exists()
+    assert set(store.load_manifest(target)) == {"lib", "bin/code.sh", "new.txt"}
+    # The objects of v1 only are collected
+    assert store.uninstall(target) == (3, len(lib) + 5)
+
+
+def test_store_symlinked_dirs(tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    with tarfile.open(tmp_path / "evil.tgz", "w:gz") as tar:
+        link = tarfile.TarInfo("app/lib")
+        link.type = tarfile.SYMTYPE
+        link.linkname = str(outside)
+        tar.addfile(link)
+        info = tarfile.TarInfo("app/lib/evil.sh")
+        info.size = 4
+        tar.addfile(info, BytesIO(b"evil"))
+    store = ContentStore(str(tmp_path / "store"))
+
+    report = store.extract_tgz(str(tmp_path / "evil.tgz"), str(tmp_path / "app"))
+
+    assert report.files == 0
+    assert list(outside.iterdir()) == []
+
+
+def test_store_gc_waits_for_extractions(tmp_path):
+    store = ContentStore(str(tmp_path / "store"))
+    collected = []
+
+    # An extraction in progress holds the lock shared
+    with store._locked(exclusive=False):
+        collector = Thread(target=lambda: collected.append(store.gc()))
+        collector.start()
+        sleep(0.2)
+        assert collected == []
+    collector.join()
+    assert collected == [(0, 0)]
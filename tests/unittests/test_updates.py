@@ -0,0 +1,87 @@
+import json
+import subprocess
+from pathlib import Path
+
+from py_apps.apps import updates
+from py_apps.apps.devtools.jetbrains import Jetbrains, JetbrainsVariants
+from py_apps.apps.updates import Update, find_updates, installed_packages, normalize
+
+
+def test_normalize():
+    assert normalize("v0.10.2") == "0.10.2"
+    assert normalize("1:7.0.3495.6-1") == "7.0.3495.6"
+    assert normalize("1.95.3-1731513102") == "1.95.3"
+
+
+def test_find_updates():
+    found = find_updates(
+        installed={
+            "firefox/esr": "115.0-1",
+            "falkon": "24.08.1-1",
+            "vivaldi": "7.0.3495.6-1",
+            "vscode": "1.95.3-1731513102",
+            "nvim/default": "v0.10.2",
+        },
+        candidates={
+            # Only the revision changed, a package update still
+            "firefox/esr": ["115.0-2", "115.0-1"],
+            "falkon": ["24.08.1-1"],
+            "vivaldi": ["7.1.3570.35"],
+            "vscode": ["1.95.3"],
+            "nvim/default": ["0.10.2"],
+        },
+        packages={"firefox/esr": "firefox-esr", "falkon": "falkon"},
+    )
+    assert found == [
+        Update("firefox/esr", "115.0-1", "115.0-2", "firefox-esr"),
+        Update("vivaldi", "7.0.3495.6-1", "7.1.3570.35"),
+    ]
+
+
+def test_installed_packages(monkeypatch):
+    output = "falkon\t24.08.1-1\nfirefox-esr\t\nvivaldi-stable\t7.0.3495.6-1\n"
+    monkeypatch.setattr(updates, "check_cmd_exists", lambda _: True)
+    monkeypatch.setattr(
+        updates,
+        "run",
+        lambda cmd, **_: subprocess.CompletedProcess(cmd, 1, stdout=output),
+    )
+
+    # The removed package is left out
+    assert installed_packages(
+        "debian", ["falkon", "firefox-esr", "vivaldi-stable"]
+    ) == {
+        "falkon": "24.08.1-1",
+        "vivaldi-stable": "7.0.3495.6-1",
+    }
+    assert installed_packages("gentoo", ["falkon"]) == {}
+
+
+def test_installed_jetbrains(tmp_path, monkeypatch):
+    monkeypatch.setenv("PY_APPS_ROOT", str(tmp_path))
+    ide = Jetbrains(JetbrainsVariants.GOLAND)
+    Path(ide.install_dir).mkdir(parents=True)
+    Path(ide.install_dir, "product-info.json").write_text(
+        json.dumps({"name": "GoLand", "version": "2024.3"})
+    )
+    Path(ide.launcher).parent.mkdir(parents=True)
+    Path(ide.launcher).symlink_to(Path(ide.install_dir, "bin/goland.sh"))
+
+    assert updates._installed_jetbrains() == {"jetbrains/go": "2024.3"}
+
+
+def test_upgrade_batches_packages():
+    jobs = []
+    updates.upgrade(
+        [
+            Update("firefox/esr", "115.0-1", "115.0-2", "firefox-esr"),
+            Update("vivaldi", "7.0.3495.6-1", "7.1.3570.35"),
+            Update("falkon", "24.08.0-1", "24.08.1-1", "falkon"),
+        ],
+        submit=lambda title, func: jobs.append((title, func.args)),
+        distro="debian",
+    )
+    assert jobs == [
+        ("更新 2 个软件包", ("debian", ["firefox-esr", "falkon"])),
+        ("Vivaldi", ("vivaldi",)),
+    ]
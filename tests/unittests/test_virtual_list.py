@@ -0,0 +1,70 @@
+from asyncio import run
+
+import pytest
+
+from py_apps.commands.bench import make_catalog
+from py_apps.ui.selection import Selection
+from py_apps.ui.virtual_list import FuzzyFilter, VirtualList, plain_label
+
+
+def test_plain_label():
+    assert plain_label(":fox_face: [b]Firefox[/b] 浏览器") == "firefox 浏览器"
+
+
+def test_fuzzy_filter_ranking():
+    fuzzy = FuzzyFilter(["neovim-qt", "vim", "neovim", "nvim", "gvim-nox"])
+
+    assert fuzzy.filter("vim") == [1, 0, 2, 3, 4]
+    assert fuzzy.filter("nvim") == [3, 0, 2]
+    assert fuzzy.filter("NEO") == [0, 2]
+    assert fuzzy.filter("xyz") == []
+
+
+def test_fuzzy_filter_incremental():
+    labels = make_catalog(2000)[1]
+    incremental = FuzzyFilter(labels)
+
+    for query in ["n", "ne", "neo", "ne", "nd", "", "gtk", "gtk-"]:
+        assert incremental.filter(query) == FuzzyFilter(labels).filter(query)
+
+
+def test_virtual_list_ids():
+    # Duplicate labels keep their own ids
+    selection = Selection(["a", "b", "c"], ["same", "same", "other"], "test")
+
+    async def _choose():
+        async with selection.run_test() as pilot:
+            await pilot.press("down", "enter")
+
+    run(_choose())
+    assert selection.return_value == "b"
+
+    with pytest.raises(ValueError):
+        VirtualList(["a", "a"], ["x", "y"])
+
+
+def test_selection_search():
+    ids, labels = make_catalog(500)
+    selection = Selection(ids, labels, "test")
+
+    async def _choose():
+        async with selection.run_test() as pilot:
+            await pilot.press(*"-499")
+            await pilot.press("enter")
+
+    run(_choose())
+    assert selection.return_value == "pkg-499"
+
+
+def test_selection_highlight():
+    highlighted = []
+    selection = Selection(
+        ["a", "b", "c"], ["x", "y", "z"], "test", on_highlight=highlighted.append
+    )
+
+    async def _choose():
+        async with selection.run_test() as pilot:
+            await pilot.press("down", "down", "up", "enter")
+
+    run(_choose())
+    assert highlighted == ["a", "b", "c", "b"]
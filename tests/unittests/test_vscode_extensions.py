@@ -0,0 +1,98 @@
+import gzip
+import os
+
+import pytest
+
+from py_apps.apps.devtools import vscode, vscode_extensions
+from py_apps.apps.devtools.vscode import VSCode
+from py_apps.apps.devtools.vscode_extensions import (
+    fetch_vsix,
+    install_cmd,
+    parse_extensions,
+    target_platform,
+    vsix_path,
+    vsix_url,
+)
+from py_apps.errors.download_failed import DownloadFailedError
+
+
+VSIX = b"PK\x03\x04" + b"vsix" * 1024
+
+
+@pytest.fixture(name="server")
+def fixture_server_vsix(fixture_server):
+    return fixture_server(
+        {
+            vsix_url("a.plain", "linux-x64"): VSIX,
+            vsix_url("a.gzipped@1.0.0", "linux-x64"): gzip.compress(VSIX),
+        }
+    )
+
+
+def test_parse_extensions():
+    assert parse_extensions("ms-python.python, golang.go@0.41.0 bad") == [
+        "ms-python.python",
+        "golang.go@0.41.0",
+    ]
+    assert vsix_url("golang.go@0.41.0", "linux-arm64").endswith(
+        "/publishers/golang/vsextensions/go/0.41.0/vspackage?targetPlatform=linux-arm64"
+    )
+    # Shareable across architectures
+    assert (
+        vsix_path("/c", "golang.go", "linux-x64")
+        == "/c/golang.go-latest-linux-x64.vsix"
+    )
+    assert target_platform("arm64") == "linux-arm64"
+
+
+def test_fetch_vsix(server, tmp_path):
+    cache = str(tmp_path / "vsix")
+    files = fetch_vsix(["a.plain", "a.gzipped@1.0.0", "a.missing"], cache, "linux-x64")
+
+    # The missing one is left out, the gzipped one is decompressed
+    assert files == [
+        vsix_path(cache, "a.plain", "linux-x64"),
+        vsix_path(cache, "a.gzipped@1.0.0", "linux-x64"),
+    ]
+    for file_path in files:
+        with open(file_path, "rb") as vsix:
+            assert vsix.read() == VSIX
+    assert install_cmd("code", files) == [
+        "code",
+        "--install-extension",
+        files[0],
+        "--install-extension",
+        files[1],
+        "--force",
+    ]
+
+
+def test_vsix_cache_ttl(server, tmp_path, monkeypatch):
+    cache = str(tmp_path / "vsix")
+    fetch_vsix(["a.plain", "a.gzipped@1.0.0"], cache, "linux-x64")
+    served = server.stats.get("requests", 0)
+
+    # Fresh & pinned ones come from the cache
+    fetch_vsix(["a.plain", "a.gzipped@1.0.0"], cache, "linux-x64")
+    assert server.stats.get("requests", 0) == served
+
+    # A stale latest one is downloaded again, the pinned one is kept
+    monkeypatch.setattr(vscode_extensions, "VSIX_TTL", 0)
+    os.utime(vsix_path(cache, "a.plain", "linux-x64"), (0, 0))
+    fetch_vsix(["a.plain", "a.gzipped@1.0.0"], cache, "linux-x64")
+    assert server.stats.get("requests", 0) > served
+    assert os.path.getmtime(vsix_path(cache, "a.plain", "linux-x64")) > 0
+
+
+def test_install_download_failed(monkeypatch, tmp_path):
+    monkeypatch.setenv("PY_APPS_ROOT", str(tmp_path))
+    ran = []
+    monkeypatch.setattr(vscode, "download", lambda *args, **kwargs: False)
+    monkeypatch.setattr(vscode, "run", lambda *args, **kwargs: ran.append(args))
+
+    editor = VSCode(extensions=[])
+    editor.pkg_url = "https://example.org/code.deb"
+    with pytest.raises(DownloadFailedError):
+        editor.install()
+    # Nothing installed from a missing or stale file
+    assert not ran